@@ -5,57 +5,46 @@ and streams AI responses to the frontend via SSE.
 """
 from flask import Flask, request, Response, jsonify, render_template, stream_with_context
 import requests
-import sqlite3
+from requests.adapters import HTTPAdapter
 import json
 import uuid
 import os
+import sys
+import atexit
+import signal
 import threading
 from datetime import datetime
 
+import db
+import upload
+from config import DIFY_API_KEY, DIFY_BASE_URL
+from db import init_db  # noqa: F401  (start.sh: `from app import init_db`)
+
 app = Flask(__name__, template_folder="templates", static_folder="static")
 
+# Flush write-behind turns and close pooled connections on exit
+atexit.register(db.shutdown)
+
 # ─── Config ───────────────────────────────────────────────────────────────────
-DIFY_API_KEY  = os.environ.get("DIFY_API_KEY", "")
-DIFY_BASE_URL = os.environ.get("DIFY_BASE_URL", "http://115.29.149.96/v1")
-DB_PATH       = os.path.join(os.path.dirname(os.path.abspath(__file__)), "webchat.db")
+DIFY_POOL_SIZE = int(os.environ.get("DIFY_POOL_SIZE", 64))
+
+# Shared upstream session: keep-alive connections reused across request threads
+_session = requests.Session()
+_session.mount("http://",  HTTPAdapter(pool_maxsize=DIFY_POOL_SIZE))
+_session.mount("https://", HTTPAdapter(pool_maxsize=DIFY_POOL_SIZE))
 
 # Per-conversation stop events (keyed by local conversation id)
 _stop_events: dict[str, threading.Event] = {}
 
-# ─── Database ─────────────────────────────────────────────────────────────────
-
-def get_db():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    return conn
-
-
-def init_db():
-    with get_db() as c:
-        c.executescript("""
-            CREATE TABLE IF NOT EXISTS conversations (
-                id                   TEXT PRIMARY KEY,
-                title                TEXT DEFAULT '新对话',
-                dify_conversation_id TEXT,
-                user_id              TEXT DEFAULT 'default_user',
-                created_at           TEXT,
-                updated_at           TEXT
-            );
-            CREATE TABLE IF NOT EXISTS messages (
-                id               TEXT PRIMARY KEY,
-                conversation_id  TEXT NOT NULL,
-                role             TEXT NOT NULL,
-                content          TEXT,
-                files_json       TEXT,
-                dify_message_id  TEXT,
-                created_at       TEXT,
-                FOREIGN KEY (conversation_id)
-                    REFERENCES conversations(id) ON DELETE CASCADE
-            );
-            CREATE INDEX IF NOT EXISTS idx_messages_conv ON messages(conversation_id);
-            CREATE INDEX IF NOT EXISTS idx_conv_updated  ON conversations(updated_at DESC);
-        """)
+# Titles of conversations with an answer in flight; `done` is sent from here
+_turn_titles: dict[str, str] = {}
+
+def paged(rows, cursor):
+    """List body stays a plain array; the next-page cursor goes in a header."""
+    resp = jsonify(rows)
+    if cursor:
+        resp.headers["X-Next-Cursor"] = cursor
+    return resp
 
 
 # ─── Routes: static page ──────────────────────────────────────────────────────
@@ -69,11 +58,13 @@ def index():
 
 @app.route("/api/conversations", methods=["GET"])
 def list_conversations():
-    with get_db() as c:
-        rows = c.execute(
-            "SELECT * FROM conversations ORDER BY updated_at DESC LIMIT 200"
-        ).fetchall()
-    return jsonify([dict(r) for r in rows])
+    try:
+        rows, cursor = db.list_conversations(
+            request.args.get("limit", type=int), request.args.get("cursor")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return paged(rows, cursor)
 
 
 @app.route("/api/conversations", methods=["POST"])
@@ -83,38 +74,25 @@ def create_conversation():
     now  = datetime.now().isoformat()
     title  = data.get("title", "新对话")[:80]
     user   = data.get("user", "default_user")
-    with get_db() as c:
-        c.execute(
-            "INSERT INTO conversations (id, title, user_id, created_at, updated_at) VALUES (?,?,?,?,?)",
-            (cid, title, user, now, now),
-        )
+    db.create_conversation(cid, title, user, now)
     return jsonify({"id": cid, "title": title, "created_at": now, "updated_at": now})
 
 
 @app.route("/api/conversations/<cid>", methods=["DELETE"])
 def delete_conversation(cid):
-    with get_db() as c:
-        c.execute("DELETE FROM messages     WHERE conversation_id=?", (cid,))
-        c.execute("DELETE FROM conversations WHERE id=?",             (cid,))
+    db.delete_conversation(cid)
     return jsonify({"success": True})
 
 
 @app.route("/api/conversations/<cid>/messages", methods=["GET"])
 def get_messages(cid):
-    with get_db() as c:
-        rows = c.execute(
-            "SELECT * FROM messages WHERE conversation_id=? ORDER BY created_at",
-            (cid,),
-        ).fetchall()
-    out = []
-    for r in rows:
-        m = dict(r)
-        try:
-            m["files"] = json.loads(m["files_json"]) if m.get("files_json") else []
-        except Exception:
-            m["files"] = []
-        out.append(m)
-    return jsonify(out)
+    try:
+        rows, cursor = db.get_messages(
+            cid, request.args.get("limit", type=int), request.args.get("cursor")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return paged(rows, cursor)
 
 
 @app.route("/api/conversations/<cid>/title", methods=["PUT"])
@@ -122,11 +100,9 @@ def update_title(cid):
     data  = request.get_json(silent=True) or {}
     title = data.get("title", "新对话")[:80]
     now   = datetime.now().isoformat()
-    with get_db() as c:
-        c.execute(
-            "UPDATE conversations SET title=?, updated_at=? WHERE id=?",
-            (title, now, cid),
-        )
+    db.update_title(cid, title, now)
+    if cid in _turn_titles:
+        _turn_titles[cid] = title
     return jsonify({"success": True, "title": title})
 
 
@@ -141,7 +117,7 @@ def stop_chat():
         _stop_events[cid].set()
     if task_id:
         try:
-            requests.post(
+            _session.post(
                 f"{DIFY_BASE_URL}/chat-messages/{task_id}/stop",
                 headers={"Authorization": f"Bearer {DIFY_API_KEY}"},
                 json={"user": data.get("user", "default_user")},
@@ -165,35 +141,15 @@ def chat():
 
     now = datetime.now().isoformat()
 
-    # Create conversation if needed
-    if not cid:
-        cid   = str(uuid.uuid4())
-        title = query[:60]
-        with get_db() as c:
-            c.execute(
-                "INSERT INTO conversations (id, title, user_id, created_at, updated_at) VALUES (?,?,?,?,?)",
-                (cid, title, user, now, now),
-            )
-
-    # Fetch dify conversation id
-    with get_db() as c:
-        row = c.execute(
-            "SELECT dify_conversation_id FROM conversations WHERE id=?", (cid,)
-        ).fetchone()
-    dify_cid = (row["dify_conversation_id"] or "") if row else ""
+    # Create conversation if needed, fetch dify conversation id, save user message
+    cid, dify_cid, title = db.begin_turn(
+        cid, str(uuid.uuid4()), user, query, files, str(uuid.uuid4()), now
+    )
 
-    # Register stop event
+    # Register stop event and live title
     stop_evt = threading.Event()
     _stop_events[cid] = stop_evt
-
-    # Save user message
-    user_mid = str(uuid.uuid4())
-    with get_db() as c:
-        c.execute(
-            "INSERT INTO messages (id, conversation_id, role, content, files_json, created_at)"
-            " VALUES (?,?,?,?,?,?)",
-            (user_mid, cid, "user", query, json.dumps(files) if files else None, now),
-        )
+    _turn_titles[cid] = title
 
     def generate():
         nonlocal dify_cid
@@ -219,7 +175,7 @@ def chat():
         try:
             yield f"data: {json.dumps({'type':'start','conversation_id':cid})}\n\n"
 
-            with requests.post(
+            with _session.post(
                 f"{DIFY_BASE_URL}/chat-messages",
                 headers=headers,
                 json=payload,
@@ -263,21 +219,8 @@ def chat():
                         dify_mid   = ev.get("id", "")
                         saved_at   = datetime.now().isoformat()
                         ai_mid     = str(uuid.uuid4())
-                        with get_db() as c:
-                            c.execute(
-                                "INSERT INTO messages (id,conversation_id,role,content,dify_message_id,created_at)"
-                                " VALUES (?,?,?,?,?,?)",
-                                (ai_mid, cid, "assistant", full_answer, dify_mid, saved_at),
-                            )
-                            c.execute(
-                                "UPDATE conversations SET dify_conversation_id=?, updated_at=? WHERE id=?",
-                                (dify_cid, saved_at, cid),
-                            )
-                        with get_db() as c:
-                            row2 = c.execute(
-                                "SELECT title FROM conversations WHERE id=?", (cid,)
-                            ).fetchone()
-                        title = row2["title"] if row2 else "新对话"
+                        db.end_turn(cid, dify_cid, full_answer, dify_mid, ai_mid, saved_at)
+                        title      = _turn_titles.get(cid, "新对话")
                         yield f"data: {json.dumps({'type':'done','conversation_id':cid,'title':title})}\n\n"
 
                     elif etype == "error":
@@ -294,6 +237,7 @@ def chat():
             yield f"data: {json.dumps({'type':'error','error':f'系统错误: {str(e)[:200]}'})}\n\n"
         finally:
             _stop_events.pop(cid, None)
+            _turn_titles.pop(cid, None)
 
     return Response(
         stream_with_context(generate()),
@@ -308,55 +252,92 @@ def chat():
 
 # ─── Routes: file upload ──────────────────────────────────────────────────────
 
-@app.route("/api/upload", methods=["POST"])
-def upload_file():
-    if "file" not in request.files:
-        return jsonify({"error": "No file provided"}), 400
-    f    = request.files["file"]
-    user = request.form.get("user", "default_user")
+def relay_upload(path, max_bytes, default_name, default_type, timeout, missing_msg, timeout_msg):
+    """Stream the multipart body from the client socket to Dify, never spooling it."""
+    if (request.content_length or 0) > max_bytes + upload.FORM_OVERHEAD:
+        return jsonify({"error": f"文件过大，上限 {max_bytes // (1024 * 1024)}MB"}), 413
+    upload_id = request.headers.get("X-Upload-Id")
+    try:
+        relay = upload.MultipartRelay(
+            request.content_type or "", max_bytes, default_name, default_type,
+            {"user": "default_user"}, upload_id,
+        )
+    except ValueError:
+        return jsonify({"error": missing_msg}), 400
+    upload.track(upload_id, request.content_length)
+    stream = request.stream
+    status = 500
     try:
-        resp = requests.post(
-            f"{DIFY_BASE_URL}/files/upload",
-            headers={"Authorization": f"Bearer {DIFY_API_KEY}"},
-            files={"file": (f.filename, f.stream, f.content_type or "application/octet-stream")},
-            data={"user": user},
-            timeout=60,
+        # Read until the file part begins, so nothing is sent if there is none
+        head = bytearray()
+        while not (relay.file_started or relay.finished):
+            head += relay.feed(stream.read(upload.CHUNK_SIZE) or None)
+        if not relay.file_started:
+            status = 400
+            return jsonify({"error": missing_msg}), status
+
+        def body():
+            yield bytes(head)
+            while not relay.finished:
+                out = relay.feed(stream.read(upload.CHUNK_SIZE) or None)
+                if out:
+                    yield out
+
+        resp = _session.post(
+            f"{DIFY_BASE_URL}{path}",
+            headers={"Authorization": f"Bearer {DIFY_API_KEY}", "Content-Type": relay.content_type},
+            data=body(),
+            timeout=timeout,
         )
-        return jsonify(resp.json()), resp.status_code
+        status = resp.status_code
+        return jsonify(resp.json()), status
+    except upload.UploadTooLarge as e:
+        status = 413
+        return jsonify({"error": f"文件过大，上限 {e.args[0] // (1024 * 1024)}MB"}), status
+    except ValueError:
+        status = 400
+        return jsonify({"error": missing_msg}), status
     except requests.exceptions.Timeout:
-        return jsonify({"error": "上传超时，请重试"}), 504
+        status = 504
+        return jsonify({"error": timeout_msg}), status
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        status = 500
+        return jsonify({"error": str(e)}), status
+    finally:
+        upload.finish(upload_id, status)
+
+
+@app.route("/api/upload", methods=["POST"])
+def upload_file():
+    return relay_upload(
+        "/files/upload", upload.UPLOAD_MAX_BYTES, None, "application/octet-stream",
+        60, "No file provided", "上传超时，请重试",
+    )
+
+
+@app.route("/api/upload/progress/<upload_id>", methods=["GET"])
+def upload_progress(upload_id):
+    p = upload.progress(upload_id)
+    if p is None:
+        return jsonify({"error": "unknown upload"}), 404
+    return jsonify(p)
 
 
 # ─── Routes: audio-to-text ────────────────────────────────────────────────────
 
 @app.route("/api/audio-to-text", methods=["POST"])
 def audio_to_text():
-    if "file" not in request.files:
-        return jsonify({"error": "No audio file provided"}), 400
-    audio = request.files["file"]
-    user  = request.form.get("user", "default_user")
-    fname = audio.filename or "recording.webm"
-    ctype = audio.content_type or "audio/webm"
-    try:
-        resp = requests.post(
-            f"{DIFY_BASE_URL}/audio-to-text",
-            headers={"Authorization": f"Bearer {DIFY_API_KEY}"},
-            files={"file": (fname, audio.stream, ctype)},
-            data={"user": user},
-            timeout=30,
-        )
-        return jsonify(resp.json()), resp.status_code
-    except requests.exceptions.Timeout:
-        return jsonify({"error": "语音识别超时，请重试"}), 504
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return relay_upload(
+        "/audio-to-text", upload.AUDIO_MAX_BYTES, "recording.webm", "audio/webm",
+        30, "No audio file provided", "语音识别超时，请重试",
+    )
 
 
 # ─── Entry point ──────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
+    # Turn SIGTERM into a normal exit so atexit flushes the write-behind queue
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
     init_db()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=False, threaded=True)
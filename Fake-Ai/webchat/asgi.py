@@ -0,0 +1,390 @@
+"""
+Dify AI WebChat ASGI Backend
+Starlette application exposing the same HTTP API as app.py, but serving every
+in-flight answer as a coroutine: all upstream Dify SSE streams are multiplexed
+on one event loop through a single pooled aiohttp client session instead of
+holding one OS thread and one blocking connection per answer. aiohttp rather
+than httpx: its connector hands out keep-alive connections in constant time
+and parses responses in C, where httpx's pool rescans every connection on each
+request and ate most of the worker's CPU at a few hundred concurrent streams.
+
+Run with:  uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import contextlib
+import json
+import os
+import uuid
+from datetime import datetime
+
+import aiohttp
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import db
+import upload
+from config import DIFY_API_KEY, DIFY_BASE_URL
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+DIFY_MAX_CONNECTIONS = int(os.environ.get("DIFY_MAX_CONNECTIONS", 1000))   # idle ones are all kept alive
+DIFY_READ_BUFSIZE    = 1024 * 1024     # longest SSE line read from Dify (message_end metadata)
+INDEX_HTML           = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "index.html")
+
+# Shared upstream client, created in lifespan()
+_client: aiohttp.ClientSession | None = None
+
+# Per-conversation stop events (keyed by local conversation id)
+_stop_events: dict[str, asyncio.Event] = {}
+
+# Titles of conversations with an answer in flight; `done` is sent from here
+_turn_titles: dict[str, str] = {}
+
+
+def sse(obj: dict) -> str:
+    return f"data: {json.dumps(obj)}\n\n"
+
+
+def auth_headers() -> dict:
+    return {"Authorization": f"Bearer {DIFY_API_KEY}"}
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    global _client
+    await run_in_threadpool(db.init_db)
+    _client = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=DIFY_MAX_CONNECTIONS, limit_per_host=0),
+        # Per read, not per answer: streams run as long as Dify keeps talking
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=120),
+        read_bufsize=DIFY_READ_BUFSIZE,
+    )
+    try:
+        yield
+    finally:
+        await _client.close()
+        _client = None
+        await run_in_threadpool(db.shutdown)
+
+
+# ─── Routes: static page ──────────────────────────────────────────────────────
+
+async def index(request: Request):
+    return FileResponse(INDEX_HTML, media_type="text/html")
+
+
+# ─── Routes: conversations ────────────────────────────────────────────────────
+
+async def list_conversations(request: Request):
+    try:
+        rows, cursor = await run_in_threadpool(
+            db.list_conversations, _int_arg(request, "limit"), request.query_params.get("cursor")
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return paged(rows, cursor)
+
+
+async def create_conversation(request: Request):
+    data  = await _json_body(request)
+    cid   = str(uuid.uuid4())
+    now   = datetime.now().isoformat()
+    title = data.get("title", "新对话")[:80]
+    user  = data.get("user", "default_user")
+    await run_in_threadpool(db.create_conversation, cid, title, user, now)
+    return JSONResponse({"id": cid, "title": title, "created_at": now, "updated_at": now})
+
+
+async def delete_conversation(request: Request):
+    cid = request.path_params["cid"]
+    await run_in_threadpool(db.delete_conversation, cid)
+    return JSONResponse({"success": True})
+
+
+async def get_messages(request: Request):
+    cid = request.path_params["cid"]
+    try:
+        rows, cursor = await run_in_threadpool(
+            db.get_messages, cid, _int_arg(request, "limit"), request.query_params.get("cursor")
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return paged(rows, cursor)
+
+
+async def update_title(request: Request):
+    cid   = request.path_params["cid"]
+    data  = await _json_body(request)
+    title = data.get("title", "新对话")[:80]
+    now   = datetime.now().isoformat()
+    await run_in_threadpool(db.update_title, cid, title, now)
+    if cid in _turn_titles:
+        _turn_titles[cid] = title
+    return JSONResponse({"success": True, "title": title})
+
+
+def paged(rows: list, cursor: str | None) -> JSONResponse:
+    """List body stays a plain array; the next-page cursor goes in a header."""
+    return JSONResponse(rows, headers={"X-Next-Cursor": cursor} if cursor else None)
+
+
+def _int_arg(request: Request, name: str) -> int | None:
+    # Same leniency as Flask's request.args.get(name, type=int)
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return None
+
+
+async def _json_body(request: Request) -> dict:
+    try:
+        data = await request.json()
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+# ─── Routes: chat ─────────────────────────────────────────────────────────────
+
+async def stop_chat(request: Request):
+    data    = await _json_body(request)
+    cid     = data.get("conversation_id")
+    task_id = data.get("task_id")
+    if cid and cid in _stop_events:
+        _stop_events[cid].set()
+    if task_id:
+        try:
+            async with _client.post(
+                f"{DIFY_BASE_URL}/chat-messages/{task_id}/stop",
+                headers=auth_headers(),
+                json={"user": data.get("user", "default_user")},
+                timeout=aiohttp.ClientTimeout(total=5),
+            ):
+                pass
+        except Exception:
+            pass
+    return JSONResponse({"success": True})
+
+
+async def chat(request: Request):
+    data  = await _json_body(request)
+    cid   = data.get("conversation_id")
+    query = (data.get("query") or "").strip()
+    files = data.get("files") or []
+    user  = data.get("user") or "default_user"
+
+    if not query:
+        return JSONResponse({"error": "query is required"}, status_code=400)
+
+    now = datetime.now().isoformat()
+
+    # Create conversation if needed, fetch dify conversation id, save user message
+    cid, dify_cid, title = await run_in_threadpool(
+        db.begin_turn, cid, str(uuid.uuid4()), user, query, files, str(uuid.uuid4()), now
+    )
+
+    # Register stop event and live title
+    stop_evt = asyncio.Event()
+    _stop_events[cid] = stop_evt
+    _turn_titles[cid] = title
+
+    async def generate():
+        nonlocal dify_cid
+
+        payload = {
+            "inputs":            {},
+            "query":             query,
+            "response_mode":     "streaming",
+            "conversation_id":   dify_cid,
+            "user":              user,
+        }
+        if files:
+            payload["files"] = files
+
+        full_answer  = ""
+        dify_task_id = None
+
+        try:
+            yield sse({"type": "start", "conversation_id": cid})
+
+            async with _client.post(
+                f"{DIFY_BASE_URL}/chat-messages",
+                headers=auth_headers(),
+                json=payload,
+            ) as resp:
+                if resp.status != 200:
+                    snippet = (await resp.read()).decode("utf-8", errors="ignore")[:400]
+                    yield sse({"type": "error", "error": f"API错误({resp.status}): {snippet}"})
+                    return
+
+                async for raw in resp.content:
+                    line = raw.decode("utf-8", errors="ignore").rstrip("\r\n")
+                    if stop_evt.is_set():
+                        yield sse({"type": "stopped"})
+                        break
+                    if not line.startswith("data: "):
+                        continue
+                    chunk_str = line[6:].strip()
+                    if chunk_str in ("[DONE]", ""):
+                        continue
+                    try:
+                        ev = json.loads(chunk_str)
+                    except json.JSONDecodeError:
+                        continue
+
+                    etype = ev.get("event", "")
+
+                    if etype in ("message", "agent_message"):
+                        piece = ev.get("answer", "")
+                        full_answer += piece
+                        dify_cid     = ev.get("conversation_id") or dify_cid
+                        dify_task_id = ev.get("task_id") or dify_task_id
+                        if piece:
+                            yield sse({"type": "chunk", "content": piece, "task_id": dify_task_id})
+
+                    elif etype in ("message_end", "agent_message_end"):
+                        dify_cid = ev.get("conversation_id") or dify_cid
+                        saved_at = datetime.now().isoformat()
+                        db.end_turn(cid, dify_cid, full_answer, ev.get("id", ""),
+                                    str(uuid.uuid4()), saved_at)
+                        title    = _turn_titles.get(cid, "新对话")
+                        yield sse({"type": "done", "conversation_id": cid, "title": title})
+
+                    elif etype == "error":
+                        yield sse({"type": "error", "error": ev.get("message", "未知错误")})
+
+                    elif etype == "ping":
+                        pass  # keep-alive
+
+        except aiohttp.ClientConnectorError:
+            yield sse({"type": "error", "error": "无法连接到AI服务，请检查网络连接"})
+        except asyncio.TimeoutError:
+            yield sse({"type": "error", "error": "请求超时，请稍后重试"})
+        except Exception as e:
+            yield sse({"type": "error", "error": f"系统错误: {str(e)[:200]}"})
+        finally:
+            _stop_events.pop(cid, None)
+            _turn_titles.pop(cid, None)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control":    "no-cache",
+            "X-Accel-Buffering":"no",
+            "Connection":       "keep-alive",
+        },
+    )
+
+
+# ─── Routes: file upload ──────────────────────────────────────────────────────
+
+async def relay_upload(request: Request, path: str, max_bytes: int, default_name: str | None,
+                       default_type: str, timeout: float, missing_msg: str, timeout_msg: str):
+    """Stream the multipart body from the client socket to Dify, never spooling it."""
+    length = int(request.headers.get("content-length") or 0)
+    if length > max_bytes + upload.FORM_OVERHEAD:
+        return JSONResponse({"error": f"文件过大，上限 {max_bytes // (1024 * 1024)}MB"}, status_code=413)
+    upload_id = request.headers.get("x-upload-id")
+    try:
+        relay = upload.MultipartRelay(
+            request.headers.get("content-type", ""), max_bytes, default_name, default_type,
+            {"user": "default_user"}, upload_id,
+        )
+    except ValueError:
+        return JSONResponse({"error": missing_msg}, status_code=400)
+    upload.track(upload_id, length or None)
+    chunks = request.stream().__aiter__()
+    status = 500
+    try:
+        # Read until the file part begins, so nothing is sent if there is none
+        head = bytearray()
+        while not (relay.file_started or relay.finished):
+            head += relay.feed(await anext(chunks, None) or None)
+        if not relay.file_started:
+            status = 400
+            return JSONResponse({"error": missing_msg}, status_code=status)
+
+        async def body():
+            yield bytes(head)
+            while not relay.finished:
+                out = relay.feed(await anext(chunks, None) or None)
+                if out:
+                    yield out
+
+        async with _client.post(
+            f"{DIFY_BASE_URL}{path}",
+            headers={**auth_headers(), "Content-Type": relay.content_type},
+            data=body(),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as resp:
+            status = resp.status
+            return JSONResponse(await resp.json(content_type=None), status_code=status)
+    except upload.UploadTooLarge as e:
+        status = 413
+        return JSONResponse({"error": f"文件过大，上限 {e.args[0] // (1024 * 1024)}MB"}, status_code=status)
+    except ValueError:
+        status = 400
+        return JSONResponse({"error": missing_msg}, status_code=status)
+    except asyncio.TimeoutError:
+        status = 504
+        return JSONResponse({"error": timeout_msg}, status_code=status)
+    except Exception as e:
+        status = 500
+        return JSONResponse({"error": str(e)}, status_code=status)
+    finally:
+        upload.finish(upload_id, status)
+
+
+async def upload_file(request: Request):
+    return await relay_upload(
+        request, "/files/upload", upload.UPLOAD_MAX_BYTES, None, "application/octet-stream",
+        60, "No file provided", "上传超时，请重试",
+    )
+
+
+async def upload_progress(request: Request):
+    p = upload.progress(request.path_params["upload_id"])
+    if p is None:
+        return JSONResponse({"error": "unknown upload"}, status_code=404)
+    return JSONResponse(p)
+
+
+# ─── Routes: audio-to-text ────────────────────────────────────────────────────
+
+async def audio_to_text(request: Request):
+    return await relay_upload(
+        request, "/audio-to-text", upload.AUDIO_MAX_BYTES, "recording.webm", "audio/webm",
+        30, "No audio file provided", "语音识别超时，请重试",
+    )
+
+
+# ─── App ──────────────────────────────────────────────────────────────────────
+
+app = Starlette(
+    routes=[
+        Route("/",                                  index),
+        Route("/api/conversations",                 list_conversations,  methods=["GET"]),
+        Route("/api/conversations",                 create_conversation, methods=["POST"]),
+        Route("/api/conversations/{cid}",           delete_conversation, methods=["DELETE"]),
+        Route("/api/conversations/{cid}/messages",  get_messages,        methods=["GET"]),
+        Route("/api/conversations/{cid}/title",     update_title,        methods=["PUT"]),
+        Route("/api/chat/stop",                     stop_chat,           methods=["POST"]),
+        Route("/api/chat",                          chat,                methods=["POST"]),
+        Route("/api/upload",                        upload_file,         methods=["POST"]),
+        Route("/api/upload/progress/{upload_id}",   upload_progress,     methods=["GET"]),
+        Route("/api/audio-to-text",                 audio_to_text,       methods=["POST"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+# ─── Entry point ──────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(os.environ.get("PORT", 5000))
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,130 @@
+"""
+SQLite micro-benchmark: chat turns per second, before and after the pooled
+access layer and write-behind queue in db.py.
+
+"before" replays what one chat turn used to cost: five fresh connections,
+each re-issuing PRAGMA journal_mode=WAL (conversation insert, dify id lookup,
+user message insert, assistant insert + conversation update, title re-read).
+"pooled" is db.begin_turn() + finish_turn() on pooled, tuned connections,
+writing what the write-behind queue does in one transaction per turn.
+"write-behind" is db.begin_turn() + db.end_turn(), timed until the queue has
+been flushed to disk.
+
+Usage:  python bench/bench_db.py --turns 2000 --threads 1,8
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+def legacy_turn(path: str, i: int) -> None:
+    def get_db():
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    now, cid = datetime.now().isoformat(), str(uuid.uuid4())
+    for sql, params in (
+        ("INSERT INTO conversations (id, title, user_id, created_at, updated_at) VALUES (?,?,?,?,?)",
+         (cid, f"q{i}", "u", now, now)),
+        ("SELECT dify_conversation_id FROM conversations WHERE id=?", (cid,)),
+        ("INSERT INTO messages (id, conversation_id, role, content, files_json, created_at)"
+         " VALUES (?,?,?,?,?,?)", (str(uuid.uuid4()), cid, "user", f"q{i}", json.dumps([]), now)),
+    ):
+        conn = get_db()
+        with conn:
+            conn.execute(sql, params).fetchall()
+        conn.close()
+    conn = get_db()
+    with conn:
+        conn.execute(
+            "INSERT INTO messages (id,conversation_id,role,content,dify_message_id,created_at)"
+            " VALUES (?,?,?,?,?,?)", (str(uuid.uuid4()), cid, "assistant", "a" * 500, "d", now))
+        conn.execute(
+            "UPDATE conversations SET dify_conversation_id=?, updated_at=? WHERE id=?", ("d", now, cid))
+    conn.close()
+    conn = get_db()
+    with conn:
+        conn.execute("SELECT title FROM conversations WHERE id=?", (cid,)).fetchone()
+    conn.close()
+
+
+def finish_turn(cid: str, dify_cid: str, answer: str, dify_mid: str,
+                ai_mid: str, saved_at: str) -> str:
+    """Save the assistant message and bump the conversation; returns the title."""
+    with db.transaction() as c:
+        c.execute(
+            "INSERT INTO messages (id,conversation_id,role,content,dify_message_id,created_at)"
+            " VALUES (?,?,?,?,?,?)",
+            (ai_mid, cid, "assistant", answer, dify_mid, saved_at),
+        )
+        row = c.execute(
+            "UPDATE conversations SET dify_conversation_id=?, updated_at=? WHERE id=? RETURNING title",
+            (dify_cid, saved_at, cid),
+        ).fetchone()
+    return row["title"] if row else "新对话"
+
+
+def pooled_turn(path: str, i: int) -> None:
+    now = datetime.now().isoformat()
+    cid, dify_cid, title = db.begin_turn(None, str(uuid.uuid4()), "u", f"q{i}", [], str(uuid.uuid4()), now)
+    finish_turn(cid, "d", "a" * 500, "d", str(uuid.uuid4()), now)
+
+
+def write_behind_turn(path: str, i: int) -> None:
+    now = datetime.now().isoformat()
+    cid, dify_cid, title = db.begin_turn(None, str(uuid.uuid4()), "u", f"q{i}", [], str(uuid.uuid4()), now)
+    db.end_turn(cid, "d", "a" * 500, "d", str(uuid.uuid4()), now)
+
+
+def run(turn, path: str, turns: int, threads: int) -> float:
+    per_thread = turns // threads
+
+    def worker(offset):
+        for i in range(per_thread):
+            turn(path, offset + i)
+
+    ts = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    db.writer().sync()
+    return per_thread * threads / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--turns",   type=int, default=2000)
+    ap.add_argument("--threads", default="1,8")
+    args = ap.parse_args()
+
+    print(f"{'threads':>8} {'before turns/s':>15} {'pooled':>8} {'write-behind':>13} {'speedup':>8}")
+    for threads in (int(x) for x in args.threads.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            db._pool   = db.ConnectionPool(path)
+            db._writer = db.WriteBehind(db._pool)
+            db.init_db()
+            before = run(legacy_turn, path, args.turns, threads)
+            pooled = run(pooled_turn, path, args.turns, threads)
+            behind = run(write_behind_turn, path, args.turns, threads)
+            db.shutdown()
+        print(f"{threads:>8} {before:>15.0f} {pooled:>8.0f} {behind:>13.0f} {behind / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Concurrent streaming benchmark for the webchat /api/chat endpoint.
+
+Starts bench/fake_dify.py and one webchat worker (ASGI or Flask), opens N
+concurrent chat streams per level and reports, for each level:
+  - how many streams completed with a `done` event,
+  - p50 / p99 time-to-first-chunk as seen by the client,
+  - the peak number of upstream Dify streams the single worker held open.
+
+Usage:  python bench/bench_streams.py --server asgi --levels 100,250,500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from common import fake_dify, percentile, webchat
+
+
+async def one_stream(client: httpx.AsyncClient, base: str, i: int) -> tuple[float | None, bool]:
+    t0   = time.perf_counter()
+    ttfc = None
+    done = False
+    try:
+        async with client.stream("POST", f"{base}/api/chat", json={"query": f"bench {i}"}) as resp:
+            async for line in resp.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                ev = json.loads(line[6:])
+                if ev["type"] == "chunk" and ttfc is None:
+                    ttfc = time.perf_counter() - t0
+                elif ev["type"] == "done":
+                    done = True
+                elif ev["type"] == "error":
+                    break
+    except httpx.HTTPError:
+        pass
+    return ttfc, done
+
+
+async def run_level(base: str, dify: str, n: int) -> dict:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(300, connect=60)) as client:
+        await client.post(f"{dify}/_reset")
+        t0      = time.perf_counter()
+        results = await asyncio.gather(*(one_stream(client, base, i) for i in range(n)))
+        wall    = time.perf_counter() - t0
+        stats   = (await client.get(f"{dify}/_stats")).json()
+    ttfcs = [t for t, _ in results if t is not None]
+    return {
+        "n":    n,
+        "ok":   sum(1 for _, d in results if d),
+        "p50":  percentile(ttfcs, 50),
+        "p99":  percentile(ttfcs, 99),
+        "peak": stats["peak"],
+        "wall": wall,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--server",   choices=["asgi", "flask"], default="asgi")
+    ap.add_argument("--levels",   default="50,200,500")
+    ap.add_argument("--chunks",   type=int,   default=50,   help="SSE chunks per fake answer")
+    ap.add_argument("--interval", type=float, default=0.05, help="seconds between fake chunks")
+    args = ap.parse_args()
+
+    dify_env = {"FAKE_DIFY_CHUNKS": str(args.chunks), "FAKE_DIFY_INTERVAL": str(args.interval)}
+    with fake_dify(dify_env) as dify, webchat(args.server, dify) as (base, _):
+        print(f"server={args.server}  answer={args.chunks} chunks x {args.interval}s")
+        print(f"{'streams':>8} {'done':>6} {'p50 ttfc':>10} {'p99 ttfc':>10} {'peak/worker':>12} {'wall':>8}")
+        for n in (int(x) for x in args.levels.split(",")):
+            r = asyncio.run(run_level(base, dify, n))
+            print(f"{r['n']:>8} {r['ok']:>6} {r['p50'] * 1000:>8.1f}ms {r['p99'] * 1000:>8.1f}ms "
+                  f"{r['peak']:>12} {r['wall']:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
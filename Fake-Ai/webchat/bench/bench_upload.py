@@ -0,0 +1,81 @@
+"""
+Upload pass-through benchmark for /api/upload.
+
+Starts bench/fake_dify.py (whose /files/upload stub decodes the multipart
+body incrementally and reports the file size it received) and one webchat
+worker, then pushes N concurrent uploads of SIZE MB each. Reports aggregate
+throughput, p50 / p99 upload latency and the worker's peak RSS, which stays
+flat as file size grows because nothing is spooled.
+
+Usage:  python bench/bench_upload.py --server asgi --concurrency 1,8 --size-mb 20
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from common import fake_dify, peak_rss_mb, percentile, webchat
+
+
+def body(size: int, chunk: int = 256 * 1024):
+    """Stream a multipart body of `size` file bytes without holding it in memory."""
+    yield (b'--BENCH\r\nContent-Disposition: form-data; name="file"; filename="bench.bin"\r\n'
+           b"Content-Type: application/octet-stream\r\n\r\n")
+    block = b"x" * chunk
+    for _ in range(size // chunk):
+        yield block
+    yield b"x" * (size % chunk)
+    yield b'\r\n--BENCH\r\nContent-Disposition: form-data; name="user"\r\n\r\nbench\r\n--BENCH--\r\n'
+
+
+async def one_upload(client: httpx.AsyncClient, base: str, size: int) -> tuple[float, bool]:
+    async def content():
+        for part in body(size):
+            yield part
+
+    t0   = time.perf_counter()
+    resp = await client.post(
+        f"{base}/api/upload", content=content(),
+        headers={"Content-Type": "multipart/form-data; boundary=BENCH"},
+    )
+    ok = resp.status_code == 201 and resp.json().get("size") == size
+    return time.perf_counter() - t0, ok
+
+
+async def run_level(base: str, n: int, size: int) -> dict:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(limits=limits, timeout=300) as client:
+        t0      = time.perf_counter()
+        results = await asyncio.gather(*(one_upload(client, base, size) for _ in range(n)))
+        wall    = time.perf_counter() - t0
+    lat = [t for t, _ in results]
+    return {
+        "n":    n,
+        "ok":   sum(1 for _, ok in results if ok),
+        "mbps": n * size / wall / (1024 * 1024),
+        "p50":  percentile(lat, 50),
+        "p99":  percentile(lat, 99),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--server",      choices=["asgi", "flask"], default="asgi")
+    ap.add_argument("--concurrency", default="1,8")
+    ap.add_argument("--size-mb",     type=int, default=20)
+    args = ap.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    env  = {"UPLOAD_MAX_BYTES": str(size)}
+    with fake_dify() as dify, webchat(args.server, dify, env) as (base, pid):
+        print(f"server={args.server}  file={args.size_mb}MB")
+        print(f"{'uploads':>8} {'ok':>4} {'MB/s':>8} {'p50':>8} {'p99':>8} {'peak RSS':>9}")
+        for n in (int(x) for x in args.concurrency.split(",")):
+            r = asyncio.run(run_level(base, n, size))
+            print(f"{r['n']:>8} {r['ok']:>4} {r['mbps']:>8.1f} {r['p50']:>7.2f}s {r['p99']:>7.2f}s "
+                  f"{peak_rss_mb(pid):>7.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Shared helpers for the webchat benchmarks: spawning the fake Dify server and
+the webchat backend under test as subprocesses, and summarising latencies.
+The benchmarks drive the servers with httpx, which requirements.txt does not
+install: pip install httpx.
+"""
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BENCH_DIR   = os.path.dirname(os.path.abspath(__file__))
+WEBCHAT_DIR = os.path.dirname(BENCH_DIR)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server at {url} did not come up")
+
+
+@contextlib.contextmanager
+def spawn(args: list[str], cwd: str, env: dict, ready_url: str):
+    proc = subprocess.Popen(
+        args, cwd=cwd, env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(ready_url)
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+@contextlib.contextmanager
+def fake_dify(env: dict | None = None):
+    """Run bench/fake_dify.py; yields its base URL."""
+    port = free_port()
+    with spawn(
+        [sys.executable, "-m", "uvicorn", "fake_dify:app", "--port", str(port), "--log-level", "warning"],
+        BENCH_DIR, env or {}, f"http://127.0.0.1:{port}/_stats",
+    ):
+        yield f"http://127.0.0.1:{port}"
+
+
+@contextlib.contextmanager
+def webchat(server: str, dify_url: str, env: dict | None = None):
+    """Run the webchat backend ("asgi" or "flask") against dify_url; yields (base URL, pid)."""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            "DIFY_BASE_URL":   dify_url,
+            "DIFY_API_KEY":    "bench",
+            "WEBCHAT_DB_PATH": os.path.join(tmp, "bench.db"),
+            "PORT":            str(port),
+            **(env or {}),
+        }
+        if server == "asgi":
+            args = [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(port),
+                    "--log-level", "warning", "--backlog", "4096"]
+        else:
+            args = [sys.executable, "app.py"]
+        with spawn(args, WEBCHAT_DIR, env, f"http://127.0.0.1:{port}/api/conversations") as proc:
+            yield f"http://127.0.0.1:{port}", proc.pid
+
+
+def peak_rss_mb(pid: int) -> float:
+    """High-water resident set size of a process (Linux only)."""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[k]
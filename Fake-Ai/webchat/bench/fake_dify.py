@@ -0,0 +1,103 @@
+"""
+Fake Dify API server for local benchmarks.
+Streams a canned answer over SSE with a configurable number of chunks and
+inter-chunk delay, and records how many streams are open at once.
+
+Run with:  uvicorn fake_dify:app --port 5901
+"""
+import asyncio
+import json
+import os
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+CHUNKS   = int(os.environ.get("FAKE_DIFY_CHUNKS", 50))
+INTERVAL = float(os.environ.get("FAKE_DIFY_INTERVAL", 0.05))
+
+_stats = {"open": 0, "peak": 0, "total": 0}
+
+
+def sse(obj: dict) -> str:
+    return f"data: {json.dumps(obj)}\n\n"
+
+
+async def chat_messages(request: Request):
+    body     = await request.json()
+    conv_id  = body.get("conversation_id") or str(uuid.uuid4())
+    task_id  = str(uuid.uuid4())
+    msg_id   = str(uuid.uuid4())
+
+    async def generate():
+        _stats["open"] += 1
+        _stats["total"] += 1
+        _stats["peak"] = max(_stats["peak"], _stats["open"])
+        try:
+            for i in range(CHUNKS):
+                yield sse({
+                    "event": "message", "answer": f"tok{i} ",
+                    "conversation_id": conv_id, "task_id": task_id, "id": msg_id,
+                })
+                await asyncio.sleep(INTERVAL)
+            yield sse({"event": "message_end", "conversation_id": conv_id, "id": msg_id})
+        finally:
+            _stats["open"] -= 1
+
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
+
+async def stop(request: Request):
+    return JSONResponse({"result": "success"})
+
+
+async def read_multipart(request: Request) -> dict:
+    """Decode the upload incrementally; returns {field: value} plus the file's name and size."""
+    _, options = parse_options_header(request.headers.get("content-type", ""))
+    decoder    = MultipartDecoder(options["boundary"].encode())
+    out, part  = {"size": 0}, None
+    async for chunk in request.stream():
+        decoder.receive_data(chunk or None)
+        while not isinstance(event := decoder.next_event(), (NeedData, Epilogue)):
+            if isinstance(event, File):
+                part, out["name"] = "file", event.filename
+            elif isinstance(event, Field):
+                part, out[event.name] = event.name, ""
+            elif isinstance(event, Data) and part == "file":
+                out["size"] += len(event.data)
+            elif isinstance(event, Data):
+                out[part] += event.data.decode()
+    return out
+
+
+async def upload(request: Request):
+    form = await read_multipart(request)
+    return JSONResponse({"id": str(uuid.uuid4()), **form}, status_code=201)
+
+
+async def audio_to_text(request: Request):
+    form = await read_multipart(request)
+    return JSONResponse({"text": "hello", **form})
+
+
+async def stats(request: Request):
+    return JSONResponse(_stats)
+
+
+async def reset(request: Request):
+    _stats.update(open=_stats["open"], peak=_stats["open"], total=0)
+    return JSONResponse(_stats)
+
+
+app = Starlette(routes=[
+    Route("/chat-messages",                 chat_messages, methods=["POST"]),
+    Route("/chat-messages/{task_id}/stop",  stop,          methods=["POST"]),
+    Route("/files/upload",                  upload,        methods=["POST"]),
+    Route("/audio-to-text",                 audio_to_text, methods=["POST"]),
+    Route("/_stats",                        stats),
+    Route("/_reset",                        reset,         methods=["POST"]),
+])
@@ -0,0 +1,7 @@
+"""
+Dify upstream settings shared by the webchat backends (app.py and asgi.py).
+"""
+import os
+
+DIFY_API_KEY  = os.environ.get("DIFY_API_KEY", "")
+DIFY_BASE_URL = os.environ.get("DIFY_BASE_URL", "http://115.29.149.96/v1")
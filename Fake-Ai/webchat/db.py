@@ -0,0 +1,473 @@
+"""
+SQLite access layer for the webchat backends (app.py and asgi.py).
+Connections are long-lived and pooled: each one is opened and tuned once,
+keeps its prepared-statement cache across requests, and is handed to
+whichever thread needs it next. Every query lives here as a named function.
+
+Assistant messages are written behind: end_turn() hands the finished turn to
+a background writer that commits many streams' turns in one transaction.
+"""
+import base64
+import contextlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+DB_PATH             = os.environ.get(
+    "WEBCHAT_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "webchat.db"),
+)
+DB_POOL_SIZE        = int(os.environ.get("DB_POOL_SIZE", 16))
+DB_SYNCHRONOUS      = os.environ.get("DB_SYNCHRONOUS", "NORMAL")   # OFF | NORMAL | FULL
+DB_CACHE_SIZE_KB    = int(os.environ.get("DB_CACHE_SIZE_KB", 16384))
+DB_MMAP_SIZE        = int(os.environ.get("DB_MMAP_SIZE", 256 * 1024 * 1024))
+DB_BUSY_TIMEOUT_MS  = int(os.environ.get("DB_BUSY_TIMEOUT_MS", 5000))
+DB_STATEMENT_CACHE  = 128
+DB_WRITE_DELAY_MS   = int(os.environ.get("DB_WRITE_DELAY_MS", 20))     # coalescing window
+DB_WRITE_BATCH      = int(os.environ.get("DB_WRITE_BATCH", 512))       # max turns per txn
+DB_WRITE_RETRIES    = int(os.environ.get("DB_WRITE_RETRIES", 5))       # then the batch is dropped
+DB_READ_SYNC_S      = float(os.environ.get("DB_READ_SYNC_S", 2.0))     # reads wait this long for it
+PAGE_SIZE_DEFAULT   = 200
+PAGE_SIZE_MAX       = 1000
+
+
+# ─── Connection pool ──────────────────────────────────────────────────────────
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    """Open one tuned connection. Transactions are managed explicitly."""
+    conn = sqlite3.connect(
+        path,
+        check_same_thread=False,
+        isolation_level=None,
+        cached_statements=DB_STATEMENT_CACHE,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+class ConnectionPool:
+    """A bounded LIFO pool of connections shared by all threads."""
+
+    def __init__(self, path: str = DB_PATH, size: int = DB_POOL_SIZE):
+        self.path  = path
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextlib.contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = connect(self.path)
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """One write transaction; takes the write lock up front."""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def connection():
+    return pool().connection()
+
+
+def transaction():
+    return pool().transaction()
+
+
+def init_db():
+    with connection() as c:
+        c.executescript("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id                   TEXT PRIMARY KEY,
+                title                TEXT DEFAULT '新对话',
+                dify_conversation_id TEXT,
+                user_id              TEXT DEFAULT 'default_user',
+                created_at           TEXT,
+                updated_at           TEXT
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                id               TEXT PRIMARY KEY,
+                conversation_id  TEXT NOT NULL,
+                role             TEXT NOT NULL,
+                content          TEXT,
+                files_json       TEXT,
+                dify_message_id  TEXT,
+                created_at       TEXT,
+                FOREIGN KEY (conversation_id)
+                    REFERENCES conversations(id) ON DELETE CASCADE
+            );
+            -- Keyset pagination: (conversation_id, created_at, id) for threads and
+            -- a covering (updated_at, id, title, created_at) index for the sidebar
+            DROP INDEX IF EXISTS idx_messages_conv;
+            DROP INDEX IF EXISTS idx_conv_updated;
+            CREATE INDEX IF NOT EXISTS idx_messages_conv_created
+                ON messages(conversation_id, created_at, id);
+            CREATE INDEX IF NOT EXISTS idx_conv_updated_cover
+                ON conversations(updated_at DESC, id DESC, title, created_at);
+        """)
+
+
+# ─── Cursors ──────────────────────────────────────────────────────────────────
+
+def encode_cursor(*key: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[str]:
+    """Inverse of encode_cursor(); raises ValueError on anything malformed."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not (isinstance(key, list) and len(key) == size and all(isinstance(k, str) for k in key)):
+        raise ValueError("invalid cursor")
+    return key
+
+
+def page_size(limit: int | None, default: int | None) -> int | None:
+    if limit is None:
+        return default
+    return max(1, min(limit, PAGE_SIZE_MAX))
+
+
+# ─── Queries: conversations ───────────────────────────────────────────────────
+
+def list_conversations(limit: int | None = None, cursor: str | None = None
+                       ) -> tuple[list[dict], str | None]:
+    """
+    One sidebar page, newest first, read straight from idx_conv_updated_cover.
+    Returns (rows, cursor of the next page or None).
+    """
+    limit = page_size(limit, PAGE_SIZE_DEFAULT)
+    sql   = "SELECT id, title, created_at, updated_at FROM conversations"
+    args: tuple = ()
+    if cursor:
+        sql += " WHERE (updated_at, id) < (?, ?)"
+        args = tuple(decode_cursor(cursor, 2))
+    sql += " ORDER BY updated_at DESC, id DESC LIMIT ?"
+    with connection() as c:
+        rows = [dict(r) for r in c.execute(sql, (*args, limit)).fetchall()]
+    more   = len(rows) == limit
+    cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"]) if more else None
+    # Bumps still in the write-behind queue, instead of waiting for it
+    pending = writer().pending_updates()
+    if pending:
+        for r in rows:
+            if r["id"] in pending:
+                r["updated_at"] = max(r["updated_at"], pending[r["id"]])
+        rows.sort(key=lambda r: (r["updated_at"], r["id"]), reverse=True)
+    return rows, cursor
+
+
+def create_conversation(cid: str, title: str, user: str, now: str) -> None:
+    with transaction() as c:
+        c.execute(
+            "INSERT INTO conversations (id, title, user_id, created_at, updated_at) VALUES (?,?,?,?,?)",
+            (cid, title, user, now, now),
+        )
+
+
+def delete_conversation(cid: str) -> None:
+    sync_writes(cid)
+    with transaction() as c:
+        c.execute("DELETE FROM messages     WHERE conversation_id=?", (cid,))
+        c.execute("DELETE FROM conversations WHERE id=?",             (cid,))
+
+
+def update_title(cid: str, title: str, now: str) -> None:
+    with transaction() as c:
+        c.execute(
+            "UPDATE conversations SET title=?, updated_at=? WHERE id=?",
+            (title, now, cid),
+        )
+
+
+def get_messages(cid: str, limit: int | None = None, cursor: str | None = None
+                 ) -> tuple[list[dict], str | None]:
+    """
+    Messages of a conversation in chronological order. With a limit, returns
+    the newest `limit` messages older than the cursor, so a client can load a
+    long thread backwards page by page. Returns (rows, cursor or None).
+    """
+    limit = page_size(limit, None)
+    sql   = ("SELECT id, role, content, files_json, created_at FROM messages"
+             " WHERE conversation_id=?")
+    args: tuple = (cid,)
+    if cursor:
+        sql  += " AND (created_at, id) < (?, ?)"
+        args += tuple(decode_cursor(cursor, 2))
+    if limit is None:
+        sql += " ORDER BY created_at, id"
+    else:
+        sql  += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        args += (limit,)
+    sync_writes(cid)
+    with connection() as c:
+        rows = c.execute(sql, args).fetchall()
+    if limit is not None:
+        rows.reverse()
+    out = [
+        {
+            "id":         r["id"],
+            "role":       r["role"],
+            "content":    r["content"],
+            "created_at": r["created_at"],
+            "files":      _decode_files(r["files_json"]),
+        }
+        for r in rows
+    ]
+    more = limit is not None and len(out) == limit
+    return out, encode_cursor(out[0]["created_at"], out[0]["id"]) if more else None
+
+
+def _decode_files(files_json: str | None) -> list:
+    # Most rows (every assistant message) carry no files; skip the parser for them
+    if not files_json:
+        return []
+    try:
+        return json.loads(files_json)
+    except Exception:
+        return []
+
+
+# ─── Queries: chat turns ──────────────────────────────────────────────────────
+
+def begin_turn(cid: str | None, new_cid: str, user: str, query: str,
+               files: list, user_mid: str, now: str) -> tuple[str, str, str]:
+    """
+    Everything a turn writes before streaming, in one transaction: create the
+    conversation if needed, read its Dify id and title and save the user
+    message. Returns (conversation id, dify conversation id, title).
+    """
+    with transaction() as c:
+        if not cid:
+            cid = new_cid
+            c.execute(
+                "INSERT INTO conversations (id, title, user_id, created_at, updated_at) VALUES (?,?,?,?,?)",
+                (cid, query[:60], user, now, now),
+            )
+        row = c.execute(
+            "SELECT dify_conversation_id, title FROM conversations WHERE id=?", (cid,)
+        ).fetchone()
+        c.execute(
+            "INSERT INTO messages (id, conversation_id, role, content, files_json, created_at)"
+            " VALUES (?,?,?,?,?,?)",
+            (user_mid, cid, "user", query, json.dumps(files) if files else None, now),
+        )
+    if not row:
+        return cid, writer().pending_dify_id(cid) or "", "新对话"
+    # A previous turn's Dify id may still be queued in the writer
+    dify_cid = writer().pending_dify_id(cid) or row["dify_conversation_id"] or ""
+    return cid, dify_cid, row["title"]
+
+
+def end_turn(cid: str, dify_cid: str, answer: str, dify_mid: str,
+             ai_mid: str, saved_at: str) -> None:
+    """
+    Queue everything a turn writes after streaming: the assistant message and
+    the conversation bump. Returns without touching the disk.
+    """
+    writer().put(
+        (ai_mid, cid, "assistant", answer, dify_mid, saved_at),
+        cid, dify_cid, saved_at,
+    )
+
+
+# ─── Write-behind ─────────────────────────────────────────────────────────────
+
+class WriteBehind:
+    """
+    Background thread that batches assistant-message inserts and coalesces
+    conversation bumps (last one per conversation wins) into one transaction
+    per DB_WRITE_DELAY_MS window. A failed batch is retried DB_WRITE_RETRIES
+    times, then logged and dropped so that one bad batch cannot stall the queue.
+    """
+
+    def __init__(self, pool: ConnectionPool, delay: float = DB_WRITE_DELAY_MS / 1000,
+                 batch: int = DB_WRITE_BATCH, retries: int = DB_WRITE_RETRIES):
+        self._pool     = pool
+        self._delay    = delay
+        self._batch    = batch
+        self._retries  = retries
+        self._cond     = threading.Condition()
+        self._messages: list[tuple] = []
+        self._convs:    dict[str, tuple[str, str]] = {}   # cid -> (dify id, updated_at)
+        self._inflight: dict[str, tuple[str, str]] = {}
+        self._queued    = 0
+        self._written   = 0
+        self._last:     dict[str, int] = {}               # cid -> _queued after its last turn
+        self.dropped    = 0                               # turns given up on
+        self._closed    = False
+        self._thread    = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+        self._thread.start()
+
+    def put(self, message: tuple, cid: str, dify_cid: str, updated_at: str) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            self._messages.append(message)
+            self._convs[cid] = (dify_cid, updated_at)
+            self._queued += 1
+            self._last[cid] = self._queued
+            self._cond.notify_all()
+
+    def pending_dify_id(self, cid: str) -> str | None:
+        with self._cond:
+            pending = self._convs.get(cid) or self._inflight.get(cid)
+        return pending[0] if pending else None
+
+    def pending_updates(self) -> dict[str, str]:
+        """updated_at of the conversations with a bump not committed yet."""
+        with self._cond:
+            pending = {**self._inflight, **self._convs}
+        return {cid: updated_at for cid, (_, updated_at) in pending.items()}
+
+    def sync(self, timeout: float | None = None, cid: str | None = None) -> bool:
+        """
+        Wait until everything queued before this call is committed (or
+        dropped), or only the turns of conversation `cid`. Batches are
+        written in queue order. Returns False if the timeout ran out first.
+        """
+        with self._cond:
+            target = self._queued if cid is None else self._last.get(cid, 0)
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Flush the queue and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._messages or self._closed)
+                if not self._messages and self._closed:
+                    return
+            if not self._closed:
+                time.sleep(self._delay)   # let more streams finish into this batch
+            with self._cond:
+                messages = self._messages[:self._batch]
+                del self._messages[:self._batch]
+                convs = {cid: self._convs.pop(cid) for cid in {m[1] for m in messages}
+                         if cid in self._convs}
+                self._inflight = convs
+            self._write(messages, convs)
+            with self._cond:
+                self._inflight = {}
+                self._written += len(messages)
+                for cid in {m[1] for m in messages}:
+                    if self._last.get(cid, 0) <= self._written:
+                        self._last.pop(cid, None)
+                self._cond.notify_all()
+
+    def _write(self, messages: list[tuple], convs: dict[str, tuple[str, str]]) -> None:
+        backoff  = 0.05
+        last_exc = None
+        for attempt in range(self._retries + 1):
+            try:
+                with self._pool.transaction() as c:
+                    c.executemany(
+                        "INSERT INTO messages (id,conversation_id,role,content,dify_message_id,created_at)"
+                        " VALUES (?,?,?,?,?,?)",
+                        messages,
+                    )
+                    c.executemany(
+                        "UPDATE conversations SET dify_conversation_id=?, updated_at=? WHERE id=?",
+                        [(dify_cid, updated_at, cid) for cid, (dify_cid, updated_at) in convs.items()],
+                    )
+                return
+            except sqlite3.Error as e:
+                last_exc = e
+                if attempt == self._retries:
+                    break
+                log.exception("write-behind batch of %d turns failed, retrying", len(messages))
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 2.0)
+        log.error("write-behind batch of %d turns failed %d times, dropping messages %s",
+                  len(messages), self._retries + 1, [m[0] for m in messages], exc_info=last_exc)
+        with self._cond:
+            self.dropped += len(messages)
+
+
+_writer: WriteBehind | None = None
+
+
+def writer() -> WriteBehind:
+    global _writer
+    if _writer is None:
+        p = pool()   # takes _pool_lock itself, so not under it
+        with _pool_lock:
+            if _writer is None:
+                _writer = WriteBehind(p)
+    return _writer
+
+
+def sync_writes(cid: str) -> None:
+    """
+    Let a read see the queued turns of conversation `cid`, without waiting on
+    other conversations; after DB_READ_SYNC_S it reads without them.
+    """
+    if not writer().sync(DB_READ_SYNC_S, cid):
+        log.warning("write-behind queue not flushed after %.1fs, reading without it", DB_READ_SYNC_S)
+
+
+def shutdown() -> None:
+    """Flush queued turns and close pooled connections."""
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+    if _pool is not None:
+        _pool.close()
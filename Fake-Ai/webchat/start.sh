@@ -12,4 +12,8 @@ echo "==> Initializing database..."
 python -c "from app import init_db; init_db(); print('DB ready.')"
 
 echo "==> Starting server on http://0.0.0.0:${PORT:-5000} ..."
+if [ "${WEBCHAT_ASYNC:-0}" = "1" ]; then
+    # asyncio serving mode: one event loop multiplexes all upstream streams
+    exec python -m uvicorn asgi:app --host 0.0.0.0 --port "${PORT:-5000}"
+fi
 exec python app.py
@@ -0,0 +1,157 @@
+"""
+Streaming multipart relay for /api/upload and /api/audio-to-text.
+The client's multipart body is re-encoded for Dify part by part as its bytes
+arrive, so an upload is never spooled to memory or a temp file, and the
+configured size caps are enforced while streaming. Sans-IO: app.py drives it
+from a blocking stream, asgi.py from an async one.
+"""
+import collections
+import os
+import threading
+import uuid
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 50 * 1024 * 1024))
+AUDIO_MAX_BYTES  = int(os.environ.get("AUDIO_MAX_BYTES", 25 * 1024 * 1024))
+CHUNK_SIZE       = 64 * 1024           # bytes read from the client per step
+FIELD_MAX_BYTES  = 64 * 1024           # forwarded form fields (user) are held in memory
+FORM_OVERHEAD    = 64 * 1024           # multipart framing allowed on top of the file cap
+PROGRESS_KEEP    = 1024                # finished uploads kept for progress polling
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+# ─── Relay ────────────────────────────────────────────────────────────────────
+
+class MultipartRelay:
+    """
+    Feed the incoming body with feed(chunk) and send what it returns upstream.
+    The `file` part is passed through as it arrives. Only the fields named in
+    `default_fields` are forwarded, after it, with the client's value if it
+    sent one; any other part is discarded unread. Once `file_started` or
+    `finished` is set the caller knows whether there is a file at all, before
+    any byte goes to Dify.
+    """
+
+    def __init__(self, content_type: str, max_bytes: int, default_filename: str | None = None,
+                 default_type: str = "application/octet-stream", default_fields: dict | None = None,
+                 upload_id: str | None = None):
+        mimetype, options = parse_options_header(content_type)
+        if mimetype != "multipart/form-data" or not options.get("boundary"):
+            raise ValueError("not a multipart/form-data body")
+        self._decoder       = MultipartDecoder(options["boundary"].encode())
+        self._boundary      = uuid.uuid4().hex.encode()
+        self.content_type   = f"multipart/form-data; boundary={self._boundary.decode()}"
+        self.max_bytes      = max_bytes
+        self.default_name   = default_filename
+        self.default_type   = default_type
+        self.upload_id      = upload_id
+        self.file_started   = False
+        self.finished       = False
+        self.file_bytes     = 0
+        self._part: str | None = None      # "file", a field name, or None to discard
+        self._fields: dict[str, bytearray] = {}
+        self._defaults      = default_fields or {}
+
+    def feed(self, chunk: bytes | None) -> bytes:
+        """Consume one chunk of the client body (None at EOF); return bytes for Dify."""
+        if chunk:
+            _advance(self.upload_id, len(chunk))
+        self._decoder.receive_data(chunk)
+        out = bytearray()
+        while not self.finished:
+            event = self._decoder.next_event()
+            if isinstance(event, NeedData):
+                break
+            if isinstance(event, File) and event.name == "file" and not self.file_started:
+                self.file_started = True
+                self._part = "file"
+                out += self._part_header(
+                    "file",
+                    event.filename or self.default_name,
+                    event.headers.get("Content-Type") or self.default_type,
+                )
+            elif isinstance(event, Field) and event.name in self._defaults:
+                self._part = event.name
+                self._fields[event.name] = bytearray()
+            elif isinstance(event, Field):
+                self._part = None
+            elif isinstance(event, File):
+                self._part = None
+            elif isinstance(event, Data):
+                if self._part == "file":
+                    self.file_bytes += len(event.data)
+                    if self.file_bytes > self.max_bytes:
+                        raise UploadTooLarge(self.max_bytes)
+                    out += event.data
+                    if not event.more_data:
+                        out += b"\r\n"
+                elif self._part is not None:
+                    field = self._fields[self._part]
+                    if len(field) + len(event.data) > FIELD_MAX_BYTES:
+                        raise UploadTooLarge(FIELD_MAX_BYTES)
+                    field += event.data
+            elif isinstance(event, Epilogue):
+                self.finished = True
+                for name, value in self._defaults.items():
+                    self._fields.setdefault(name, bytearray(value.encode()))
+                for name, value in self._fields.items():
+                    out += self._part_header(name) + bytes(value) + b"\r\n"
+                out += b"--" + self._boundary + b"--\r\n"
+        if chunk is None and not self.finished:
+            raise ValueError("truncated multipart body")
+        return bytes(out)
+
+    def _part_header(self, name: str, filename: str | None = None, content_type: str | None = None) -> bytes:
+        disposition = f'form-data; name="{_quote(name)}"'
+        if filename is not None:
+            disposition += f'; filename="{_quote(filename)}"'
+        head = f"--{self._boundary.decode()}\r\nContent-Disposition: {disposition}\r\n"
+        if content_type:
+            head += f"Content-Type: {content_type}\r\n"
+        return (head + "\r\n").encode()
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", "").replace("\n", "")
+
+
+# ─── Progress ─────────────────────────────────────────────────────────────────
+
+_progress: collections.OrderedDict[str, dict] = collections.OrderedDict()
+_progress_lock = threading.Lock()
+
+
+def track(upload_id: str | None, total: int | None) -> None:
+    if not upload_id:
+        return
+    with _progress_lock:
+        _progress[upload_id] = {"received": 0, "total": total, "done": False}
+        _progress.move_to_end(upload_id)
+        while len(_progress) > PROGRESS_KEEP:
+            _progress.popitem(last=False)
+
+
+def _advance(upload_id: str | None, n: int) -> None:
+    if upload_id:
+        with _progress_lock:
+            if upload_id in _progress:
+                _progress[upload_id]["received"] += n
+
+
+def finish(upload_id: str | None, status: int) -> None:
+    if upload_id:
+        with _progress_lock:
+            if upload_id in _progress:
+                _progress[upload_id].update(done=True, status=status)
+
+
+def progress(upload_id: str) -> dict | None:
+    with _progress_lock:
+        p = _progress.get(upload_id)
+        return dict(p) if p else None
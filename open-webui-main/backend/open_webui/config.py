@@ -4,6 +4,7 @@ import os
 import shutil
 import socket
 import base64
+import time
 from concurrent.futures import ThreadPoolExecutor
 import redis
 
@@ -19,6 +20,7 @@ from authlib.integrations.starlette_client import OAuth
 
 
 from open_webui.env import (
+    CONFIG_REDIS_REFRESH_INTERVAL,
     DATA_DIR,
     DATABASE_URL,
     ENABLE_DB_MIGRATIONS,
@@ -226,11 +228,24 @@ class PersistentConfig(Generic[T]):
 
 
 class AppConfig:
+    """
+    Config values, shared between instances through Redis when it is set up.
+
+    Reads are served from the in-process values. Writes store the value in
+    Redis and bump a version key; reads check that version at most every
+    CONFIG_REDIS_REFRESH_INTERVAL seconds and reload all values in one MGET
+    when it changed, so another instance's change shows within that delay.
+    """
+
     _redis: Union[redis.Redis, redis.cluster.RedisCluster] = None
     _redis_key_prefix: str
 
     _state: dict[str, PersistentConfig]
 
+    # Version of the values last loaded from Redis, and when it was checked
+    _version: Optional[str]
+    _checked_at: float
+
     def __init__(
         self,
         redis_url: Optional[str] = None,
@@ -251,10 +266,16 @@ class AppConfig:
             )
 
         super().__setattr__("_state", {})
+        # Load everything on the first read
+        super().__setattr__("_version", None)
+        super().__setattr__("_checked_at", float("-inf"))
 
     def __setattr__(self, key, value):
         if isinstance(value, PersistentConfig):
             self._state[key] = value
+            # Load the new key from Redis on the next read
+            super().__setattr__("_version", None)
+            super().__setattr__("_checked_at", float("-inf"))
         else:
             self._state[key].value = value
             self._state[key].save()
@@ -262,29 +283,48 @@ class AppConfig:
             if self._redis and ENABLE_PERSISTENT_CONFIG:
                 redis_key = f"{self._redis_key_prefix}:config:{key}"
                 self._redis.set(redis_key, json.dumps(self._state[key].value))
+                self._redis.incr(f"{self._redis_key_prefix}:config:version")
 
     def __getattr__(self, key):
         if key not in self._state:
             raise AttributeError(f"Config key '{key}' not found")
 
-        # If Redis is available and persistent config is enabled, check for an updated value
+        # If Redis is available and persistent config is enabled, check for updated values
         if self._redis and ENABLE_PERSISTENT_CONFIG:
-            redis_key = f"{self._redis_key_prefix}:config:{key}"
-            redis_value = self._redis.get(redis_key)
-
-            if redis_value is not None:
+            now = time.monotonic()
+            if now - self._checked_at >= CONFIG_REDIS_REFRESH_INTERVAL:
+                super().__setattr__("_checked_at", now)
                 try:
-                    decoded_value = json.loads(redis_value)
+                    self._refresh()
+                except Exception as e:
+                    log.error(f"Error reading config from Redis: {e}")
 
-                    # Update the in-memory value if different
-                    if self._state[key].value != decoded_value:
-                        self._state[key].value = decoded_value
-                        log.info(f"Updated {key} from Redis: {decoded_value}")
+        return self._state[key].value
 
-                except json.JSONDecodeError:
-                    log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
+    def _refresh(self):
+        # "" until the first write to a config value
+        version = self._redis.get(f"{self._redis_key_prefix}:config:version") or ""
+        if version == self._version:
+            return
 
-        return self._state[key].value
+        keys = list(self._state)
+        redis_keys = [f"{self._redis_key_prefix}:config:{key}" for key in keys]
+        mget = getattr(self._redis, "mget_nonatomic", self._redis.mget)
+        for key, redis_value in zip(keys, mget(redis_keys)):
+            if redis_value is None:
+                continue
+            try:
+                decoded_value = json.loads(redis_value)
+
+                # Update the in-memory value if different
+                if self._state[key].value != decoded_value:
+                    self._state[key].value = decoded_value
+                    log.info(f"Updated {key} from Redis: {decoded_value}")
+
+            except json.JSONDecodeError:
+                log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
+
+        super().__setattr__("_version", version)
 
 
 ####################################
@@ -2278,6 +2318,16 @@ Ensure that the tools are effectively utilized to achieve the highest-quality an
 
 VECTOR_DB = os.environ.get("VECTOR_DB", "chroma")
 
+# Persistent BM25 index per collection for hybrid search, kept up to date by
+# the writes going through VECTOR_DB_CLIENT of this instance only. Enable it
+# on a single instance, or when every instance writing to the vector
+# database shares RAG_BM25_INDEX_DIR: other instances would otherwise serve
+# BM25 results missing their writes.
+ENABLE_RAG_BM25_INDEX = (
+    os.environ.get("ENABLE_RAG_BM25_INDEX", "False").lower() == "true"
+)
+RAG_BM25_INDEX_DIR = os.environ.get("RAG_BM25_INDEX_DIR", f"{DATA_DIR}/bm25")
+
 # Chroma
 CHROMA_DATA_PATH = f"{DATA_DIR}/vector_db"
 
@@ -3892,6 +3942,12 @@ WHISPER_MULTILINGUAL = os.getenv("WHISPER_MULTILINGUAL", "False").lower() == "tr
 
 WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "").lower() or None
 
+# Recordings over the size limit of the STT engine are cut into segments of
+# at most this many seconds, preferably on silence, and transcribed by up to
+# AUDIO_STT_MAX_WORKERS workers as they are decoded
+AUDIO_STT_SEGMENT_SECONDS = int(os.getenv("AUDIO_STT_SEGMENT_SECONDS", "300"))
+AUDIO_STT_MAX_WORKERS = int(os.getenv("AUDIO_STT_MAX_WORKERS", "4"))
+
 # Add Deepgram configuration
 DEEPGRAM_API_KEY = PersistentConfig(
     "DEEPGRAM_API_KEY",
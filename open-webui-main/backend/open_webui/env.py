@@ -410,6 +410,32 @@ if DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL is not None:
     except Exception:
         DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL = 0.0
 
+# last_active_at of authenticated users is written in one batch every this
+# many seconds, 0 writes it on every request
+try:
+    DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL = float(
+        os.environ.get("DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL", "10")
+    )
+except Exception:
+    DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL = 10.0
+
+# Authenticated users are kept in process for AUTH_USER_CACHE_TTL seconds,
+# 0 disables the cache. See utils/user_cache.py
+try:
+    AUTH_USER_CACHE_TTL = float(os.environ.get("AUTH_USER_CACHE_TTL", "10"))
+except Exception:
+    AUTH_USER_CACHE_TTL = 10.0
+
+try:
+    AUTH_USER_CACHE_SIZE = int(os.environ.get("AUTH_USER_CACHE_SIZE", "10000"))
+except Exception:
+    AUTH_USER_CACHE_SIZE = 10000
+
+# Publish changes to users through REDIS_URL so other instances drop them
+ENABLE_AUTH_USER_CACHE_REDIS = (
+    os.environ.get("ENABLE_AUTH_USER_CACHE_REDIS", "True").lower() == "true"
+)
+
 # When enabled, get_db_context reuses existing sessions; set to False to always create new sessions
 DATABASE_ENABLE_SESSION_SHARING = (
     os.environ.get("DATABASE_ENABLE_SESSION_SHARING", "False").lower() == "true"
@@ -428,6 +454,21 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+# Realtime saves are coalesced: the latest state of a streaming message is
+# written at most every REALTIME_CHAT_SAVE_INTERVAL seconds, or sooner once
+# its content grew by REALTIME_CHAT_SAVE_MAX_BYTES. 0 saves every delta.
+REALTIME_CHAT_SAVE_INTERVAL = os.environ.get("REALTIME_CHAT_SAVE_INTERVAL", "1")
+try:
+    REALTIME_CHAT_SAVE_INTERVAL = float(REALTIME_CHAT_SAVE_INTERVAL)
+except Exception:
+    REALTIME_CHAT_SAVE_INTERVAL = 1.0
+
+REALTIME_CHAT_SAVE_MAX_BYTES = os.environ.get("REALTIME_CHAT_SAVE_MAX_BYTES", "65536")
+try:
+    REALTIME_CHAT_SAVE_MAX_BYTES = int(REALTIME_CHAT_SAVE_MAX_BYTES)
+except Exception:
+    REALTIME_CHAT_SAVE_MAX_BYTES = 65536
+
 ENABLE_QUERIES_CACHE = os.environ.get("ENABLE_QUERIES_CACHE", "False").lower() == "true"
 
 RAG_SYSTEM_CONTEXT = os.environ.get("RAG_SYSTEM_CONTEXT", "False").lower() == "true"
@@ -472,6 +513,24 @@ else:
     except Exception:
         REDIS_RECONNECT_DELAY = None
 
+# Task metadata of an instance that stops sending heartbeats (crashed or
+# restarted) is dropped after this many seconds, see open_webui.tasks
+try:
+    REDIS_TASKS_NODE_TIMEOUT = int(os.environ.get("REDIS_TASKS_NODE_TIMEOUT", "60"))
+    if REDIS_TASKS_NODE_TIMEOUT < 3:
+        REDIS_TASKS_NODE_TIMEOUT = 60
+except ValueError:
+    REDIS_TASKS_NODE_TIMEOUT = 60
+
+# Config values changed by another instance are picked up within this many
+# seconds, see AppConfig
+try:
+    CONFIG_REDIS_REFRESH_INTERVAL = float(
+        os.environ.get("CONFIG_REDIS_REFRESH_INTERVAL", "1")
+    )
+except Exception:
+    CONFIG_REDIS_REFRESH_INTERVAL = 1.0
+
 ####################################
 # UVICORN WORKERS
 ####################################
@@ -670,11 +729,56 @@ else:
     except Exception:
         MODELS_CACHE_TTL = 1
 
+# Models are built once and kept until models, functions or access grants
+# change, base models are refetched every this many seconds in the
+# background. 0 builds them on every request. See utils/model_registry.py
+try:
+    MODELS_REGISTRY_REFRESH_INTERVAL = float(
+        os.environ.get("MODELS_REGISTRY_REFRESH_INTERVAL", "10")
+    )
+except Exception:
+    MODELS_REGISTRY_REFRESH_INTERVAL = 10.0
+
+# Per-user filtered model lists kept for /api/models
+try:
+    MODELS_FILTER_CACHE_SIZE = int(os.environ.get("MODELS_FILTER_CACHE_SIZE", "1024"))
+except Exception:
+    MODELS_FILTER_CACHE_SIZE = 1024
+
 
 ####################################
 # CHAT
 ####################################
 
+# Keys kept per rate limiter when Redis is not available
+try:
+    RATE_LIMIT_MEMORY_SIZE = int(os.environ.get("RATE_LIMIT_MEMORY_SIZE", "10000"))
+except Exception:
+    RATE_LIMIT_MEMORY_SIZE = 10000
+
+# Chat completions allowed per CHAT_RATE_LIMIT_WINDOW seconds, 0 for no limit
+try:
+    CHAT_RATE_LIMIT_WINDOW = float(os.environ.get("CHAT_RATE_LIMIT_WINDOW", "60"))
+except Exception:
+    CHAT_RATE_LIMIT_WINDOW = 60.0
+
+try:
+    CHAT_RATE_LIMIT_PER_USER = int(os.environ.get("CHAT_RATE_LIMIT_PER_USER", "0"))
+except Exception:
+    CHAT_RATE_LIMIT_PER_USER = 0
+
+try:
+    CHAT_RATE_LIMIT_PER_MODEL = int(os.environ.get("CHAT_RATE_LIMIT_PER_MODEL", "0"))
+except Exception:
+    CHAT_RATE_LIMIT_PER_MODEL = 0
+
+try:
+    CHAT_RATE_LIMIT_PER_API_KEY = int(
+        os.environ.get("CHAT_RATE_LIMIT_PER_API_KEY", "0")
+    )
+except Exception:
+    CHAT_RATE_LIMIT_PER_API_KEY = 0
+
 ENABLE_CHAT_RESPONSE_BASE64_IMAGE_URL_CONVERSION = (
     os.environ.get("ENABLE_CHAT_RESPONSE_BASE64_IMAGE_URL_CONVERSION", "False").lower()
     == "true"
@@ -805,6 +909,45 @@ else:
 AIOHTTP_CLIENT_SESSION_SSL = (
     os.environ.get("AIOHTTP_CLIENT_SESSION_SSL", "True").lower() == "true"
 )
+# Upstream model connections are pooled per base URL and kept alive, see
+# utils/http_client.py. The pool size bounds concurrent requests to one base
+# URL, 0 is unlimited.
+try:
+    AIOHTTP_CLIENT_POOL_SIZE = int(os.environ.get("AIOHTTP_CLIENT_POOL_SIZE", "100"))
+except Exception:
+    AIOHTTP_CLIENT_POOL_SIZE = 100
+
+try:
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT = float(
+        os.environ.get("AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT", "30")
+    )
+except Exception:
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT = 30.0
+
+try:
+    AIOHTTP_CLIENT_POOL_DNS_CACHE_TTL = int(
+        os.environ.get("AIOHTTP_CLIENT_POOL_DNS_CACHE_TTL", "300")
+    )
+except Exception:
+    AIOHTTP_CLIENT_POOL_DNS_CACHE_TTL = 300
+
+# How requests for a model served by several OLLAMA_BASE_URLS are spread,
+# see utils/load_balancer.py: random, least_outstanding, ewma or p2c
+LOAD_BALANCER_STRATEGY = os.environ.get("LOAD_BALANCER_STRATEGY", "p2c").lower()
+
+try:
+    LOAD_BALANCER_FAILURE_THRESHOLD = int(
+        os.environ.get("LOAD_BALANCER_FAILURE_THRESHOLD", "3")
+    )
+except Exception:
+    LOAD_BALANCER_FAILURE_THRESHOLD = 3
+
+try:
+    LOAD_BALANCER_EJECTION_COOLDOWN = float(
+        os.environ.get("LOAD_BALANCER_EJECTION_COOLDOWN", "30")
+    )
+except Exception:
+    LOAD_BALANCER_EJECTION_COOLDOWN = 30.0
 
 AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST = os.environ.get(
     "AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST",
@@ -850,6 +993,39 @@ else:
     except Exception:
         RAG_EMBEDDING_TIMEOUT = None
 
+# Cache of query and document embeddings, keyed on engine, model, prefix and
+# text. The in-process tier holds RAG_EMBEDDING_CACHE_SIZE embeddings (about
+# 6KB each at 1536 dimensions), 0 disables the cache.
+try:
+    RAG_EMBEDDING_CACHE_SIZE = int(os.environ.get("RAG_EMBEDDING_CACHE_SIZE", "4096"))
+except Exception:
+    RAG_EMBEDDING_CACHE_SIZE = 4096
+
+try:
+    RAG_EMBEDDING_CACHE_TTL = int(
+        os.environ.get("RAG_EMBEDDING_CACHE_TTL", str(7 * 24 * 60 * 60))
+    )
+except Exception:
+    RAG_EMBEDDING_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Share cached embeddings between instances through REDIS_URL
+ENABLE_RAG_EMBEDDING_CACHE_REDIS = (
+    os.environ.get("ENABLE_RAG_EMBEDDING_CACHE_REDIS", "False").lower() == "true"
+)
+
+# Chunks embedded and inserted per step when ingesting documents, while the
+# previous step is written to the vector database
+try:
+    RAG_INGEST_BATCH_SIZE = int(os.environ.get("RAG_INGEST_BATCH_SIZE", "256"))
+except Exception:
+    RAG_INGEST_BATCH_SIZE = 256
+
+# Keep the embedding of every ingested chunk by its normalized text, so the
+# same chunk in another file or collection is not sent to the engine again
+ENABLE_RAG_CHUNK_EMBEDDING_STORE = (
+    os.environ.get("ENABLE_RAG_CHUNK_EMBEDDING_STORE", "True").lower() == "true"
+)
+
 
 ####################################
 # SENTENCE TRANSFORMERS
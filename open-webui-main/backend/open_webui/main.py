@@ -111,6 +111,7 @@ from open_webui.internal.db import ScopedSession, engine, get_session
 
 from open_webui.models.functions import Functions
 from open_webui.models.models import Models
+from open_webui.models.groups import Groups
 from open_webui.models.users import UserModel, Users
 from open_webui.models.chats import Chats
 
@@ -512,6 +513,7 @@ from open_webui.utils.models import (
     get_all_base_models,
     check_model_access,
     get_filtered_models,
+    periodic_models_refresh,
 )
 from open_webui.utils.chat import (
     generate_chat_completion as chat_completion_handler,
@@ -535,6 +537,7 @@ from open_webui.utils.auth import (
     create_admin_user,
 )
 from open_webui.utils.plugin import install_tool_and_function_dependencies
+from open_webui.utils.rate_limit import is_chat_completion_limited
 from open_webui.utils.oauth import (
     get_oauth_client_info_with_dynamic_client_registration,
     encrypt_data,
@@ -545,9 +548,15 @@ from open_webui.utils.oauth import (
 )
 from open_webui.utils.security_headers import SecurityHeadersMiddleware
 from open_webui.utils.redis import get_redis_connection
+from open_webui.utils.chat_save import CHAT_EVENT_WRITER
+from open_webui.utils.http_client import CLIENT_SESSION_POOL
+from open_webui.utils.user_cache import LAST_ACTIVE_BUFFER, redis_user_cache_listener
+from open_webui.utils.model_registry import MODEL_REGISTRY
+from open_webui.utils.event_loop import monitor_event_loop_lag
 
 from open_webui.tasks import (
     redis_task_command_listener,
+    redis_task_heartbeat,
     list_task_ids_by_item_id,
     create_task,
     stop_task,
@@ -637,6 +646,20 @@ async def lifespan(app: FastAPI):
         app.state.redis_task_command_listener = asyncio.create_task(
             redis_task_command_listener(app)
         )
+        app.state.redis_task_heartbeat = asyncio.create_task(
+            redis_task_heartbeat(app)
+        )
+        app.state.redis_user_cache_listener = asyncio.create_task(
+            redis_user_cache_listener(app.state.redis)
+        )
+
+    if MODEL_REGISTRY.enabled:
+        app.state.models_refresh = asyncio.create_task(periodic_models_refresh(app))
+
+    if LAST_ACTIVE_BUFFER.interval > 0:
+        app.state.last_active_flush = asyncio.create_task(
+            LAST_ACTIVE_BUFFER.run(Users.update_last_active_by_ids)
+        )
 
     if THREAD_POOL_SIZE and THREAD_POOL_SIZE > 0:
         limiter = anyio.to_thread.current_default_thread_limiter()
@@ -644,6 +667,7 @@ async def lifespan(app: FastAPI):
 
     asyncio.create_task(periodic_usage_pool_cleanup())
     asyncio.create_task(periodic_session_pool_cleanup())
+    app.state.event_loop_lag_monitor = asyncio.create_task(monitor_event_loop_lag())
 
     if app.state.config.ENABLE_BASE_MODELS_CACHE:
         try:
@@ -695,9 +719,29 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    app.state.event_loop_lag_monitor.cancel()
+    await CHAT_EVENT_WRITER.close()
+    await CLIENT_SESSION_POOL.close()
+
     if hasattr(app.state, "redis_task_command_listener"):
         app.state.redis_task_command_listener.cancel()
 
+    if hasattr(app.state, "redis_task_heartbeat"):
+        app.state.redis_task_heartbeat.cancel()
+
+    if hasattr(app.state, "redis_user_cache_listener"):
+        app.state.redis_user_cache_listener.cancel()
+
+    if hasattr(app.state, "models_refresh"):
+        app.state.models_refresh.cancel()
+
+    if hasattr(app.state, "last_active_flush"):
+        app.state.last_active_flush.cancel()
+        try:
+            await app.state.last_active_flush
+        except asyncio.CancelledError:
+            pass
+
 
 app = FastAPI(
     title="Open WebUI",
@@ -1573,15 +1617,40 @@ async def get_models(
 ):
     all_models = await get_all_models(request, refresh=refresh, user=user)
 
+    # The list only changes with the models, the model order and the access
+    # of the user: memoized per model registry build
+    build = MODEL_REGISTRY.build
+    model_order_list = request.app.state.config.MODEL_ORDER_LIST
+    user_group_ids = {group.id for group in Groups.get_groups_by_member_id(user.id)}
+    models_key = (
+        user.id,
+        user.role,
+        frozenset(user_group_ids),
+        tuple(model_order_list or []),
+    )
+    models = MODEL_REGISTRY.get_filtered(models_key)
+    if models is not None:
+        return {"data": models}
+
     models = []
     for model in all_models:
         # Filter out filter pipelines
         if "pipeline" in model and model["pipeline"].get("type", None) == "filter":
             continue
 
+        # Models are shared with app.state.MODELS: copy what is changed below
+        model = {**model}
+
         # Remove profile image URL to reduce payload size
         if model.get("info", {}).get("meta", {}).get("profile_image_url"):
-            model["info"]["meta"].pop("profile_image_url", None)
+            model["info"] = {
+                **model["info"],
+                "meta": {
+                    key: value
+                    for key, value in model["info"]["meta"].items()
+                    if key != "profile_image_url"
+                },
+            }
 
         try:
             model_tags = [
@@ -1599,7 +1668,6 @@ async def get_models(
 
         models.append(model)
 
-    model_order_list = request.app.state.config.MODEL_ORDER_LIST
     if model_order_list:
         model_order_dict = {model_id: i for i, model_id in enumerate(model_order_list)}
         # Sort models by order list priority, with fallback for those not in the list
@@ -1610,7 +1678,8 @@ async def get_models(
             )
         )
 
-    models = get_filtered_models(models, user)
+    models = get_filtered_models(models, user, user_group_ids=user_group_ids)
+    MODEL_REGISTRY.set_filtered(build, models_key, models)
 
     log.debug(
         f"/api/models returned filtered models accessible to the user: {json.dumps([model.get('id') for model in models])}"
@@ -1670,6 +1739,12 @@ async def chat_completion(
     model_item = form_data.pop("model_item", {})
     tasks = form_data.pop("background_tasks", None)
 
+    if await is_chat_completion_limited(request, user, model_id):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=ERROR_MESSAGES.RATE_LIMIT_EXCEEDED,
+        )
+
     metadata = {}
     try:
         model_info = None
@@ -1918,6 +1993,7 @@ async def chat_completion(
             request.app.state.redis,
             process_chat(request, form_data, user, metadata, model),
             id=metadata["chat_id"],
+            model=model.get("id"),
         )
         # Emit chat:active=true when task starts
         event_emitter = get_event_emitter(metadata, update_db=False)
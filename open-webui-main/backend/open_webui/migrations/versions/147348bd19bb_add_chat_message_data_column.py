@@ -0,0 +1,77 @@
+"""Store pending message writes in chat_message
+
+Revision ID: 147348bd19bb
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "147348bd19bb"
+down_revision: Union[str, None] = "b2c3d4e5f6a7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Full message while it is newer than its copy in chat.chat
+    op.add_column("chat_message", sa.Column("data", sa.JSON(), nullable=True))
+    op.create_index(
+        "chat_message_pending_idx",
+        "chat_message",
+        ["chat_id"],
+        sqlite_where=sa.text("data IS NOT NULL"),
+        postgresql_where=sa.text("data IS NOT NULL"),
+    )
+
+    # history.currentId while pending messages are not folded into chat.chat
+    op.add_column("chat", sa.Column("current_message_id", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    # Fold pending messages back into chat.chat before dropping them
+    conn = op.get_bind()
+    chat = sa.table(
+        "chat",
+        sa.column("id", sa.Text()),
+        sa.column("chat", sa.JSON()),
+        sa.column("current_message_id", sa.Text()),
+    )
+    chat_message = sa.table(
+        "chat_message",
+        sa.column("id", sa.Text()),
+        sa.column("chat_id", sa.Text()),
+        sa.column("data", sa.JSON()),
+    )
+
+    pending = {}
+    for chat_id, id, data in conn.execute(
+        sa.select(chat_message.c.chat_id, chat_message.c.id, chat_message.c.data).where(
+            chat_message.c.data.isnot(None)
+        )
+    ):
+        if data is not None:
+            pending.setdefault(chat_id, {})[id[len(chat_id) + 1 :]] = data
+
+    for chat_id, messages in pending.items():
+        row = conn.execute(
+            sa.select(chat.c.chat, chat.c.current_message_id).where(
+                chat.c.id == chat_id
+            )
+        ).first()
+        if row is None:
+            continue
+        chat_data = row[0] or {}
+        history = chat_data.setdefault("history", {})
+        history.setdefault("messages", {}).update(messages)
+        if row[1]:
+            history["currentId"] = row[1]
+        conn.execute(chat.update().where(chat.c.id == chat_id).values(chat=chat_data))
+
+    op.drop_column("chat", "current_message_id")
+    op.drop_index("chat_message_pending_idx", table_name="chat_message")
+    op.drop_column("chat_message", "data")
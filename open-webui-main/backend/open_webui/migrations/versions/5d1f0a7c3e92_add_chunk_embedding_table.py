@@ -0,0 +1,39 @@
+"""Add chunk_embedding and chunk_embedding_ref tables
+
+Revision ID: 5d1f0a7c3e92
+Revises: 147348bd19bb
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5d1f0a7c3e92"
+down_revision: Union[str, None] = "147348bd19bb"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chunk_embedding",
+        sa.Column("hash", sa.Text(), primary_key=True),
+        sa.Column("vector", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.BigInteger(), nullable=False),
+    )
+    op.create_table(
+        "chunk_embedding_ref",
+        sa.Column("hash", sa.Text(), primary_key=True),
+        sa.Column("file_id", sa.Text(), primary_key=True),
+        # indexes
+        sa.Index("ix_chunk_embedding_ref_file_id", "file_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("chunk_embedding_ref")
+    op.drop_table("chunk_embedding")
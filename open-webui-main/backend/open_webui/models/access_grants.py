@@ -5,6 +5,7 @@ from typing import Optional
 
 from sqlalchemy.orm import Session
 from open_webui.internal.db import Base, get_db_context
+from open_webui.utils.model_registry import MODEL_REGISTRY
 
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Column, Text, UniqueConstraint, or_, and_
@@ -296,6 +297,8 @@ class AccessGrantsTable:
             )
             db.add(grant)
             db.commit()
+            if resource_type == "model":
+                MODEL_REGISTRY.invalidate()
             db.refresh(grant)
             return AccessGrantModel.model_validate(grant)
 
@@ -322,6 +325,8 @@ class AccessGrantsTable:
                 .delete()
             )
             db.commit()
+            if resource_type == "model":
+                MODEL_REGISTRY.invalidate()
             return deleted > 0
 
     def revoke_all_access(
@@ -341,6 +346,8 @@ class AccessGrantsTable:
                 .delete()
             )
             db.commit()
+            if resource_type == "model":
+                MODEL_REGISTRY.invalidate()
             return deleted
 
     def set_access_control(
@@ -378,6 +385,8 @@ class AccessGrantsTable:
                 results.append(grant)
 
             db.commit()
+            if resource_type == "model":
+                MODEL_REGISTRY.invalidate()
 
             return [AccessGrantModel.model_validate(g) for g in results]
 
@@ -414,6 +423,8 @@ class AccessGrantsTable:
                 results.append(grant)
 
             db.commit()
+            if resource_type == "model":
+                MODEL_REGISTRY.invalidate()
             return [AccessGrantModel.model_validate(g) for g in results]
 
     def get_access_control(
@@ -16,6 +16,7 @@ from sqlalchemy import (
     JSON,
     Index,
     func,
+    text,
 )
 
 ####################
@@ -84,10 +85,20 @@ class ChatMessage(Base):
     created_at = Column(BigInteger, index=True)
     updated_at = Column(BigInteger)
 
+    # Full message while it is newer than its copy in chat.chat history;
+    # cleared when the chat is rewritten as a whole
+    data = Column(JSON(none_as_null=True), nullable=True)
+
     __table_args__ = (
         Index("chat_message_chat_parent_idx", "chat_id", "parent_id"),
         Index("chat_message_model_created_idx", "model_id", "created_at"),
         Index("chat_message_user_created_idx", "user_id", "created_at"),
+        Index(
+            "chat_message_pending_idx",
+            "chat_id",
+            sqlite_where=text("data IS NOT NULL"),
+            postgresql_where=text("data IS NOT NULL"),
+        ),
     )
 
 
@@ -130,9 +141,13 @@ class ChatMessageTable:
         chat_id: str,
         user_id: str,
         data: dict,
+        pending: bool = False,
         db: Optional[Session] = None,
     ) -> Optional[ChatMessageModel]:
-        """Insert or update a chat message."""
+        """
+        Insert or update a chat message. With `pending`, `data` is the full
+        message and is kept as the latest version of it (see get_pending_message).
+        """
         with get_db_context(db) as db:
             now = int(time.time())
             timestamp = data.get("timestamp", now)
@@ -174,6 +189,8 @@ class ChatMessageTable:
                     usage = info.get("usage") if info else None
                 if usage:
                     existing.usage = usage
+                if pending:
+                    existing.data = data
                 existing.updated_at = now
                 db.commit()
                 db.refresh(existing)
@@ -202,6 +219,7 @@ class ChatMessageTable:
                     or data.get("statusHistory"),
                     error=data.get("error"),
                     usage=usage,
+                    data=data if pending else None,
                     created_at=timestamp,
                     updated_at=now,
                 )
@@ -229,6 +247,40 @@ class ChatMessageTable:
             )
             return [ChatMessageModel.model_validate(message) for message in messages]
 
+    def get_pending_message(
+        self, chat_id: str, message_id: str, db: Optional[Session] = None
+    ) -> Optional[dict]:
+        """Latest version of a message not yet folded into chat.chat, if any."""
+        with get_db_context(db) as db:
+            row = (
+                db.query(ChatMessage.data)
+                .filter_by(id=f"{chat_id}-{message_id}")
+                .first()
+            )
+            return row[0] if row else None
+
+    def get_pending_messages_by_chat_ids(
+        self, chat_ids: list[str], db: Optional[Session] = None
+    ) -> dict[str, dict[str, dict]]:
+        """Pending messages as {chat_id: {message_id: message}}."""
+        pending: dict[str, dict[str, dict]] = {}
+        if not chat_ids:
+            return pending
+
+        with get_db_context(db) as db:
+            for i in range(0, len(chat_ids), 500):
+                rows = (
+                    db.query(ChatMessage.chat_id, ChatMessage.id, ChatMessage.data)
+                    .filter(
+                        ChatMessage.chat_id.in_(chat_ids[i : i + 500]),
+                        ChatMessage.data.isnot(None),
+                    )
+                    .all()
+                )
+                for chat_id, id, data in rows:
+                    pending.setdefault(chat_id, {})[id[len(chat_id) + 1 :]] = data
+        return pending
+
     def get_messages_by_user_id(
         self,
         user_id: str,
@@ -23,7 +23,7 @@ from sqlalchemy import (
     Index,
     UniqueConstraint,
 )
-from sqlalchemy import or_, func, select, and_, text
+from sqlalchemy import or_, func, select, and_, text, null
 from sqlalchemy.sql import exists
 from sqlalchemy.sql.expression import bindparam
 
@@ -52,6 +52,9 @@ class Chat(Base):
     meta = Column(JSON, server_default="{}")
     folder_id = Column(Text, nullable=True)
 
+    # history.currentId while newer messages are pending in chat_message
+    current_message_id = Column(Text, nullable=True)
+
     __table_args__ = (
         # Performance indexes for common queries
         # WHERE folder_id = ...
@@ -290,6 +293,94 @@ class ChatTable:
 
         return changed
 
+    def _to_chat_models(self, chat_items: list, db: Session) -> list[ChatModel]:
+        """
+        Validate Chat rows, overlaying the messages whose latest version is
+        still pending in chat_message onto their history.
+        """
+        chat_items = list(chat_items)
+        chats = [ChatModel.model_validate(chat_item) for chat_item in chat_items]
+        pending = ChatMessages.get_pending_messages_by_chat_ids(
+            [chat.id for chat in chats], db=db
+        )
+        for chat, chat_item in zip(chats, chat_items):
+            messages = pending.get(chat.id)
+            if not messages:
+                continue
+
+            history = chat.chat.get("history", {})
+            history = {
+                **history,
+                "messages": {**history.get("messages", {}), **messages},
+            }
+            if chat_item.current_message_id:
+                history["currentId"] = chat_item.current_message_id
+            chat.chat = {**chat.chat, "history": history}
+        return chats
+
+    def _to_chat_model(self, chat_item, db: Session) -> Optional[ChatModel]:
+        return self._to_chat_models([chat_item], db)[0] if chat_item else None
+
+    def _get_message(
+        self, id: str, message_id: str, db: Session
+    ) -> Optional[tuple[str, Optional[dict]]]:
+        """
+        (user_id, message) for one message of a chat, or None if there is no
+        such chat. Reads the pending chat_message row, or only that message
+        out of chat.chat, never the whole chat.
+        """
+        chat = db.query(Chat.user_id).filter_by(id=id).first()
+        if chat is None:
+            return None
+
+        message = ChatMessages.get_pending_message(id, message_id, db=db)
+        if message is None:
+            message = (
+                db.query(Chat.chat[("history", "messages", message_id)])
+                .filter_by(id=id)
+                .scalar()
+            )
+        return chat.user_id, message if isinstance(message, dict) else None
+
+    def _write_message(
+        self,
+        id: str,
+        message_id: str,
+        user_id: str,
+        message: dict,
+        db: Session,
+        current: bool = False,
+    ):
+        """Store the latest version of one message in its chat_message row."""
+        ChatMessages.upsert_message(
+            message_id=message_id,
+            chat_id=id,
+            user_id=user_id,
+            data=self._clean_null_bytes(message),
+            pending=True,
+            db=db,
+        )
+
+        now = int(time.time())
+        values = {"updated_at": now}
+        if current:
+            values["current_message_id"] = message_id
+        db.query(Chat).filter(
+            Chat.id == id,
+            or_(
+                Chat.updated_at != now,
+                *(
+                    [
+                        Chat.current_message_id.is_(None),
+                        Chat.current_message_id != message_id,
+                    ]
+                    if current
+                    else []
+                ),
+            ),
+        ).update(values, synchronize_session=False)
+        db.commit()
+
     def insert_new_chat(
         self, user_id: str, form_data: ChatForm, db: Optional[Session] = None
     ) -> Optional[ChatModel]:
@@ -411,6 +502,12 @@ class ChatTable:
 
                 chat_item.updated_at = int(time.time())
 
+                # The written history supersedes any pending messages
+                chat_item.current_message_id = None
+                db.query(ChatMessage).filter(
+                    ChatMessage.chat_id == id, ChatMessage.data.isnot(None)
+                ).update({ChatMessage.data: null()}, synchronize_session=False)
+
                 db.commit()
                 db.refresh(chat_item)
 
@@ -453,7 +550,7 @@ class ChatTable:
             if removed:
                 self.delete_orphan_tags_for_user(list(removed), user.id, db=db)
 
-            return ChatModel.model_validate(chat)
+            return self._to_chat_model(chat, db)
 
     def get_chat_title_by_id(self, id: str) -> Optional[str]:
         with get_db_context() as db:
@@ -470,92 +567,74 @@ class ChatTable:
         return chat.chat.get("history", {}).get("messages", {}) or {}
 
     def get_message_by_id_and_message_id(
-        self, id: str, message_id: str
+        self, id: str, message_id: str, db: Optional[Session] = None
     ) -> Optional[dict]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
-        return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
-
-    def upsert_message_to_chat_by_id_and_message_id(
-        self, id: str, message_id: str, message: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
-        # Sanitize message content for null characters before upserting
-        if isinstance(message.get("content"), str):
-            message["content"] = sanitize_text_for_db(message["content"])
-
-        user_id = chat.user_id
-        chat = chat.chat
-        history = chat.get("history", {})
-
-        if message_id in history.get("messages", {}):
-            history["messages"][message_id] = {
-                **history["messages"][message_id],
-                **message,
-            }
-        else:
-            history["messages"][message_id] = message
+        with get_db_context(db) as db:
+            result = self._get_message(id, message_id, db)
+            if result is None:
+                return None
 
-        history["currentId"] = message_id
+            return result[1] or {}
 
-        chat["history"] = history
+    # Per-message mutations write the message's chat_message row only; the
+    # chat.chat history is assembled from it on read and rewritten as a
+    # whole only by update_chat_by_id.
 
-        # Dual-write to chat_message table
+    def upsert_message_to_chat_by_id_and_message_id(
+        self, id: str, message_id: str, message: dict, db: Optional[Session] = None
+    ) -> Optional[dict]:
+        """Merge `message` into a message of the chat and return the result."""
         try:
-            ChatMessages.upsert_message(
-                message_id=message_id,
-                chat_id=id,
-                user_id=user_id,
-                data=history["messages"][message_id],
-            )
-        except Exception as e:
-            log.warning(f"Failed to write to chat_message table: {e}")
+            with get_db_context(db) as db:
+                result = self._get_message(id, message_id, db)
+                if result is None:
+                    return None
+                user_id, existing = result
 
-        return self.update_chat_by_id(id, chat)
+                # Sanitize message content for null characters before upserting
+                if isinstance(message.get("content"), str):
+                    message["content"] = sanitize_text_for_db(message["content"])
 
-    def add_message_status_to_chat_by_id_and_message_id(
-        self, id: str, message_id: str, status: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
+                message = {**existing, **message} if existing else message
+                self._write_message(id, message_id, user_id, message, db, current=True)
+                return message
+        except Exception as e:
+            log.warning(f"Failed to upsert message {message_id} of chat {id}: {e}")
             return None
 
-        chat = chat.chat
-        history = chat.get("history", {})
-
-        if message_id in history.get("messages", {}):
-            status_history = history["messages"][message_id].get("statusHistory", [])
-            status_history.append(status)
-            history["messages"][message_id]["statusHistory"] = status_history
+    def add_message_status_to_chat_by_id_and_message_id(
+        self, id: str, message_id: str, status: dict, db: Optional[Session] = None
+    ) -> Optional[dict]:
+        try:
+            with get_db_context(db) as db:
+                result = self._get_message(id, message_id, db)
+                if result is None or result[1] is None:
+                    return None
+                user_id, message = result
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+                message["statusHistory"] = message.get("statusHistory", []) + [status]
+                self._write_message(id, message_id, user_id, message, db)
+                return message
+        except Exception as e:
+            log.warning(f"Failed to add status to message {message_id}: {e}")
+            return None
 
     def add_message_files_by_id_and_message_id(
-        self, id: str, message_id: str, files: list[dict]
+        self, id: str, message_id: str, files: list[dict], db: Optional[Session] = None
     ) -> list[dict]:
-        with get_db_context() as db:
-            chat = self.get_chat_by_id(id, db=db)
-            if chat is None:
+        with get_db_context(db) as db:
+            result = self._get_message(id, message_id, db)
+            if result is None:
                 return None
-
-            chat = chat.chat
-            history = chat.get("history", {})
+            user_id, message = result
 
             message_files = []
 
-            if message_id in history.get("messages", {}):
-                message_files = history["messages"][message_id].get("files", [])
-                message_files = message_files + files
-                history["messages"][message_id]["files"] = message_files
+            if message is not None:
+                message_files = message.get("files", []) + files
+                message["files"] = message_files
+                self._write_message(id, message_id, user_id, message, db)
 
-            chat["history"] = history
-            self.update_chat_by_id(id, chat, db=db)
             return message_files
 
     def insert_shared_chat_by_chat_id(
@@ -576,7 +655,7 @@ class ChatTable:
                     "id": str(uuid.uuid4()),
                     "user_id": f"shared-{chat_id}",
                     "title": chat.title,
-                    "chat": chat.chat,
+                    "chat": self._to_chat_model(chat, db).chat,
                     "meta": chat.meta,
                     "pinned": chat.pinned,
                     "folder_id": chat.folder_id,
@@ -612,7 +691,7 @@ class ChatTable:
                     return self.insert_shared_chat_by_chat_id(chat_id, db=db)
 
                 shared_chat.title = chat.title
-                shared_chat.chat = chat.chat
+                shared_chat.chat = self._to_chat_model(chat, db).chat
                 shared_chat.meta = chat.meta
                 shared_chat.pinned = chat.pinned
                 shared_chat.folder_id = chat.folder_id
@@ -665,7 +744,7 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(chat, db)
         except Exception:
             return None
 
@@ -679,7 +758,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(chat, db)
         except Exception:
             return None
 
@@ -694,7 +773,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(chat, db)
         except Exception:
             return None
 
@@ -868,7 +947,7 @@ class ChatTable:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(all_chats, db)
 
     def get_chat_title_id_list_by_user_id(
         self,
@@ -931,7 +1010,7 @@ class ChatTable:
                 .order_by(Chat.updated_at.desc())
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(all_chats, db)
 
     def get_chat_by_id(
         self, id: str, db: Optional[Session] = None
@@ -946,7 +1025,7 @@ class ChatTable:
                     db.commit()
                     db.refresh(chat_item)
 
-                return ChatModel.model_validate(chat_item)
+                return self._to_chat_model(chat_item, db)
         except Exception:
             return None
 
@@ -972,7 +1051,7 @@ class ChatTable:
         try:
             with get_db_context(db) as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(chat, db)
         except Exception:
             return None
 
@@ -1016,7 +1095,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(all_chats, db)
 
     def get_chats_by_user_id(
         self,
@@ -1059,7 +1138,7 @@ class ChatTable:
 
             return ChatListResponse(
                 **{
-                    "items": [ChatModel.model_validate(chat) for chat in all_chats],
+                    "items": self._to_chat_models(all_chats, db),
                     "total": total,
                 }
             )
@@ -1095,7 +1174,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(all_chats, db)
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -1294,7 +1373,7 @@ class ChatTable:
             log.info(f"The number of chats: {len(all_chats)}")
 
             # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(all_chats, db)
 
     def get_chats_by_folder_id_and_user_id(
         self,
@@ -1317,7 +1396,7 @@ class ChatTable:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(all_chats, db)
 
     def get_chats_by_folder_ids_and_user_id(
         self, folder_ids: list[str], user_id: str, db: Optional[Session] = None
@@ -1332,7 +1411,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(all_chats, db)
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str, db: Optional[Session] = None
@@ -1345,7 +1424,7 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(chat, db)
         except Exception:
             return None
 
@@ -1391,7 +1470,7 @@ class ChatTable:
 
             all_chats = query.all()
             log.debug(f"all_chats: {all_chats}")
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(all_chats, db)
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str, db: Optional[Session] = None
@@ -1408,7 +1487,7 @@ class ChatTable:
                     }
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(chat, db)
         except Exception:
             return None
 
@@ -1711,7 +1790,7 @@ class ChatTable:
                 .all()
             )
 
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(all_chats, db)
 
 
 Chats = ChatTable()
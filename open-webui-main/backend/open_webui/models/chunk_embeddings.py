@@ -0,0 +1,185 @@
+import logging
+import time
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from open_webui.internal.db import Base, get_db_context
+from pydantic import BaseModel
+from sqlalchemy import BigInteger, Column, Index, LargeBinary, Text, func
+
+log = logging.getLogger(__name__)
+
+####################
+# ChunkEmbedding DB Schema
+####################
+
+
+class ChunkEmbedding(Base):
+    __tablename__ = "chunk_embedding"
+
+    # get_chunk_embedding_key of the normalized chunk text
+    hash = Column(Text, primary_key=True)
+    vector = Column(LargeBinary, nullable=False)  # float32
+    created_at = Column(BigInteger, nullable=False)
+
+
+class ChunkEmbeddingRef(Base):
+    __tablename__ = "chunk_embedding_ref"
+
+    # Files whose chunks use a stored embedding, embeddings without any
+    # reference left are deleted with the last file
+    hash = Column(Text, primary_key=True)
+    file_id = Column(Text, primary_key=True)
+
+    __table_args__ = (Index("ix_chunk_embedding_ref_file_id", "file_id"),)
+
+
+class ChunkEmbeddingReport(BaseModel):
+    embeddings: int
+    references: int
+    files: int
+    # References served by an embedding computed for another chunk
+    embedding_calls_saved: int
+
+
+class ChunkEmbeddingsTable:
+    def get_vectors_by_hashes(
+        self, hashes: list[str], db: Optional[Session] = None
+    ) -> dict[str, list[float]]:
+        if not hashes:
+            return {}
+        with get_db_context(db) as db:
+            rows = (
+                db.query(ChunkEmbedding.hash, ChunkEmbedding.vector)
+                .filter(ChunkEmbedding.hash.in_(set(hashes)))
+                .all()
+            )
+            return {
+                hash: np.frombuffer(vector, dtype=np.float32).tolist()
+                for hash, vector in rows
+            }
+
+    def insert_vectors(
+        self,
+        vectors: dict[str, list[float]],
+        db: Optional[Session] = None,
+    ) -> None:
+        with get_db_context(db) as db:
+            now = int(time.time())
+            embeddings = [
+                ChunkEmbedding(
+                    hash=hash,
+                    vector=np.asarray(vector, dtype=np.float32).tobytes(),
+                    created_at=now,
+                )
+                for hash, vector in vectors.items()
+            ]
+            try:
+                db.add_all(embeddings)
+                db.commit()
+            except IntegrityError:
+                # Some were stored meanwhile by another ingestion
+                db.rollback()
+                for embedding in embeddings:
+                    db.merge(embedding)
+                db.commit()
+
+    def add_refs(
+        self, hashes: list[str], file_id: str, db: Optional[Session] = None
+    ) -> None:
+        if not hashes:
+            return
+        with get_db_context(db) as db:
+            hashes = set(hashes)
+            referenced = {
+                hash
+                for (hash,) in db.query(ChunkEmbeddingRef.hash)
+                .filter(
+                    ChunkEmbeddingRef.file_id == file_id,
+                    ChunkEmbeddingRef.hash.in_(hashes),
+                )
+                .all()
+            }
+            refs = [
+                ChunkEmbeddingRef(hash=hash, file_id=file_id)
+                for hash in hashes - referenced
+            ]
+            if not refs:
+                return
+            try:
+                db.add_all(refs)
+                db.commit()
+            except IntegrityError:
+                # The same file ingested into two collections at once
+                db.rollback()
+                for ref in refs:
+                    db.merge(ref)
+                db.commit()
+
+    def delete_refs_by_file_id(self, file_id: str, db: Optional[Session] = None) -> int:
+        """
+        Drop the references of a deleted file and the embeddings no other
+        file references. Returns the number of embeddings deleted.
+        """
+        with get_db_context(db) as db:
+            try:
+                hashes = [
+                    hash
+                    for (hash,) in db.query(ChunkEmbeddingRef.hash)
+                    .filter_by(file_id=file_id)
+                    .all()
+                ]
+                if not hashes:
+                    return 0
+                db.query(ChunkEmbeddingRef).filter_by(file_id=file_id).delete()
+
+                deleted = 0
+                for start in range(0, len(hashes), 500):
+                    batch = hashes[start : start + 500]
+                    still_referenced = db.query(ChunkEmbeddingRef.hash).filter(
+                        ChunkEmbeddingRef.hash.in_(batch)
+                    )
+                    deleted += (
+                        db.query(ChunkEmbedding)
+                        .filter(
+                            ChunkEmbedding.hash.in_(batch),
+                            ChunkEmbedding.hash.not_in(still_referenced),
+                        )
+                        .delete(synchronize_session=False)
+                    )
+                db.commit()
+                return deleted
+            except Exception as e:
+                log.exception(f"Error deleting chunk embeddings of {file_id}: {e}")
+                db.rollback()
+                return 0
+
+    def delete_all(self, db: Optional[Session] = None) -> bool:
+        with get_db_context(db) as db:
+            try:
+                db.query(ChunkEmbeddingRef).delete()
+                db.query(ChunkEmbedding).delete()
+                db.commit()
+                return True
+            except Exception:
+                return False
+
+    def get_report(self, db: Optional[Session] = None) -> ChunkEmbeddingReport:
+        with get_db_context(db) as db:
+            embeddings = db.query(func.count(ChunkEmbedding.hash)).scalar() or 0
+            references = db.query(func.count(ChunkEmbeddingRef.hash)).scalar() or 0
+            files = (
+                db.query(func.count(func.distinct(ChunkEmbeddingRef.file_id))).scalar()
+                or 0
+            )
+            return ChunkEmbeddingReport(
+                embeddings=embeddings,
+                references=references,
+                files=files,
+                embedding_calls_saved=max(references - embeddings, 0),
+            )
+
+
+ChunkEmbeddings = ChunkEmbeddingsTable()
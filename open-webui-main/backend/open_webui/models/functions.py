@@ -5,6 +5,7 @@ from typing import Optional
 from sqlalchemy.orm import Session
 from open_webui.internal.db import Base, JSONField, get_db, get_db_context
 from open_webui.models.users import Users, UserModel
+from open_webui.utils.model_registry import MODEL_REGISTRY
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Boolean, Column, String, Text, Index
 
@@ -102,6 +103,15 @@ class FunctionValves(BaseModel):
     valves: Optional[dict] = None
 
 
+# Function id -> number of changes to its content or valves (global or any
+# user's), so compiled filter pipelines know to resolve it again
+FUNCTION_VERSIONS: dict[str, int] = {}
+
+
+def bump_function_version(id: str):
+    FUNCTION_VERSIONS[id] = FUNCTION_VERSIONS.get(id, 0) + 1
+
+
 class FunctionsTable:
     def insert_new_function(
         self,
@@ -125,6 +135,7 @@ class FunctionsTable:
                 result = Function(**function.model_dump())
                 db.add(result)
                 db.commit()
+                MODEL_REGISTRY.invalidate()
                 db.refresh(result)
                 if result:
                     return FunctionModel.model_validate(result)
@@ -176,6 +187,7 @@ class FunctionsTable:
                         db.delete(func)
 
                 db.commit()
+                MODEL_REGISTRY.invalidate()
 
                 return [
                     FunctionModel.model_validate(func)
@@ -259,19 +271,24 @@ class FunctionsTable:
             ]
 
     def get_functions_by_type(
-        self, type: str, active_only=False, db: Optional[Session] = None
-    ) -> list[FunctionModel]:
+        self,
+        type: str,
+        active_only=False,
+        include_valves=False,
+        db: Optional[Session] = None,
+    ) -> list[FunctionModel | FunctionWithValvesModel]:
+        model = FunctionWithValvesModel if include_valves else FunctionModel
         with get_db_context(db) as db:
             if active_only:
                 return [
-                    FunctionModel.model_validate(function)
+                    model.model_validate(function)
                     for function in db.query(Function)
                     .filter_by(type=type, is_active=True)
                     .all()
                 ]
             else:
                 return [
-                    FunctionModel.model_validate(function)
+                    model.model_validate(function)
                     for function in db.query(Function).filter_by(type=type).all()
                 ]
 
@@ -317,6 +334,8 @@ class FunctionsTable:
                 function.valves = valves
                 function.updated_at = int(time.time())
                 db.commit()
+                MODEL_REGISTRY.invalidate()
+                bump_function_version(id)
                 db.refresh(function)
                 return FunctionModel.model_validate(function)
             except Exception:
@@ -337,6 +356,7 @@ class FunctionsTable:
 
                     function.updated_at = int(time.time())
                     db.commit()
+                    MODEL_REGISTRY.invalidate()
                     db.refresh(function)
                     return FunctionModel.model_validate(function)
                 else:
@@ -380,6 +400,7 @@ class FunctionsTable:
 
             # Update the user settings in the database
             Users.update_user_by_id(user_id, {"settings": user_settings}, db=db)
+            bump_function_version(id)
 
             return user_settings["functions"]["valves"][id]
         except Exception as e:
@@ -400,6 +421,8 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                MODEL_REGISTRY.invalidate()
+                bump_function_version(id)
                 function = db.get(Function, id)
                 return FunctionModel.model_validate(function) if function else None
             except Exception:
@@ -415,6 +438,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                MODEL_REGISTRY.invalidate()
                 return True
             except Exception:
                 return None
@@ -424,6 +448,8 @@ class FunctionsTable:
             try:
                 db.query(Function).filter_by(id=id).delete()
                 db.commit()
+                MODEL_REGISTRY.invalidate()
+                bump_function_version(id)
 
                 return True
             except Exception:
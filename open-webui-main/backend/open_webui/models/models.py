@@ -8,6 +8,7 @@ from open_webui.internal.db import Base, JSONField, get_db, get_db_context
 from open_webui.models.groups import Groups
 from open_webui.models.users import User, UserModel, Users, UserResponse
 from open_webui.models.access_grants import AccessGrantModel, AccessGrants
+from open_webui.utils.model_registry import MODEL_REGISTRY
 
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -175,6 +176,7 @@ class ModelsTable:
                 )
                 db.add(result)
                 db.commit()
+                MODEL_REGISTRY.invalidate()
                 db.refresh(result)
                 AccessGrants.set_access_grants(
                     "model", result.id, form_data.access_grants, db=db
@@ -416,6 +418,7 @@ class ModelsTable:
                 model.is_active = not model.is_active
                 model.updated_at = int(time.time())
                 db.commit()
+                MODEL_REGISTRY.invalidate()
                 db.refresh(model)
 
                 return self._to_model_model(model, db=db)
@@ -432,6 +435,7 @@ class ModelsTable:
                 result = db.query(Model).filter_by(id=id).update(data)
 
                 db.commit()
+                MODEL_REGISTRY.invalidate()
                 if model.access_grants is not None:
                     AccessGrants.set_access_grants(
                         "model", id, model.access_grants, db=db
@@ -448,6 +452,7 @@ class ModelsTable:
                 AccessGrants.revoke_all_access("model", id, db=db)
                 db.query(Model).filter_by(id=id).delete()
                 db.commit()
+                MODEL_REGISTRY.invalidate()
 
                 return True
         except Exception:
@@ -461,6 +466,7 @@ class ModelsTable:
                     AccessGrants.revoke_all_access("model", model_id, db=db)
                 db.query(Model).delete()
                 db.commit()
+                MODEL_REGISTRY.invalidate()
 
                 return True
         except Exception:
@@ -508,6 +514,7 @@ class ModelsTable:
                         db.delete(model)
 
                 db.commit()
+                MODEL_REGISTRY.invalidate()
 
                 all_models = db.query(Model).all()
                 model_ids = [model.id for model in all_models]
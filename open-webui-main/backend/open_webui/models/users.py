@@ -12,6 +12,7 @@ from open_webui.models.groups import Groups, GroupMember
 from open_webui.models.channels import ChannelMember
 
 from open_webui.utils.misc import throttle
+from open_webui.utils.user_cache import USER_CACHE
 from open_webui.utils.validate import validate_profile_image_url
 
 
@@ -27,6 +28,8 @@ from sqlalchemy import (
     exists,
     select,
     cast,
+    update,
+    bindparam,
 )
 from sqlalchemy import or_, case, func
 from sqlalchemy.dialects.postgresql import JSONB
@@ -593,6 +596,7 @@ class UsersTable:
                 user.role = role
                 db.commit()
                 db.refresh(user)
+                USER_CACHE.invalidate(id)
                 return UserModel.model_validate(user)
         except Exception:
             return None
@@ -609,6 +613,7 @@ class UsersTable:
                     setattr(user, key, value)
                 db.commit()
                 db.refresh(user)
+                USER_CACHE.invalidate(id)
                 return UserModel.model_validate(user)
         except Exception:
             return None
@@ -624,6 +629,7 @@ class UsersTable:
                 user.profile_image_url = profile_image_url
                 db.commit()
                 db.refresh(user)
+                USER_CACHE.invalidate(id)
                 return UserModel.model_validate(user)
         except Exception:
             return None
@@ -644,6 +650,28 @@ class UsersTable:
         except Exception:
             return None
 
+    def update_last_active_by_ids(
+        self, last_active: dict[str, int], db: Optional[Session] = None
+    ) -> None:
+        """
+        Set last_active_at of many users in one statement, see LastActiveBuffer.
+        Users deleted in the meantime are skipped.
+        """
+        # A Core executemany: the ORM bulk update by primary key raises
+        # StaleDataError when any of the rows is gone
+        table = User.__table__
+        with get_db_context(db) as db:
+            db.execute(
+                update(table)
+                .where(table.c.id == bindparam("user_id"))
+                .values(last_active_at=bindparam("timestamp")),
+                [
+                    {"user_id": id, "timestamp": timestamp}
+                    for id, timestamp in last_active.items()
+                ],
+            )
+            db.commit()
+
     def update_user_oauth_by_id(
         self, id: str, provider: str, sub: str, db: Optional[Session] = None
     ) -> Optional[UserModel]:
@@ -671,6 +699,7 @@ class UsersTable:
                 db.query(User).filter_by(id=id).update({"oauth": oauth})
                 db.commit()
 
+                USER_CACHE.invalidate(id)
                 return UserModel.model_validate(user)
 
         except Exception:
@@ -703,6 +732,7 @@ class UsersTable:
                 db.query(User).filter_by(id=id).update({"scim": scim})
                 db.commit()
 
+                USER_CACHE.invalidate(id)
                 return UserModel.model_validate(user)
 
         except Exception:
@@ -720,6 +750,7 @@ class UsersTable:
                     setattr(user, key, value)
                 db.commit()
                 db.refresh(user)
+                USER_CACHE.invalidate(id)
                 return UserModel.model_validate(user)
         except Exception as e:
             print(e)
@@ -745,6 +776,7 @@ class UsersTable:
                 db.commit()
 
                 user = db.query(User).filter_by(id=id).first()
+                USER_CACHE.invalidate(id)
                 return UserModel.model_validate(user)
         except Exception:
             return None
@@ -762,6 +794,7 @@ class UsersTable:
                     db.query(User).filter_by(id=id).delete()
                     db.commit()
 
+                USER_CACHE.invalidate(id)
                 return True
             else:
                 return False
@@ -797,6 +830,7 @@ class UsersTable:
                 db.add(new_api_key)
                 db.commit()
 
+                USER_CACHE.invalidate(id)
                 return True
 
         except Exception:
@@ -807,6 +841,7 @@ class UsersTable:
             with get_db_context(db) as db:
                 db.query(ApiKey).filter_by(user_id=id).delete()
                 db.commit()
+                USER_CACHE.invalidate(id)
                 return True
         except Exception:
             return False
@@ -0,0 +1,644 @@
+"""
+Persistent BM25 index per collection for hybrid search.
+
+Hybrid search used to fetch every chunk of a collection and build a
+BM25Retriever for each query. A BM25Index keeps the postings on disk
+instead, memory-mapped at query time, so a query only reads the posting
+lists of its own terms and the chunks it returns.
+
+An index is a list of immutable segments plus a manifest of the chunks
+deleted from them. Inserts add a segment, deletes only update the manifest,
+and small or mostly deleted segments are merged as they accumulate.
+Scores are those of rank_bm25's BM25Okapi, which BM25Retriever uses.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import uuid
+from itertools import chain
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from filelock import FileLock
+
+from open_webui.retrieval.vector.main import (
+    GetResult,
+    SearchResult,
+    VectorDBBase,
+    VectorItem,
+)
+
+log = logging.getLogger(__name__)
+
+# BM25Okapi defaults
+K1 = 1.5
+B = 0.75
+EPSILON = 0.25
+
+MAX_SEGMENTS = 8
+MAX_DELETED_RATIO = 0.2
+
+# Metadata deletes filter on, hashed per chunk so deleting needs no scan
+FILTER_KEYS = ("file_id", "hash")
+
+# "text" indexes the chunk, "all" the chunk and its metadata texts
+FIELDS = ("text", "all")
+
+
+def tokenize(text: str) -> list[str]:
+    """BM25Retriever's default preprocessing"""
+    return text.split()
+
+
+def get_metadata_texts(metadata: dict) -> list[str]:
+    """Metadata appended to a chunk for ENABLE_RAG_HYBRID_SEARCH_ENRICHED_TEXTS"""
+    parts = []
+
+    # Add filename (repeat twice for extra weight in BM25 scoring)
+    if metadata.get("name"):
+        filename = metadata["name"]
+        filename_tokens = filename.replace("_", " ").replace("-", " ").replace(".", " ")
+        parts.append(f"Filename: {filename} {filename_tokens} {filename_tokens}")
+
+    # Add title if available
+    if metadata.get("title"):
+        parts.append(f"Title: {metadata['title']}")
+
+    # Add document section headings if available (from markdown splitter)
+    if metadata.get("headings") and isinstance(metadata["headings"], list):
+        headings = " > ".join(str(h) for h in metadata["headings"])
+        parts.append(f"Section: {headings}")
+
+    # Add source URL/path if available
+    if metadata.get("source"):
+        parts.append(f"Source: {metadata['source']}")
+
+    # Add snippet for web search results
+    if metadata.get("snippet"):
+        parts.append(f"Snippet: {metadata['snippet']}")
+
+    return parts
+
+
+def hash_strings(values) -> np.ndarray:
+    """64-bit hashes of terms, chunk ids and metadata values"""
+    return np.fromiter(
+        (
+            int.from_bytes(
+                hashlib.blake2b(str(value).encode(), digest_size=8).digest(),
+                "little",
+            )
+            for value in values
+        ),
+        dtype=np.uint64,
+    )
+
+
+def _save(path: str, array: np.ndarray):
+    with open(path, "wb") as f:
+        np.save(f, array)
+
+
+def _write_json(path: str, data: Any):
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _write_postings(path: str, field: str, terms: np.ndarray, docs: np.ndarray):
+    """
+    Write the postings of the (term rank, chunk) pairs of every token, in CSR
+    layout ordered by term hash
+    """
+    n = int(docs.max()) + 1 if len(docs) else 1
+    keys, freqs = np.unique(terms.astype(np.int64) * n + docs, return_counts=True)
+    ranks, starts = np.unique(keys // n, return_index=True)
+
+    _save(f"{path}/{field}.ranks.npy", ranks)
+    _save(f"{path}/{field}.offsets.npy", np.append(starts, len(keys)).astype(np.int64))
+    _save(f"{path}/{field}.docs.npy", (keys % n).astype(np.int32))
+    _save(f"{path}/{field}.freqs.npy", freqs.astype(np.float32))
+
+
+def write_segment(
+    path: str, ids: list[str], texts: list[str], metadatas: list[dict]
+) -> int:
+    os.makedirs(path)
+
+    text_tokens = [tokenize(text or "") for text in texts]
+    extra_tokens = [
+        tokenize(" ".join(get_metadata_texts(metadata))) for metadata in metadatas
+    ]
+    lengths = np.array(
+        [
+            [len(tokens), len(tokens) + len(extra)]
+            for tokens, extra in zip(text_tokens, extra_tokens)
+        ],
+        dtype=np.int32,
+    ).reshape(-1, len(FIELDS))
+
+    # Term ids are ranks in hash order, so postings sorted by id are sorted by hash
+    text_flat = list(chain.from_iterable(text_tokens))
+    extra_flat = list(chain.from_iterable(extra_tokens))
+    vocab = list(dict.fromkeys(chain(text_flat, extra_flat)))
+    hashes = hash_strings(vocab)
+    order = np.argsort(hashes)
+    rank = np.empty(len(vocab), dtype=np.int64)
+    rank[order] = np.arange(len(vocab))
+    lookup = dict(zip(vocab, rank.tolist()))
+
+    text_terms = np.fromiter(map(lookup.__getitem__, text_flat), dtype=np.int64)
+    extra_terms = np.fromiter(map(lookup.__getitem__, extra_flat), dtype=np.int64)
+    text_docs = np.repeat(np.arange(len(ids)), lengths[:, 0])
+    extra_docs = np.repeat(np.arange(len(ids)), lengths[:, 1] - lengths[:, 0])
+
+    _save(f"{path}/terms.npy", hashes[order])
+    _write_postings(path, "text", text_terms, text_docs)
+    _write_postings(
+        path,
+        "all",
+        np.concatenate([text_terms, extra_terms]),
+        np.concatenate([text_docs, extra_docs]),
+    )
+    _save(f"{path}/lengths.npy", lengths)
+    _save(f"{path}/ids.npy", hash_strings(ids))
+    for key in FILTER_KEYS:
+        _save(f"{path}/{key}.npy", hash_strings(m.get(key) for m in metadatas))
+
+    offsets = [0]
+    with open(f"{path}/docs.jsonl", "wb") as f:
+        for id, text, metadata in zip(ids, texts, metadatas):
+            line = json.dumps(
+                {"id": id, "text": text or "", "metadata": metadata}, default=str
+            )
+            offsets.append(offsets[-1] + f.write(line.encode() + b"\n"))
+    _save(f"{path}/docs.offsets.npy", np.array(offsets, dtype=np.int64))
+    return len(ids)
+
+
+class Segment:
+    def __init__(self, path: str, size: int, deleted: list[int]):
+        self.path = path
+        self.size = size
+        self.live = np.ones(size, dtype=bool)
+        self.live[deleted] = False
+        self.arrays = {}
+
+    def array(self, name: str) -> np.ndarray:
+        if name not in self.arrays:
+            self.arrays[name] = np.load(f"{self.path}/{name}.npy", mmap_mode="r")
+        return self.arrays[name]
+
+    def terms(self, field: str) -> np.ndarray:
+        """Hashes of the terms of `field`, sorted"""
+        return self.array("terms")[self.array(f"{field}.ranks")]
+
+    def postings(self, field: str, term: np.uint64):
+        terms = self.array("terms")
+        rank = np.searchsorted(terms, term)
+        if rank == len(terms) or terms[rank] != term:
+            return None
+        ranks = self.array(f"{field}.ranks")
+        pos = np.searchsorted(ranks, rank)
+        if pos == len(ranks) or ranks[pos] != rank:
+            return None
+        offsets = self.array(f"{field}.offsets")
+        start, end = offsets[pos], offsets[pos + 1]
+        return (
+            self.array(f"{field}.docs")[start:end],
+            self.array(f"{field}.freqs")[start:end],
+        )
+
+    def document_frequencies(self, field: str):
+        """Terms of the segment and the number of live chunks containing each"""
+        terms = self.terms(field)
+        offsets = np.asarray(self.array(f"{field}.offsets"))
+        if self.live.all():
+            return terms, np.diff(offsets)
+        live = self.live[self.array(f"{field}.docs")].astype(np.int64)
+        counts = np.add.reduceat(live, offsets[:-1]) if len(live) else live
+        return terms, counts
+
+    def documents(self, idxs) -> list[dict]:
+        offsets = self.array("docs.offsets")
+        documents = []
+        with open(f"{self.path}/docs.jsonl", "rb") as f:
+            for idx in idxs:
+                f.seek(offsets[idx])
+                documents.append(json.loads(f.read(offsets[idx + 1] - offsets[idx])))
+        return documents
+
+    def match(self, ids=None, filter: Optional[dict] = None) -> np.ndarray:
+        """Indices of the live chunks matching `ids` or an equality `filter`"""
+        mask = self.live.copy()
+        if ids is not None:
+            mask &= np.isin(self.array("ids"), hash_strings(ids))
+        scan = {}
+        for key, value in (filter or {}).items():
+            if key.startswith("$") or isinstance(value, (dict, list)):
+                raise ValueError(f"Unsupported filter {filter}")
+            if key in FILTER_KEYS:
+                mask &= self.array(key) == hash_strings([value])[0]
+            else:
+                scan[key] = value
+
+        idxs = np.flatnonzero(mask)
+        if scan and len(idxs):
+            idxs = np.array(
+                [
+                    idx
+                    for idx, document in zip(idxs, self.documents(idxs))
+                    if all(document["metadata"].get(k) == v for k, v in scan.items())
+                ],
+                dtype=np.int64,
+            )
+        return idxs
+
+
+class BM25Index:
+    """BM25 index of one collection, stored in `path`"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.manifest_stat = None
+        self.segments: list[Segment] = []
+        self.stats = {}
+
+    @property
+    def manifest_path(self) -> str:
+        return f"{self.path}/manifest.json"
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def size(self) -> int:
+        self._load()
+        return sum(int(segment.live.sum()) for segment in self.segments)
+
+    def _load(self):
+        stat = os.stat(self.manifest_path)
+        stat = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self.lock:
+            if stat == self.manifest_stat:
+                return
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            self.segments = [
+                Segment(f"{self.path}/{s['name']}", s["size"], s["deleted"])
+                for s in manifest["segments"]
+            ]
+            self.stats = {}
+            self.manifest_stat = stat
+
+    def _stats(self, field: str):
+        """
+        The segments with their chunk count, average length and the idf of
+        every term, as BM25Okapi computes them
+        """
+        self._load()
+        with self.lock:
+            if field not in self.stats:
+                segments = self.segments
+                column = FIELDS.index(field)
+                count = sum(int(s.live.sum()) for s in segments)
+                length = sum(
+                    int(s.array("lengths")[:, column][s.live].sum()) for s in segments
+                )
+
+                terms = [np.empty(0, dtype=np.uint64)]
+                frequencies = [np.empty(0, dtype=np.int64)]
+                for segment in segments:
+                    segment_terms, segment_frequencies = segment.document_frequencies(
+                        field
+                    )
+                    terms.append(np.asarray(segment_terms))
+                    frequencies.append(segment_frequencies)
+                terms, inverse = np.unique(np.concatenate(terms), return_inverse=True)
+                frequencies = np.bincount(
+                    inverse, weights=np.concatenate(frequencies), minlength=len(terms)
+                )
+
+                present = frequencies > 0
+                terms, frequencies = terms[present], frequencies[present]
+                idf = np.log(count - frequencies + 0.5) - np.log(frequencies + 0.5)
+                if len(idf):
+                    idf[idf < 0] = EPSILON * idf.mean()
+
+                self.stats[field] = (
+                    segments,
+                    count,
+                    length / count if count else 0.0,
+                    terms,
+                    idf,
+                )
+            return self.stats[field]
+
+    def search(self, query: str, k: int, enriched: bool = False) -> list[dict]:
+        """The `k` best chunks for `query`, with their BM25 score"""
+        try:
+            return self._search(query, k, "all" if enriched else "text")
+        except FileNotFoundError:
+            # A segment was merged away by another process, reload
+            self.manifest_stat = None
+            return self._search(query, k, "all" if enriched else "text")
+
+    def _search(self, query: str, k: int, field: str) -> list[dict]:
+        segments, count, avgdl, terms, idf = self._stats(field)
+        if not count or not len(terms):
+            return []
+
+        query_terms = hash_strings(tokenize(query))
+        pos = np.minimum(np.searchsorted(terms, query_terms), len(terms) - 1)
+        known = terms[pos] == query_terms
+        query_terms, query_idf = query_terms[known], idf[pos[known]]
+
+        candidates = []
+        column = FIELDS.index(field)
+        for seg_idx, segment in enumerate(segments):
+            docs, scores = [], []
+            for term, term_idf in zip(query_terms, query_idf):
+                postings = segment.postings(field, term)
+                if postings is None:
+                    continue
+                term_docs, freqs = postings
+                lengths = segment.array("lengths")[term_docs, column]
+                docs.append(term_docs)
+                scores.append(
+                    term_idf
+                    * freqs
+                    * (K1 + 1)
+                    / (freqs + K1 * (1 - B + B * lengths / avgdl))
+                )
+            if not docs:
+                continue
+
+            docs, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(scores))
+            live = segment.live[docs]
+            docs, scores = docs[live], scores[live]
+            if len(docs) > k:
+                top = np.argpartition(scores, -k)[-k:]
+                docs, scores = docs[top], scores[top]
+            candidates.extend(zip(scores.tolist(), [seg_idx] * len(docs), docs))
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        results = []
+        for score, seg_idx, doc in candidates[:k]:
+            document = segments[seg_idx].documents([doc])[0]
+            results.append({**document, "score": float(score)})
+        return results
+
+    def write_lock(self) -> FileLock:
+        return FileLock(f"{self.path}.lock")
+
+    def _read_manifest(self) -> dict:
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def add(self, ids: list[str], texts: list[str], metadatas: list[dict]):
+        if not ids:
+            return
+        with self.write_lock():
+            manifest = self._read_manifest()
+            name = f"seg-{uuid.uuid4().hex}"
+            size = write_segment(f"{self.path}/{name}", ids, texts, metadatas)
+            manifest["segments"].append({"name": name, "size": size, "deleted": []})
+            self._compact(manifest)
+
+    def delete(self, ids: Optional[list[str]] = None, filter: Optional[dict] = None):
+        with self.write_lock():
+            manifest = self._read_manifest()
+            self._load()
+            changed = False
+            for entry, segment in zip(manifest["segments"], self.segments):
+                idxs = segment.match(ids=ids, filter=filter)
+                if len(idxs):
+                    entry["deleted"] = sorted(
+                        set(entry["deleted"]) | set(idxs.tolist())
+                    )
+                    changed = True
+            if changed:
+                self._compact(manifest)
+
+    def _compact(self, manifest: dict):
+        """Merge small or mostly deleted segments, then write the manifest"""
+        segments = manifest["segments"]
+        merge = [
+            s
+            for s in segments
+            if s["size"] and len(s["deleted"]) / s["size"] > MAX_DELETED_RATIO
+        ]
+        if len(segments) > MAX_SEGMENTS:
+            by_size = sorted(
+                (s for s in segments if s not in merge),
+                key=lambda s: s["size"] - len(s["deleted"]),
+            )
+            merge += by_size[: len(segments) - MAX_SEGMENTS // 2 + 1]
+
+        if merge:
+            ids, texts, metadatas = [], [], []
+            for entry in merge:
+                segment = Segment(
+                    f"{self.path}/{entry['name']}", entry["size"], entry["deleted"]
+                )
+                for document in segment.documents(np.flatnonzero(segment.live)):
+                    ids.append(document["id"])
+                    texts.append(document["text"])
+                    metadatas.append(document["metadata"])
+
+            segments = [s for s in segments if s not in merge]
+            if ids:
+                name = f"seg-{uuid.uuid4().hex}"
+                size = write_segment(f"{self.path}/{name}", ids, texts, metadatas)
+                segments.append({"name": name, "size": size, "deleted": []})
+            manifest["segments"] = segments
+
+        _write_json(self.manifest_path, manifest)
+        for entry in merge:
+            # Open memory maps of readers stay valid on POSIX
+            shutil.rmtree(f"{self.path}/{entry['name']}", ignore_errors=True)
+
+
+class BM25Indexes:
+    """The BM25 indexes of all collections, under `root`"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.indexes: dict[str, BM25Index] = {}
+        self.lock = threading.Lock()
+
+    def _path(self, collection_name: str) -> str:
+        if not re.fullmatch(r"[\w\-]{1,128}", collection_name):
+            collection_name = hashlib.sha256(collection_name.encode()).hexdigest()
+        return os.path.join(self.root, collection_name)
+
+    def _index(self, collection_name: str) -> BM25Index:
+        with self.lock:
+            if collection_name not in self.indexes:
+                self.indexes[collection_name] = BM25Index(self._path(collection_name))
+            return self.indexes[collection_name]
+
+    def get(self, collection_name: str) -> Optional[BM25Index]:
+        index = self._index(collection_name)
+        return index if index.exists() else None
+
+    def version(self, collection_name: str) -> Optional[str]:
+        """Changes on every write to a collection that has no index"""
+        try:
+            with open(f"{self._path(collection_name)}.version") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def touch(self, collection_name: str):
+        os.makedirs(self.root, exist_ok=True)
+        _write_json(f"{self._path(collection_name)}.version", uuid.uuid4().hex)
+
+    def build(
+        self,
+        collection_name: str,
+        result: Optional[GetResult],
+        version: Optional[str] = None,
+    ) -> Optional[BM25Index]:
+        """
+        Index the full contents of a collection. `version` must be read
+        before fetching `result`; if the collection was written since, the
+        result may be stale and nothing is stored.
+        """
+        if not result or not result.ids or not result.ids[0]:
+            return None
+
+        index = self._index(collection_name)
+        os.makedirs(self.root, exist_ok=True)
+        with index.write_lock():
+            if index.exists():
+                return index
+            if self.version(collection_name) != version:
+                log.debug(f"Collection {collection_name} changed while indexing")
+                return None
+
+            os.makedirs(index.path, exist_ok=True)
+            name = f"seg-{uuid.uuid4().hex}"
+            size = write_segment(
+                f"{index.path}/{name}",
+                result.ids[0],
+                result.documents[0],
+                [m or {} for m in result.metadatas[0]],
+            )
+            _write_json(
+                index.manifest_path,
+                {"segments": [{"name": name, "size": size, "deleted": []}]},
+            )
+        log.info(f"Built BM25 index of {collection_name} with {size} chunks")
+        return index
+
+    def drop(self, collection_name: str):
+        index = self._index(collection_name)
+        os.makedirs(self.root, exist_ok=True)
+        with index.write_lock():
+            shutil.rmtree(index.path, ignore_errors=True)
+        self.touch(collection_name)
+
+    def drop_all(self):
+        with self.lock:
+            self.indexes = {}
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _item_fields(item: Union[VectorItem, dict]):
+    if isinstance(item, dict):
+        return item["id"], item["text"], item.get("metadata") or {}
+    return item.id, item.text, item.metadata or {}
+
+
+class BM25IndexedVectorDB(VectorDBBase):
+    """
+    Passes every call to `client` and applies its writes to the BM25 index
+    of the collection. A collection without an index is only marked as
+    changed; its index is built from its contents on first use.
+    """
+
+    def __init__(self, client: VectorDBBase, indexes: BM25Indexes):
+        self.client = client
+        self.indexes = indexes
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _update(self, collection_name: str, update):
+        try:
+            index = self.indexes.get(collection_name)
+            if index is None:
+                self.indexes.touch(collection_name)
+            else:
+                update(index)
+        except Exception as e:
+            log.warning(f"Dropping BM25 index of {collection_name}: {e}")
+            self.indexes.drop(collection_name)
+
+    def has_collection(self, collection_name: str) -> bool:
+        return self.client.has_collection(collection_name)
+
+    def delete_collection(self, collection_name: str) -> None:
+        self.client.delete_collection(collection_name)
+        self.indexes.drop(collection_name)
+
+    def insert(self, collection_name: str, items: List[VectorItem]) -> None:
+        self.client.insert(collection_name, items)
+        self._update(
+            collection_name,
+            lambda index: index.add(*map(list, zip(*map(_item_fields, items)))),
+        )
+
+    def upsert(self, collection_name: str, items: List[VectorItem]) -> None:
+        self.client.upsert(collection_name, items)
+
+        def update(index: BM25Index):
+            ids, texts, metadatas = map(list, zip(*map(_item_fields, items)))
+            index.delete(ids=ids)
+            index.add(ids, texts, metadatas)
+
+        if items:
+            self._update(collection_name, update)
+
+    def search(
+        self,
+        collection_name: str,
+        vectors: List[List[Union[float, int]]],
+        filter: Optional[Dict] = None,
+        limit: int = 10,
+    ) -> Optional[SearchResult]:
+        return self.client.search(collection_name, vectors, filter=filter, limit=limit)
+
+    def query(
+        self, collection_name: str, filter: Dict, limit: Optional[int] = None
+    ) -> Optional[GetResult]:
+        return self.client.query(collection_name, filter, limit=limit)
+
+    def get(self, collection_name: str) -> Optional[GetResult]:
+        return self.client.get(collection_name)
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict] = None,
+    ) -> None:
+        self.client.delete(collection_name, ids=ids, filter=filter)
+        if ids is None and filter is None:
+            self.indexes.drop(collection_name)
+        else:
+            self._update(
+                collection_name, lambda index: index.delete(ids=ids, filter=filter)
+            )
+
+    def reset(self) -> None:
+        self.client.reset()
+        self.indexes.drop_all()
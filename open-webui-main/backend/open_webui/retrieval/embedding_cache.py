@@ -0,0 +1,187 @@
+"""
+Cache of query and document embeddings.
+
+Embeddings are keyed on the embedding engine, model, prefix and a hash of
+the text, so repeated queries and re-indexed chunks that did not change
+reuse the embedding instead of calling the model or API again. A bounded
+in-process LRU sits in front of an optional Redis tier shared between
+instances. Embeddings are kept as float32.
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+import numpy as np
+
+from open_webui.env import (
+    ENABLE_RAG_EMBEDDING_CACHE_REDIS,
+    RAG_EMBEDDING_CACHE_SIZE,
+    RAG_EMBEDDING_CACHE_TTL,
+    REDIS_CLUSTER,
+    REDIS_KEY_PREFIX,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    REDIS_URL,
+)
+from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
+
+log = logging.getLogger(__name__)
+
+# Exported by utils/telemetry/metrics.py
+EMBEDDING_CACHE_STATS = {
+    "hits": 0,  # in process
+    "redis_hits": 0,
+    "misses": 0,
+}
+
+
+class EmbeddingCache:
+    def __init__(self, size: int, ttl: int, redis: Any = None, redis_prefix=""):
+        self.size = size
+        self.ttl = ttl
+        self.redis = redis
+        self.redis_prefix = (
+            f"{redis_prefix}:embedding:" if redis_prefix else "embedding:"
+        )
+        # key -> (expires at, embedding)
+        self.entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+
+    @staticmethod
+    def key(engine: str, model: str, prefix: Optional[str], text: str) -> str:
+        text_hash = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        return f"{engine}:{model}:{prefix or ''}:{text_hash}"
+
+    def _get_local(self, key: str) -> Optional[np.ndarray]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def _set_local(self, key: str, embedding: np.ndarray):
+        self.entries[key] = (time.monotonic() + self.ttl, embedding)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    async def get_many(self, keys: list[str]) -> list[Optional[np.ndarray]]:
+        embeddings = [self._get_local(key) for key in keys]
+        EMBEDDING_CACHE_STATS["hits"] += sum(e is not None for e in embeddings)
+
+        missing = [idx for idx, embedding in enumerate(embeddings) if embedding is None]
+        if missing and self.redis is not None:
+            try:
+                # Keys spread over slots in Redis Cluster
+                mget = getattr(self.redis, "mget_nonatomic", self.redis.mget)
+                values = await mget([self.redis_prefix + keys[idx] for idx in missing])
+            except Exception as e:
+                log.warning(f"Failed to read cached embeddings from Redis: {e}")
+                values = [None] * len(missing)
+
+            for idx, value in zip(missing, values):
+                if value is not None:
+                    embeddings[idx] = np.frombuffer(value, dtype=np.float32)
+                    self._set_local(keys[idx], embeddings[idx])
+                    EMBEDDING_CACHE_STATS["redis_hits"] += 1
+
+        EMBEDDING_CACHE_STATS["misses"] += sum(e is None for e in embeddings)
+        return embeddings
+
+    async def set_many(self, keys: list[str], embeddings: list[np.ndarray]):
+        for key, embedding in zip(keys, embeddings):
+            self._set_local(key, embedding)
+
+        if self.redis is not None and keys:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for key, embedding in zip(keys, embeddings):
+                        pipe.set(
+                            self.redis_prefix + key, embedding.tobytes(), ex=self.ttl
+                        )
+                    await pipe.execute()
+            except Exception as e:
+                log.warning(f"Failed to cache embeddings in Redis: {e}")
+
+    def wrap(
+        self, embedding_function: Callable[..., Awaitable], engine: str, model: str
+    ) -> Callable[..., Awaitable]:
+        """Embedding function only embedding the texts missing from the cache"""
+        if self.size <= 0:
+            return embedding_function
+
+        async def cached_embedding_function(query, prefix=None, user=None):
+            texts = query if isinstance(query, list) else [query]
+            keys = [self.key(engine, model, prefix, text) for text in texts]
+            embeddings = await self.get_many(keys)
+
+            # Embed each missing text once, even if it occurs more than once
+            missing = {}
+            for idx, embedding in enumerate(embeddings):
+                if embedding is None:
+                    missing.setdefault(keys[idx], texts[idx])
+
+            if missing:
+                computed = await embedding_function(
+                    (
+                        list(missing.values())
+                        if isinstance(query, list)
+                        else next(iter(missing.values()))
+                    ),
+                    prefix,
+                    user,
+                )
+                if not isinstance(query, list):
+                    computed = [computed] if computed else []
+
+                if not computed or len(computed) != len(missing):
+                    # Failed batches are dropped, the rest can't be matched
+                    # to their texts. Only return them when nothing was cached.
+                    if len(missing) == len(texts):
+                        return computed if isinstance(query, list) else None
+                    return await embedding_function(query, prefix, user)
+
+                computed = [np.asarray(e, dtype=np.float32) for e in computed]
+                await self.set_many(list(missing), computed)
+                computed = dict(zip(missing, computed))
+                embeddings = [
+                    embedding if embedding is not None else computed[key]
+                    for key, embedding in zip(keys, embeddings)
+                ]
+
+            embeddings = [embedding.tolist() for embedding in embeddings]
+            return embeddings if isinstance(query, list) else embeddings[0]
+
+        return cached_embedding_function
+
+
+def get_embedding_cache_redis():
+    if not (ENABLE_RAG_EMBEDDING_CACHE_REDIS and REDIS_URL):
+        return None
+    try:
+        # Embeddings are stored as raw float32 bytes
+        return get_redis_connection(
+            redis_url=REDIS_URL,
+            redis_sentinels=get_sentinels_from_env(
+                REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT
+            ),
+            redis_cluster=REDIS_CLUSTER,
+            async_mode=True,
+            decode_responses=False,
+        )
+    except Exception as e:
+        log.warning(f"Embedding cache is not shared, failed to connect to Redis: {e}")
+        return None
+
+
+EMBEDDING_CACHE = EmbeddingCache(
+    size=RAG_EMBEDDING_CACHE_SIZE,
+    ttl=RAG_EMBEDDING_CACHE_TTL,
+    redis=get_embedding_cache_redis(),
+    redis_prefix=REDIS_KEY_PREFIX,
+)
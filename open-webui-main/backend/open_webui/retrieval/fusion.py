@@ -0,0 +1,76 @@
+"""
+Rank fusion and scoring for hybrid search, on NumPy arrays.
+
+Candidates are identified by their position in a shared candidate list, so
+each retriever's result is just an array of positions, best first.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+# Rank offset of reciprocal rank fusion, EnsembleRetriever's default
+RRF_C = 60
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[np.ndarray], weights: Sequence[float], c: int = RRF_C
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted reciprocal rank fusion: a candidate at rank r (from 1) in a
+    ranking of weight w scores w / (r + c), summed over rankings.
+
+    Returns the candidates best first and their scores. Ties keep the order
+    in which candidates first appear across the rankings.
+    """
+    rankings = [np.asarray(ranking, dtype=np.int64) for ranking in rankings]
+    candidates = np.concatenate(rankings) if rankings else np.empty(0, np.int64)
+    if not len(candidates):
+        return candidates, np.empty(0)
+
+    contributions = np.concatenate(
+        [
+            weight / (np.arange(1, len(ranking) + 1) + c)
+            for ranking, weight in zip(rankings, weights)
+        ]
+    )
+    keys, first, inverse = np.unique(candidates, return_index=True, return_inverse=True)
+    scores = np.bincount(inverse.ravel(), weights=contributions, minlength=len(keys))
+
+    order = np.lexsort((first, -scores))
+    return keys[order], scores[order]
+
+
+def top_k(scores: np.ndarray, k: int, threshold: Optional[float] = None) -> np.ndarray:
+    """
+    Positions of the `k` highest scores, best first, skipping scores below
+    `threshold` when given. Ties keep their original order.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    positions = (
+        np.flatnonzero(scores >= threshold)
+        if threshold
+        else np.arange(len(scores), dtype=np.int64)
+    )
+    if k <= 0 or not len(positions):
+        return positions[:0]
+
+    if k < len(positions):
+        # Only the candidates at or above the k-th best score need sorting
+        values = scores[positions]
+        kth = np.partition(values, len(values) - k)[len(values) - k]
+        positions = positions[values >= kth]
+
+    order = np.argsort(-scores[positions], kind="stable")[:k]
+    return positions[order]
+
+
+def cosine_similarity(query: Sequence[float], documents: Sequence) -> np.ndarray:
+    """Cosine similarity of a query embedding to each document embedding"""
+    query = np.asarray(query, dtype=np.float64)
+    documents = np.asarray(documents, dtype=np.float64).reshape(-1, len(query))
+
+    norms = np.linalg.norm(documents, axis=1) * np.linalg.norm(query)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similarity = documents @ query / norms
+    return np.nan_to_num(similarity, nan=0.0, posinf=0.0, neginf=0.0)
@@ -0,0 +1,192 @@
+"""
+Streaming ingestion of chunks into a vector database.
+
+Chunks are embedded and written in batches as they are produced, instead of
+splitting, embedding and inserting a whole document set at once. A writer
+thread inserts batch N while batch N+1 is embedded, and a bounded queue
+between them makes the embedding side wait when writes fall behind, so only
+a few batches are held in memory at any time.
+
+Embeddings of ingested chunks can be kept in a content addressed store,
+see embed_with_chunk_store, so identical chunks are embedded once.
+"""
+
+import hashlib
+import logging
+import queue
+import threading
+import uuid
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional, Protocol
+
+log = logging.getLogger(__name__)
+
+# Namespace of deterministic chunk ids, see get_chunk_id
+CHUNK_ID_NAMESPACE = uuid.UUID("5c2e7f0e-8d4b-4a53-9a8e-2f6a1d0c9b71")
+
+# Chunks served from the chunk embedding store and sent to the engine
+CHUNK_EMBEDDING_STATS = {"reused": 0, "computed": 0}
+
+
+class ChunkEmbeddingStore(Protocol):
+    def get_vectors_by_hashes(self, hashes: list[str]) -> dict[str, list]: ...
+
+    def insert_vectors(self, vectors: dict[str, list]) -> None: ...
+
+    def add_refs(self, hashes: list[str], file_id: str) -> None: ...
+
+
+def get_chunk_id(
+    collection_name: str, document_hash: str, position: int, chunk_hash: str
+) -> str:
+    """
+    Stable id of the chunk at `position` of a document, so an interrupted
+    ingestion of the same document can skip the chunks already stored.
+    """
+    return str(
+        uuid.uuid5(
+            CHUNK_ID_NAMESPACE,
+            f"{collection_name}:{document_hash}:{position}:{chunk_hash}",
+        )
+    )
+
+
+def get_chunk_embedding_key(
+    engine: str, model: str, prefix: Optional[str], text: str
+) -> str:
+    """
+    Store key of a chunk embedding. Whitespace is normalized, so the same
+    text extracted with different line breaks or indentation matches.
+    """
+    normalized = " ".join(text.split())
+    return hashlib.sha256(
+        f"{engine}\0{model}\0{prefix or ''}\0{normalized}".encode()
+    ).hexdigest()
+
+
+def embed_with_chunk_store(
+    texts: list[str],
+    keys: list[str],
+    embed: Callable[[list[str]], list],
+    store: ChunkEmbeddingStore,
+    file_id: Optional[str] = None,
+    stats: Optional[dict] = None,
+) -> list:
+    """
+    Embed `texts` with the vectors stored under `keys`, calling `embed` only
+    for the texts without one, once per key. New vectors are stored and all
+    of them referenced by `file_id`, which keeps them until the file is
+    deleted. Without a file nothing is stored, as nothing would delete it.
+    Reused and computed counts are added to CHUNK_EMBEDDING_STATS and
+    `stats`.
+    """
+    try:
+        stored = store.get_vectors_by_hashes(keys)
+    except Exception as e:
+        log.warning(f"Error reading the chunk embedding store: {e}")
+        stored = {}
+
+    missing = {}
+    for text, key in zip(texts, keys):
+        if key not in stored and key not in missing:
+            missing[key] = text
+
+    computed = {}
+    if missing:
+        vectors = embed(list(missing.values()))
+        if vectors is None or len(vectors) != len(missing):
+            raise ValueError(
+                f"Got {0 if vectors is None else len(vectors)} embeddings for {len(missing)} chunks"
+            )
+        computed = dict(zip(missing, vectors))
+
+    for counters in (CHUNK_EMBEDDING_STATS, stats):
+        if counters is not None:
+            counters["reused"] = counters.get("reused", 0) + len(keys) - len(computed)
+            counters["computed"] = counters.get("computed", 0) + len(computed)
+
+    if file_id:
+        try:
+            if computed:
+                store.insert_vectors(computed)
+            store.add_refs(keys, file_id)
+        except Exception as e:
+            log.warning(f"Error writing the chunk embedding store: {e}")
+
+    return [stored[key] if key in stored else computed[key] for key in keys]
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def ingest_chunks(
+    items: Iterable[dict],
+    embed: Callable[[list[str]], list],
+    write: Callable[[list[dict]], None],
+    batch_size: int,
+    max_pending_batches: int = 2,
+    skip_ids: Optional[set] = None,
+    progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Embed and write `items` ({"id", "text", "metadata"}) batch by batch.
+
+    `embed` returns the vectors of a batch of texts and `write` stores a
+    batch of vector items, both blocking. Items whose id is in `skip_ids`
+    are already stored and skipped. `progress` is called from the writer
+    thread after each batch is written.
+    """
+    stats = {"chunks": 0, "skipped": 0, "batches": 0}
+    pending = queue.Queue(maxsize=max(max_pending_batches, 1))
+    errors = []
+
+    def writer():
+        while True:
+            batch = pending.get()
+            if batch is None:
+                return
+            if errors:
+                # Keep draining so the embedding side never blocks on a full queue
+                continue
+            try:
+                write(batch)
+                stats["chunks"] += len(batch)
+                stats["batches"] += 1
+                if progress:
+                    progress(dict(stats))
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=writer, name="ingest-writer", daemon=True)
+    thread.start()
+    try:
+        for batch in batched(items, batch_size):
+            if skip_ids:
+                stored = sum(item["id"] in skip_ids for item in batch)
+                stats["skipped"] += stored
+                if stored:
+                    batch = [item for item in batch if item["id"] not in skip_ids]
+                if not batch:
+                    continue
+
+            vectors = embed([item["text"] for item in batch])
+            if errors:
+                break
+            if vectors is None or len(vectors) != len(batch):
+                raise ValueError(
+                    f"Got {0 if vectors is None else len(vectors)} embeddings for {len(batch)} chunks"
+                )
+
+            pending.put(
+                [{**item, "vector": vector} for item, vector in zip(batch, vectors)]
+            )
+    finally:
+        pending.put(None)
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return stats
@@ -12,15 +12,19 @@ import re
 
 from urllib.parse import quote
 from huggingface_hub import snapshot_download
-from langchain_classic.retrievers import (
-    ContextualCompressionRetriever,
-    EnsembleRetriever,
-)
-from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
+import numpy as np
+from rank_bm25 import BM25Okapi
 
 from open_webui.config import VECTOR_DB
-from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
+from open_webui.retrieval.vector.factory import BM25_INDEXES, VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import BM25Index, get_metadata_texts, tokenize
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
+from open_webui.retrieval.fusion import (
+    cosine_similarity,
+    reciprocal_rank_fusion,
+    top_k,
+)
 
 
 from open_webui.models.users import UserModel
@@ -33,6 +37,7 @@ from open_webui.models.access_grants import AccessGrants
 
 from open_webui.retrieval.vector.main import GetResult
 from open_webui.utils.headers import include_user_info_headers
+from open_webui.utils.http_client import get_client_session
 from open_webui.utils.misc import get_message_list
 
 from open_webui.retrieval.web.utils import get_web_loader
@@ -54,12 +59,6 @@ from open_webui.config import (
 log = logging.getLogger(__name__)
 
 
-from typing import Any
-
-from langchain_core.callbacks import CallbackManagerForRetrieverRun
-from langchain_core.retrievers import BaseRetriever
-
-
 def is_youtube_url(url: str) -> bool:
     youtube_regex = r"^(https?://)?(www\.)?(youtube\.com|youtu\.be)/.+$"
     return re.match(youtube_regex, url) is not None
@@ -91,60 +90,11 @@ def get_content_from_url(request, url: str) -> str:
 CHUNK_HASH_KEY = "_chunk_hash"
 
 
-def _content_hash(text: str) -> str:
+def get_content_hash(text: str) -> str:
     """SHA-256 hash of text, used as a stable chunk identifier for RRF dedup."""
     return hashlib.sha256(text.encode()).hexdigest()
 
 
-class VectorSearchRetriever(BaseRetriever):
-    collection_name: Any
-    embedding_function: Any
-    top_k: int
-
-    def _get_relevant_documents(
-        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
-    ) -> list[Document]:
-        """Get documents relevant to a query.
-
-        Args:
-            query: String to find relevant documents for.
-            run_manager: The callback handler to use.
-
-        Returns:
-            List of relevant documents.
-        """
-        return []
-
-    async def _aget_relevant_documents(
-        self,
-        query: str,
-        *,
-        run_manager: CallbackManagerForRetrieverRun,
-    ) -> list[Document]:
-        embedding = await self.embedding_function(query, RAG_EMBEDDING_QUERY_PREFIX)
-        result = VECTOR_DB_CLIENT.search(
-            collection_name=self.collection_name,
-            vectors=[embedding],
-            limit=self.top_k,
-        )
-
-        ids = result.ids[0]
-        metadatas = result.metadatas[0]
-        documents = result.documents[0]
-
-        results = []
-        for idx in range(len(ids)):
-            metadata = metadatas[idx]
-            metadata[CHUNK_HASH_KEY] = _content_hash(documents[idx])
-            results.append(
-                Document(
-                    metadata=metadata,
-                    page_content=documents[idx],
-                )
-            )
-        return results
-
-
 def query_doc(
     collection_name: str, query_embedding: list[float], k: int, user: UserModel = None
 ):
@@ -180,41 +130,54 @@ def get_doc(collection_name: str, user: UserModel = None):
 
 
 def get_enriched_texts(collection_result: GetResult) -> list[str]:
-    enriched_texts = []
-    for idx, text in enumerate(collection_result.documents[0]):
-        metadata = collection_result.metadatas[0][idx]
-        metadata_parts = [text]
-
-        # Add filename (repeat twice for extra weight in BM25 scoring)
-        if metadata.get("name"):
-            filename = metadata["name"]
-            filename_tokens = (
-                filename.replace("_", " ").replace("-", " ").replace(".", " ")
-            )
-            metadata_parts.append(
-                f"Filename: {filename} {filename_tokens} {filename_tokens}"
-            )
+    return [
+        " ".join([text, *get_metadata_texts(collection_result.metadatas[0][idx])])
+        for idx, text in enumerate(collection_result.documents[0])
+    ]
 
-        # Add title if available
-        if metadata.get("title"):
-            metadata_parts.append(f"Title: {metadata['title']}")
 
-        # Add document section headings if available (from markdown splitter)
-        if metadata.get("headings") and isinstance(metadata["headings"], list):
-            headings = " > ".join(str(h) for h in metadata["headings"])
-            metadata_parts.append(f"Section: {headings}")
+def get_bm25_index(collection_name: str) -> Optional[BM25Index]:
+    """Persistent BM25 index of a collection, built from its contents on first use."""
+    if BM25_INDEXES is None:
+        return None
+
+    index = BM25_INDEXES.get(collection_name)
+    if index is None:
+        version = BM25_INDEXES.version(collection_name)
+        index = BM25_INDEXES.build(
+            collection_name,
+            VECTOR_DB_CLIENT.get(collection_name=collection_name),
+            version,
+        )
+    return index
 
-        # Add source URL/path if available
-        if metadata.get("source"):
-            metadata_parts.append(f"Source: {metadata['source']}")
 
-        # Add snippet for web search results
-        if metadata.get("snippet"):
-            metadata_parts.append(f"Snippet: {metadata['snippet']}")
+def get_chunk_hash(text: str, metadata: Optional[dict]) -> str:
+    """Chunk hash stored at ingest, computed for chunks stored before that."""
+    return (metadata or {}).get(CHUNK_HASH_KEY) or get_content_hash(text)
 
-        enriched_texts.append(" ".join(metadata_parts))
 
-    return enriched_texts
+def search_bm25(
+    collection_result: GetResult, query: str, k: int, enriched: bool = False
+) -> list[dict]:
+    """BM25 search over the chunks of a collection without a BM25 index."""
+    texts = collection_result.documents[0]
+    vectorizer = BM25Okapi(
+        [
+            tokenize(text)
+            for text in (get_enriched_texts(collection_result) if enriched else texts)
+        ]
+    )
+    scores = vectorizer.get_scores(tokenize(query))
+    matching = np.flatnonzero(scores > 0)
+    return [
+        {
+            "text": texts[idx],
+            "metadata": collection_result.metadatas[0][idx],
+            "score": float(scores[idx]),
+        }
+        for idx in matching[top_k(scores[matching], k)]
+    ]
 
 
 async def query_doc_with_hybrid_search(
@@ -228,10 +191,15 @@ async def query_doc_with_hybrid_search(
     r: float,
     hybrid_bm25_weight: float,
     enable_enriched_texts: bool = False,
+    bm25_index: Optional[BM25Index] = None,
 ) -> dict:
     try:
+        if bm25_index is not None:
+            if not bm25_index.size():
+                log.warning(f"query_doc_with_hybrid_search:no_docs {collection_name}")
+                return {"documents": [], "metadatas": [], "distances": []}
         # First check if collection_result has the required attributes
-        if (
+        elif (
             not collection_result
             or not hasattr(collection_result, "documents")
             or not hasattr(collection_result, "metadatas")
@@ -240,7 +208,7 @@ async def query_doc_with_hybrid_search(
             return {"documents": [], "metadatas": [], "distances": []}
 
         # Now safely check the documents content after confirming attributes exist
-        if (
+        elif (
             not collection_result.documents
             or len(collection_result.documents) == 0
             or not collection_result.documents[0]
@@ -250,83 +218,105 @@ async def query_doc_with_hybrid_search(
 
         log.debug(f"query_doc_with_hybrid_search:doc {collection_name}")
 
-        original_texts = collection_result.documents[0]
-        bm25_metadatas = [
-            {**meta, CHUNK_HASH_KEY: _content_hash(original_texts[idx])}
-            for idx, meta in enumerate(collection_result.metadatas[0])
-        ]
-
-        bm25_texts = (
-            get_enriched_texts(collection_result)
-            if enable_enriched_texts
-            else original_texts
-        )
-
-        bm25_retriever = BM25Retriever.from_texts(
-            texts=bm25_texts,
-            metadatas=bm25_metadatas,
-        )
-        bm25_retriever.k = k
-
-        vector_search_retriever = VectorSearchRetriever(
-            collection_name=collection_name,
-            embedding_function=embedding_function,
-            top_k=k,
-        )
-
-        # Use CHUNK_HASH_KEY for dedup so enriched BM25 texts don't defeat RRF
-        if hybrid_bm25_weight <= 0:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[vector_search_retriever],
-                weights=[1.0],
-                id_key=CHUNK_HASH_KEY,
+        # Candidates of both searches, deduplicated by chunk hash so enriched
+        # BM25 texts don't defeat RRF. Rankings are positions in this list.
+        texts, metadatas, positions = [], [], {}
+
+        def rank(documents: list[str], documents_metadatas: list[dict]) -> np.ndarray:
+            ranking = []
+            for text, metadata in zip(documents, documents_metadatas):
+                chunk_hash = get_chunk_hash(text, metadata)
+                if chunk_hash not in positions:
+                    positions[chunk_hash] = len(texts)
+                    texts.append(text)
+                    metadatas.append({**(metadata or {}), CHUNK_HASH_KEY: chunk_hash})
+                ranking.append(positions[chunk_hash])
+            return np.array(ranking, dtype=np.int64)
+
+        rankings, weights = [], []
+        if hybrid_bm25_weight > 0:
+            if bm25_index is not None:
+                bm25_results = await asyncio.to_thread(
+                    bm25_index.search, query, k, enable_enriched_texts
+                )
+            else:
+                bm25_results = await asyncio.to_thread(
+                    search_bm25, collection_result, query, k, enable_enriched_texts
+                )
+            rankings.append(
+                rank(
+                    [result["text"] for result in bm25_results],
+                    [result["metadata"] for result in bm25_results],
+                )
             )
-        elif hybrid_bm25_weight >= 1:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[bm25_retriever],
-                weights=[1.0],
-                id_key=CHUNK_HASH_KEY,
+            weights.append(min(hybrid_bm25_weight, 1.0))
+
+        query_embedding = None
+        if hybrid_bm25_weight < 1:
+            query_embedding = await embedding_function(
+                query, RAG_EMBEDDING_QUERY_PREFIX
             )
-        else:
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[bm25_retriever, vector_search_retriever],
-                weights=[hybrid_bm25_weight, 1.0 - hybrid_bm25_weight],
-                id_key=CHUNK_HASH_KEY,
+            vector_result = VECTOR_DB_CLIENT.search(
+                collection_name=collection_name,
+                vectors=[query_embedding],
+                limit=k,
             )
+            if vector_result:
+                rankings.append(
+                    rank(vector_result.documents[0], vector_result.metadatas[0])
+                )
+                weights.append(1.0 - max(hybrid_bm25_weight, 0.0))
 
-        compressor = RerankCompressor(
-            embedding_function=embedding_function,
-            top_n=k_reranker,
-            reranking_function=reranking_function,
-            r_score=r,
-        )
-
-        compression_retriever = ContextualCompressionRetriever(
-            base_compressor=compressor, base_retriever=ensemble_retriever
-        )
-
-        result = await compression_retriever.ainvoke(query)
-
-        distances = [d.metadata.get("score") for d in result]
-        documents = [d.page_content for d in result]
-        metadatas = [d.metadata for d in result]
+        candidates, fused_scores = reciprocal_rank_fusion(rankings, weights)
+        texts = [texts[idx] for idx in candidates]
+        metadatas = [metadatas[idx] for idx in candidates]
 
-        # retrieve only min(k, k_reranker) items, sort and cut by distance if k < k_reranker
-        if k < k_reranker:
-            sorted_items = sorted(
-                zip(distances, documents, metadatas), key=lambda x: x[0], reverse=True
+        scores = None
+        if texts and reranking_function is not None:
+            scores = await asyncio.to_thread(
+                reranking_function,
+                query,
+                [
+                    Document(page_content=text, metadata=metadata)
+                    for text, metadata in zip(texts, metadatas)
+                ],
             )
-            sorted_items = sorted_items[:k]
+        elif texts:
+            if query_embedding is None:
+                query_embedding = await embedding_function(
+                    query, RAG_EMBEDDING_QUERY_PREFIX
+                )
+            document_embeddings = await embedding_function(
+                texts, RAG_EMBEDDING_CONTENT_PREFIX
+            )
+            scores = cosine_similarity(query_embedding, document_embeddings)
 
-            if sorted_items:
-                distances, documents, metadatas = map(list, zip(*sorted_items))
-            else:
-                distances, documents, metadatas = [], [], []
+        if scores is not None:
+            scores = np.asarray(
+                scores.tolist() if not isinstance(scores, list) else scores,
+                dtype=np.float64,
+            ).reshape(-1)
+            # retrieve only min(k, k_reranker) items at or above the relevance threshold
+            selected = top_k(scores, min(k, k_reranker), threshold=r)
+        else:
+            if texts:
+                log.warning(
+                    "No valid scores found, check your reranking function. Returning fused documents."
+                )
+            scores = fused_scores
+            selected = np.arange(min(len(texts), k, k_reranker))
+
+        distances, documents, result_metadatas = [], [], []
+        for idx in selected:
+            metadatas[idx]["score"] = float(scores[idx])
+            distances.append(float(scores[idx]))
+            documents.append(texts[idx])
+            result_metadatas.append(metadatas[idx])
 
         result = {
             "distances": [distances],
             "documents": [documents],
-            "metadatas": [metadatas],
+            "metadatas": [result_metadatas],
         }
 
         log.info(
@@ -361,9 +351,8 @@ def merge_get_results(get_results: list[dict]) -> dict:
 
 
 def merge_and_sort_query_results(query_results: list[dict], k: int) -> dict:
-    # Initialize lists to store combined data
-    combined = dict()  # To store documents with unique document hashes
-
+    # Flatten the results, keeping only string documents
+    distances, documents, metadatas = [], [], []
     for data in query_results:
         if (
             len(data.get("distances", [])) == 0
@@ -372,38 +361,38 @@ def merge_and_sort_query_results(query_results: list[dict], k: int) -> dict:
         ):
             continue
 
-        distances = data["distances"][0]
-        documents = data["documents"][0]
-        metadatas = data["metadatas"][0]
-
-        for distance, document, metadata in zip(distances, documents, metadatas):
+        for distance, document, metadata in zip(
+            data["distances"][0], data["documents"][0], data["metadatas"][0]
+        ):
             if isinstance(document, str):
-                doc_hash = hashlib.sha256(
-                    document.encode()
-                ).hexdigest()  # Compute a hash for uniqueness
-
-                if doc_hash not in combined.keys():
-                    combined[doc_hash] = (distance, document, metadata)
-                    continue  # if doc is new, no further comparison is needed
-
-                # if doc is alredy in, but new distance is better, update
-                if distance > combined[doc_hash][0]:
-                    combined[doc_hash] = (distance, document, metadata)
-
-    combined = list(combined.values())
-    # Sort the list based on distances
-    combined.sort(key=lambda x: x[0], reverse=True)
-
-    # Slice to keep only the top k elements
-    sorted_distances, sorted_documents, sorted_metadatas = (
-        zip(*combined[:k]) if combined else ([], [], [])
+                distances.append(distance)
+                documents.append(document)
+                metadatas.append(metadata)
+
+    if not documents:
+        return {"distances": [[]], "documents": [[]], "metadatas": [[]]}
+
+    # Keep the best distance of each unique document, the first one on ties
+    hashes = {}
+    keys = np.array(
+        [
+            hashes.setdefault(get_chunk_hash(document, metadata), len(hashes))
+            for document, metadata in zip(documents, metadatas)
+        ],
+        dtype=np.int64,
     )
+    scores = np.asarray(distances, dtype=np.float64)
+    best_first = np.lexsort((np.arange(len(keys)), -scores))
+    _, unique = np.unique(keys[best_first], return_index=True)
+    unique = np.sort(best_first[unique])
+
+    # Top k by distance, ties in input order
+    selected = unique[top_k(scores[unique], k)]
 
-    # Create and return the output dictionary
     return {
-        "distances": [list(sorted_distances)],
-        "documents": [list(sorted_documents)],
-        "metadatas": [list(sorted_metadatas)],
+        "distances": [[distances[idx] for idx in selected]],
+        "documents": [[documents[idx] for idx in selected]],
+        "metadatas": [[metadatas[idx] for idx in selected]],
     }
 
 
@@ -493,9 +482,18 @@ async def query_collection_with_hybrid_search(
     error = False
     # Fetch collection data once per collection sequentially
     # Avoid fetching the same data multiple times later
+    # Collections with a BM25 index are not fetched at all
     collection_results = {}
+    bm25_indexes = {}
     for collection_name in collection_names:
         try:
+            bm25_indexes[collection_name] = await asyncio.to_thread(
+                get_bm25_index, collection_name
+            )
+            if bm25_indexes[collection_name] is not None:
+                collection_results[collection_name] = None
+                continue
+
             log.debug(
                 f"query_collection_with_hybrid_search:VECTOR_DB_CLIENT.get:collection {collection_name}"
             )
@@ -523,6 +521,7 @@ async def query_collection_with_hybrid_search(
                 r=r,
                 hybrid_bm25_weight=hybrid_bm25_weight,
                 enable_enriched_texts=enable_enriched_texts,
+                bm25_index=bm25_indexes.get(collection_name),
             )
             return result, None
         except Exception as e:
@@ -535,6 +534,7 @@ async def query_collection_with_hybrid_search(
         (collection_name, query)
         for collection_name in collection_names
         if collection_results[collection_name] is not None
+        or bm25_indexes.get(collection_name) is not None
         for query in queries
     ]
 
@@ -619,21 +619,19 @@ async def agenerate_openai_batch_embeddings(
         if ENABLE_FORWARD_USER_INFO_HEADERS and user:
             headers = include_user_info_headers(headers, user)
 
-        async with aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        ) as session:
-            async with session.post(
-                f"{url}/embeddings",
-                headers=headers,
-                json=form_data,
-                ssl=AIOHTTP_CLIENT_SESSION_SSL,
-            ) as r:
-                r.raise_for_status()
-                data = await r.json()
-                if "data" in data:
-                    return [item["embedding"] for item in data["data"]]
-                else:
-                    raise Exception("Something went wrong :/")
+        async with get_client_session(url).post(
+            f"{url}/embeddings",
+            headers=headers,
+            json=form_data,
+            ssl=AIOHTTP_CLIENT_SESSION_SSL,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
+        ) as r:
+            r.raise_for_status()
+            data = await r.json()
+            if "data" in data:
+                return [item["embedding"] for item in data["data"]]
+            else:
+                raise Exception("Something went wrong :/")
     except Exception as e:
         log.exception(f"Error generating openai batch embeddings: {e}")
         return None
@@ -713,21 +711,19 @@ async def agenerate_azure_openai_batch_embeddings(
         if ENABLE_FORWARD_USER_INFO_HEADERS and user:
             headers = include_user_info_headers(headers, user)
 
-        async with aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        ) as session:
-            async with session.post(
-                full_url,
-                headers=headers,
-                json=form_data,
-                ssl=AIOHTTP_CLIENT_SESSION_SSL,
-            ) as r:
-                r.raise_for_status()
-                data = await r.json()
-                if "data" in data:
-                    return [item["embedding"] for item in data["data"]]
-                else:
-                    raise Exception("Something went wrong :/")
+        async with get_client_session(full_url).post(
+            full_url,
+            headers=headers,
+            json=form_data,
+            ssl=AIOHTTP_CLIENT_SESSION_SSL,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
+        ) as r:
+            r.raise_for_status()
+            data = await r.json()
+            if "data" in data:
+                return [item["embedding"] for item in data["data"]]
+            else:
+                raise Exception("Something went wrong :/")
     except Exception as e:
         log.exception(f"Error generating azure openai batch embeddings: {e}")
         return None
@@ -796,21 +792,19 @@ async def agenerate_ollama_batch_embeddings(
         if ENABLE_FORWARD_USER_INFO_HEADERS and user:
             headers = include_user_info_headers(headers, user)
 
-        async with aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        ) as session:
-            async with session.post(
-                f"{url}/api/embed",
-                headers=headers,
-                json=form_data,
-                ssl=AIOHTTP_CLIENT_SESSION_SSL,
-            ) as r:
-                r.raise_for_status()
-                data = await r.json()
-                if "embeddings" in data:
-                    return data["embeddings"]
-                else:
-                    raise Exception("Something went wrong :/")
+        async with get_client_session(url).post(
+            f"{url}/api/embed",
+            headers=headers,
+            json=form_data,
+            ssl=AIOHTTP_CLIENT_SESSION_SSL,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
+        ) as r:
+            r.raise_for_status()
+            data = await r.json()
+            if "embeddings" in data:
+                return data["embeddings"]
+            else:
+                raise Exception("Something went wrong :/")
     except Exception as e:
         log.exception(f"Error generating ollama batch embeddings: {e}")
         return None
@@ -842,7 +836,9 @@ def get_embedding_function(
                 prefix,
             )
 
-        return async_embedding_function
+        return EMBEDDING_CACHE.wrap(
+            async_embedding_function, embedding_engine, embedding_model
+        )
     elif embedding_engine in ["ollama", "openai", "azure_openai"]:
         embedding_function = lambda query, prefix=None, user=None: generate_embeddings(
             engine=embedding_engine,
@@ -910,7 +906,9 @@ def get_embedding_function(
             else:
                 return await embedding_function(query, prefix, user)
 
-        return async_embedding_function
+        return EMBEDDING_CACHE.wrap(
+            async_embedding_function, embedding_engine, embedding_model
+        )
     else:
         raise ValueError(f"Unknown embedding engine: {embedding_engine}")
 
@@ -1307,91 +1305,3 @@ def get_model_path(model: str, update_model: bool = False):
     except Exception as e:
         log.exception(f"Cannot determine model snapshot path: {e}")
         return model
-
-
-import operator
-from typing import Optional, Sequence
-
-from langchain_core.callbacks import Callbacks
-from langchain_core.documents import BaseDocumentCompressor, Document
-
-
-class RerankCompressor(BaseDocumentCompressor):
-    embedding_function: Any
-    top_n: int
-    reranking_function: Any
-    r_score: float
-
-    class Config:
-        extra = "forbid"
-        arbitrary_types_allowed = True
-
-    def compress_documents(
-        self,
-        documents: Sequence[Document],
-        query: str,
-        callbacks: Optional[Callbacks] = None,
-    ) -> Sequence[Document]:
-        """Compress retrieved documents given the query context.
-
-        Args:
-            documents: The retrieved documents.
-            query: The query context.
-            callbacks: Optional callbacks to run during compression.
-
-        Returns:
-            The compressed documents.
-
-        """
-        return []
-
-    async def acompress_documents(
-        self,
-        documents: Sequence[Document],
-        query: str,
-        callbacks: Optional[Callbacks] = None,
-    ) -> Sequence[Document]:
-        reranking = self.reranking_function is not None
-
-        scores = None
-        if reranking:
-            scores = await asyncio.to_thread(self.reranking_function, query, documents)
-        else:
-            from sentence_transformers import util
-
-            query_embedding = await self.embedding_function(
-                query, RAG_EMBEDDING_QUERY_PREFIX
-            )
-            document_embedding = await self.embedding_function(
-                [doc.page_content for doc in documents], RAG_EMBEDDING_CONTENT_PREFIX
-            )
-            scores = util.cos_sim(query_embedding, document_embedding)[0]
-
-        if scores is not None:
-            docs_with_scores = list(
-                zip(
-                    documents,
-                    scores.tolist() if not isinstance(scores, list) else scores,
-                )
-            )
-            if self.r_score:
-                docs_with_scores = [
-                    (d, s) for d, s in docs_with_scores if s >= self.r_score
-                ]
-
-            result = sorted(docs_with_scores, key=operator.itemgetter(1), reverse=True)
-            final_results = []
-            for doc, doc_score in result[: self.top_n]:
-                metadata = doc.metadata
-                metadata["score"] = doc_score
-                doc = Document(
-                    page_content=doc.page_content,
-                    metadata=metadata,
-                )
-                final_results.append(doc)
-            return final_results
-        else:
-            log.warning(
-                "No valid scores found, check your reranking function. Returning original documents."
-            )
-            return documents
@@ -5,11 +5,13 @@ import os
 import uuid
 import html
 import base64
+import tempfile
+from collections import deque
 from functools import lru_cache
 from pydub import AudioSegment
 from pydub.silence import split_on_silence
 from concurrent.futures import ThreadPoolExecutor
-from typing import Optional
+from typing import Iterator, Optional
 
 from fnmatch import fnmatch
 import aiohttp
@@ -29,13 +31,14 @@ from fastapi import (
     APIRouter,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 
 
 from open_webui.utils.misc import strict_match_mime_type
 from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.utils.access_control import has_permission
+from open_webui.utils.audio import get_max_segment_seconds, stream_audio_segments
 from open_webui.utils.headers import include_user_info_headers
 from open_webui.config import (
     WHISPER_MODEL_AUTO_UPDATE,
@@ -46,6 +49,8 @@ from open_webui.config import (
     WHISPER_LANGUAGE,
     WHISPER_MULTILINGUAL,
     ELEVENLABS_API_BASE_URL,
+    AUDIO_STT_MAX_WORKERS,
+    AUDIO_STT_SEGMENT_SECONDS,
 )
 
 from open_webui.constants import ERROR_MESSAGES
@@ -1049,123 +1054,136 @@ def transcription_handler(request, file_path, metadata, user=None):
             )
 
 
-def transcribe(
-    request: Request, file_path: str, metadata: Optional[dict] = None, user=None
-):
-    log.info(f"transcribe: {file_path} {metadata}")
-
-    if is_audio_conversion_required(file_path):
-        file_path = convert_audio_to_mp3(file_path)
-
-    try:
-        file_path = compress_audio(file_path)
-    except Exception as e:
-        log.exception(e)
-
-    # Always produce a list of chunk paths (could be one entry if small)
-    try:
-        chunk_paths = split_audio(file_path, MAX_FILE_SIZE)
-        print(f"Chunk paths: {chunk_paths}")
-    except Exception as e:
-        log.exception(e)
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=ERROR_MESSAGES.DEFAULT(e),
-        )
-
-    results = []
+def get_audio_duration(file_path: str) -> Optional[float]:
     try:
-        with ThreadPoolExecutor() as executor:
-            # Submit tasks for each chunk_path
-            futures = [
-                executor.submit(
-                    transcription_handler, request, chunk_path, metadata, user
-                )
-                for chunk_path in chunk_paths
-            ]
-            # Gather results as they complete
-            for future in futures:
-                try:
-                    results.append(future.result())
-                except Exception as transcribe_exc:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=f"Error transcribing chunk: {transcribe_exc}",
-                    )
-    finally:
-        # Clean up only the temporary chunks, never the original file
-        for chunk_path in chunk_paths:
-            if chunk_path != file_path and os.path.isfile(chunk_path):
-                try:
-                    os.remove(chunk_path)
-                except Exception:
-                    pass
-
-    return {
-        "text": " ".join([result["text"] for result in results]),
-    }
-
-
-def compress_audio(file_path):
-    if os.path.getsize(file_path) > MAX_FILE_SIZE:
-        id = os.path.splitext(os.path.basename(file_path))[
-            0
-        ]  # Handles names with multiple dots
-        file_dir = os.path.dirname(file_path)
-
-        audio = AudioSegment.from_file(file_path)
-        audio = audio.set_frame_rate(16000).set_channels(1)  # Compress audio
+        return float(mediainfo(file_path).get("duration"))
+    except Exception:
+        return None
 
-        compressed_path = os.path.join(file_dir, f"{id}_compressed.mp3")
-        audio.export(compressed_path, format="mp3", bitrate="32k")
-        # log.debug(f"Compressed audio to {compressed_path}")  # Uncomment if log is defined
 
-        return compressed_path
-    else:
-        return file_path
+def get_stt_max_file_size(request: Request) -> Optional[int]:
+    """Largest file the STT engine accepts, None if it has no limit"""
+    engine = request.app.state.config.STT_ENGINE
+    if engine == "":
+        return None
+    if engine == "azure":
+        return AZURE_MAX_FILE_SIZE
+    return MAX_FILE_SIZE
 
 
-def split_audio(file_path, max_bytes, format="mp3", bitrate="32k"):
+def transcribe_segments(
+    request: Request, file_path: str, metadata: Optional[dict] = None, user=None
+) -> Iterator[dict]:
     """
-    Splits audio into chunks not exceeding max_bytes.
-    Returns a list of chunk file paths. If audio fits, returns list with original path.
+    Transcribe an audio file, yielding the transcript of each segment in
+    order as soon as it and the ones before are done.
+
+    Files within the size limit of the STT engine are sent whole, local
+    whisper takes any file. Larger files are decoded once and cut into
+    segments of at most AUDIO_STT_SEGMENT_SECONDS, transcribed by
+    AUDIO_STT_MAX_WORKERS workers while the rest is being decoded.
     """
-    file_size = os.path.getsize(file_path)
-    if file_size <= max_bytes:
-        return [file_path]  # Nothing to split
+    log.info(f"transcribe: {file_path} {metadata}")
 
-    audio = AudioSegment.from_file(file_path)
-    duration_ms = len(audio)
-    orig_size = file_size
+    max_size = get_stt_max_file_size(request)
+    if max_size is None or os.path.getsize(file_path) <= max_size:
+        if is_audio_conversion_required(file_path):
+            file_path = convert_audio_to_mp3(file_path) or file_path
+
+        if max_size is None or os.path.getsize(file_path) <= max_size:
+            result = transcription_handler(request, file_path, metadata, user)
+            yield {
+                "index": 0,
+                "start": 0.0,
+                "end": get_audio_duration(file_path),
+                "text": result["text"],
+            }
+            return
 
-    approx_chunk_ms = max(int(duration_ms * (max_bytes / orig_size)) - 1000, 1000)
-    chunks = []
-    start = 0
-    i = 0
+    max_seconds = min(AUDIO_STT_SEGMENT_SECONDS, get_max_segment_seconds(max_size))
+    # Segments decoded ahead of the transcriptions, bounding the disk used
+    max_pending = 2 * AUDIO_STT_MAX_WORKERS
 
-    base, _ = os.path.splitext(file_path)
+    def get_result(segment, future) -> dict:
+        try:
+            text = future.result()["text"]
+        except Exception as transcribe_exc:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error transcribing chunk: {transcribe_exc}",
+            )
+        return {
+            "index": segment.index,
+            "start": segment.start,
+            "end": segment.end,
+            "text": text,
+        }
 
-    while start < duration_ms:
-        end = min(start + approx_chunk_ms, duration_ms)
-        chunk = audio[start:end]
-        chunk_path = f"{base}_chunk_{i}.{format}"
-        chunk.export(chunk_path, format=format, bitrate=bitrate)
+    # Segments and their transcripts are removed with the directory
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(file_path)) as segment_dir:
+        executor = ThreadPoolExecutor(max_workers=AUDIO_STT_MAX_WORKERS)
+        pending = deque()
+        try:
+            for segment in stream_audio_segments(file_path, segment_dir, max_seconds):
+                pending.append(
+                    (
+                        segment,
+                        executor.submit(
+                            transcription_handler, request, segment.path, metadata, user
+                        ),
+                    )
+                )
+                while pending and (len(pending) >= max_pending or pending[0][1].done()):
+                    yield get_result(*pending.popleft())
+
+            while pending:
+                yield get_result(*pending.popleft())
+        except HTTPException:
+            raise
+        except Exception as e:
+            log.exception(e)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERROR_MESSAGES.DEFAULT(e),
+            )
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
-        # Reduce chunk duration if still too large
-        while os.path.getsize(chunk_path) > max_bytes and (end - start) > 5000:
-            end = start + ((end - start) // 2)
-            chunk = audio[start:end]
-            chunk.export(chunk_path, format=format, bitrate=bitrate)
 
-        if os.path.getsize(chunk_path) > max_bytes:
-            os.remove(chunk_path)
-            raise Exception("Audio chunk cannot be reduced below max file size.")
+def transcribe(
+    request: Request, file_path: str, metadata: Optional[dict] = None, user=None
+):
+    results = list(transcribe_segments(request, file_path, metadata, user))
+    return {
+        "text": " ".join([result["text"] for result in results]),
+    }
 
-        chunks.append(chunk_path)
-        start = end
-        i += 1
 
-    return chunks
+def stream_transcripts(
+    request: Request, file_path: str, metadata: Optional[dict] = None, user=None
+) -> Iterator[str]:
+    """
+    NDJSON lines of the segment transcripts, then the full transcript. The
+    response has started by the time a segment fails, so failures end the
+    stream with an error line instead.
+    """
+    texts = []
+    try:
+        for segment in transcribe_segments(request, file_path, metadata, user):
+            texts.append(segment["text"])
+            yield json.dumps(segment) + "\n"
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else ERROR_MESSAGES.DEFAULT(e)
+        yield json.dumps({"error": detail, "done": True}) + "\n"
+        return
+
+    yield json.dumps(
+        {
+            "text": " ".join(texts),
+            "filename": os.path.basename(file_path),
+            "done": True,
+        }
+    ) + "\n"
 
 
 @router.post("/transcriptions")
@@ -1173,6 +1191,7 @@ def transcription(
     request: Request,
     file: UploadFile = File(...),
     language: Optional[str] = Form(None),
+    stream: bool = Form(False),
     user=Depends(get_verified_user),
 ):
     if user.role != "admin" and not has_permission(
@@ -1213,6 +1232,12 @@ def transcription(
             if language:
                 metadata = {"language": language}
 
+            if stream:
+                return StreamingResponse(
+                    stream_transcripts(request, file_path, metadata, user),
+                    media_type="application/x-ndjson",
+                )
+
             result = transcribe(request, file_path, metadata, user)
 
             return {
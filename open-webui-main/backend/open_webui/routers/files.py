@@ -36,6 +36,7 @@ from open_webui.models.files import (
     Files,
 )
 from open_webui.models.chats import Chats
+from open_webui.models.chunk_embeddings import ChunkEmbeddings
 from open_webui.models.knowledge import Knowledges
 from open_webui.models.groups import Groups
 from open_webui.models.access_grants import AccessGrants
@@ -467,6 +468,7 @@ async def delete_all_files(
         try:
             Storage.delete_all_files()
             VECTOR_DB_CLIENT.reset()
+            ChunkEmbeddings.delete_all(db=db)
         except Exception as e:
             log.exception(e)
             log.error("Error deleting files")
@@ -549,6 +551,8 @@ async def get_file_process_status(
                             event = {"status": status}
                             if status == "failed":
                                 event["error"] = data.get("error")
+                            elif data.get("progress"):
+                                event["progress"] = data["progress"]
 
                             yield f"data: {json.dumps(event)}\n\n"
                             if status in ("completed", "failed"):
@@ -891,6 +895,7 @@ async def delete_file_by_id(
             try:
                 Storage.delete_file(file.path)
                 VECTOR_DB_CLIENT.delete(collection_name=f"file-{id}")
+                ChunkEmbeddings.delete_refs_by_file_id(id, db=db)
             except Exception as e:
                 log.exception(e)
                 log.error("Error deleting files")
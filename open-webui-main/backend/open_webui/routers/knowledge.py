@@ -18,6 +18,7 @@ from open_webui.models.knowledge import (
     KnowledgeUserResponse,
 )
 from open_webui.models.files import Files, FileModel, FileMetadataResponse
+from open_webui.models.chunk_embeddings import ChunkEmbeddings
 from open_webui.retrieval.vector.factory import VECTOR_DB_CLIENT
 from open_webui.routers.retrieval import (
     process_file,
@@ -869,6 +870,7 @@ def remove_file_from_knowledge_by_id(
 
         # Delete file from database
         Files.delete_file_by_id(form_data.file_id, db=db)
+        ChunkEmbeddings.delete_refs_by_file_id(form_data.file_id, db=db)
 
     if knowledge:
         return KnowledgeFilesResponse(
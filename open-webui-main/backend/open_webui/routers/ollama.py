@@ -1,12 +1,7 @@
-# TODO: Implement a more intelligent load balancing mechanism for distributing requests among multiple backend instances.
-# Current implementation uses a simple round-robin approach (random.choice). Consider incorporating algorithms like weighted round-robin,
-# least connections, or least response time for better resource utilization and performance optimization.
-
 import asyncio
 import json
 import logging
 import os
-import random
 import re
 import time
 from datetime import datetime
@@ -47,6 +42,8 @@ from open_webui.internal.db import get_session
 from open_webui.models.models import Models
 from open_webui.models.access_grants import AccessGrants
 from open_webui.models.groups import Groups
+from open_webui.utils.http_client import get_client_session
+from open_webui.utils.load_balancer import OLLAMA_LOAD_BALANCER
 from open_webui.utils.misc import (
     calculate_sha256,
     cleanup_response,
@@ -84,21 +81,21 @@ log = logging.getLogger(__name__)
 async def send_get_request(url, key=None, user: UserModel = None):
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            headers = {
-                "Content-Type": "application/json",
-                **({"Authorization": f"Bearer {key}"} if key else {}),
-            }
+        headers = {
+            "Content-Type": "application/json",
+            **({"Authorization": f"Bearer {key}"} if key else {}),
+        }
 
-            if ENABLE_FORWARD_USER_INFO_HEADERS and user:
-                headers = include_user_info_headers(headers, user)
+        if ENABLE_FORWARD_USER_INFO_HEADERS and user:
+            headers = include_user_info_headers(headers, user)
 
-            async with session.get(
-                url,
-                headers=headers,
-                ssl=AIOHTTP_CLIENT_SESSION_SSL,
-            ) as response:
-                return await response.json()
+        async with get_client_session(url).get(
+            url,
+            headers=headers,
+            ssl=AIOHTTP_CLIENT_SESSION_SSL,
+            timeout=timeout,
+        ) as response:
+            return await response.json()
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
@@ -113,15 +110,18 @@ async def send_post_request(
     content_type: Optional[str] = None,
     user: UserModel = None,
     metadata: Optional[dict] = None,
+    node: Optional[str] = None,
 ):
+    """
+    POST `payload` to `url`. With the base URL the model was routed to as
+    `node`, the request is tracked by the load balancer until the response
+    or its stream is finished.
+    """
 
     r = None
     streaming = False
+    node_request = OLLAMA_LOAD_BALANCER.start(node) if node else None
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
-
         headers = {
             "Content-Type": "application/json",
             **({"Authorization": f"Bearer {key}"} if key else {}),
@@ -132,17 +132,20 @@ async def send_post_request(
             if metadata and metadata.get("chat_id"):
                 headers[FORWARD_SESSION_INFO_HEADER_CHAT_ID] = metadata.get("chat_id")
 
-        r = await session.post(
+        r = await get_client_session(url).post(
             url,
             data=payload,
             headers=headers,
             ssl=AIOHTTP_CLIENT_SESSION_SSL,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
         )
+        if node_request:
+            node_request.responded(r.status)
 
         if r.ok is False:
             try:
                 res = await r.json()
-                await cleanup_response(r, session)
+                await cleanup_response(r, None)
                 if "error" in res:
                     raise HTTPException(status_code=r.status, detail=res["error"])
             except HTTPException as e:
@@ -161,9 +164,13 @@ async def send_post_request(
             if content_type:
                 response_headers["Content-Type"] = content_type
 
+            body = stream_wrapper(r, None)
+            if node_request:
+                body = node_request.track_stream(body)
+
             streaming = True
             return StreamingResponse(
-                stream_wrapper(r, session),
+                body,
                 status_code=r.status,
                 headers=response_headers,
             )
@@ -182,7 +189,10 @@ async def send_post_request(
         )
     finally:
         if not streaming:
-            await cleanup_response(r, session)
+            await cleanup_response(r, None)
+            if node_request:
+                # Without a response the node couldn't be reached
+                node_request.finish(failed=r is None)
 
 
 def get_api_key(idx, url, configs):
@@ -258,6 +268,11 @@ async def verify_connection(
             raise HTTPException(status_code=500, detail=error_detail)
 
 
+@router.get("/load_balancer")
+async def get_load_balancer_stats(user=Depends(get_admin_user)):
+    return OLLAMA_LOAD_BALANCER.get_stats()
+
+
 @router.get("/config")
 async def get_config(request: Request, user=Depends(get_admin_user)):
     return {
@@ -961,7 +976,7 @@ async def show_model_info(
             detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
         )
 
-    url_idx = random.choice(models[model]["urls"])
+    url_idx = choose_url_idx(request, models[model]["urls"])
 
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     key = get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS)
@@ -1034,7 +1049,7 @@ async def embed(
             models = request.app.state.OLLAMA_MODELS
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = choose_url_idx(request, models[model]["urls"])
         else:
             raise HTTPException(
                 status_code=400,
@@ -1119,7 +1134,7 @@ async def embeddings(
             models = request.app.state.OLLAMA_MODELS
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = choose_url_idx(request, models[model]["urls"])
         else:
             raise HTTPException(
                 status_code=400,
@@ -1206,7 +1221,7 @@ async def generate_completion(
 
         model = form_data.model
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = choose_url_idx(request, models[model]["urls"])
         else:
             raise HTTPException(
                 status_code=400,
@@ -1228,6 +1243,7 @@ async def generate_completion(
         payload=form_data.model_dump_json(exclude_none=True).encode(),
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
+        node=url,
     )
 
 
@@ -1265,6 +1281,13 @@ class GenerateChatCompletionForm(BaseModel):
     )
 
 
+def choose_url_idx(request: Request, url_idxs: list[int]) -> int:
+    """Pick one of the OLLAMA_BASE_URLS serving a model, see OLLAMA_LOAD_BALANCER"""
+    urls = request.app.state.config.OLLAMA_BASE_URLS
+    url = OLLAMA_LOAD_BALANCER.choose([urls[idx] for idx in url_idxs])
+    return next(idx for idx in url_idxs if urls[idx] == url)
+
+
 async def get_ollama_url(request: Request, model: str, url_idx: Optional[int] = None):
     if url_idx is None:
         models = request.app.state.OLLAMA_MODELS
@@ -1273,7 +1296,7 @@ async def get_ollama_url(request: Request, model: str, url_idx: Optional[int] =
                 status_code=400,
                 detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
             )
-        url_idx = random.choice(models[model].get("urls", []))
+        url_idx = choose_url_idx(request, models[model].get("urls", []))
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     return url, url_idx
 
@@ -1379,6 +1402,7 @@ async def generate_chat_completion(
         content_type="application/x-ndjson",
         user=user,
         metadata=metadata,
+        node=url,
     )
 
 
@@ -1490,6 +1514,7 @@ async def generate_openai_completion(
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
         metadata=metadata,
+        node=url,
     )
 
 
@@ -1577,6 +1602,7 @@ async def generate_openai_chat_completion(
         key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
         user=user,
         metadata=metadata,
+        node=url,
     )
 
 
@@ -7,9 +7,11 @@ import asyncio
 
 import re
 import uuid
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import datetime
+from itertools import chain
 from pathlib import Path
-from typing import Iterator, List, Optional, Sequence, Union
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Union
 
 from fastapi import (
     Depends,
@@ -37,6 +39,7 @@ from langchain_text_splitters import (
 from langchain_core.documents import Document
 
 from open_webui.models.files import FileModel, FileUpdateForm, Files
+from open_webui.models.chunk_embeddings import ChunkEmbeddings
 from open_webui.models.knowledge import Knowledges
 from open_webui.storage.provider import Storage
 from open_webui.internal.db import get_session, get_db
@@ -80,7 +83,9 @@ from open_webui.retrieval.web.yandex import search_yandex
 from open_webui.retrieval.web.ydc import search_youcom
 
 from open_webui.retrieval.utils import (
+    CHUNK_HASH_KEY,
     get_content_from_url,
+    get_content_hash,
     get_embedding_function,
     get_reranking_function,
     get_model_path,
@@ -88,8 +93,16 @@ from open_webui.retrieval.utils import (
     query_collection_with_hybrid_search,
     query_doc,
     query_doc_with_hybrid_search,
+    get_bm25_index,
 )
 from open_webui.retrieval.vector.utils import filter_metadata
+from open_webui.retrieval.ingest import (
+    CHUNK_EMBEDDING_STATS,
+    embed_with_chunk_store,
+    get_chunk_embedding_key,
+    get_chunk_id,
+    ingest_chunks,
+)
 from open_webui.utils.misc import (
     calculate_sha256_string,
     sanitize_text_for_db,
@@ -111,7 +124,9 @@ from open_webui.config import (
 from open_webui.env import (
     DEVICE_TYPE,
     DOCKER,
+    ENABLE_RAG_CHUNK_EMBEDDING_STORE,
     RAG_EMBEDDING_TIMEOUT,
+    RAG_INGEST_BATCH_SIZE,
     SENTENCE_TRANSFORMERS_BACKEND,
     SENTENCE_TRANSFORMERS_MODEL_KWARGS,
     SENTENCE_TRANSFORMERS_CROSS_ENCODER_BACKEND,
@@ -1371,8 +1386,8 @@ def can_merge_chunks(a: Document, b: Document) -> bool:
 
 def merge_docs_to_target_size(
     request: Request,
-    chunks: list[Document],
-) -> list[Document]:
+    chunks: Iterable[Document],
+) -> Iterator[Document]:
     """
     Best-effort normalization of chunk sizes.
 
@@ -1384,7 +1399,8 @@ def merge_docs_to_target_size(
     max_chunk_size = request.app.state.config.CHUNK_SIZE
 
     if min_chunk_size_target <= 0:
-        return chunks
+        yield from chunks
+        return
 
     measure_chunk_size = len
     if request.app.state.config.TEXT_SPLITTER == "token":
@@ -1393,8 +1409,6 @@ def merge_docs_to_target_size(
         )
         measure_chunk_size = lambda text: len(encoding.encode(text))
 
-    processed_chunks: list[Document] = []
-
     current_chunk: Document | None = None
     current_content: str = ""
 
@@ -1415,24 +1429,75 @@ def merge_docs_to_target_size(
         if can_merge:
             current_content = proposed_content
         else:
-            processed_chunks.append(
-                Document(
-                    page_content=current_content,
-                    metadata={**current_chunk.metadata},
-                )
+            yield Document(
+                page_content=current_content,
+                metadata={**current_chunk.metadata},
             )
             current_chunk = next_chunk
             current_content = next_chunk.page_content
 
     if current_chunk is not None:
-        processed_chunks.append(
+        yield Document(
+            page_content=current_content,
+            metadata={**current_chunk.metadata},
+        )
+
+
+def split_docs(request: Request, docs: Iterable[Document]) -> Iterator[Document]:
+    """
+    Chunks of `docs` with the configured text splitter. Chunks are produced
+    one document at a time, so callers can consume them as a stream.
+    """
+    chunks = iter(docs)
+    if request.app.state.config.ENABLE_MARKDOWN_HEADER_TEXT_SPLITTER:
+        log.info("Using markdown header text splitter")
+        # Define headers to split on - covering most common markdown header levels
+        markdown_splitter = MarkdownHeaderTextSplitter(
+            headers_to_split_on=[
+                ("#", "Header 1"),
+                ("##", "Header 2"),
+                ("###", "Header 3"),
+                ("####", "Header 4"),
+                ("#####", "Header 5"),
+                ("######", "Header 6"),
+            ],
+            strip_headers=False,  # Keep headers in content for context
+        )
+
+        chunks = (
             Document(
-                page_content=current_content,
-                metadata={**current_chunk.metadata},
+                page_content=split_chunk.page_content,
+                metadata={**doc.metadata},
             )
+            for doc in chunks
+            for split_chunk in markdown_splitter.split_text(doc.page_content)
+        )
+        if request.app.state.config.CHUNK_MIN_SIZE_TARGET > 0:
+            chunks = merge_docs_to_target_size(request, chunks)
+
+    if request.app.state.config.TEXT_SPLITTER in ["", "character"]:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=request.app.state.config.CHUNK_SIZE,
+            chunk_overlap=request.app.state.config.CHUNK_OVERLAP,
+            add_start_index=True,
         )
+    elif request.app.state.config.TEXT_SPLITTER == "token":
+        log.info(
+            f"Using token text splitter: {request.app.state.config.TIKTOKEN_ENCODING_NAME}"
+        )
+
+        tiktoken.get_encoding(str(request.app.state.config.TIKTOKEN_ENCODING_NAME))
+        text_splitter = TokenTextSplitter(
+            encoding_name=str(request.app.state.config.TIKTOKEN_ENCODING_NAME),
+            chunk_size=request.app.state.config.CHUNK_SIZE,
+            chunk_overlap=request.app.state.config.CHUNK_OVERLAP,
+            add_start_index=True,
+        )
+    else:
+        raise ValueError(ERROR_MESSAGES.DEFAULT("Invalid text splitter"))
 
-    return processed_chunks
+    for chunk in chunks:
+        yield from text_splitter.split_documents([chunk])
 
 
 def save_docs_to_vector_db(
@@ -1444,7 +1509,14 @@ def save_docs_to_vector_db(
     split: bool = True,
     add: bool = False,
     user=None,
+    progress: Optional[Callable[[dict], None]] = None,
 ) -> bool:
+    """
+    Split `docs` into chunks, embed them and add them to `collection_name`,
+    one batch of RAG_INGEST_BATCH_SIZE chunks at a time. `progress` is called
+    with the chunks and batches written so far after each batch.
+    """
+
     def _get_docs_info(docs: list[Document]) -> str:
         docs_info = set()
 
@@ -1465,6 +1537,9 @@ def save_docs_to_vector_db(
         f"save_docs_to_vector_db: document {_get_docs_info(docs)} {collection_name}"
     )
 
+    # Chunks of this document already in the collection
+    existing_ids = set()
+
     # Check if entries with the same hash (metadata.hash) already exist
     if metadata and "hash" in metadata:
         result = VECTOR_DB_CLIENT.query(
@@ -1486,78 +1561,43 @@ def save_docs_to_vector_db(
                     log.info(f"Document with hash {metadata['hash']} already exists")
                     raise ValueError(ERROR_MESSAGES.DUPLICATE_CONTENT)
 
-    if split:
-        if request.app.state.config.ENABLE_MARKDOWN_HEADER_TEXT_SPLITTER:
-            log.info("Using markdown header text splitter")
-            # Define headers to split on - covering most common markdown header levels
-            markdown_splitter = MarkdownHeaderTextSplitter(
-                headers_to_split_on=[
-                    ("#", "Header 1"),
-                    ("##", "Header 2"),
-                    ("###", "Header 3"),
-                    ("####", "Header 4"),
-                    ("#####", "Header 5"),
-                    ("######", "Header 6"),
-                ],
-                strip_headers=False,  # Keep headers in content for context
-            )
-
-            split_docs = []
-            for doc in docs:
-                split_docs.extend(
-                    [
-                        Document(
-                            page_content=split_chunk.page_content,
-                            metadata={**doc.metadata},
-                        )
-                        for split_chunk in markdown_splitter.split_text(
-                            doc.page_content
-                        )
-                    ]
-                )
-
-            docs = split_docs
-            if request.app.state.config.CHUNK_MIN_SIZE_TARGET > 0:
-                docs = merge_docs_to_target_size(request, docs)
+                existing_ids = set(existing_doc_ids)
 
-        if request.app.state.config.TEXT_SPLITTER in ["", "character"]:
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=request.app.state.config.CHUNK_SIZE,
-                chunk_overlap=request.app.state.config.CHUNK_OVERLAP,
-                add_start_index=True,
-            )
-            docs = text_splitter.split_documents(docs)
-        elif request.app.state.config.TEXT_SPLITTER == "token":
-            log.info(
-                f"Using token text splitter: {request.app.state.config.TIKTOKEN_ENCODING_NAME}"
-            )
+    # Chunks of a document with a hash get stable ids, so running the same
+    # document again skips the chunks an interrupted run already stored
+    document_hash = metadata.get("hash") if metadata else None
 
-            tiktoken.get_encoding(str(request.app.state.config.TIKTOKEN_ENCODING_NAME))
-            text_splitter = TokenTextSplitter(
-                encoding_name=str(request.app.state.config.TIKTOKEN_ENCODING_NAME),
-                chunk_size=request.app.state.config.CHUNK_SIZE,
-                chunk_overlap=request.app.state.config.CHUNK_OVERLAP,
-                add_start_index=True,
-            )
-            docs = text_splitter.split_documents(docs)
-        else:
-            raise ValueError(ERROR_MESSAGES.DEFAULT("Invalid text splitter"))
+    def get_item(position: int, chunk: Document) -> dict:
+        text = sanitize_text_for_db(chunk.page_content)
+        chunk_hash = get_content_hash(text)
+        return {
+            "id": (
+                get_chunk_id(collection_name, document_hash, position, chunk_hash)
+                if document_hash
+                else str(uuid.uuid4())
+            ),
+            "text": text,
+            "metadata": {
+                **chunk.metadata,
+                **(metadata if metadata else {}),
+                "embedding_config": {
+                    "engine": request.app.state.config.RAG_EMBEDDING_ENGINE,
+                    "model": request.app.state.config.RAG_EMBEDDING_MODEL,
+                },
+                # Identifies the chunk for hybrid search fusion and result dedup
+                CHUNK_HASH_KEY: chunk_hash,
+            },
+        }
 
-    if len(docs) == 0:
+    chunks = split_docs(request, docs) if split else iter(docs)
+    items = (get_item(position, chunk) for position, chunk in enumerate(chunks))
+    first_item = next(items, None)
+    if first_item is None:
         raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+    items = chain([first_item], items)
 
-    texts = [sanitize_text_for_db(doc.page_content) for doc in docs]
-    metadatas = [
-        {
-            **doc.metadata,
-            **(metadata if metadata else {}),
-            "embedding_config": {
-                "engine": request.app.state.config.RAG_EMBEDDING_ENGINE,
-                "model": request.app.state.config.RAG_EMBEDDING_MODEL,
-            },
-        }
-        for doc in docs
-    ]
+    # Chunks stored before ids were stable can't be matched, keep them as is
+    resuming = first_item["id"] in existing_ids
 
     try:
         if VECTOR_DB_CLIENT.has_collection(collection_name=collection_name):
@@ -1566,13 +1606,18 @@ def save_docs_to_vector_db(
             if overwrite:
                 VECTOR_DB_CLIENT.delete_collection(collection_name=collection_name)
                 log.info(f"deleting existing collection {collection_name}")
-            elif add is False:
+                resuming = False
+            elif add is False and not resuming:
                 log.info(
                     f"collection {collection_name} already exists, overwrite is False and add is False"
                 )
                 return True
 
-        log.info(f"generating embeddings for {collection_name}")
+        if resuming:
+            log.info(
+                f"{len(existing_ids)} chunks of {document_hash} already in {collection_name}, resuming"
+            )
+
         embedding_function = get_embedding_function(
             request.app.state.config.RAG_EMBEDDING_ENGINE,
             request.app.state.config.RAG_EMBEDDING_MODEL,
@@ -1605,38 +1650,76 @@ def save_docs_to_vector_db(
             concurrent_requests=request.app.state.config.RAG_EMBEDDING_CONCURRENT_REQUESTS,
         )
 
-        # Run async embedding in sync context using the main event loop
-        # This allows the main loop to stay responsive to health checks during long operations
-        embedding_timeout = RAG_EMBEDDING_TIMEOUT
-
-        future = asyncio.run_coroutine_threadsafe(
-            embedding_function(
-                list(map(lambda x: x.replace("\n", " "), texts)),
-                prefix=RAG_EMBEDDING_CONTENT_PREFIX,
-                user=user,
-            ),
-            request.app.state.main_loop,
-        )
-        embeddings = future.result(timeout=embedding_timeout)
-        log.info(f"embeddings generated {len(embeddings)} for {len(texts)} items")
+        def embed_texts(texts: list[str]) -> list:
+            # Run async embedding in sync context using the main event loop
+            # This allows the main loop to stay responsive to health checks during long operations
+            future = asyncio.run_coroutine_threadsafe(
+                embedding_function(
+                    [text.replace("\n", " ") for text in texts],
+                    prefix=RAG_EMBEDDING_CONTENT_PREFIX,
+                    user=user,
+                ),
+                request.app.state.main_loop,
+            )
+            try:
+                # RAG_EMBEDDING_TIMEOUT applies to each batch
+                return future.result(timeout=RAG_EMBEDDING_TIMEOUT)
+            except FuturesTimeoutError:
+                future.cancel()
+                raise
+
+        embedding_stats = {"reused": 0, "computed": 0}
+
+        def embed(texts: list[str]) -> list:
+            if not ENABLE_RAG_CHUNK_EMBEDDING_STORE:
+                return embed_texts(texts)
+            keys = [
+                get_chunk_embedding_key(
+                    request.app.state.config.RAG_EMBEDDING_ENGINE,
+                    request.app.state.config.RAG_EMBEDDING_MODEL,
+                    RAG_EMBEDDING_CONTENT_PREFIX,
+                    text,
+                )
+                for text in texts
+            ]
+            return embed_with_chunk_store(
+                texts,
+                keys,
+                embed_texts,
+                ChunkEmbeddings,
+                file_id=metadata.get("file_id") if metadata else None,
+                stats=embedding_stats,
+            )
 
-        items = [
-            {
-                "id": str(uuid.uuid4()),
-                "text": text,
-                "vector": embeddings[idx],
-                "metadata": metadatas[idx],
-            }
-            for idx, text in enumerate(texts)
-        ]
+        def write(batch: list[dict]):
+            VECTOR_DB_CLIENT.insert(collection_name=collection_name, items=batch)
 
-        log.info(f"adding to collection {collection_name}")
-        VECTOR_DB_CLIENT.insert(
-            collection_name=collection_name,
-            items=items,
+        def on_progress(stats: dict):
+            log.debug(
+                f"added {stats['chunks']} items to collection {collection_name} in {stats['batches']} batches"
+            )
+            if progress:
+                progress(stats)
+
+        log.info(f"generating embeddings and adding to collection {collection_name}")
+        stats = ingest_chunks(
+            items,
+            embed=embed,
+            write=write,
+            batch_size=RAG_INGEST_BATCH_SIZE,
+            skip_ids=existing_ids if resuming else None,
+            progress=on_progress,
+        )
+
+        log.info(
+            f"added {stats['chunks']} items to collection {collection_name}"
+            + (f", {stats['skipped']} already stored" if stats["skipped"] else "")
+            + (
+                f", {embedding_stats['reused']} with stored embeddings"
+                if embedding_stats["reused"]
+                else ""
+            )
         )
-
-        log.info(f"added {len(items)} items to collection {collection_name}")
         return True
     except Exception as e:
         log.exception(e)
@@ -1840,6 +1923,10 @@ def process_file(
                         },
                         add=(True if form_data.collection_name else False),
                         user=user,
+                        # Chunks and batches stored so far, polled by /files/{id}/process/status
+                        progress=lambda stats: Files.update_file_data_by_id(
+                            file.id, {"progress": stats}
+                        ),
                     )
                     log.info(f"added {len(docs)} items to collection {collection_name}")
 
@@ -2508,13 +2595,19 @@ async def query_doc_handler(
         if request.app.state.config.ENABLE_RAG_HYBRID_SEARCH and (
             form_data.hybrid is None or form_data.hybrid
         ):
+            bm25_index = await asyncio.to_thread(
+                get_bm25_index, form_data.collection_name
+            )
             collection_results = {}
-            collection_results[form_data.collection_name] = VECTOR_DB_CLIENT.get(
-                collection_name=form_data.collection_name
+            collection_results[form_data.collection_name] = (
+                VECTOR_DB_CLIENT.get(collection_name=form_data.collection_name)
+                if bm25_index is None
+                else None
             )
             return await query_doc_with_hybrid_search(
                 collection_name=form_data.collection_name,
                 collection_result=collection_results[form_data.collection_name],
+                bm25_index=bm25_index,
                 query=form_data.query,
                 embedding_function=lambda query, prefix: request.app.state.EMBEDDING_FUNCTION(
                     query, prefix=prefix, user=user
@@ -2674,6 +2767,21 @@ def delete_entries_from_collection(
         return {"status": False}
 
 
+@router.get("/embeddings/store")
+def get_chunk_embedding_store_report(
+    user=Depends(get_admin_user), db: Session = Depends(get_session)
+):
+    """
+    Size of the chunk embedding store and the embedding calls it saved, in
+    total for the stored files and since startup.
+    """
+    return {
+        "enabled": ENABLE_RAG_CHUNK_EMBEDDING_STORE,
+        **ChunkEmbeddings.get_report(db=db).model_dump(),
+        "since_startup": dict(CHUNK_EMBEDDING_STATS),
+    }
+
+
 @router.post("/reset/db")
 def reset_vector_db(user=Depends(get_admin_user), db: Session = Depends(get_session)):
     VECTOR_DB_CLIENT.reset()
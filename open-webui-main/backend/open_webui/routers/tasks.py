@@ -63,6 +63,14 @@ async def check_active_chats(
     return {"active_chat_ids": active}
 
 
+@router.get("/active/nodes")
+async def get_active_task_counts(request: Request, user=Depends(get_admin_user)):
+    """Count the active tasks of each instance."""
+    from open_webui.tasks import get_task_counts_by_node
+
+    return {"nodes": await get_task_counts_by_node(request.app.state.redis)}
+
+
 @router.get("/config")
 async def get_task_config(request: Request, user=Depends(get_verified_user)):
     return {
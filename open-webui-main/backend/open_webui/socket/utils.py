@@ -1,5 +1,7 @@
 import json
 import uuid
+from collections import OrderedDict
+from redis.exceptions import WatchError
 from open_webui.utils.redis import get_redis_connection
 from open_webui.env import REDIS_KEY_PREFIX
 from typing import Optional, List, Tuple
@@ -55,10 +57,14 @@ class RedisDict:
             redis_cluster=redis_cluster,
             decode_responses=True,
         )
+        # Serialized values as last written by set(), None until then
+        self._written = None
 
     def __setitem__(self, key, value):
         serialized_value = json.dumps(value)
         self.redis.hset(self.name, key, serialized_value)
+        if self._written is not None:
+            self._written[key] = serialized_value
 
     def __getitem__(self, key):
         value = self.redis.hget(self.name, key)
@@ -67,6 +73,8 @@ class RedisDict:
         return json.loads(value)
 
     def __delitem__(self, key):
+        if self._written is not None:
+            self._written.pop(key, None)
         result = self.redis.hdel(self.name, key)
         if result == 0:
             raise KeyError(key)
@@ -87,13 +95,34 @@ class RedisDict:
         return [(k, json.loads(v)) for k, v in self.redis.hgetall(self.name).items()]
 
     def set(self, mapping: dict):
+        """
+        Replace the contents with `mapping`. After the first call only the
+        keys that changed since the previous call are written, unless the
+        hash no longer has the keys written then.
+        """
+        serialized = {k: json.dumps(v) for k, v in mapping.items()}
+        written = self._written
+        if written is not None and self.redis.hlen(self.name) == len(written):
+            changed = {k: v for k, v in serialized.items() if written.get(k) != v}
+            removed = [k for k in written if k not in serialized]
+            if changed or removed:
+                pipe = self.redis.pipeline()
+                if removed:
+                    pipe.hdel(self.name, *removed)
+                if changed:
+                    pipe.hset(self.name, mapping=changed)
+                pipe.execute()
+            self._written = serialized
+            return
+
         pipe = self.redis.pipeline()
 
         pipe.delete(self.name)
         if mapping:
-            pipe.hset(self.name, mapping={k: json.dumps(v) for k, v in mapping.items()})
+            pipe.hset(self.name, mapping=serialized)
 
         pipe.execute()
+        self._written = serialized
 
     def get(self, key, default=None):
         try:
@@ -103,6 +132,7 @@ class RedisDict:
 
     def clear(self):
         self.redis.delete(self.name)
+        self._written = None
 
     def update(self, other=None, **kwargs):
         if other is not None:
@@ -118,78 +148,171 @@ class RedisDict:
 
 
 class YdocManager:
+    """
+    Yjs documents shared by the users editing them.
+
+    Without Redis, each document is kept as one Y.Doc that updates are
+    applied to.
+
+    With Redis, a document is stored as raw bytes in two keys:
+
+    - {prefix}:{id}:snapshot, a hash with the document `state` as of its
+      last compaction and a `gen` token that changes with each compaction
+    - {prefix}:{id}:log, the updates appended since
+
+    Every COMPACTION_THRESHOLD updates the log is folded into the snapshot.
+    Each instance keeps the documents it serves materialized, with the
+    snapshot generation and the number of log entries applied, and only
+    reads the entries appended since. Both keys use the same hash tag so
+    they can be read and compacted in one transaction on Redis Cluster.
+    """
+
     COMPACTION_THRESHOLD = 500
+    # Documents kept materialized by each instance using Redis
+    CACHE_SIZE = 100
 
     def __init__(
         self,
         redis=None,
         redis_key_prefix: str = f"{REDIS_KEY_PREFIX}:ydoc:documents",
+        binary_redis=None,
     ):
-        self._updates = {}
+        self._documents: dict[str, Y.Doc] = {}
         self._users = {}
         self._redis = redis
+        # Client without decode_responses for the document bytes
+        self._binary_redis = binary_redis or redis
         self._redis_key_prefix = redis_key_prefix
+        # document_id -> [gen, applied log entries, Y.Doc]
+        self._cache: OrderedDict[str, list] = OrderedDict()
+
+    def _snapshot_key(self, document_id: str) -> str:
+        return f"{self._redis_key_prefix}:{{{document_id}}}:snapshot"
+
+    def _log_key(self, document_id: str) -> str:
+        return f"{self._redis_key_prefix}:{{{document_id}}}:log"
+
+    def _cache_document(self, document_id: str, gen, applied: int, ydoc: Y.Doc):
+        self._cache[document_id] = [gen, applied, ydoc]
+        self._cache.move_to_end(document_id)
+        while len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
 
     async def append_to_updates(self, document_id: str, update: bytes):
         document_id = document_id.replace(":", "_")
+        update = bytes(update)
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            await self._redis.rpush(redis_key, json.dumps(list(update)))
-            list_len = await self._redis.llen(redis_key)
+            pipe = self._binary_redis.pipeline(transaction=True)
+            # A new document gets its first generation
+            pipe.hsetnx(self._snapshot_key(document_id), "gen", uuid.uuid4().hex)
+            pipe.hget(self._snapshot_key(document_id), "gen")
+            pipe.rpush(self._log_key(document_id), update)
+            _, gen, list_len = await pipe.execute()
+
+            # Keep a materialized copy current without reading the log back
+            cached = self._cache.get(document_id)
+            if cached and cached[0] == gen and cached[1] == list_len - 1:
+                cached[2].apply_update(update)
+                cached[1] = list_len
+
             if list_len >= self.COMPACTION_THRESHOLD:
                 await self._compact_updates_redis(document_id)
         else:
-            if document_id not in self._updates:
-                self._updates[document_id] = []
-            self._updates[document_id].append(update)
-            if len(self._updates[document_id]) >= self.COMPACTION_THRESHOLD:
-                self._compact_updates_memory(document_id)
+            if document_id not in self._documents:
+                self._documents[document_id] = Y.Doc()
+            self._documents[document_id].apply_update(update)
+
+    async def _get_document_redis(self, document_id: str) -> Optional[Y.Doc]:
+        """The materialized document, reading only what it misses"""
+        snapshot_key = self._snapshot_key(document_id)
+        log_key = self._log_key(document_id)
+
+        cached = self._cache.get(document_id)
+        if cached:
+            start = cached[1]
+            pipe = self._binary_redis.pipeline(transaction=True)
+            pipe.hget(snapshot_key, "gen")
+            pipe.lrange(log_key, start, -1)
+            gen, updates = await pipe.execute()
+            if gen is not None and gen == cached[0]:
+                for update in updates:
+                    cached[2].apply_update(update)
+                # Counted from where this read started: an append_to_updates
+                # may have applied its own entry meanwhile, and applying an
+                # update twice is harmless but skipping one is not
+                cached[1] = max(cached[1], start + len(updates))
+                self._cache.move_to_end(document_id)
+                return cached[2]
+            # Compacted or cleared since
+            self._cache.pop(document_id, None)
+
+        pipe = self._binary_redis.pipeline(transaction=True)
+        pipe.hmget(snapshot_key, "gen", "state")
+        pipe.lrange(log_key, 0, -1)
+        (gen, state), updates = await pipe.execute()
+        if gen is None:
+            return None
 
-    async def _compact_updates_redis(self, document_id: str):
-        """Rolling compaction: squash oldest half into one snapshot."""
-        redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-        all_updates = await self._redis.lrange(redis_key, 0, -1)
-        if len(all_updates) <= 1:
-            return
-        mid = len(all_updates) // 2
         ydoc = Y.Doc()
-        for raw in all_updates[:mid]:
-            ydoc.apply_update(bytes(json.loads(raw)))
-        snapshot = json.dumps(list(ydoc.get_update()))
-        pipe = self._redis.pipeline()
-        pipe.delete(redis_key)
-        pipe.rpush(redis_key, snapshot, *all_updates[mid:])
-        await pipe.execute()
-
-    def _compact_updates_memory(self, document_id: str):
-        """Rolling compaction: squash oldest half into one snapshot."""
-        updates = self._updates.get(document_id, [])
-        if len(updates) <= 1:
+        if state:
+            ydoc.apply_update(state)
+        for update in updates:
+            ydoc.apply_update(update)
+        self._cache_document(document_id, gen, len(updates), ydoc)
+        return ydoc
+
+    async def _compact_updates_redis(self, document_id: str):
+        """Fold the applied log entries into the snapshot"""
+        ydoc = await self._get_document_redis(document_id)
+        cached = self._cache.get(document_id)
+        if ydoc is None or cached is None:
             return
-        mid = len(updates) // 2
-        ydoc = Y.Doc()
-        for update in updates[:mid]:
-            ydoc.apply_update(bytes(update))
-        self._updates[document_id] = [ydoc.get_update()] + updates[mid:]
+        gen, applied, _ = cached
 
-    async def get_updates(self, document_id: str) -> List[bytes]:
+        snapshot_key = self._snapshot_key(document_id)
+        try:
+            async with self._binary_redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(snapshot_key)
+                if await pipe.hget(snapshot_key, "gen") != gen:
+                    # Compacted by another instance
+                    await pipe.unwatch()
+                    return
+                new_gen = uuid.uuid4().hex.encode()
+                pipe.multi()
+                pipe.hset(
+                    snapshot_key, mapping={"gen": new_gen, "state": ydoc.get_update()}
+                )
+                # Entries appended meanwhile stay in the log
+                pipe.ltrim(self._log_key(document_id), applied, -1)
+                await pipe.execute()
+        except WatchError:
+            return
+        self._cache_document(document_id, new_gen, 0, ydoc)
+
+    async def get_state(
+        self, document_id: str, state_vector: Optional[bytes] = None
+    ) -> Optional[bytes]:
+        """
+        The document encoded as an update, or only what a client with
+        `state_vector` misses. None if the document does not exist.
+        """
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            updates = await self._redis.lrange(redis_key, 0, -1)
-            return [bytes(json.loads(update)) for update in updates]
+            ydoc = await self._get_document_redis(document_id)
         else:
-            return self._updates.get(document_id, [])
+            ydoc = self._documents.get(document_id)
+        if ydoc is None:
+            return None
+        return ydoc.get_update(bytes(state_vector) if state_vector else None)
 
     async def document_exists(self, document_id: str) -> bool:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            return await self._redis.exists(redis_key) > 0
+            return await self._redis.exists(self._snapshot_key(document_id)) > 0
         else:
-            return document_id in self._updates
+            return document_id in self._documents
 
     async def get_users(self, document_id: str) -> List[str]:
         document_id = document_id.replace(":", "_")
@@ -250,12 +373,14 @@ class YdocManager:
         document_id = document_id.replace(":", "_")
 
         if self._redis:
-            redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
-            await self._redis.delete(redis_key)
+            self._cache.pop(document_id, None)
+            await self._redis.delete(
+                self._snapshot_key(document_id), self._log_key(document_id)
+            )
             redis_users_key = f"{self._redis_key_prefix}:{document_id}:users"
             await self._redis.delete(redis_users_key)
         else:
-            if document_id in self._updates:
-                del self._updates[document_id]
+            if document_id in self._documents:
+                del self._documents[document_id]
             if document_id in self._users:
                 del self._users[document_id]
@@ -1,5 +1,6 @@
 # tasks.py
 import asyncio
+import time
 from typing import Dict
 from uuid import uuid4
 import json
@@ -8,17 +9,24 @@ from redis.asyncio import Redis
 from fastapi import Request
 from typing import Dict, List, Optional
 
-from open_webui.env import REDIS_KEY_PREFIX
+from open_webui.env import INSTANCE_ID, REDIS_KEY_PREFIX, REDIS_TASKS_NODE_TIMEOUT
 
 log = logging.getLogger(__name__)
 
 # A dictionary to keep track of active tasks
 tasks: Dict[str, asyncio.Task] = {}
 item_tasks = {}
+# task_id -> metadata of the tasks of this instance, see get_task_metadata
+task_metadata: Dict[str, dict] = {}
 
 
 REDIS_TASKS_KEY = f"{REDIS_KEY_PREFIX}:tasks"
 REDIS_ITEM_TASKS_KEY = f"{REDIS_KEY_PREFIX}:tasks:item"
+# One hash per node, task_id -> compact JSON of the task metadata. The hash
+# expires unless its node keeps sending heartbeats.
+REDIS_TASKS_META_KEY = f"{REDIS_KEY_PREFIX}:tasks:meta"
+# node -> time of its last heartbeat
+REDIS_TASKS_NODES_KEY = f"{REDIS_KEY_PREFIX}:tasks:nodes"
 REDIS_PUBSUB_CHANNEL = f"{REDIS_KEY_PREFIX}:tasks:commands"
 
 
@@ -41,14 +49,53 @@ async def redis_task_command_listener(app):
             log.exception(f"Error handling distributed task command: {e}")
 
 
+async def redis_task_heartbeat(app):
+    """
+    Keep the task metadata of this instance alive. Once the heartbeats stop,
+    readers drop the node after REDIS_TASKS_NODE_TIMEOUT seconds.
+    """
+    redis: Redis = app.state.redis
+    # Tasks left by a previous run under the same INSTANCE_ID are gone
+    try:
+        await redis.delete(redis_node_meta_key(INSTANCE_ID))
+    except Exception as e:
+        log.exception(f"Error clearing stale task metadata: {e}")
+
+    while True:
+        try:
+            pipe = redis.pipeline(transaction=False)
+            redis_touch_node(pipe, INSTANCE_ID)
+            await pipe.execute()
+        except Exception as e:
+            log.exception(f"Error sending task heartbeat: {e}")
+        await asyncio.sleep(REDIS_TASKS_NODE_TIMEOUT / 3)
+
+
 ### ------------------------------
 ### REDIS-ENABLED HANDLERS
 ### ------------------------------
 
 
-async def redis_save_task(redis: Redis, task_id: str, item_id: Optional[str]):
+def redis_node_meta_key(node: str) -> str:
+    return f"{REDIS_TASKS_META_KEY}:{node}"
+
+
+def redis_touch_node(pipe, node: str):
+    pipe.zadd(REDIS_TASKS_NODES_KEY, {node: time.time()})
+    pipe.expire(redis_node_meta_key(node), REDIS_TASKS_NODE_TIMEOUT)
+
+
+async def redis_save_task(
+    redis: Redis, task_id: str, item_id: Optional[str], metadata: dict
+):
     pipe = redis.pipeline()
     pipe.hset(REDIS_TASKS_KEY, task_id, item_id or "")
+    pipe.hset(
+        redis_node_meta_key(metadata["node"]),
+        task_id,
+        json.dumps(metadata, separators=(",", ":")),
+    )
+    redis_touch_node(pipe, metadata["node"])
     if item_id:
         pipe.sadd(f"{REDIS_ITEM_TASKS_KEY}:{item_id}", task_id)
     await pipe.execute()
@@ -57,10 +104,10 @@ async def redis_save_task(redis: Redis, task_id: str, item_id: Optional[str]):
 async def redis_cleanup_task(redis: Redis, task_id: str, item_id: Optional[str]):
     pipe = redis.pipeline()
     pipe.hdel(REDIS_TASKS_KEY, task_id)
+    pipe.hdel(redis_node_meta_key(INSTANCE_ID), task_id)
     if item_id:
+        # Redis deletes the set with its last member
         pipe.srem(f"{REDIS_ITEM_TASKS_KEY}:{item_id}", task_id)
-        if (await pipe.scard(f"{REDIS_ITEM_TASKS_KEY}:{item_id}").execute())[-1] == 0:
-            pipe.delete(f"{REDIS_ITEM_TASKS_KEY}:{item_id}")  # Remove if empty set
     await pipe.execute()
 
 
@@ -72,6 +119,35 @@ async def redis_list_item_tasks(redis: Redis, item_id: str) -> List[str]:
     return list(await redis.smembers(f"{REDIS_ITEM_TASKS_KEY}:{item_id}"))
 
 
+async def redis_list_active_items(redis: Redis, item_ids: List[str]) -> List[str]:
+    # One round trip for all the items, split per node by RedisCluster
+    pipe = redis.pipeline(transaction=False)
+    for item_id in item_ids:
+        pipe.exists(f"{REDIS_ITEM_TASKS_KEY}:{item_id}")
+    counts = await pipe.execute()
+    return [item_id for item_id, count in zip(item_ids, counts) if count]
+
+
+async def redis_list_task_metadata(redis: Redis) -> Dict[str, dict]:
+    # Forget the nodes that missed their heartbeats, their hashes expire alone
+    cutoff = time.time() - REDIS_TASKS_NODE_TIMEOUT
+    await redis.zremrangebyscore(REDIS_TASKS_NODES_KEY, "-inf", cutoff)
+    nodes = await redis.zrange(REDIS_TASKS_NODES_KEY, 0, -1)
+
+    pipe = redis.pipeline(transaction=False)
+    for node in nodes:
+        pipe.hgetall(redis_node_meta_key(node))
+
+    metadata = {}
+    for values in await pipe.execute():
+        for task_id, value in values.items():
+            try:
+                metadata[task_id] = json.loads(value)
+            except Exception:
+                log.debug(f"Invalid metadata for task {task_id}")
+    return metadata
+
+
 async def redis_send_command(redis: Redis, command: dict):
     command_json = json.dumps(command)
     # RedisCluster doesn't expose publish() directly, but the
@@ -90,6 +166,7 @@ async def cleanup_task(redis, task_id: str, id=None):
         await redis_cleanup_task(redis, task_id, id)
 
     tasks.pop(task_id, None)  # Remove the task if it exists
+    task_metadata.pop(task_id, None)
 
     # If an ID is provided, remove the task from the item_tasks dictionary
     if id and task_id in item_tasks.get(id, []):
@@ -98,11 +175,17 @@ async def cleanup_task(redis, task_id: str, id=None):
             item_tasks.pop(id, None)
 
 
-async def create_task(redis, coroutine, id=None):
+async def create_task(redis, coroutine, id=None, model: Optional[str] = None):
     """
     Create a new asyncio task and add it to the global task dictionary.
     """
     task_id = str(uuid4())  # Generate a unique ID for the task
+    metadata = {
+        "item_id": id,
+        "node": INSTANCE_ID,
+        "model": model,
+        "started_at": int(time.time()),
+    }
     task = asyncio.create_task(coroutine)  # Create the task
 
     # Add a done callback for cleanup
@@ -110,6 +193,7 @@ async def create_task(redis, coroutine, id=None):
         lambda t: asyncio.create_task(cleanup_task(redis, task_id, id))
     )
     tasks[task_id] = task
+    task_metadata[task_id] = metadata
 
     # If an ID is provided, associate the task with that ID
     if item_tasks.get(id):
@@ -118,7 +202,7 @@ async def create_task(redis, coroutine, id=None):
         item_tasks[id] = [task_id]
 
     if redis:
-        await redis_save_task(redis, task_id, id)
+        await redis_save_task(redis, task_id, id, metadata)
 
     return task_id, task
 
@@ -141,6 +225,39 @@ async def list_task_ids_by_item_id(redis, id):
     return item_tasks.get(id, [])
 
 
+async def list_active_item_ids(redis, ids: List[str]) -> List[str]:
+    """
+    Filter a list of IDs to those with active tasks, in one Redis round trip.
+    """
+    if not ids:
+        return []
+    if redis:
+        return await redis_list_active_items(redis, ids)
+    return [id for id in ids if item_tasks.get(id)]
+
+
+async def get_task_metadata(redis) -> Dict[str, dict]:
+    """
+    Metadata of the active tasks by task ID: item_id, node (the INSTANCE_ID
+    running it), model and started_at. With Redis, only the nodes that sent
+    a heartbeat in the last REDIS_TASKS_NODE_TIMEOUT seconds are included.
+    """
+    if redis:
+        return await redis_list_task_metadata(redis)
+    return dict(task_metadata)
+
+
+async def get_task_counts_by_node(redis) -> Dict[str, int]:
+    """
+    Count the active tasks per node.
+    """
+    counts = {}
+    for metadata in (await get_task_metadata(redis)).values():
+        node = metadata.get("node")
+        counts[node] = counts.get(node, 0) + 1
+    return counts
+
+
 async def stop_task(redis, task_id: str):
     """
     Cancel a running task and remove it from the global task list.
@@ -198,8 +315,4 @@ async def has_active_tasks(redis, chat_id: str) -> bool:
 
 async def get_active_chat_ids(redis, chat_ids: List[str]) -> List[str]:
     """Filter a list of chat_ids to only those with active tasks."""
-    active = []
-    for chat_id in chat_ids:
-        if await has_active_tasks(redis, chat_id):
-            active.append(chat_id)
-    return active
+    return await list_active_item_ids(redis, chat_ids)
@@ -0,0 +1,114 @@
+"""
+Redis calls and time per request for a request handler reading config
+values, with every PersistentConfig of config.py registered in AppConfig.
+The former AppConfig did a GET per read; the current one checks a version
+key once per CONFIG_REDIS_REFRESH_INTERVAL. Redis round trips are simulated
+with a fixed latency.
+
+    python -m open_webui.test.benchmarks.bench_app_config [--requests N]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from open_webui import config
+from open_webui.config import AppConfig, PersistentConfig
+
+
+class SlowRedis:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.values = {}
+        self.calls = 0
+
+    def call(self):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    def get(self, key):
+        self.call()
+        return self.values.get(key)
+
+    def mget(self, keys):
+        self.call()
+        return [self.values.get(key) for key in keys]
+
+    def set(self, key, value):
+        self.call()
+        self.values[key] = value
+
+    def incr(self, key):
+        self.call()
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+
+
+class FormerAppConfig(AppConfig):
+    def __getattr__(self, key):
+        if key not in self._state:
+            raise AttributeError(f"Config key '{key}' not found")
+
+        redis_value = self._redis.get(f"{self._redis_key_prefix}:config:{key}")
+        if redis_value is not None:
+            decoded_value = json.loads(redis_value)
+            if self._state[key].value != decoded_value:
+                self._state[key].value = decoded_value
+        return self._state[key].value
+
+
+def make_config(cls, redis):
+    app_config = cls()
+    object.__setattr__(app_config, "_redis", redis)
+    object.__setattr__(app_config, "_redis_key_prefix", "bench")
+    for name, value in vars(config).items():
+        if isinstance(value, PersistentConfig):
+            app_config._state[name] = value
+            redis.values[f"bench:config:{name}"] = json.dumps(value.value)
+    return app_config
+
+
+def run(app_config, keys, requests, reads, duration):
+    rng = random.Random(0)
+    redis = app_config._redis
+    redis.calls = 0
+    elapsed = 0.0
+    for _ in range(requests):
+        request_keys = rng.sample(keys, reads)
+        start = time.perf_counter()
+        for key in request_keys:
+            getattr(app_config, key)
+        elapsed += time.perf_counter() - start
+        # Spread the requests over `duration` seconds
+        time.sleep(duration / requests)
+    return redis.calls / requests, elapsed / requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=40)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.0002)
+    args = parser.parse_args()
+
+    results = {}
+    for label, cls in (("former", FormerAppConfig), ("snapshot", AppConfig)):
+        app_config = make_config(cls, SlowRedis(args.latency))
+        keys = list(app_config._state)
+        results[label] = run(app_config, keys, args.requests, args.reads, args.duration)
+
+    print(
+        f"{args.requests} requests over {args.duration}s reading {args.reads} of"
+        f" {len(keys)} config values, {args.latency * 1000:.1f}ms per Redis call,"
+        f" refresh interval {config.CONFIG_REDIS_REFRESH_INTERVAL}s"
+    )
+    for label, (calls, seconds) in results.items():
+        print(
+            f"{label:9} {calls:7.2f} Redis calls/request"
+            f"  {seconds * 1000:7.3f}ms config reads/request"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Time to the first transcript, total time and peak memory of transcribing
+a long recording with a simulated STT engine whose latency is proportional
+to the audio it is sent. The former pipeline loaded the whole recording
+with pydub, exported every chunk, then transcribed them all before
+returning anything; the current one cuts segments while the recording is
+read and transcribes them as they are cut. ffmpeg is not needed: the
+recording is a generated 16 kHz WAV read with the wave module in place of
+the ffmpeg decoder, and the former chunks are exported as WAV.
+
+    python -m open_webui.test.benchmarks.bench_audio_transcription [--minutes N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pydub import AudioSegment
+
+from open_webui.routers import audio as audio_router
+from open_webui.utils.audio import FRAME_BYTES, SAMPLE_RATE, segment_pcm
+
+
+def make_recording(path: str, minutes: float):
+    """Speech-like bursts of tone separated by short pauses"""
+    rng = np.random.default_rng(0)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        remaining = int(minutes * 60 * SAMPLE_RATE)
+        while remaining > 0:
+            speech = min(remaining, int(rng.uniform(5, 40) * SAMPLE_RATE))
+            t = np.arange(speech) / SAMPLE_RATE
+            f.writeframes((np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16))
+            pause = min(remaining - speech, int(0.6 * SAMPLE_RATE))
+            f.writeframes(np.zeros(pause, dtype=np.int16))
+            remaining -= speech + pause
+
+
+def read_frames(path: str):
+    with wave.open(path, "rb") as f:
+        while frame := f.readframes(FRAME_BYTES // 2):
+            yield frame
+
+
+def make_transcriber(seconds_per_minute: float):
+    def transcription_handler(request, file_path, metadata, user=None):
+        with wave.open(file_path, "rb") as f:
+            duration = f.getnframes() / f.getframerate()
+        time.sleep(duration / 60 * seconds_per_minute)
+        return {"text": os.path.basename(file_path)}
+
+    return transcription_handler
+
+
+def former(path: str, max_seconds: float, workers: int, transcription_handler):
+    """Whole file in memory, every chunk exported before transcribing"""
+    with tempfile.TemporaryDirectory() as chunk_dir:
+        audio = AudioSegment.from_file(path, format="wav")
+        chunk_ms = int(max_seconds * 1000)
+        chunk_paths = []
+        for idx, start in enumerate(range(0, len(audio), chunk_ms)):
+            chunk_path = os.path.join(chunk_dir, f"chunk_{idx}.wav")
+            audio[start : start + chunk_ms].export(chunk_path, format="wav")
+            chunk_paths.append(chunk_path)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(transcription_handler, None, chunk_path, None)
+                for chunk_path in chunk_paths
+            ]
+            for future in futures:
+                yield future.result()
+
+
+def current(path: str, transcription_handler):
+    audio_router.transcription_handler = transcription_handler
+    audio_router.get_audio_duration = lambda file_path: float("inf")
+    audio_router.stream_audio_segments = (
+        lambda file_path, output_dir, max_seconds: segment_pcm(
+            read_frames(file_path), output_dir, max_seconds
+        )
+    )
+    yield from audio_router.transcribe_segments(None, path)
+
+
+def run(pipeline) -> tuple[float, float, float, int]:
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in pipeline():
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    total = time.perf_counter() - start
+
+    # Separately, as tracing slows down the segmenter loop
+    tracemalloc.start()
+    for _ in pipeline():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first, total, peak, count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--segment-seconds", type=float, default=300)
+    parser.add_argument("--workers", type=int, default=4)
+    # Simulated STT latency per minute of audio
+    parser.add_argument("--stt-seconds", type=float, default=0.2)
+    args = parser.parse_args()
+
+    audio_router.AUDIO_STT_SEGMENT_SECONDS = args.segment_seconds
+    audio_router.AUDIO_STT_MAX_WORKERS = args.workers
+    transcription_handler = make_transcriber(args.stt_seconds)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "recording.wav")
+        make_recording(path, args.minutes)
+        print(
+            f"{args.minutes:.0f}min recording ({os.path.getsize(path) / 2**20:.0f}MiB),"
+            f" {args.segment_seconds:.0f}s segments, {args.workers} workers,"
+            f" {args.stt_seconds:.2f}s STT per audio minute"
+        )
+        pipelines = {
+            "former": lambda: former(
+                path, args.segment_seconds, args.workers, transcription_handler
+            ),
+            "current": lambda: current(path, transcription_handler),
+        }
+        for label, pipeline in pipelines.items():
+            first, total, peak, count = run(pipeline)
+            print(
+                f"{label:8} first transcript {first:6.2f}s  total {total:6.2f}s"
+                f"  peak {peak / 2**20:7.1f}MiB  {count} segments"
+            )
+
+
+if __name__ == "__main__":
+    main()
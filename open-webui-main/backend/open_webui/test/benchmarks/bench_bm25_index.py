@@ -0,0 +1,100 @@
+"""
+Query a synthetic 100k-chunk collection with BM25, once building a
+BM25Retriever from all chunks per query (the former hybrid search path) and
+once from a persistent BM25Index. Index files go to a temporary directory.
+
+    python -m open_webui.test.benchmarks.bench_bm25_index [--chunks N]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from langchain_community.retrievers import BM25Retriever
+
+from open_webui.retrieval.bm25 import BM25Indexes
+from open_webui.retrieval.vector.main import GetResult
+
+
+def synthetic_collection(chunks: int, seed: int = 0) -> GetResult:
+    """Chunks of 100-300 tokens over a Zipf-distributed 50k-word vocabulary"""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(50_000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    ids, documents, metadatas = [], [], []
+    for i in range(chunks):
+        ids.append(f"chunk-{i}")
+        documents.append(
+            " ".join(rng.choices(vocabulary, weights, k=rng.randint(100, 300)))
+        )
+        metadatas.append({"file_id": f"file-{i // 50}", "name": f"doc-{i // 50}.pdf"})
+    return GetResult(ids=[ids], documents=[documents], metadatas=[metadatas])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    collection = synthetic_collection(args.chunks)
+    queries = [
+        " ".join(f"term{rng.randint(0, 5_000)}" for _ in range(rng.randint(2, 8)))
+        for _ in range(args.queries)
+    ]
+
+    start = time.perf_counter()
+    retriever = BM25Retriever.from_texts(
+        texts=collection.documents[0], metadatas=collection.metadatas[0]
+    )
+    retriever.k = args.k
+    retriever.invoke(queries[0])
+    per_query_s = time.perf_counter() - start
+    scores = retriever.vectorizer.get_scores(queries[0].split())
+    expected = sorted(scores[scores > 0], reverse=True)[: args.k]
+
+    with tempfile.TemporaryDirectory() as root:
+        indexes = BM25Indexes(root)
+
+        start = time.perf_counter()
+        index = indexes.build("bench", collection)
+        build_s = time.perf_counter() - start
+
+        # Same top scores as BM25Retriever
+        found = [r["score"] for r in index.search(queries[0], args.k)]
+        assert all(abs(a - b) < 1e-6 for a, b in zip(found, expected)), found
+
+        # Reopen so the first query loads the index from disk
+        index = BM25Indexes(root).get("bench")
+        start = time.perf_counter()
+        index.search(queries[0], args.k)
+        first_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query, args.k)
+        index_s = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        new = synthetic_collection(50, seed=2)
+        index.add(
+            [f"new-{id}" for id in new.ids[0]], new.documents[0], new.metadatas[0]
+        )
+        index.delete(filter={"file_id": "file-7"})
+        update_s = time.perf_counter() - start
+
+    print(f"{args.chunks} chunks, {args.queries} queries, k={args.k}")
+    print(f"BM25Retriever per query   {per_query_s * 1000:10.1f}ms")
+    print(f"BM25Index build (once)    {build_s * 1000:10.1f}ms")
+    print(f"BM25Index first query     {first_s * 1000:10.1f}ms")
+    print(f"BM25Index per query       {index_s * 1000:10.1f}ms")
+    print(f"BM25Index add 50 + delete {update_s * 1000:10.1f}ms")
+    print(f"speedup per query         {per_query_s / index_s:10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
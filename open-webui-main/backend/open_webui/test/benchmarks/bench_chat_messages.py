@@ -0,0 +1,97 @@
+"""
+Stream an assistant reply into a chat with 1k messages and time the
+per-save database work, once rewriting the whole chat row (the former
+upsert path) and once writing only the message row.
+
+Point DATA_DIR at a scratch directory, the benchmark creates chats there:
+
+    DATA_DIR=/tmp/bench python -m open_webui.test.benchmarks.bench_chat_messages
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+import open_webui.config  # noqa: F401, runs the migrations
+from open_webui.models.chat_messages import ChatMessages
+from open_webui.models.chats import ChatForm, Chats
+
+WORDS = "the quick brown fox jumps over a lazy dog while tokens stream in".split()
+
+
+def build_chat(messages: int, size: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    history = {"messages": {}, "currentId": None}
+    parent = None
+    for i in range(messages):
+        message_id = str(uuid.uuid4())
+        history["messages"][message_id] = {
+            "id": message_id,
+            "parentId": parent,
+            "childrenIds": [],
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": " ".join(rng.choices(WORDS, k=size // 5))[:size],
+            "timestamp": 1700000000 + i,
+        }
+        if parent:
+            history["messages"][parent]["childrenIds"].append(message_id)
+        parent = message_id
+    history["currentId"] = parent
+    return {"title": "bench", "history": history}
+
+
+def full_row_upsert(id: str, message_id: str, message: dict):
+    """The upsert as it was before chat_message held pending writes"""
+    chat = Chats.get_chat_by_id(id)
+    history = chat.chat["history"]
+    history["messages"][message_id] = {
+        **history["messages"].get(message_id, {}),
+        **message,
+    }
+    history["currentId"] = message_id
+    ChatMessages.upsert_message(
+        message_id=message_id,
+        chat_id=id,
+        user_id=chat.user_id,
+        data=history["messages"][message_id],
+    )
+    Chats.update_chat_by_id(id, chat.chat)
+
+
+def run(upsert, chat: dict, saves: int):
+    chat_id = Chats.insert_new_chat("bench", ChatForm(chat=chat)).id
+    message_id = str(uuid.uuid4())
+    content = ""
+    start = time.perf_counter()
+    for i in range(saves):
+        content += WORDS[i % len(WORDS)] + " "
+        upsert(chat_id, message_id, {"role": "assistant", "content": content})
+    elapsed = time.perf_counter() - start
+
+    stored = Chats.get_chat_by_id(chat_id).chat["history"]
+    assert stored["messages"][message_id]["content"] == content
+    assert stored["currentId"] == message_id
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1_000)
+    parser.add_argument("--size", type=int, default=2_000)
+    parser.add_argument("--saves", type=int, default=200)
+    args = parser.parse_args()
+
+    chat = build_chat(args.messages, args.size)
+
+    full_s = run(full_row_upsert, chat, args.saves)
+    row_s = run(Chats.upsert_message_to_chat_by_id_and_message_id, chat, args.saves)
+
+    print(f"{args.messages} messages of {args.size} chars, {args.saves} saves")
+    print(f"full chat row   {full_s:8.2f}s  {args.saves / full_s:8.1f} saves/s")
+    print(f"message row     {row_s:8.2f}s  {args.saves / row_s:8.1f} saves/s")
+    print(f"speedup         {full_s / row_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
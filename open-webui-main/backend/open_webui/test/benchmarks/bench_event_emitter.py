@@ -0,0 +1,94 @@
+"""
+Emit status and citation events from concurrent chat responses and measure
+event loop lag, once persisting each event inline on the loop (the former
+__event_emitter__) and once through ChatEventWriter.
+
+Point DATA_DIR at a scratch directory, the benchmark creates chats there:
+
+    DATA_DIR=/tmp/bench python -m open_webui.test.benchmarks.bench_event_emitter
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from open_webui.test.benchmarks.bench_chat_messages import build_chat
+from open_webui.models.chats import ChatForm, Chats
+from open_webui.utils.chat_save import ChatEventWriter, apply_chat_event
+from open_webui.utils.event_loop import EVENT_LOOP_LAG_STATS, monitor_event_loop_lag
+
+
+def inline_persist(chat_id: str, message_id: str, event: dict):
+    """One read and one write per event, as __event_emitter__ used to do"""
+    message = Chats.get_message_by_id_and_message_id(chat_id, message_id)
+    fields = apply_chat_event(message, event)
+    if fields is not None:
+        Chats.upsert_message_to_chat_by_id_and_message_id(chat_id, message_id, fields)
+
+
+def events(n: int):
+    for i in range(n):
+        if i % 3:
+            yield {"type": "status", "data": {"action": "web_search", "step": i}}
+        else:
+            yield {"type": "citation", "data": {"source": {"name": f"doc {i}"}}}
+
+
+async def respond(persist, chat_id: str, message_id: str, n: int):
+    for event in events(n):
+        persist(chat_id, message_id, event)
+        # Streaming the response between events
+        await asyncio.sleep(0.005)
+
+
+async def run(mode: str, chats: list[str], n: int):
+    writer = ChatEventWriter()
+    persist = inline_persist if mode == "inline" else writer.enqueue
+    message_ids = [str(uuid.uuid4()) for _ in chats]
+    for chat_id, message_id in zip(chats, message_ids):
+        Chats.upsert_message_to_chat_by_id_and_message_id(
+            chat_id, message_id, {"role": "assistant", "content": ""}
+        )
+
+    EVENT_LOOP_LAG_STATS["max"] = 0.0
+    monitor = asyncio.create_task(monitor_event_loop_lag(0.01))
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[respond(persist, *ids, n) for ids in zip(chats, message_ids)]
+    )
+    emitted = time.perf_counter() - start
+    await writer.close()
+    total = time.perf_counter() - start
+    monitor.cancel()
+
+    for chat_id, message_id in zip(chats, message_ids):
+        message = Chats.get_message_by_id_and_message_id(chat_id, message_id)
+        assert len(message["statusHistory"]) + len(message["sources"]) == n
+    return emitted, total, EVENT_LOOP_LAG_STATS["max"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--events", type=int, default=60)
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+
+    chat = build_chat(args.messages, 2_000)
+    chats = [
+        Chats.insert_new_chat("bench", ChatForm(chat=chat)).id
+        for _ in range(args.chats)
+    ]
+
+    print(f"{args.chats} chats x {args.events} events")
+    for mode in ["inline", "writer"]:
+        emitted, total, lag = asyncio.run(run(mode, chats, args.events))
+        print(
+            f"{mode:8} emitted in {emitted:6.2f}s, persisted in {total:6.2f}s,"
+            f" max loop lag {lag * 1000:8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Fuse, threshold and cut BM25 and vector search candidates, once the former
+way (a Document and SHA-256 per candidate, EnsembleRetriever RRF, sorted
+tuples) and once with open_webui.retrieval.fusion on arrays. Then merge the
+results of several collections with the former and the current
+merge_and_sort_query_results.
+
+    python -m open_webui.test.benchmarks.bench_hybrid_fusion [--k N]
+"""
+
+import argparse
+import hashlib
+import operator
+import random
+import time
+
+import numpy as np
+from langchain_classic.retrievers import EnsembleRetriever
+from langchain_core.documents import Document
+
+from open_webui.retrieval.fusion import reciprocal_rank_fusion, top_k
+from open_webui.retrieval.utils import (
+    CHUNK_HASH_KEY,
+    get_content_hash,
+    merge_and_sort_query_results,
+)
+
+
+def candidates(rng: random.Random, chunks: list[str], k: int):
+    """k BM25 and k vector results, half of them found by both"""
+    bm25 = rng.sample(range(len(chunks)), k)
+    vector = bm25[: k // 2] + rng.sample(range(len(chunks)), k - k // 2)
+    rng.shuffle(vector)
+    return bm25, vector
+
+
+def former_fusion(chunks, metadatas, bm25, vector, scores, k, r):
+    def documents(ranking):
+        return [
+            Document(
+                page_content=chunks[idx],
+                metadata={
+                    **metadatas[idx],
+                    CHUNK_HASH_KEY: hashlib.sha256(chunks[idx].encode()).hexdigest(),
+                },
+            )
+            for idx in ranking
+        ]
+
+    ensemble = EnsembleRetriever(
+        retrievers=[], weights=[0.5, 0.5], id_key=CHUNK_HASH_KEY
+    )
+    fused = ensemble.weighted_reciprocal_rank([documents(bm25), documents(vector)])
+    docs_with_scores = [
+        (doc, score)
+        for doc, score in zip(fused, scores[: len(fused)].tolist())
+        if score >= r
+    ]
+    result = sorted(docs_with_scores, key=operator.itemgetter(1), reverse=True)
+    return [doc.page_content for doc, _ in result[:k]]
+
+
+def fusion(chunks, metadatas, bm25, vector, scores, k, r):
+    # Hashes come from the stored metadata
+    texts, positions, rankings = [], {}, []
+    for ranking in (bm25, vector):
+        ids = []
+        for idx in ranking:
+            chunk_hash = metadatas[idx][CHUNK_HASH_KEY]
+            if chunk_hash not in positions:
+                positions[chunk_hash] = len(texts)
+                texts.append(chunks[idx])
+            ids.append(positions[chunk_hash])
+        rankings.append(np.array(ids, dtype=np.int64))
+
+    order, _ = reciprocal_rank_fusion(rankings, [0.5, 0.5])
+    selected = top_k(scores[: len(order)], k, threshold=r)
+    return [texts[order[idx]] for idx in selected]
+
+
+def former_merge(query_results, k):
+    combined = {}
+    for data in query_results:
+        for distance, document, metadata in zip(
+            data["distances"][0], data["documents"][0], data["metadatas"][0]
+        ):
+            doc_hash = hashlib.sha256(document.encode()).hexdigest()
+            if doc_hash not in combined or distance > combined[doc_hash][0]:
+                combined[doc_hash] = (distance, document, metadata)
+    combined = sorted(combined.values(), key=lambda x: x[0], reverse=True)
+    return [document for _, document, _ in combined[:k]]
+
+
+def timed(function, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = function()
+    return (time.perf_counter() - start) / runs, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--k", type=int, default=1_000)
+    parser.add_argument("--collections", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    chunks = [
+        " ".join(f"w{rng.randint(0, 5_000)}" for _ in range(rng.randint(100, 300)))
+        for _ in range(args.chunks)
+    ]
+    metadatas = [
+        {"file_id": f"file-{i // 50}", CHUNK_HASH_KEY: get_content_hash(chunk)}
+        for i, chunk in enumerate(chunks)
+    ]
+    bm25, vector = candidates(rng, chunks, args.k)
+    # Rerank scores, distinct so both ways agree on the order
+    scores = np.array(rng.sample(range(10 * args.k), 2 * args.k)) / (10 * args.k)
+    k, r = 10, 0.3
+
+    former_s, expected = timed(
+        lambda: former_fusion(chunks, metadatas, bm25, vector, scores, k, r), args.runs
+    )
+    fusion_s, found = timed(
+        lambda: fusion(chunks, metadatas, bm25, vector, scores, k, r), args.runs
+    )
+    assert found == expected, (found, expected)
+
+    query_results = []
+    for _ in range(args.collections):
+        ids = rng.sample(range(args.chunks), args.k)
+        query_results.append(
+            {
+                "distances": [[rng.random() for _ in ids]],
+                "documents": [[chunks[idx] for idx in ids]],
+                "metadatas": [[metadatas[idx] for idx in ids]],
+            }
+        )
+    former_merge_s, expected = timed(lambda: former_merge(query_results, k), args.runs)
+    merge_s, merged = timed(
+        lambda: merge_and_sort_query_results(query_results, k), args.runs
+    )
+    assert merged["documents"][0] == expected
+
+    print(f"{args.k} BM25 + {args.k} vector candidates, k={k}, r={r}")
+    print(f"former fusion and rerank cut {former_s * 1000:8.2f}ms")
+    print(f"array fusion and rerank cut  {fusion_s * 1000:8.2f}ms")
+    print(f"speedup                      {former_s / fusion_s:8.1f}x")
+    print(f"{args.collections} collections x {args.k} results")
+    print(f"former merge and sort        {former_merge_s * 1000:8.2f}ms")
+    print(f"merge_and_sort_query_results {merge_s * 1000:8.2f}ms")
+    print(f"speedup                      {former_merge_s / merge_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Ingest a large synthetic document with simulated embedding and vector
+database latencies, once the former way (split everything, embed
+everything, one insert) and once through ingest_chunks. Reports wall time,
+then peak traced memory without latencies, then resumes an ingestion
+interrupted halfway.
+
+    python -m open_webui.test.benchmarks.bench_ingest [--pages N]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from open_webui.retrieval.ingest import batched, get_chunk_id, ingest_chunks
+
+
+class Interrupted(Exception):
+    pass
+
+
+def pages(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    for page in range(count):
+        words = (f"w{rng.randint(0, 20_000)}" for _ in range(rng.randint(400, 600)))
+        yield Document(page_content=" ".join(words), metadata={"page": page})
+
+
+def make_embed(latency: float, dimensions: int):
+    def embed(texts):
+        # Per request latency plus a little per chunk, like a remote API
+        time.sleep(latency + 0.0002 * len(texts))
+        return [[float(len(text) % 97)] * dimensions for text in texts]
+
+    return embed
+
+
+def make_write(latency: float, store: dict):
+    def write(items):
+        # Index maintenance grows with the batch, as in Chroma or pgvector
+        time.sleep(latency + 0.0005 * len(items))
+        for item in items:
+            store[item["id"]] = (item["text"], len(item["vector"]))
+
+    return write
+
+
+def items(chunks, document_hash="doc"):
+    for position, chunk in enumerate(chunks):
+        yield {
+            "id": get_chunk_id(
+                "bench", document_hash, position, str(hash(chunk.page_content))
+            ),
+            "text": chunk.page_content,
+            "metadata": chunk.metadata,
+        }
+
+
+def former(splitter, args, store):
+    embed = make_embed(args.embed_latency, args.dimensions)
+    write = make_write(args.write_latency, store)
+
+    docs = splitter.split_documents(list(pages(args.pages)))
+    all_items = list(items(docs))
+    vectors = []
+    # The embedding function batches requests internally
+    for batch in batched([item["text"] for item in all_items], args.batch_size):
+        vectors.extend(embed(batch))
+    write([{**item, "vector": v} for item, v in zip(all_items, vectors)])
+
+
+def pipelined(splitter, args, store, skip_ids=None, stop_after=None):
+    chunks = (
+        chunk
+        for page in pages(args.pages)
+        for chunk in splitter.split_documents([page])
+    )
+    write = make_write(args.write_latency, store)
+    if stop_after is not None:
+
+        def write(items, write=write):
+            if len(store) >= stop_after:
+                raise Interrupted()
+            write(items)
+
+    return ingest_chunks(
+        items(chunks),
+        embed=make_embed(args.embed_latency, args.dimensions),
+        write=write,
+        batch_size=args.batch_size,
+        skip_ids=skip_ids,
+    )
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--embed-latency", type=float, default=0.15)
+    parser.add_argument("--write-latency", type=float, default=0.08)
+    args = parser.parse_args()
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000, chunk_overlap=100, add_start_index=True
+    )
+
+    former_store, store = {}, {}
+    former_s = timed(lambda: former(splitter, args, former_store))
+    pipelined_s = timed(lambda: pipelined(splitter, args, store))
+    assert former_store == store
+
+    no_latency = argparse.Namespace(
+        **{**vars(args), "embed_latency": 0, "write_latency": 0}
+    )
+    former_peak = peak_memory(lambda: former(splitter, no_latency, {}))
+    peak = peak_memory(lambda: pipelined(splitter, no_latency, {}))
+
+    # Interrupt halfway, then run again
+    resumed = {}
+    try:
+        pipelined(splitter, args, resumed, stop_after=len(store) // 2)
+    except Interrupted:
+        pass
+    stored_before = len(resumed)
+    start = time.perf_counter()
+    stats = pipelined(splitter, args, resumed, skip_ids=set(resumed))
+    resume_s = time.perf_counter() - start
+    assert resumed == store
+
+    print(f"{args.pages} pages, {len(store)} chunks, batches of {args.batch_size}")
+    print(f"former     {former_s:7.2f}s  peak {former_peak / 2**20:8.1f}MiB")
+    print(f"pipelined  {pipelined_s:7.2f}s  peak {peak / 2**20:8.1f}MiB")
+    print(
+        f"resumed    {resume_s:7.2f}s  after {stored_before} stored chunks,"
+        f" {stats['skipped']} skipped"
+    )
+
+
+if __name__ == "__main__":
+    main()
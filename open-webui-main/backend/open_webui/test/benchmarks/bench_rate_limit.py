@@ -0,0 +1,115 @@
+"""
+Throughput of the rate limiter against fakeredis (with lupa for the Lua
+script) under concurrent requests. The former limiter did an INCR, an
+EXPIRE on the first hit and an MGET over window / bucket_size + 1 keys with
+the synchronous client, blocking the event loop for each; the current one
+runs one GCRA script with the async client. Each Redis round trip is given
+a fixed latency.
+
+    python -m open_webui.test.benchmarks.bench_rate_limit [--checks N]
+"""
+
+import argparse
+import asyncio
+import time
+
+import fakeredis
+
+from open_webui.env import REDIS_KEY_PREFIX
+from open_webui.utils.rate_limit import RateLimiter
+
+
+class SlowRedis(fakeredis.FakeRedis):
+    latency = 0.0
+    calls = 0
+
+    def execute_command(self, *args, **kwargs):
+        SlowRedis.calls += 1
+        time.sleep(self.latency)
+        return super().execute_command(*args, **kwargs)
+
+
+class SlowAsyncRedis(fakeredis.FakeAsyncRedis):
+    latency = 0.0
+    calls = 0
+
+    async def execute_command(self, *args, **kwargs):
+        SlowAsyncRedis.calls += 1
+        await asyncio.sleep(self.latency)
+        return await super().execute_command(*args, **kwargs)
+
+
+class FormerRateLimiter:
+    def __init__(self, redis_client, limit: int, window: int, bucket_size: int = 60):
+        self.r = redis_client
+        self.limit = limit
+        self.window = window
+        self.bucket_size = bucket_size
+        self.num_buckets = window // bucket_size
+
+    def _bucket_key(self, key: str, bucket_index: int) -> str:
+        return f"{REDIS_KEY_PREFIX}:ratelimit:{key.lower()}:{bucket_index}"
+
+    async def is_limited(self, key: str) -> bool:
+        now_bucket = int(time.time()) // self.bucket_size
+        bucket_key = self._bucket_key(key, now_bucket)
+
+        attempts = self.r.incr(bucket_key)
+        if attempts == 1:
+            self.r.expire(bucket_key, self.window + self.bucket_size)
+
+        buckets = [
+            self._bucket_key(key, now_bucket - i) for i in range(self.num_buckets + 1)
+        ]
+        counts = self.r.mget(buckets)
+        return sum(int(c) for c in counts if c) > self.limit
+
+
+async def run(limiter, checks: int, concurrency: int, keys: int) -> float:
+    queue = iter(range(checks))
+
+    async def worker():
+        for idx in queue:
+            await limiter.is_limited(f"user-{idx % keys}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--keys", type=int, default=100)
+    parser.add_argument("--window", type=int, default=180)
+    parser.add_argument("--latency", type=float, default=0.0002)
+    args = parser.parse_args()
+
+    SlowRedis.latency = SlowAsyncRedis.latency = args.latency
+    limiters = {
+        "former": FormerRateLimiter(SlowRedis(), limit=1_000_000, window=args.window),
+        "gcra": RateLimiter(
+            "bench",
+            limit=1_000_000,
+            window=args.window,
+            redis_client=SlowAsyncRedis(),
+        ),
+    }
+
+    print(
+        f"{args.checks} checks over {args.keys} keys, {args.concurrency} concurrent,"
+        f" {args.window}s window, {args.latency * 1000:.1f}ms per Redis call"
+    )
+    for label, limiter in limiters.items():
+        SlowRedis.calls = SlowAsyncRedis.calls = 0
+        seconds = await run(limiter, args.checks, args.concurrency, args.keys)
+        calls = SlowRedis.calls + SlowAsyncRedis.calls
+        print(
+            f"{label:7} {args.checks / seconds:9.0f} checks/s"
+            f"  {calls / args.checks:5.2f} Redis calls/check"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Replay a 20k-token streamed response (reasoning, text and tool calls) and
+time rendering the content after every delta, once with serialize_output()
+and once with OutputSerializer.
+
+    python -m open_webui.test.benchmarks.bench_serialize_output [--tokens N]
+"""
+
+import argparse
+import random
+import time
+
+from open_webui.utils.middleware import OutputSerializer, serialize_output
+
+WORDS = (
+    "the model considers whether a <tool> call is needed before answering "
+    'and quotes "inputs" & escapes them so the rendered HTML stays valid'
+).split()
+
+
+def recorded_stream(tokens: int, seed: int = 0):
+    """
+    Yield the output list after each delta, the way the streaming handler
+    sees it: items appended, the tail item's text extended, tool results
+    arriving and earlier items being completed.
+    """
+    rng = random.Random(seed)
+    output = []
+    emitted = 0
+    turn = 0
+    while emitted < tokens:
+        turn += 1
+
+        reasoning = {
+            "type": "reasoning",
+            "status": "in_progress",
+            "content": [{"type": "output_text", "text": ""}],
+            "summary": None,
+        }
+        output.append(reasoning)
+        for _ in range(rng.randint(200, 800)):
+            reasoning["content"][0]["text"] += rng.choice(WORDS) + " "
+            if rng.random() < 0.05:
+                reasoning["content"][0]["text"] += "\n"
+            emitted += 1
+            yield output
+
+        reasoning["status"] = "completed"
+        reasoning["duration"] = rng.randint(1, 30)
+
+        text = {
+            "type": "message",
+            "status": "in_progress",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": ""}],
+        }
+        output.append(text)
+        for _ in range(rng.randint(100, 400)):
+            text["content"][0]["text"] += rng.choice(WORDS) + " "
+            emitted += 1
+            yield output
+        text["status"] = "completed"
+
+        call_id = f"call_{turn}"
+        call = {
+            "type": "function_call",
+            "call_id": call_id,
+            "name": "web_search",
+            "arguments": "",
+            "status": "in_progress",
+        }
+        output.append(call)
+        for word in ('{"query": "' + " ".join(rng.choices(WORDS, k=20)) + '"}').split(
+            " "
+        ):
+            call["arguments"] += word + " "
+            emitted += 1
+            yield output
+
+        output.append(
+            {
+                "type": "function_call_output",
+                "call_id": call_id,
+                "output": [
+                    {"type": "input_text", "text": " ".join(rng.choices(WORDS, k=400))}
+                ],
+                "status": "completed",
+            }
+        )
+        call["status"] = "completed"
+        yield output
+
+
+def run(render, tokens: int):
+    deltas = 0
+    chars = 0
+    start = time.perf_counter()
+    for output in recorded_stream(tokens):
+        chars = len(render(output))
+        deltas += 1
+    return time.perf_counter() - start, deltas, chars
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=20_000)
+    args = parser.parse_args()
+
+    incremental = OutputSerializer()
+    for output in recorded_stream(2_000, seed=1):
+        assert incremental(output) == serialize_output(output)
+
+    full_s, deltas, chars = run(serialize_output, args.tokens)
+    inc_s, _, _ = run(OutputSerializer(), args.tokens)
+
+    print(f"{deltas} deltas, {chars} chars of final content")
+    print(f"serialize_output  {full_s:8.2f}s  {deltas / full_s:10.0f} deltas/s")
+    print(f"OutputSerializer  {inc_s:8.2f}s  {deltas / inc_s:10.0f} deltas/s")
+    print(f"speedup           {full_s / inc_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Time to first token of chat completions streamed from a local fake
+OpenAI-compatible server over TLS, with a new aiohttp session per request
+(the former way) and with the pooled sessions of utils/http_client.py.
+
+    python -m open_webui.test.benchmarks.bench_upstream_pool [--requests N]
+"""
+
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import json
+import os
+import ssl
+import statistics
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from open_webui.utils.http_client import ClientSessionPool
+
+
+def server_ssl_context(directory: str) -> ssl.SSLContext:
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName(
+                [x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]
+            ),
+            critical=False,
+        )
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        )
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+async def chat_completions(request):
+    await request.read()
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    for token in ("Hello", " there", "!"):
+        chunk = {"choices": [{"delta": {"content": token}}]}
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+    await response.write(b"data: [DONE]\n\n")
+    return response
+
+
+async def start_server(context: ssl.SSLContext):
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0, ssl_context=context)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"https://127.0.0.1:{port}/v1"
+
+
+async def stream_first_token(session: aiohttp.ClientSession, url: str) -> float:
+    payload = json.dumps({"model": "fake", "stream": True, "messages": []})
+    start = time.perf_counter()
+    r = await session.request(
+        method="POST",
+        url=f"{url}/chat/completions",
+        data=payload,
+        headers={"Content-Type": "application/json"},
+        ssl=False,
+        timeout=aiohttp.ClientTimeout(total=30),
+    )
+    try:
+        first = None
+        async for line in r.content:
+            if first is None and line.startswith(b"data:"):
+                first = time.perf_counter() - start
+        return first
+    finally:
+        r.close()
+
+
+async def former(url: str) -> float:
+    session = aiohttp.ClientSession(trust_env=True)
+    try:
+        return await stream_first_token(session, url)
+    finally:
+        await session.close()
+
+
+async def run(args, url: str, request) -> list[float]:
+    timings = []
+    for _ in range(args.requests // args.concurrency):
+        timings.extend(
+            await asyncio.gather(*(request(url) for _ in range(args.concurrency)))
+        )
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{label:10} ttft p50 {statistics.median(timings) * 1000:6.2f}ms"
+        f"  p95 {p95 * 1000:6.2f}ms  mean {statistics.mean(timings) * 1000:6.2f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        runner, url = await start_server(server_ssl_context(directory))
+
+    pool = ClientSessionPool()
+    try:
+        # Warm up both paths once
+        await former(url)
+        await stream_first_token(pool.get_session(url), url)
+
+        former_timings = await run(args, url, former)
+        pooled_timings = await run(
+            args, url, lambda url: stream_first_token(pool.get_session(url), url)
+        )
+    finally:
+        await pool.close()
+        await runner.cleanup()
+
+    print(
+        f"{args.requests} streamed chat completions over TLS, {args.concurrency} at a time"
+    )
+    report("former", former_timings)
+    report("pooled", pooled_timings)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+"""
+Storage and join cost of a collaborative note with many edits, against
+fakeredis. The former YdocManager stored each update as a JSON list of
+ints with an LLEN per update, and every join replayed the stored updates
+into a new Y.Doc sent back as a JSON list. The current one stores raw
+bytes with a compacted snapshot, keeps the document materialized and
+sends joining clients only what their state vector misses. Redis round
+trips are counted and given a fixed latency.
+
+    python -m open_webui.test.benchmarks.bench_ydoc [--edits N]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import fakeredis
+import pycrdt as Y
+
+from open_webui.socket.utils import YdocManager
+
+
+class SlowRedis(fakeredis.FakeAsyncRedis):
+    latency = 0.0
+    calls = 0
+
+    async def call(self):
+        SlowRedis.calls += 1
+        await asyncio.sleep(self.latency)
+
+    async def execute_command(self, *args, **kwargs):
+        await self.call()
+        return await super().execute_command(*args, **kwargs)
+
+    def pipeline(self, *args, **kwargs):
+        pipe = super().pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def slow_execute(*args, **kwargs):
+            await self.call()
+            return await execute(*args, **kwargs)
+
+        pipe.execute = slow_execute
+        return pipe
+
+
+class FormerYdocManager:
+    COMPACTION_THRESHOLD = 500
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._redis_key_prefix = "former"
+
+    async def append_to_updates(self, document_id: str, update: bytes):
+        redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
+        await self._redis.rpush(redis_key, json.dumps(list(update)))
+        list_len = await self._redis.llen(redis_key)
+        if list_len >= self.COMPACTION_THRESHOLD:
+            await self._compact_updates_redis(document_id)
+
+    async def _compact_updates_redis(self, document_id: str):
+        redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
+        all_updates = await self._redis.lrange(redis_key, 0, -1)
+        if len(all_updates) <= 1:
+            return
+        mid = len(all_updates) // 2
+        ydoc = Y.Doc()
+        for raw in all_updates[:mid]:
+            ydoc.apply_update(bytes(json.loads(raw)))
+        snapshot = json.dumps(list(ydoc.get_update()))
+        pipe = self._redis.pipeline()
+        pipe.delete(redis_key)
+        pipe.rpush(redis_key, snapshot, *all_updates[mid:])
+        await pipe.execute()
+
+    async def join(self, document_id: str, state_vector: bytes) -> str:
+        redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
+        updates = await self._redis.lrange(redis_key, 0, -1)
+        ydoc = Y.Doc()
+        for update in updates:
+            ydoc.apply_update(bytes(json.loads(update)))
+        return json.dumps({"state": list(ydoc.get_update())})
+
+    async def stored_bytes(self, document_id: str) -> int:
+        redis_key = f"{self._redis_key_prefix}:{document_id}:updates"
+        return sum(len(value) for value in await self._redis.lrange(redis_key, 0, -1))
+
+
+class CurrentYdocManager(YdocManager):
+    async def join(self, document_id: str, state_vector: bytes) -> bytes:
+        return await self.get_state(document_id, state_vector)
+
+    async def stored_bytes(self, document_id: str) -> int:
+        state = await self._binary_redis.hget(self._snapshot_key(document_id), "state")
+        log = await self._binary_redis.lrange(self._log_key(document_id), 0, -1)
+        return len(state or b"") + sum(len(update) for update in log)
+
+
+def make_edits(count: int) -> tuple[list[bytes], list[bytes]]:
+    """Updates of `count` single character edits, and state vectors seen"""
+    rng = random.Random(0)
+    doc = Y.Doc()
+    text = doc.get("prosemirror", type=Y.Text)
+    updates = []
+    doc.observe(lambda event: updates.append(event.update))
+    state_vectors = []
+    for idx in range(count):
+        if len(text) > 10 and rng.random() < 0.1:
+            del text[rng.randrange(len(text))]
+        else:
+            text.insert(rng.randrange(len(text) + 1), rng.choice("abcdefgh "))
+        if idx % (count // 10) == 0:
+            state_vectors.append(doc.get_state())
+    return updates, state_vectors
+
+
+async def run(manager, updates, state_vectors, joins: int):
+    SlowRedis.calls = 0
+    start = time.perf_counter()
+    for update in updates:
+        await manager.append_to_updates("note_1", update)
+    append_seconds = time.perf_counter() - start
+    append_calls = SlowRedis.calls
+
+    payload = 0
+    SlowRedis.calls = 0
+    start = time.perf_counter()
+    for idx in range(joins):
+        # Reconnecting clients that saw part of the note, and new ones
+        state_vector = state_vectors[idx % len(state_vectors)] if idx % 2 else None
+        payload += len(await manager.join("note_1", state_vector))
+    join_seconds = time.perf_counter() - start
+
+    return (
+        append_seconds / len(updates),
+        append_calls / len(updates),
+        join_seconds / joins,
+        SlowRedis.calls / joins,
+        payload / joins,
+        await manager.stored_bytes("note_1"),
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--edits", type=int, default=50_000)
+    parser.add_argument("--joins", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0002)
+    args = parser.parse_args()
+    SlowRedis.latency = args.latency
+
+    updates, state_vectors = make_edits(args.edits)
+    server = fakeredis.FakeServer()
+    redis = SlowRedis(server=server, decode_responses=True)
+    binary_redis = SlowRedis(server=server)
+    managers = {
+        "former": FormerYdocManager(redis),
+        "current": CurrentYdocManager(
+            redis=redis, redis_key_prefix="current", binary_redis=binary_redis
+        ),
+    }
+
+    print(
+        f"{args.edits} edits of one note, {args.joins} joins"
+        f" (half with a state vector), {args.latency * 1000:.1f}ms per Redis call"
+    )
+    for label, manager in managers.items():
+        append, append_calls, join, join_calls, payload, stored = await run(
+            manager, updates, state_vectors, args.joins
+        )
+        print(
+            f"{label:8} {append * 1000:6.2f}ms/update ({append_calls:.2f} calls)"
+            f"  {join * 1000:7.2f}ms/join ({join_calls:.2f} calls)"
+            f"  {payload / 1024:7.1f}KiB/join  {stored / 1024:7.1f}KiB stored"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
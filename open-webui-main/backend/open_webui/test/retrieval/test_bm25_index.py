@@ -0,0 +1,207 @@
+import random
+
+import pytest
+from rank_bm25 import BM25Okapi
+
+from open_webui.retrieval import bm25
+from open_webui.retrieval.bm25 import (
+    BM25IndexedVectorDB,
+    BM25Indexes,
+    get_metadata_texts,
+)
+from open_webui.retrieval.vector.main import GetResult, VectorDBBase
+
+WORDS = [f"w{i}" for i in range(60)] + ["the", "a", "of"] * 10
+
+
+def random_chunks(rng, n, prefix="c"):
+    ids = [f"{prefix}{i}" for i in range(n)]
+    texts = [" ".join(rng.choices(WORDS, k=rng.randint(1, 40))) for _ in ids]
+    metadatas = [
+        {"file_id": f"f{i % 5}", "name": f"doc_{i % 3}.pdf", "page": i}
+        for i in range(n)
+    ]
+    return ids, texts, metadatas
+
+
+def expected_scores(texts, metadatas, query, enriched=False):
+    if enriched:
+        texts = [
+            " ".join([text, *get_metadata_texts(metadata)])
+            for text, metadata in zip(texts, metadatas)
+        ]
+    return BM25Okapi([t.split() for t in texts]).get_scores(query.split())
+
+
+class MemoryVectorDB(VectorDBBase):
+    """Vector database keeping chunks in a dict"""
+
+    def __init__(self):
+        self.collections = {}
+
+    def has_collection(self, collection_name):
+        return collection_name in self.collections
+
+    def delete_collection(self, collection_name):
+        self.collections.pop(collection_name, None)
+
+    def insert(self, collection_name, items):
+        for item in items:
+            self.collections.setdefault(collection_name, {})[item["id"]] = item
+
+    def upsert(self, collection_name, items):
+        self.insert(collection_name, items)
+
+    def search(self, collection_name, vectors, filter=None, limit=10):
+        raise NotImplementedError
+
+    def query(self, collection_name, filter, limit=None):
+        raise NotImplementedError
+
+    def get(self, collection_name):
+        items = list(self.collections.get(collection_name, {}).values())
+        return GetResult(
+            ids=[[i["id"] for i in items]],
+            documents=[[i["text"] for i in items]],
+            metadatas=[[i["metadata"] for i in items]],
+        )
+
+    def delete(self, collection_name, ids=None, filter=None):
+        items = self.collections.get(collection_name, {})
+        for id, item in list(items.items()):
+            if (ids is not None and id in ids) or (
+                filter and all(item["metadata"].get(k) == v for k, v in filter.items())
+            ):
+                del items[id]
+
+    def reset(self):
+        self.collections = {}
+
+
+class TestBM25Index:
+    """BM25Index must score like BM25Okapi over the live chunks"""
+
+    def assert_matches(self, index, ids, texts, metadatas, query, enriched=False):
+        expected = expected_scores(texts, metadatas, query, enriched)
+        results = index.search(query, k=len(ids), enriched=enriched)
+        found = {r["id"]: r["score"] for r in results}
+
+        matching = {
+            id
+            for id, text, metadata in zip(ids, texts, metadatas)
+            if set(query.split())
+            & set(
+                (
+                    " ".join([text, *get_metadata_texts(metadata)])
+                    if enriched
+                    else text
+                ).split()
+            )
+        }
+        assert set(found) == matching
+        for id, score in zip(ids, expected):
+            if id in found:
+                assert found[id] == pytest.approx(score)
+        assert [r["score"] for r in results] == sorted(found.values(), reverse=True)
+
+    def test_scores_match_bm25okapi(self, tmp_path):
+        rng = random.Random(3)
+        ids, texts, metadatas = random_chunks(rng, 300)
+        index = BM25Indexes(str(tmp_path)).build(
+            "c", GetResult(ids=[ids], documents=[texts], metadatas=[metadatas])
+        )
+        for query in ["w1 w2", "the w3 w3", "doc_1 w5", "missing", "of a the"]:
+            self.assert_matches(index, ids, texts, metadatas, query)
+            self.assert_matches(index, ids, texts, metadatas, query, enriched=True)
+
+    def test_incremental_updates_and_compaction(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(bm25, "MAX_SEGMENTS", 3)
+        rng = random.Random(5)
+        ids, texts, metadatas = random_chunks(rng, 50)
+        indexes = BM25Indexes(str(tmp_path))
+        index = indexes.build(
+            "c", GetResult(ids=[ids], documents=[texts], metadatas=[metadatas])
+        )
+
+        for batch in range(8):
+            new = random_chunks(rng, 20, prefix=f"b{batch}-")
+            index.add(*new)
+            for values, added in zip((ids, texts, metadatas), new):
+                values.extend(added)
+
+            deleted = set(rng.sample(ids, 10))
+            index.delete(ids=sorted(deleted))
+            if batch % 3 == 0:
+                deleted |= {id for id, m in zip(ids, metadatas) if m["file_id"] == "f1"}
+                index.delete(filter={"file_id": "f1"})
+            if batch == 4:
+                deleted |= {id for id, m in zip(ids, metadatas) if m["page"] == 7}
+                index.delete(filter={"page": 7})
+
+            keep = [i for i, id in enumerate(ids) if id not in deleted]
+            ids, texts, metadatas = (
+                [values[i] for i in keep] for values in (ids, texts, metadatas)
+            )
+
+            assert index.size() == len(ids)
+            assert len(index.segments) <= bm25.MAX_SEGMENTS
+            self.assert_matches(index, ids, texts, metadatas, "w1 w7 the")
+
+        # A fresh process sees the same index
+        reopened = BM25Indexes(str(tmp_path)).get("c")
+        self.assert_matches(reopened, ids, texts, metadatas, "w2 doc_2", True)
+
+    def test_unsupported_filter_raises(self, tmp_path):
+        ids, texts, metadatas = random_chunks(random.Random(1), 5)
+        index = BM25Indexes(str(tmp_path)).build(
+            "c", GetResult(ids=[ids], documents=[texts], metadatas=[metadatas])
+        )
+        with pytest.raises(ValueError):
+            index.delete(filter={"file_id": {"$in": ["f1"]}})
+
+
+class TestBM25IndexedVectorDB:
+    """Writes through the client keep an existing index up to date"""
+
+    def items(self, ids, texts, metadatas):
+        return [
+            {"id": id, "text": text, "vector": [0.0], "metadata": metadata}
+            for id, text, metadata in zip(ids, texts, metadatas)
+        ]
+
+    def test_writes_update_index(self, tmp_path):
+        client = BM25IndexedVectorDB(MemoryVectorDB(), BM25Indexes(str(tmp_path)))
+        rng = random.Random(9)
+
+        client.insert("kb", self.items(*random_chunks(rng, 30)))
+        # No index until the collection is first searched
+        assert client.indexes.get("kb") is None
+        index = client.indexes.build(
+            "kb", client.get("kb"), client.indexes.version("kb")
+        )
+
+        client.insert("kb", self.items(*random_chunks(rng, 10, prefix="n")))
+        client.upsert("kb", self.items(["c1"], ["w59 w59"], [{"file_id": "x"}]))
+        client.delete("kb", filter={"file_id": "f2"})
+        client.delete("kb", ids=["n3"])
+
+        stored = client.get("kb")
+        assert index.size() == len(stored.ids[0])
+        assert index.search("w59", k=1)[0]["id"] == "c1"
+        TestBM25Index().assert_matches(
+            index, stored.ids[0], stored.documents[0], stored.metadatas[0], "w4 w8"
+        )
+
+        client.delete_collection("kb")
+        assert client.indexes.get("kb") is None
+
+    def test_stale_build_is_discarded(self, tmp_path):
+        client = BM25IndexedVectorDB(MemoryVectorDB(), BM25Indexes(str(tmp_path)))
+        client.insert("kb", self.items(*random_chunks(random.Random(2), 5)))
+
+        version = client.indexes.version("kb")
+        result = client.get("kb")
+        client.insert("kb", self.items(["late"], ["w1"], [{}]))
+
+        assert client.indexes.build("kb", result, version) is None
+        assert client.indexes.get("kb") is None
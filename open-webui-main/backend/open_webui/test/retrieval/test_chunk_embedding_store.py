@@ -0,0 +1,119 @@
+import uuid
+
+import pytest
+
+from open_webui.models.chunk_embeddings import ChunkEmbeddings
+from open_webui.retrieval import ingest
+from open_webui.retrieval.ingest import (
+    CHUNK_EMBEDDING_STATS,
+    embed_with_chunk_store,
+    get_chunk_embedding_key,
+)
+
+
+class CountingEmbed:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(texts)
+        return [[float(len(text)), 0.25] for text in texts]
+
+
+@pytest.fixture
+def file_ids():
+    ids = []
+    yield lambda: ids.append(str(uuid.uuid4())) or ids[-1]
+    for file_id in ids:
+        ChunkEmbeddings.delete_refs_by_file_id(file_id)
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    monkeypatch.setattr(
+        ingest,
+        "CHUNK_EMBEDDING_STATS",
+        {key: 0 for key in CHUNK_EMBEDDING_STATS},
+    )
+    return ingest.CHUNK_EMBEDDING_STATS
+
+
+def embed_chunks(texts, embed, file_id=None, model="m"):
+    # Tests pass a fresh model, so runs never share stored vectors
+    keys = [get_chunk_embedding_key("", model, "passage: ", text) for text in texts]
+    return embed_with_chunk_store(texts, keys, embed, ChunkEmbeddings, file_id)
+
+
+def test_key_normalizes_whitespace():
+    assert get_chunk_embedding_key("e", "m", None, "a  b\n c ") == (
+        get_chunk_embedding_key("e", "m", None, "a b c")
+    )
+    assert get_chunk_embedding_key("e", "m", None, "a b") != (
+        get_chunk_embedding_key("e", "m2", None, "a b")
+    )
+    assert get_chunk_embedding_key("e", "m", None, "a b") != (
+        get_chunk_embedding_key("e", "m", "query: ", "a b")
+    )
+
+
+def test_identical_chunks_are_embedded_once(file_ids, stats):
+    model = str(uuid.uuid4())
+    embed = CountingEmbed()
+    first, second = file_ids(), file_ids()
+
+    vectors = embed_chunks(["one", "two", "one"], embed, first, model)
+    assert embed.calls == [["one", "two"]]
+    assert vectors == [[3.0, 0.25], [3.0, 0.25], [3.0, 0.25]]
+
+    # Another file, in any collection, reuses the stored vectors
+    vectors = embed_chunks(["two", " one\n", "three"], embed, second, model)
+    assert embed.calls[-1] == ["three"]
+    assert vectors == [[3.0, 0.25], [3.0, 0.25], [5.0, 0.25]]
+    assert stats == {"reused": 3, "computed": 3}
+
+
+def test_embeddings_are_deleted_with_the_last_file(file_ids):
+    model = str(uuid.uuid4())
+    embed = CountingEmbed()
+    first, second = file_ids(), file_ids()
+    embed_chunks(["shared", "first only"], embed, first, model)
+    embed_chunks(["shared"], embed, second, model)
+    keys = [
+        get_chunk_embedding_key("", model, "passage: ", t)
+        for t in ("shared", "first only")
+    ]
+
+    assert ChunkEmbeddings.delete_refs_by_file_id(first) == 1
+    assert list(ChunkEmbeddings.get_vectors_by_hashes(keys)) == [keys[0]]
+
+    assert ChunkEmbeddings.delete_refs_by_file_id(second) == 1
+    assert ChunkEmbeddings.get_vectors_by_hashes(keys) == {}
+
+
+def test_chunks_without_file_are_not_stored():
+    model = str(uuid.uuid4())
+    embed = CountingEmbed()
+    embed_chunks(["web page"], embed, None, model)
+    embed_chunks(["web page"], embed, None, model)
+    assert len(embed.calls) == 2
+
+
+def test_report_counts_saved_calls(file_ids):
+    before = ChunkEmbeddings.get_report()
+    model = str(uuid.uuid4())
+    embed = CountingEmbed()
+    for _ in range(3):
+        embed_chunks(["a", "b"], embed, file_ids(), model)
+
+    report = ChunkEmbeddings.get_report()
+    assert report.embeddings - before.embeddings == 2
+    assert report.references - before.references == 6
+    assert report.files - before.files == 3
+    assert report.embedding_calls_saved - before.embedding_calls_saved == 4
+
+
+def test_missing_embeddings_raise(file_ids):
+    with pytest.raises(ValueError):
+        embed_chunks(
+            [str(uuid.uuid4()), str(uuid.uuid4())], lambda texts: [[1.0]], file_ids()
+        )
@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+from open_webui.retrieval import embedding_cache
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE_STATS, EmbeddingCache
+
+
+class CountingEmbeddings:
+    """Embedding function recording the texts it embeds"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, query, prefix=None, user=None):
+        self.calls.append(query)
+        if isinstance(query, list):
+            return [self.embed(text, prefix) for text in query]
+        return self.embed(query, prefix)
+
+    @staticmethod
+    def embed(text, prefix):
+        return [float(len(text)), float(len(prefix or "")), 0.5]
+
+
+class DictRedis:
+    """The part of the async Redis client EmbeddingCache uses"""
+
+    def __init__(self):
+        self.values = {}
+
+    async def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            async def __aenter__(self):
+                self.commands = []
+                return self
+
+            async def __aexit__(self, *args):
+                pass
+
+            def set(self, key, value, ex=None):
+                self.commands.append((key, value))
+
+            async def execute(self):
+                redis.values.update(self.commands)
+
+        return Pipeline()
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    monkeypatch.setattr(
+        embedding_cache,
+        "EMBEDDING_CACHE_STATS",
+        {key: 0 for key in EMBEDDING_CACHE_STATS},
+    )
+    return embedding_cache.EMBEDDING_CACHE_STATS
+
+
+@pytest.mark.asyncio
+async def test_queries_and_documents_are_cached(stats):
+    embed = CountingEmbeddings()
+    cached = EmbeddingCache(size=100, ttl=60).wrap(embed, "openai", "m")
+
+    assert await cached("query", "q: ") == embed.embed("query", "q: ")
+    assert await cached("query", "q: ") == embed.embed("query", "q: ")
+    # The prefix is part of the key
+    await cached("query")
+    assert embed.calls == ["query", "query"]
+
+    documents = ["a", "bb", "a", "query"]
+    assert await cached(documents) == [embed.embed(t, None) for t in documents]
+    # Only texts not seen before are embedded, once each
+    assert embed.calls[-1] == ["a", "bb"]
+
+    await cached(["bb", "a"])
+    assert len(embed.calls) == 3
+    assert stats == {"hits": 4, "redis_hits": 0, "misses": 5}
+
+
+@pytest.mark.asyncio
+async def test_lru_and_ttl(monkeypatch):
+    embed = CountingEmbeddings()
+    cache = EmbeddingCache(size=2, ttl=60)
+    cached = cache.wrap(embed, "", "m")
+
+    await cached(["a", "b"])
+    await cached("a")
+    await cached("c")  # evicts b, the least recently used
+    await cached(["a", "b"])
+    assert embed.calls[-1] == ["b"]
+
+    now = embedding_cache.time.monotonic()
+    monkeypatch.setattr(embedding_cache.time, "monotonic", lambda: now + 61)
+    await cached("a")
+    assert embed.calls[-1] == "a"
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_is_shared(stats):
+    redis = DictRedis()
+    embed = CountingEmbeddings()
+    await EmbeddingCache(size=10, ttl=60, redis=redis).wrap(embed, "ollama", "m")(
+        ["x", "yy"]
+    )
+
+    # Another instance finds them in Redis
+    other = EmbeddingCache(size=10, ttl=60, redis=redis).wrap(embed, "ollama", "m")
+    assert await other(["yy", "x"]) == [[2.0, 0.0, 0.5], [1.0, 0.0, 0.5]]
+    assert len(embed.calls) == 1
+    assert stats["redis_hits"] == 2
+    assert all(
+        np.frombuffer(value, dtype=np.float32).shape == (3,)
+        for value in redis.values.values()
+    )
+
+
+@pytest.mark.asyncio
+async def test_failed_embeddings_are_not_cached():
+    calls = []
+
+    async def failing(query, prefix=None, user=None):
+        calls.append(query)
+        # Failed batches are dropped from the result
+        return [[1.0]] if isinstance(query, list) else None
+
+    cached = EmbeddingCache(size=10, ttl=60).wrap(failing, "openai", "m")
+    assert await cached("q") is None
+    assert await cached(["a", "b"]) == [[1.0]]
+    assert await cached(["a", "b"]) == [[1.0]]
+    assert calls == ["q", ["a", "b"], ["a", "b"]]
+
+
+def test_disabled():
+    embed = CountingEmbeddings()
+    assert EmbeddingCache(size=0, ttl=60).wrap(embed, "", "m") is embed
@@ -0,0 +1,202 @@
+import random
+
+import numpy as np
+import pytest
+from langchain_classic.retrievers import EnsembleRetriever
+from langchain_core.documents import Document
+
+from open_webui.retrieval import utils
+from open_webui.retrieval.fusion import (
+    cosine_similarity,
+    reciprocal_rank_fusion,
+    top_k,
+)
+from open_webui.retrieval.utils import (
+    CHUNK_HASH_KEY,
+    get_content_hash,
+    merge_and_sort_query_results,
+    query_doc_with_hybrid_search,
+)
+from open_webui.retrieval.vector.main import GetResult, SearchResult
+
+
+def random_rankings(rng, n, sizes):
+    return [np.array(rng.sample(range(n), size)) for size in sizes]
+
+
+class TestReciprocalRankFusion:
+    """Fusion must rank like EnsembleRetriever.weighted_reciprocal_rank"""
+
+    def test_matches_ensemble_retriever(self):
+        rng = random.Random(4)
+        for _ in range(50):
+            rankings = random_rankings(
+                rng, 40, [rng.randint(0, 25), rng.randint(0, 25)]
+            )
+            weights = [rng.random(), rng.random()]
+
+            ensemble = EnsembleRetriever(retrievers=[], weights=weights)
+            expected = ensemble.weighted_reciprocal_rank(
+                [
+                    [Document(page_content=str(idx)) for idx in ranking]
+                    for ranking in rankings
+                ]
+            )
+            candidates, scores = reciprocal_rank_fusion(rankings, weights)
+
+            assert [str(idx) for idx in candidates] == [
+                doc.page_content for doc in expected
+            ]
+            assert np.all(np.diff(scores) <= 0)
+
+    def test_ties_keep_first_appearance(self):
+        candidates, scores = reciprocal_rank_fusion(
+            [np.array([3, 1]), np.array([1, 3])], [0.5, 0.5]
+        )
+        assert candidates.tolist() == [3, 1]
+        assert scores[0] == pytest.approx(scores[1])
+
+    def test_empty(self):
+        candidates, scores = reciprocal_rank_fusion([np.array([], dtype=int)], [1.0])
+        assert len(candidates) == len(scores) == 0
+
+
+class TestTopK:
+    def test_matches_sorted(self):
+        rng = np.random.default_rng(0)
+        for k in [0, 1, 5, 50, 200]:
+            # Rounded so there are ties at the cut
+            scores = np.round(rng.random(100), 1)
+            expected = sorted(range(100), key=lambda i: -scores[i])[:k]
+            assert top_k(scores, k).tolist() == expected
+
+    def test_threshold(self):
+        scores = np.array([0.2, 0.9, 0.5, 0.7, 0.1])
+        assert top_k(scores, 10, threshold=0.5).tolist() == [1, 3, 2]
+        assert top_k(scores, 2, threshold=0.5).tolist() == [1, 3]
+        assert top_k(scores, 10, threshold=0.0).tolist() == [1, 3, 2, 0, 4]
+
+    def test_cosine_similarity(self):
+        similarity = cosine_similarity([1, 0], [[2, 0], [0, 3], [1, 1], [0, 0]])
+        assert similarity == pytest.approx([1.0, 0.0, 2**-0.5, 0.0])
+
+
+def test_merge_and_sort_query_results():
+    results = [
+        {
+            "distances": [[0.9, 0.4, 0.7]],
+            "documents": [["a", "b", "c"]],
+            "metadatas": [[{"n": 1}, {"n": 2}, {"n": 3}]],
+        },
+        {"distances": [], "documents": [], "metadatas": []},
+        {
+            "distances": [[0.5, 0.8, 0.7]],
+            "documents": [["b", "d", "e"]],
+            "metadatas": [[{"n": 4}, {"n": 5}, {"n": 6}]],
+        },
+    ]
+
+    merged = merge_and_sort_query_results(results, k=4)
+    assert merged["documents"] == [["a", "d", "c", "e"]]
+    assert merged["distances"] == [[0.9, 0.8, 0.7, 0.7]]
+
+    # The better of duplicate chunks is kept
+    merged = merge_and_sort_query_results(results, k=10)
+    assert merged["documents"][0][-1] == "b"
+    assert merged["metadatas"][0][-1] == {"n": 4}
+
+    assert merge_and_sort_query_results([], k=3)["documents"] == [[]]
+
+
+class TestHybridSearch:
+    texts = [
+        "apple banana",
+        "banana cherry",
+        "cherry date",
+        "date elderberry",
+        "fig grape",
+    ]
+
+    def collection(self):
+        return GetResult(
+            ids=[[str(i) for i in range(len(self.texts))]],
+            documents=[self.texts],
+            # Chunks stored before the hash was kept in metadata have none
+            metadatas=[
+                [
+                    {"page": i, CHUNK_HASH_KEY: get_content_hash(text)} if i % 2 else {}
+                    for i, text in enumerate(self.texts)
+                ]
+            ],
+        )
+
+    @pytest.fixture
+    def vector_search(self, monkeypatch):
+        order = [2, 1, 4]
+
+        class VectorDB:
+            def search(self, collection_name, vectors, filter=None, limit=10):
+                return SearchResult(
+                    ids=[[str(i) for i in order[:limit]]],
+                    documents=[[self.texts[i] for i in order[:limit]]],
+                    metadatas=[[{"page": i} for i in order[:limit]]],
+                    distances=[[0.0] * len(order[:limit])],
+                )
+
+        VectorDB.texts = self.texts
+        monkeypatch.setattr(utils, "VECTOR_DB_CLIENT", VectorDB())
+
+    @staticmethod
+    async def embedding_function(query, prefix=None, user=None):
+        if isinstance(query, list):
+            return [[len(text), text.count("a")] for text in query]
+        return [10.0, 1.0]
+
+    @pytest.mark.asyncio
+    async def test_reranked_fusion(self, vector_search):
+        reranked = []
+
+        def reranking_function(query, documents, user=None):
+            reranked.extend(doc.page_content for doc in documents)
+            return [float(len(doc.page_content)) for doc in documents]
+
+        result = await query_doc_with_hybrid_search(
+            collection_name="c",
+            collection_result=self.collection(),
+            query="banana cherry",
+            embedding_function=self.embedding_function,
+            k=3,
+            reranking_function=reranking_function,
+            k_reranker=5,
+            r=12.0,
+            hybrid_bm25_weight=0.5,
+        )
+
+        # BM25 finds 0-2, the vector search 2, 1 and 4: fused and deduplicated
+        assert sorted(reranked) == sorted(self.texts[:3] + [self.texts[4]])
+        # Rerank scores at or above r, best first, cut to k
+        assert result["documents"] == [["banana cherry", "apple banana"]]
+        assert result["distances"] == [[13.0, 12.0]]
+        for text, metadata in zip(result["documents"][0], result["metadatas"][0]):
+            assert metadata[CHUNK_HASH_KEY] == get_content_hash(text)
+
+    @pytest.mark.asyncio
+    async def test_vector_only_cosine(self, vector_search):
+        result = await query_doc_with_hybrid_search(
+            collection_name="c",
+            collection_result=self.collection(),
+            query="anything",
+            embedding_function=self.embedding_function,
+            k=3,
+            reranking_function=None,
+            k_reranker=2,
+            r=0.0,
+            hybrid_bm25_weight=0.0,
+        )
+
+        similarity = cosine_similarity(
+            [10.0, 1.0],
+            [[len(self.texts[i]), self.texts[i].count("a")] for i in [2, 1, 4]],
+        )
+        expected = [[2, 1, 4][i] for i in np.argsort(-similarity, kind="stable")[:2]]
+        assert result["documents"] == [[self.texts[i] for i in expected]]
@@ -0,0 +1,156 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from open_webui.retrieval.ingest import get_chunk_id, ingest_chunks
+from open_webui.routers.retrieval import split_docs
+
+
+def make_items(n, prefix="c"):
+    return [
+        {"id": f"{prefix}{i}", "text": f"text {i}", "metadata": {}} for i in range(n)
+    ]
+
+
+def embed(texts):
+    return [[float(len(text))] for text in texts]
+
+
+class TestIngestChunks:
+    def test_batches_are_embedded_and_written_in_order(self):
+        written, progress = [], []
+        stats = ingest_chunks(
+            make_items(10),
+            embed=embed,
+            write=written.append,
+            batch_size=4,
+            progress=progress.append,
+        )
+
+        assert [len(batch) for batch in written] == [4, 4, 2]
+        assert [item["id"] for batch in written for item in batch] == [
+            f"c{i}" for i in range(10)
+        ]
+        assert written[0][0]["vector"] == [6.0]
+        assert stats == {"chunks": 10, "skipped": 0, "batches": 3}
+        assert [p["chunks"] for p in progress] == [4, 8, 10]
+
+    def test_embedding_overlaps_writes_with_backpressure(self):
+        events = []
+        lock = threading.Lock()
+
+        def produce(n):
+            for item in make_items(n):
+                with lock:
+                    events.append(("split", item["id"]))
+                yield item
+
+        def slow_embed(texts):
+            with lock:
+                events.append(("embed", len(texts)))
+            return embed(texts)
+
+        def slow_write(batch):
+            with lock:
+                events.append(("write", batch[0]["id"]))
+            time.sleep(0.05)
+
+        ingest_chunks(
+            produce(12),
+            embed=slow_embed,
+            write=slow_write,
+            batch_size=2,
+            max_pending_batches=1,
+        )
+
+        # The second batch is embedded while the first one is being written
+        assert events.index(("embed", 2), events.index(("write", "c0"))) < events.index(
+            ("write", "c2")
+        )
+        # Chunks are split at most a few batches ahead of the writes
+        for idx, event in enumerate(events):
+            if event[0] == "split":
+                written = sum(e[0] == "write" for e in events[:idx])
+                assert int(event[1][1:]) < (written + 3) * 2
+
+    def test_skip_stored_chunks(self):
+        written = []
+        stats = ingest_chunks(
+            make_items(6),
+            embed=embed,
+            write=written.append,
+            batch_size=2,
+            skip_ids={"c0", "c1", "c3"},
+        )
+        assert [item["id"] for batch in written for item in batch] == ["c2", "c4", "c5"]
+        assert stats["skipped"] == 3
+
+    def test_write_error_stops_ingestion(self):
+        embedded = []
+
+        def failing_write(batch):
+            raise RuntimeError("vector db down")
+
+        def counting_embed(texts):
+            embedded.append(texts)
+            return embed(texts)
+
+        with pytest.raises(RuntimeError, match="vector db down"):
+            ingest_chunks(
+                make_items(100),
+                embed=counting_embed,
+                write=failing_write,
+                batch_size=2,
+                max_pending_batches=1,
+            )
+        assert len(embedded) < 50
+
+    def test_missing_embeddings_raise(self):
+        with pytest.raises(ValueError):
+            ingest_chunks(
+                make_items(4),
+                embed=lambda texts: embed(texts)[:-1],
+                write=lambda batch: None,
+                batch_size=4,
+            )
+
+    def test_chunk_ids_are_stable(self):
+        assert get_chunk_id("c", "h", 0, "x") == get_chunk_id("c", "h", 0, "x")
+        assert (
+            len(
+                {
+                    get_chunk_id("c", "h", 0, "x"),
+                    get_chunk_id("c", "h", 1, "x"),
+                    get_chunk_id("c", "h2", 0, "x"),
+                    get_chunk_id("d", "h", 0, "x"),
+                }
+            )
+            == 4
+        )
+
+
+def test_split_docs_matches_splitting_all_docs():
+    config = SimpleNamespace(
+        ENABLE_MARKDOWN_HEADER_TEXT_SPLITTER=False,
+        TEXT_SPLITTER="character",
+        CHUNK_SIZE=50,
+        CHUNK_OVERLAP=10,
+        CHUNK_MIN_SIZE_TARGET=0,
+    )
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(config=config)))
+    docs = [
+        Document(
+            page_content=" ".join(f"word{i}-{j}" for j in range(40)),
+            metadata={"page": i},
+        )
+        for i in range(5)
+    ]
+
+    expected = RecursiveCharacterTextSplitter(
+        chunk_size=50, chunk_overlap=10, add_start_index=True
+    ).split_documents(docs)
+    assert list(split_docs(request, iter(docs))) == expected
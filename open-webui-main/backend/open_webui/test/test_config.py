@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from open_webui import config
+from open_webui.config import AppConfig, PersistentConfig
+
+
+class CountingRedis:
+    """The part of the sync Redis client AppConfig uses, counting calls"""
+
+    def __init__(self):
+        self.values = {}
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append("get")
+        return self.values.get(key)
+
+    def mget(self, keys):
+        self.calls.append("mget")
+        return [self.values.get(key) for key in keys]
+
+    def set(self, key, value):
+        self.calls.append("set")
+        self.values[key] = value
+
+    def incr(self, key):
+        self.calls.append("incr")
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+        return int(self.values[key])
+
+
+class LocalConfig(PersistentConfig):
+    """A PersistentConfig not stored in the database"""
+
+    def __init__(self, value):
+        self.env_name = "TEST"
+        self.value = value
+
+    def save(self):
+        pass
+
+
+def make_config(redis):
+    app_config = AppConfig()
+    object.__setattr__(app_config, "_redis", redis)
+    object.__setattr__(app_config, "_redis_key_prefix", "test")
+    app_config.CHUNK_SIZE = LocalConfig(1000)
+    app_config.TOP_K = LocalConfig(3)
+    return app_config
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(config.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_reads_are_local_between_checks(clock):
+    redis = CountingRedis()
+    redis.values["test:config:TOP_K"] = json.dumps(5)
+    app_config = make_config(redis)
+
+    for _ in range(50):
+        assert app_config.TOP_K == 5
+        assert app_config.CHUNK_SIZE == 1000
+    assert redis.calls == ["get", "mget"]
+
+    # Once the interval passed, one version check, nothing changed
+    clock[0] += config.CONFIG_REDIS_REFRESH_INTERVAL
+    assert app_config.TOP_K == 5
+    assert redis.calls == ["get", "mget", "get"]
+
+
+def test_changes_from_other_instances_show_after_the_interval(clock):
+    redis = CountingRedis()
+    first, second = make_config(redis), make_config(redis)
+    assert second.CHUNK_SIZE == 1000
+
+    first.CHUNK_SIZE = 500
+    assert first.CHUNK_SIZE == 500
+    assert second.CHUNK_SIZE == 1000
+
+    clock[0] += config.CONFIG_REDIS_REFRESH_INTERVAL
+    assert second.CHUNK_SIZE == 500
+    assert second.TOP_K == 3
+
+
+def test_keys_added_later_are_loaded(clock):
+    redis = CountingRedis()
+    redis.values["test:config:RAG_TEMPLATE"] = json.dumps("from redis")
+    app_config = make_config(redis)
+    assert app_config.TOP_K == 3
+
+    app_config.RAG_TEMPLATE = LocalConfig("default")
+    assert app_config.RAG_TEMPLATE == "from redis"
+
+
+def test_redis_errors_keep_local_values(clock):
+    class FailingRedis(CountingRedis):
+        def get(self, key):
+            raise ConnectionError("redis down")
+
+    app_config = make_config(FailingRedis())
+    assert app_config.TOP_K == 3
+    with pytest.raises(AttributeError):
+        app_config.MISSING
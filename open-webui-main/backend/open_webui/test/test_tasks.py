@@ -0,0 +1,109 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from open_webui import tasks
+from open_webui.env import INSTANCE_ID
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture(params=["local", "redis"])
+def redis(request):
+    if request.param == "redis":
+        return fakeredis.FakeAsyncRedis(decode_responses=True)
+    return None
+
+
+async def settle():
+    # Let the done callbacks run their cleanup
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_active_items_in_one_call(redis):
+    release = asyncio.Event()
+    task_ids = []
+    for chat_id in ("a", "b", "b"):
+        task_id, _ = await tasks.create_task(
+            redis, release.wait(), id=chat_id, model="llama"
+        )
+        task_ids.append(task_id)
+
+    chat_ids = ["a", "missing", "b"]
+    assert await tasks.get_active_chat_ids(redis, chat_ids) == ["a", "b"]
+    assert await tasks.has_active_tasks(redis, "b")
+    assert await tasks.get_active_chat_ids(redis, []) == []
+
+    metadata = await tasks.get_task_metadata(redis)
+    assert metadata[task_ids[0]]["item_id"] == "a"
+    assert metadata[task_ids[0]]["model"] == "llama"
+    assert metadata[task_ids[0]]["node"] == INSTANCE_ID
+    assert (await tasks.get_task_counts_by_node(redis))[INSTANCE_ID] >= 3
+
+    release.set()
+    await settle()
+    assert await tasks.get_active_chat_ids(redis, chat_ids) == []
+    assert not set(task_ids) & set(await tasks.get_task_metadata(redis))
+    assert not set(task_ids) & set(tasks.tasks)
+    if redis:
+        assert await redis.keys(f"{tasks.REDIS_ITEM_TASKS_KEY}:*") == []
+
+
+@pytest.mark.asyncio
+async def test_stopped_tasks_are_no_longer_active():
+    task_id, task = await tasks.create_task(None, asyncio.sleep(60), id="chat")
+    assert await tasks.get_active_chat_ids(None, ["chat"]) == ["chat"]
+
+    result = await tasks.stop_item_tasks(None, "chat")
+    assert result["status"]
+    await settle()
+    assert task.cancelled()
+    assert await tasks.get_active_chat_ids(None, ["chat"]) == []
+    assert task_id not in tasks.task_metadata
+
+
+@pytest.mark.asyncio
+async def test_tasks_of_dead_nodes_are_not_counted():
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    release = asyncio.Event()
+    task_id, _ = await tasks.create_task(redis, release.wait(), id="chat")
+
+    # A node that crashed mid-task: its entry stays until the hash expires
+    stale = time.time() - tasks.REDIS_TASKS_NODE_TIMEOUT - 1
+    await redis.zadd(tasks.REDIS_TASKS_NODES_KEY, {"dead": stale})
+    await redis.hset(
+        tasks.redis_node_meta_key("dead"),
+        "orphan",
+        json.dumps({"item_id": "x", "node": "dead"}),
+    )
+
+    assert await tasks.get_task_counts_by_node(redis) == {INSTANCE_ID: 1}
+    assert "orphan" not in await tasks.get_task_metadata(redis)
+    assert await redis.zscore(tasks.REDIS_TASKS_NODES_KEY, "dead") is None
+    assert 0 < await redis.ttl(tasks.redis_node_meta_key(INSTANCE_ID))
+
+    release.set()
+    await settle()
+    assert task_id not in await tasks.get_task_metadata(redis)
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_the_node_alive():
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    key = tasks.redis_node_meta_key(INSTANCE_ID)
+    # Left over by a previous run of this instance
+    await redis.hset(key, "orphan", json.dumps({"node": INSTANCE_ID}))
+    await redis.zadd(tasks.REDIS_TASKS_NODES_KEY, {INSTANCE_ID: 0})
+
+    app = SimpleNamespace(state=SimpleNamespace(redis=redis))
+    heartbeat = asyncio.create_task(tasks.redis_task_heartbeat(app))
+    await settle()
+    heartbeat.cancel()
+
+    assert await redis.zscore(tasks.REDIS_TASKS_NODES_KEY, INSTANCE_ID) > 0
+    assert await tasks.get_task_metadata(redis) == {}
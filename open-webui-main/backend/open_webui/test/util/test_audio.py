@@ -0,0 +1,136 @@
+import json
+import time
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from open_webui.utils import audio
+from open_webui.utils.audio import FRAME_BYTES, SAMPLE_RATE, AudioChunk, segment_pcm
+
+
+def stt_request(engine: str):
+    config = SimpleNamespace(STT_ENGINE=engine)
+    return SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(config=config)))
+
+
+def tone(seconds: float) -> list[bytes]:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    samples = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16).tobytes()
+    return [
+        samples[idx : idx + FRAME_BYTES] for idx in range(0, len(samples), FRAME_BYTES)
+    ]
+
+
+def silence(seconds: float) -> list[bytes]:
+    return [bytes(FRAME_BYTES)] * int(seconds / audio.FRAME_SECONDS)
+
+
+def test_segments_are_cut_on_silence(tmp_path):
+    frames = tone(6) + silence(1) + tone(3) + silence(0.5) + tone(2)
+    chunks = list(segment_pcm(frames, str(tmp_path), max_seconds=10))
+
+    # The first silence after half the maximum length, then the rest
+    assert [round(chunk.start, 1) for chunk in chunks] == [0.0, 6.3]
+    assert chunks[-1].end == pytest.approx(12.5)
+    for chunk in chunks:
+        with wave.open(chunk.path, "rb") as f:
+            assert f.getframerate() == SAMPLE_RATE
+            assert f.getnchannels() == 1
+            assert f.getnframes() / SAMPLE_RATE == pytest.approx(
+                chunk.end - chunk.start
+            )
+
+
+def test_segments_are_cut_at_the_maximum_length(tmp_path):
+    chunks = list(segment_pcm(tone(25) + silence(2), str(tmp_path), max_seconds=10))
+
+    assert [(chunk.start, chunk.end) for chunk in chunks] == [
+        (0.0, 10.0),
+        (10.0, 20.0),
+        (20.0, pytest.approx(25.3)),
+    ]
+
+
+def test_transcripts_are_yielded_in_order(tmp_path, monkeypatch):
+    audio_path = tmp_path / "recording.wav"
+    audio_path.write_bytes(bytes(2048))
+
+    def stream_audio_segments(file_path, output_dir, max_seconds):
+        for idx in range(6):
+            yield AudioChunk(
+                index=idx, path=f"segment_{idx}", start=idx * 10, end=(idx + 1) * 10
+            )
+
+    def transcription_handler(request, file_path, metadata, user=None):
+        # Later segments finish first
+        index = int(file_path.rsplit("_", 1)[1])
+        time.sleep(0.01 * (6 - index))
+        return {"text": f"part {index}"}
+
+    from open_webui.routers import audio as audio_router
+
+    # Over the size limit of the engine
+    monkeypatch.setattr(audio_router, "MAX_FILE_SIZE", 1024)
+    monkeypatch.setattr(audio_router, "stream_audio_segments", stream_audio_segments)
+    monkeypatch.setattr(audio_router, "transcription_handler", transcription_handler)
+
+    request = stt_request("openai")
+    results = list(audio_router.transcribe_segments(request, str(audio_path)))
+    assert [result["index"] for result in results] == list(range(6))
+    assert results[2] == {"index": 2, "start": 20, "end": 30, "text": "part 2"}
+    assert audio_router.transcribe(request, str(audio_path)) == {
+        "text": "part 0 part 1 part 2 part 3 part 4 part 5"
+    }
+
+
+@pytest.mark.parametrize("engine", ["", "openai"])
+def test_files_within_the_engine_limit_are_sent_whole(tmp_path, monkeypatch, engine):
+    from open_webui.routers import audio as audio_router
+
+    audio_path = tmp_path / "recording.wav"
+    audio_path.write_bytes(bytes(2048))
+    # An hour long, over the size limit for local whisper only
+    monkeypatch.setattr(audio_router, "MAX_FILE_SIZE", 1024 if engine == "" else 4096)
+    monkeypatch.setattr(audio_router, "get_audio_duration", lambda path: 3600.0)
+    monkeypatch.setattr(
+        audio_router, "is_audio_conversion_required", lambda path: False
+    )
+
+    def stream_audio_segments(file_path, output_dir, max_seconds):
+        raise AssertionError("segmented")
+
+    calls = []
+
+    def transcription_handler(request, file_path, metadata, user=None):
+        calls.append(file_path)
+        return {"text": "all of it"}
+
+    monkeypatch.setattr(audio_router, "stream_audio_segments", stream_audio_segments)
+    monkeypatch.setattr(audio_router, "transcription_handler", transcription_handler)
+
+    results = list(
+        audio_router.transcribe_segments(stt_request(engine), str(audio_path))
+    )
+    assert results == [{"index": 0, "start": 0.0, "end": 3600.0, "text": "all of it"}]
+    assert calls == [str(audio_path)]
+
+
+def test_streamed_transcripts_end_with_an_error_line(tmp_path, monkeypatch):
+    from open_webui.routers import audio as audio_router
+
+    def transcribe_segments(request, file_path, metadata=None, user=None):
+        yield {"index": 0, "start": 0, "end": 10, "text": "part 0"}
+        raise HTTPException(status_code=500, detail="Error transcribing chunk: boom")
+
+    monkeypatch.setattr(audio_router, "transcribe_segments", transcribe_segments)
+    lines = [
+        json.loads(line)
+        for line in audio_router.stream_transcripts(None, str(tmp_path / "a.wav"))
+    ]
+    assert lines == [
+        {"index": 0, "start": 0, "end": 10, "text": "part 0"},
+        {"error": "Error transcribing chunk: boom", "done": True},
+    ]
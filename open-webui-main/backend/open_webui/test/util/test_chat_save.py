@@ -0,0 +1,148 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from open_webui.utils.chat_save import (
+    REALTIME_CHAT_SAVE_STATS,
+    ChatEventWriter,
+    RealtimeChatSaver,
+)
+
+
+class TestRealtimeChatSaver:
+    """Realtime saves are coalesced and always flushed at the end"""
+
+    def test_coalesces_until_interval(self):
+        with patch("open_webui.utils.chat_save.Chats") as chats:
+            saver = RealtimeChatSaver("chat", "msg", interval=3600, max_bytes=1 << 20)
+            avoided = REALTIME_CHAT_SAVE_STATS["avoided"]
+            for i in range(100):
+                saver.save({"content": "x" * i})
+
+            chats.upsert_message_to_chat_by_id_and_message_id.assert_not_called()
+            assert REALTIME_CHAT_SAVE_STATS["avoided"] - avoided == 99
+
+            saver.flush()
+            chats.upsert_message_to_chat_by_id_and_message_id.assert_called_once_with(
+                "chat", "msg", {"content": "x" * 99}
+            )
+
+    def test_writes_when_content_grows(self):
+        with patch("open_webui.utils.chat_save.Chats") as chats:
+            saver = RealtimeChatSaver("chat", "msg", interval=3600, max_bytes=10)
+            for i in range(25):
+                saver.save({"content": "x" * i})
+
+            written = [
+                call.args[2]["content"]
+                for call in chats.upsert_message_to_chat_by_id_and_message_id.call_args_list
+            ]
+            assert written == ["x" * 10, "x" * 20]
+
+    def test_zero_interval_saves_every_delta(self):
+        with patch("open_webui.utils.chat_save.Chats") as chats:
+            saver = RealtimeChatSaver("chat", "msg", interval=0, max_bytes=1 << 20)
+            for i in range(5):
+                saver.save({"content": str(i)})
+
+            assert chats.upsert_message_to_chat_by_id_and_message_id.call_count == 5
+
+    def test_flush_merges_pending_fields(self):
+        with patch("open_webui.utils.chat_save.Chats") as chats:
+            saver = RealtimeChatSaver("chat", "msg", interval=3600, max_bytes=1 << 20)
+            saver.save({"content": "partial", "output": []})
+            saver.flush({"content": "final", "usage": {"total_tokens": 3}})
+            saver.flush()
+
+            chats.upsert_message_to_chat_by_id_and_message_id.assert_called_once_with(
+                "chat",
+                "msg",
+                {"content": "final", "output": [], "usage": {"total_tokens": 3}},
+            )
+
+
+class FakeChats:
+    """Message store standing in for Chats, counting reads and writes"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.reads = 0
+        self.writes = 0
+
+    def get_message_by_id_and_message_id(self, chat_id, message_id):
+        self.reads += 1
+        message = self.messages.get(message_id)
+        return dict(message) if message is not None else None
+
+    def upsert_message_to_chat_by_id_and_message_id(self, chat_id, message_id, message):
+        self.writes += 1
+        self.messages[message_id] = {**self.messages.get(message_id, {}), **message}
+
+
+class TestChatEventWriter:
+    """Queued socket events are merged into one write per message"""
+
+    @pytest.mark.asyncio
+    async def test_events_merge_into_one_write(self):
+        chats = FakeChats({"msg": {"content": "a", "sources": [{"id": 0}]}})
+        with patch("open_webui.utils.chat_save.Chats", chats):
+            writer = ChatEventWriter()
+            for event in [
+                {"type": "message", "data": {"content": "b"}},
+                {"type": "status", "data": {"step": 1}},
+                {"type": "citation", "data": {"id": 1}},
+                {"type": "message", "data": {"content": "c"}},
+                {"type": "status", "data": {"step": 2}},
+            ]:
+                writer.enqueue("chat", "msg", event)
+            await writer.flush("chat", "msg")
+
+        assert chats.reads == 1 and chats.writes == 1
+        assert chats.messages["msg"] == {
+            "content": "abc",
+            "statusHistory": [{"step": 1}, {"step": 2}],
+            "sources": [{"id": 0}, {"id": 1}],
+        }
+
+    @pytest.mark.asyncio
+    async def test_replace_creates_missing_message(self):
+        chats = FakeChats({})
+        with patch("open_webui.utils.chat_save.Chats", chats):
+            writer = ChatEventWriter()
+            for event in [
+                {"type": "status", "data": {"step": 1}},
+                {"type": "replace", "data": {"content": "x"}},
+                {"type": "files", "data": {"files": [1]}},
+            ]:
+                writer.enqueue("chat", "msg", event)
+            await writer.close()
+
+        assert chats.messages["msg"] == {"content": "x", "files": [1]}
+
+    @pytest.mark.asyncio
+    async def test_enqueue_does_not_block_the_loop(self):
+        chats = FakeChats({"msg": {"content": ""}})
+        write = chats.upsert_message_to_chat_by_id_and_message_id
+
+        def slow_write(*args):
+            time.sleep(0.2)
+            write(*args)
+
+        chats.upsert_message_to_chat_by_id_and_message_id = slow_write
+
+        with patch("open_webui.utils.chat_save.Chats", chats):
+            writer = ChatEventWriter()
+            start = time.monotonic()
+            for _ in range(50):
+                writer.enqueue(
+                    "chat", "msg", {"type": "message", "data": {"content": "x"}}
+                )
+                await asyncio.sleep(0)
+            elapsed = time.monotonic() - start
+            await writer.flush("chat", "msg")
+
+        assert elapsed < 0.1
+        assert chats.messages["msg"]["content"] == "x" * 50
+        assert chats.writes <= 2
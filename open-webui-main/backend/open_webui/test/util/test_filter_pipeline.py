@@ -0,0 +1,135 @@
+import types
+import uuid
+
+import pytest
+
+from open_webui.models.functions import FunctionForm, FunctionMeta, Functions
+from open_webui.models.users import Users
+from open_webui.utils.filter import (
+    FilterPipeline,
+    get_sorted_filter_ids,
+    process_filter_functions,
+)
+
+FILTER = """
+from pydantic import BaseModel
+
+
+class Filter:
+    class Valves(BaseModel):
+        priority: int = 0
+        suffix: str = "!"
+
+    class UserValves(BaseModel):
+        prefix: str = ""
+
+    def __init__(self):
+        self.valves = self.Valves()
+
+    def inlet(self, body, __user__):
+        body["seen"] = body.get("seen", []) + [self.valves.suffix]
+        return body
+
+    async def stream(self, event, __user__):
+        event["content"] = __user__["valves"].prefix + event["content"] + self.valves.suffix
+        return event
+"""
+
+
+@pytest.fixture
+def request_():
+    state = types.SimpleNamespace(FUNCTIONS={}, FUNCTION_CONTENTS={})
+    return types.SimpleNamespace(app=types.SimpleNamespace(state=state))
+
+
+@pytest.fixture
+def filters():
+    ids = []
+
+    def create(valves=None):
+        id = f"filter_{uuid.uuid4().hex}"
+        ids.append(id)
+        Functions.insert_new_function(
+            "test",
+            "filter",
+            FunctionForm(id=id, name=id, content=FILTER, meta=FunctionMeta()),
+        )
+        Functions.update_function_by_id(id, {"is_active": True})
+        if valves is not None:
+            Functions.update_function_valves_by_id(id, valves)
+        return Functions.get_function_by_id(id)
+
+    yield create
+    for id in ids:
+        Functions.delete_function_by_id(id)
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Count the valves read from the database"""
+    reads = []
+    for name in ("get_function_valves_by_id", "get_user_valves_by_id_and_user_id"):
+        method = getattr(Functions, name)
+
+        def counted(*args, method=method, name=name, **kwargs):
+            reads.append(name)
+            return method(*args, **kwargs)
+
+        monkeypatch.setattr(Functions, name, counted)
+    return reads
+
+
+@pytest.fixture
+def user_params():
+    id = str(uuid.uuid4())
+    Users.insert_new_user(id, "Test", f"{id}@example.com")
+    yield lambda: {"__user__": {"id": id}}
+    Users.delete_user_by_id(id)
+
+
+@pytest.mark.asyncio
+async def test_stream_resolves_valves_once(request_, filters, reads, user_params):
+    first = filters({"suffix": "?"})
+    second = filters()
+    pipeline = FilterPipeline(request_, [first, second], "stream")
+
+    for idx in range(20):
+        event, _ = await pipeline.process({"content": str(idx)}, user_params())
+        assert event["content"] == f"{idx}?!"
+    assert reads.count("get_function_valves_by_id") == 2
+    assert reads.count("get_user_valves_by_id_and_user_id") == 2
+
+
+@pytest.mark.asyncio
+async def test_changed_valves_apply_to_the_next_chunk(
+    request_, filters, reads, user_params
+):
+    filter = filters()
+    pipeline = FilterPipeline(request_, [filter], "stream")
+    event, _ = await pipeline.process({"content": "a"}, user_params())
+    assert event["content"] == "a!"
+
+    Functions.update_function_valves_by_id(filter.id, {"suffix": "."})
+    user_id = user_params()["__user__"]["id"]
+    Functions.update_user_valves_by_id_and_user_id(filter.id, user_id, {"prefix": ">"})
+    event, _ = await pipeline.process({"content": "b"}, user_params())
+    assert event["content"] == ">b."
+    event, _ = await pipeline.process({"content": "c"}, user_params())
+    assert event["content"] == ">c."
+    assert reads.count("get_function_valves_by_id") == 2
+
+
+@pytest.mark.asyncio
+async def test_process_filter_functions_runs_once(request_, filters, user_params):
+    filter = filters({"suffix": "1"})
+    body, _ = await process_filter_functions(
+        request_, [filter, None], "inlet", {}, user_params()
+    )
+    assert body == {"seen": ["1"]}
+
+
+def test_sorted_filter_ids_reads_the_priorities_at_once(request_, filters, reads):
+    low, high = filters({"priority": 5}), filters({"priority": 1})
+    model = {"info": {"meta": {"filterIds": [low.id, high.id, "missing"]}}}
+    assert get_sorted_filter_ids(request_, model) == [high.id, low.id]
+    assert reads == []
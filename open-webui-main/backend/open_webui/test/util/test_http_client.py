@@ -0,0 +1,70 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from open_webui.utils.http_client import ClientSessionPool, get_origin
+
+
+@pytest_asyncio.fixture
+async def server():
+    peers, cookies = [], []
+
+    async def handler(request):
+        peers.append(request.transport.get_extra_info("peername")[1])
+        cookies.append(dict(request.cookies))
+        response = web.json_response({"ok": True})
+        response.set_cookie("upstream", "session")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/v1", peers, cookies
+    await runner.cleanup()
+
+
+def test_origin():
+    assert get_origin("https://API.example.com:8443/v1/chat") == (
+        "https://api.example.com:8443"
+    )
+    assert get_origin("http://localhost:11434") == "http://localhost:11434"
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused(server):
+    url, peers, _ = server
+    pool = ClientSessionPool()
+    try:
+        for _ in range(3):
+            session = pool.get_session(url)
+            async with session.post(f"{url}/chat/completions", json={}) as r:
+                assert (await r.json()) == {"ok": True}
+
+        assert pool.get_session(f"{url}/embeddings") is session
+        assert pool.get_session("http://127.0.0.2:1/v1") is not session
+        # One connection served every request
+        assert len(set(peers)) == 1
+    finally:
+        await pool.close()
+    assert session.closed
+    assert pool.get_session(url) is not session
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_cookies_are_not_shared_between_requests(server):
+    url, _, cookies = server
+    pool = ClientSessionPool()
+    try:
+        session = pool.get_session(url)
+        async with session.post(f"{url}/chat/completions", cookies={"a": "1"}):
+            pass
+        async with session.post(f"{url}/chat/completions"):
+            pass
+    finally:
+        await pool.close()
+    assert cookies == [{"a": "1"}, {}]
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import random
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from fastapi import HTTPException
+
+from open_webui.routers import ollama
+from open_webui.utils import load_balancer
+from open_webui.utils.http_client import CLIENT_SESSION_POOL
+from open_webui.utils.load_balancer import LoadBalancer
+
+
+def balancer(strategy, **kwargs):
+    return LoadBalancer(strategy=strategy, rng=random.Random(0), **kwargs)
+
+
+def test_least_outstanding():
+    lb = balancer("least_outstanding")
+    busy = [lb.start("a"), lb.start("a"), lb.start("b")]
+    assert {lb.choose(["a", "b", "c"]) for _ in range(10)} == {"c"}
+    for request in busy:
+        request.finish()
+    assert lb.nodes["a"].in_flight == 0
+
+
+def test_ewma_prefers_the_faster_node(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(load_balancer.time, "monotonic", lambda: now[0])
+    lb = balancer("ewma")
+    for node, latency in (("slow", 0.5), ("fast", 0.05)):
+        request = lb.start(node)
+        now[0] += latency
+        request.responded()
+        request.finish()
+
+    assert {lb.choose(["slow", "fast"]) for _ in range(10)} == {"fast"}
+    # Until it is busy enough
+    streams = [lb.start("fast") for _ in range(10)]
+    assert lb.choose(["slow", "fast"]) == "slow"
+    assert lb.get_stats()["nodes"]["fast"]["in_flight"] == 10
+    for request in streams:
+        request.finish()
+    assert lb.get_stats()["nodes"]["fast"]["in_flight"] == 0
+    assert lb.choose(["slow", "fast"]) == "fast"
+
+
+@pytest.mark.parametrize("strategy", ["ewma", "p2c"])
+def test_unanswered_node_is_not_flooded(strategy, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(load_balancer.time, "monotonic", lambda: now[0])
+    lb = balancer(strategy)
+    request = lb.start("fast")
+    now[0] += 0.05
+    request.responded()
+    request.finish()
+
+    # "loading" has not answered yet, e.g. still loading the model
+    chosen = []
+    for _ in range(50):
+        chosen.append(lb.choose(["loading", "fast"]))
+        lb.start(chosen[-1])
+    assert 10 < chosen.count("loading") < 40
+    assert lb.nodes["fast"].in_flight > 10
+
+
+def test_p2c_spreads_load():
+    lb = balancer("p2c")
+    nodes = ["a", "b", "c", "d"]
+    for _ in range(40):
+        lb.start(lb.choose(nodes))
+    # Every pick avoids the busier of two nodes, so in-flight stays level
+    in_flight = [lb.nodes[node].in_flight for node in nodes]
+    assert max(in_flight) - min(in_flight) <= 2
+
+
+def test_failing_node_is_ejected_then_retried(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(load_balancer.time, "monotonic", lambda: now[0])
+    lb = balancer("random", failure_threshold=2, cooldown=10)
+
+    lb.start("bad").finish(failed=True)
+    assert "bad" in {lb.choose(["bad", "good"]) for _ in range(20)}
+    lb.start("bad").responded(503)
+    assert {lb.choose(["bad", "good"]) for _ in range(20)} == {"good"}
+    assert lb.get_stats()["nodes"]["bad"]["ejected_for"] == 10
+    # With every node ejected the choice is still made
+    assert lb.choose(["bad"]) == "bad"
+
+    now[0] += 10
+    assert "bad" in {lb.choose(["bad", "good"]) for _ in range(20)}
+    # One more failure ejects it again, a success resets it
+    lb.start("bad").finish(failed=True)
+    assert lb.nodes["bad"].ejections == 2
+    now[0] += 10
+    lb.start("bad").finish()
+    lb.start("bad").finish(failed=True)
+    assert lb.nodes["bad"].ejections == 2
+
+
+@pytest.mark.asyncio
+async def test_streams_stay_in_flight_until_consumed():
+    lb = balancer("least_outstanding")
+
+    async def stream():
+        yield b"a"
+        yield b"b"
+
+    request = lb.start("a")
+    chunks = request.track_stream(stream())
+    assert await chunks.__anext__() == b"a"
+    assert lb.nodes["a"].in_flight == 1
+    assert [chunk async for chunk in chunks] == [b"b"]
+    assert lb.nodes["a"].in_flight == 0
+
+
+@pytest_asyncio.fixture
+async def stub_servers():
+    """Start Ollama stubs answering /api/chat after `delay`, or with `status`"""
+    runners = []
+
+    async def start(delay=0.0, status=200):
+        async def chat(request):
+            await asyncio.sleep(delay)
+            return web.json_response({"done": True}, status=status)
+
+        app = web.Application()
+        app.router.add_post("/api/chat", chat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        runners.append(runner)
+        return f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    yield start
+    await CLIENT_SESSION_POOL.close()
+    for runner in runners:
+        await runner.cleanup()
+
+
+async def chat(lb, urls):
+    url = lb.choose(urls)
+    try:
+        await ollama.send_post_request(
+            url=f"{url}/api/chat", payload=json.dumps({}), stream=False, node=url
+        )
+    except HTTPException:
+        pass
+    return url
+
+
+@pytest.mark.asyncio
+async def test_slow_stub_gets_less_traffic(stub_servers, monkeypatch):
+    slow, fast = await stub_servers(delay=0.05), await stub_servers()
+    lb = balancer("p2c")
+    monkeypatch.setattr(ollama, "OLLAMA_LOAD_BALANCER", lb)
+
+    chosen = []
+    for _ in range(5):
+        chosen += await asyncio.gather(*(chat(lb, [slow, fast]) for _ in range(4)))
+
+    assert chosen.count(fast) > 2 * chosen.count(slow)
+    stats = lb.get_stats()["nodes"]
+    assert stats[slow]["latency_ewma"] > stats[fast]["latency_ewma"]
+    assert stats[slow]["in_flight"] == stats[fast]["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failing_stub_is_ejected(stub_servers, monkeypatch):
+    failing, healthy = await stub_servers(status=500), await stub_servers()
+    lb = balancer("random", failure_threshold=2, cooldown=60)
+    monkeypatch.setattr(ollama, "OLLAMA_LOAD_BALANCER", lb)
+
+    chosen = [await chat(lb, [failing, healthy]) for _ in range(20)]
+    assert chosen.count(failing) == 2
+    assert lb.get_stats()["nodes"][failing]["errors"] == 2
@@ -0,0 +1,211 @@
+import types
+import uuid
+
+import pytest
+
+from open_webui.models import access_grants, functions
+from open_webui.models import models as models_model
+from open_webui.models.models import ModelForm, ModelMeta, ModelParams, Models
+from open_webui.socket import utils as socket_utils
+from open_webui.socket.utils import RedisDict
+from open_webui.utils import model_registry
+from open_webui.utils import models as utils_models
+from open_webui.utils.model_registry import ModelRegistry
+
+
+class FakeRedis:
+    """The part of the sync Redis client RedisDict and ModelRegistry use"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.values = {}
+        self.written = []
+
+    def hlen(self, name):
+        return len(self.hashes.get(name, {}))
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        mapping = mapping or {key: value}
+        self.written.extend(mapping)
+        self.hashes.setdefault(name, {}).update(mapping)
+
+    def hdel(self, name, *keys):
+        self.written.extend(keys)
+        return sum(self.hashes.get(name, {}).pop(key, None) is not None for key in keys)
+
+    def hget(self, name, key):
+        return self.hashes.get(name, {}).get(key)
+
+    def delete(self, name):
+        self.hashes.pop(name, None)
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+        return int(self.values[key])
+
+
+def test_redis_dict_writes_only_changes(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(socket_utils, "get_redis_connection", lambda *a, **k: redis)
+    models = RedisDict("models", "redis://localhost")
+
+    models.set({"a": {"name": "A"}, "b": {"name": "B"}})
+    assert sorted(redis.written) == ["a", "b"]
+
+    redis.written = []
+    models.set({"a": {"name": "A"}, "b": {"name": "B2"}, "c": {"name": "C"}})
+    assert sorted(redis.written) == ["b", "c"]
+
+    redis.written = []
+    models.set({"a": {"name": "A"}, "c": {"name": "C"}})
+    assert redis.written == ["b"]
+    assert models.get("b") is None and models["c"] == {"name": "C"}
+
+    # The hash was lost: written in full again
+    redis.delete("models")
+    models.set({"a": {"name": "A"}, "c": {"name": "C"}})
+    assert models["a"] == {"name": "A"}
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = ModelRegistry(refresh_interval=60, filter_cache_size=10)
+    for module in (utils_models, models_model, functions, access_grants):
+        monkeypatch.setattr(module, "MODEL_REGISTRY", registry)
+    return registry
+
+
+@pytest.fixture
+def request_state(monkeypatch):
+    fetches = []
+    base_models = [{"id": "base", "name": "Base", "object": "model"}]
+
+    async def get_all_base_models(request, user=None):
+        fetches.append(user)
+        # Models listed by Ollama get a new timestamp on every fetch
+        return [{**model, "created": len(fetches)} for model in base_models]
+
+    monkeypatch.setattr(utils_models, "get_all_base_models", get_all_base_models)
+    config = types.SimpleNamespace(
+        ENABLE_BASE_MODELS_CACHE=False,
+        ENABLE_EVALUATION_ARENA_MODELS=False,
+        EVALUATION_ARENA_MODELS=[],
+        DEFAULT_MODEL_METADATA={},
+    )
+    state = types.SimpleNamespace(
+        config=config, MODELS={}, BASE_MODELS=[], FUNCTIONS={}
+    )
+    request = types.SimpleNamespace(app=types.SimpleNamespace(state=state))
+    return request, fetches
+
+
+@pytest.fixture
+def custom_model():
+    ids = []
+
+    def create(base_model_id="base"):
+        id = f"test-{uuid.uuid4()}"
+        ids.append(id)
+        return Models.insert_new_model(
+            ModelForm(
+                id=id,
+                base_model_id=base_model_id,
+                name="Custom",
+                meta=ModelMeta(),
+                params=ModelParams(),
+            ),
+            user_id="test",
+        )
+
+    yield create
+    for id in ids:
+        Models.delete_model_by_id(id)
+
+
+@pytest.mark.asyncio
+async def test_models_are_built_until_something_changes(
+    registry, request_state, custom_model
+):
+    request, fetches = request_state
+    first = await utils_models.get_all_models(request)
+    for _ in range(10):
+        assert await utils_models.get_all_models(request) is first
+    assert len(fetches) == 1
+
+    model = custom_model()
+    models = await utils_models.get_all_models(request)
+    assert model.id in [m["id"] for m in models]
+    assert len(fetches) == 2
+
+    Models.toggle_model_by_id(model.id)
+    models = await utils_models.get_all_models(request)
+    assert model.id not in [m["id"] for m in models]
+
+    # A config change is a different key
+    request.app.state.config.ENABLE_EVALUATION_ARENA_MODELS = True
+    request.app.state.config.EVALUATION_ARENA_MODELS = []
+    models = await utils_models.get_all_models(request)
+    assert any(m.get("arena") for m in models)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_rebuilds_keep_the_build(registry, request_state):
+    request, fetches = request_state
+    await utils_models.get_all_models(request)
+    build = registry.build
+    registry.set_filtered(build, ("user",), [{"id": "base"}])
+
+    # The background refresh refetches base models
+    models = await utils_models.get_all_models(request, refresh=True)
+    assert len(fetches) == 2
+    assert models[0]["created"] == 1
+    assert registry.build == build
+    assert registry.get_filtered(("user",)) == [{"id": "base"}]
+
+
+def test_filtered_models_are_dropped_with_the_build(registry):
+    registry.set_models(0, "key", [{"id": "a"}], {"a": {"id": "a"}})
+    build = registry.build
+    registry.set_filtered(build, ("user",), [{"id": "a"}])
+    assert registry.get_filtered(("user",)) == [{"id": "a"}]
+
+    registry.set_models(0, "key", [{"id": "b"}], {"b": {"id": "b"}})
+    assert registry.get_filtered(("user",)) is None
+    # Filtered for an older build while the models changed
+    registry.set_filtered(build, ("user",), [{"id": "a"}])
+    assert registry.get_filtered(("user",)) is None
+
+
+def test_invalidations_reach_other_instances(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(model_registry.time, "monotonic", lambda: now[0])
+    redis = FakeRedis()
+    first = ModelRegistry(refresh_interval=60, redis=redis)
+    second = ModelRegistry(refresh_interval=60, redis=redis)
+    for registry in (first, second):
+        registry.set_models(registry.version, "key", [], {})
+        registry.check()
+
+    first.invalidate()
+    assert first.get_models("key") is None
+    assert second.get_models("key") == []
+
+    now[0] += model_registry.CONFIG_REDIS_REFRESH_INTERVAL
+    assert second.get_models("key") is None
+    second.set_models(second.version, "key", [], {})
+    assert second.get_models("key") == []
+
+
+def test_disabled_registry_never_serves():
+    registry = ModelRegistry(refresh_interval=0)
+    registry.set_models(0, "key", [], {})
+    assert registry.get_models("key") is None
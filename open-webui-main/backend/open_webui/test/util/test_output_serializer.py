@@ -0,0 +1,180 @@
+import copy
+import random
+
+from open_webui.utils import middleware
+from open_webui.utils.middleware import OutputSerializer, serialize_output
+
+
+def message(text, status="in_progress"):
+    return {
+        "type": "message",
+        "status": status,
+        "role": "assistant",
+        "content": [{"type": "output_text", "text": text}],
+    }
+
+
+def reasoning(text, status="in_progress", duration=None):
+    return {
+        "type": "reasoning",
+        "status": status,
+        "content": [{"type": "output_text", "text": text}],
+        "summary": None,
+        "duration": duration,
+    }
+
+
+def function_call(call_id, arguments, name="search"):
+    return {
+        "type": "function_call",
+        "call_id": call_id,
+        "name": name,
+        "arguments": arguments,
+        "status": "in_progress",
+    }
+
+
+def function_call_output(call_id, text, files=None):
+    return {
+        "type": "function_call_output",
+        "call_id": call_id,
+        "output": [{"type": "input_text", "text": text}],
+        "files": files,
+        "status": "completed",
+    }
+
+
+def code_interpreter(code, status="in_progress", output=None):
+    return {
+        "type": "open_webui:code_interpreter",
+        "status": status,
+        "lang": "python",
+        "code": code,
+        "output": output,
+    }
+
+
+class TestOutputSerializer:
+    """OutputSerializer must render exactly what serialize_output renders"""
+
+    def assert_same(self, render, output):
+        assert render(output) == serialize_output(output)
+
+    def test_empty(self):
+        self.assert_same(OutputSerializer(), [])
+
+    def test_streamed_message(self):
+        render = OutputSerializer()
+        output = [message("")]
+        for word in "Hello there, how are you doing today?".split():
+            output[-1]["content"][0]["text"] += word + " "
+            self.assert_same(render, output)
+
+    def test_reasoning_done_when_followed(self):
+        render = OutputSerializer()
+        output = [reasoning("step one\nstep two")]
+        self.assert_same(render, output)
+        # A following item flips the reasoning block to done without
+        # touching the reasoning item itself
+        output.append(message("answer"))
+        self.assert_same(render, output)
+        output.pop()
+        self.assert_same(render, output)
+
+    def test_tool_call_result_arrives(self):
+        render = OutputSerializer()
+        output = [message("Let me check."), function_call("c1", '{"q": "x"}')]
+        self.assert_same(render, output)
+        output.append(function_call_output("c1", "result <b>1</b>"))
+        self.assert_same(render, output)
+        output[2]["files"] = [{"type": "image", "url": "a.png"}]
+        self.assert_same(render, output)
+        output[2]["files"].append({"type": "image", "url": "b.png"})
+        self.assert_same(render, output)
+
+    def test_in_place_mutation_of_earlier_item(self):
+        render = OutputSerializer()
+        output = [
+            function_call("c1", '{"q": "x"}'),
+            message("text"),
+            reasoning("thinking"),
+        ]
+        self.assert_same(render, output)
+        output[0]["arguments"] = '{"q": "y"}'
+        self.assert_same(render, output)
+        output[2]["status"] = "completed"
+        output[2]["duration"] = 3
+        self.assert_same(render, output)
+
+    def test_code_interpreter_strips_open_fence(self):
+        render = OutputSerializer()
+        output = [message("Running:\n```python"), code_interpreter("print(1)")]
+        self.assert_same(render, output)
+        output[1]["output"] = {"stdout": "1\n"}
+        output[1]["status"] = "completed"
+        self.assert_same(render, output)
+        output[1]["output"]["stdout"] = "2\n"
+        self.assert_same(render, output)
+
+    def test_pending_items_then_rollback(self):
+        render = OutputSerializer()
+        output = [message("hi")]
+        self.assert_same(render, output)
+        self.assert_same(render, output + [function_call("c9", "{}")])
+        self.assert_same(render, output)
+
+    def test_completed_items_are_not_keyed_again(self, monkeypatch):
+        keyed = []
+        render_key = middleware.output_item_render_key
+
+        def output_item_render_key(output, idx, tool_outputs):
+            keyed.append(idx)
+            return render_key(output, idx, tool_outputs)
+
+        monkeypatch.setattr(
+            middleware, "output_item_render_key", output_item_render_key
+        )
+        render = OutputSerializer()
+        output = []
+        for idx in range(5):
+            call = function_call(f"c{idx}", '{"q": "%s"}' % ("x" * 1000))
+            call["status"] = "completed"
+            output += [call, function_call_output(f"c{idx}", "result")]
+        output.append(message(""))
+        self.assert_same(render, output)
+
+        keyed.clear()
+        words = "streaming after many tool calls".split()
+        for word in words:
+            output[-1]["content"][0]["text"] += word + " "
+            self.assert_same(render, output)
+        assert keyed == [len(output) - 1] * len(words)
+
+    def test_random_stream(self):
+        rng = random.Random(0)
+        render = OutputSerializer()
+        output = []
+        for step in range(2000):
+            choice = rng.random()
+            tail = output[-1] if output else None
+            if tail and tail["type"] in ("message", "reasoning") and choice < 0.7:
+                tail["content"][0]["text"] += rng.choice(
+                    ["a", " b", "\n", "> q", "<", '"', "```", "ok "]
+                )
+            elif choice < 0.78:
+                output.append(message(""))
+            elif choice < 0.84:
+                output.append(reasoning(""))
+            elif choice < 0.9:
+                call_id = f"c{step}"
+                output.append(function_call(call_id, '{"i": %d}' % step))
+                if rng.random() < 0.5:
+                    output.append(function_call_output(call_id, "r" * step))
+            elif choice < 0.94:
+                output.append(code_interpreter(f"x = {step}"))
+            elif output:
+                item = rng.choice(output)
+                item["status"] = "completed"
+                if item["type"] == "reasoning":
+                    item["duration"] = step
+            self.assert_same(render, copy.deepcopy(output) if step % 7 else output)
@@ -0,0 +1,122 @@
+import types
+
+import pytest
+
+from open_webui.utils import rate_limit
+from open_webui.utils.rate_limit import RateLimiter, is_chat_completion_limited
+from open_webui.utils.redis import SentinelRedisProxy
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+class FailingRedis:
+    async def evalsha(self, *args):
+        raise ConnectionError("redis down")
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis()
+
+
+@pytest.fixture
+def now(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.mark.asyncio
+async def test_redis_limit_in_one_round_trip(redis):
+    limiter = RateLimiter("test", limit=3, window=60, redis_client=redis)
+    assert [await limiter.is_limited("a@example.com") for _ in range(5)] == [
+        False,
+        False,
+        False,
+        True,
+        True,
+    ]
+    assert await limiter.get_count("A@example.com") == 3
+    assert await limiter.remaining("a@example.com") == 0
+
+    # One key per limited key, expiring with the window
+    keys = await redis.keys("*")
+    assert keys == [b"open-webui:ratelimit:test:a@example.com"]
+    assert 0 < await redis.pttl(keys[0]) <= 60_000
+
+    # Other limiters and keys are counted apart
+    other = RateLimiter("other", limit=3, window=60, redis_client=redis)
+    assert not await other.is_limited("a@example.com")
+    assert not await limiter.is_limited("b@example.com")
+
+
+@pytest.mark.asyncio
+async def test_redis_limit_through_the_sentinel_proxy(redis):
+    sentinel = types.SimpleNamespace(master_for=lambda service, **kw: redis)
+    proxy = SentinelRedisProxy(sentinel, "mymaster", async_mode=True)
+    limiter = RateLimiter("test", limit=2, window=60, redis_client=proxy)
+
+    fallbacks = rate_limit.RATE_LIMIT_STATS["fallbacks"]
+    assert [await limiter.is_limited("key") for _ in range(3)] == [False, False, True]
+    assert rate_limit.RATE_LIMIT_STATS["fallbacks"] == fallbacks
+    assert await redis.keys("*") == [b"open-webui:ratelimit:test:key"]
+
+
+@pytest.mark.asyncio
+async def test_memory_fallback_refills_over_the_window(now):
+    limiter = RateLimiter("test", limit=2, window=10, redis_client=FailingRedis())
+    assert not await limiter.is_limited("key")
+    assert not await limiter.is_limited("key")
+    assert await limiter.is_limited("key")
+    assert rate_limit.RATE_LIMIT_STATS["fallbacks"] >= 3
+
+    # One event every window / limit seconds
+    now[0] += 5
+    assert not await limiter.is_limited("key")
+    assert await limiter.is_limited("key")
+    now[0] += 10
+    assert await limiter.remaining("key") == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_fallback_is_bounded(now, monkeypatch):
+    monkeypatch.setattr(rate_limit, "REDIS_URL", None)
+    limiter = RateLimiter("test", limit=1, window=10, memory_size=3)
+    for idx in range(100):
+        assert not await limiter.is_limited(f"key-{idx}")
+    assert list(limiter._memory_store) == ["key-97", "key-98", "key-99"]
+
+    # Expired keys are dropped before the least recently used ones
+    now[0] += 5
+    assert await limiter.is_limited("key-97")
+    now[0] += 10
+    assert not await limiter.is_limited("key-0")
+    assert list(limiter._memory_store) == ["key-0"]
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_limits(redis, monkeypatch):
+    for name, limit in (("user", 5), ("model", 2), ("api_key", 5)):
+        monkeypatch.setattr(
+            rate_limit,
+            f"chat_{name}_rate_limiter",
+            RateLimiter(f"chat:{name}", limit=limit, window=60, redis_client=redis),
+        )
+    user = types.SimpleNamespace(id="user")
+    request = types.SimpleNamespace(
+        headers={"Authorization": "Bearer sk-secret"}, state=types.SimpleNamespace()
+    )
+
+    assert not await is_chat_completion_limited(request, user, "model")
+    assert not await is_chat_completion_limited(request, user, "model")
+    assert await is_chat_completion_limited(request, user, "model")
+    assert not await is_chat_completion_limited(request, user, "other")
+    assert not any(b"sk-secret" in key for key in await redis.keys("*"))
+
+
+@pytest.mark.asyncio
+async def test_disabled_limits_are_not_checked():
+    limiter = RateLimiter("test", limit=0, window=60, redis_client=FailingRedis())
+    assert not await limiter.is_limited("key")
+    assert await limiter.get_count("key") == 0
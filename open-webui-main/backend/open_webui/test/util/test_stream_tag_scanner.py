@@ -0,0 +1,144 @@
+import random
+import re
+
+from open_webui.utils.middleware import (
+    DEFAULT_CODE_INTERPRETER_TAGS,
+    DEFAULT_REASONING_TAGS,
+    DEFAULT_SOLUTION_TAGS,
+    StreamTagScanner,
+)
+
+
+def regex_find_start(text, tags):
+    """The full-text search tag_output_handler used to run on every chunk"""
+    for idx, (start_tag, _) in enumerate(tags):
+        start_tag_pattern = rf"{re.escape(start_tag)}"
+        if start_tag.startswith("<") and start_tag.endswith(">"):
+            start_tag_pattern = rf"<{re.escape(start_tag[1:-1])}(\s.*?)?>"
+        match = re.search(start_tag_pattern, text)
+        if match:
+            return idx, match
+    return None
+
+
+def summarize(found):
+    if found is None:
+        return None
+    idx, match = found
+    return idx, match.span(), match.groups()
+
+
+FRAGMENTS = [
+    "hello ",
+    "world",
+    "\n",
+    " ",
+    ">",
+    "<",
+    "<think",
+    "<thinking",
+    "think>",
+    "</think>",
+    ' type="x"',
+    ' lang="python"',
+    "<code_interpreter",
+    "<|begin_of_",
+    "thought|>",
+    "solution|>",
+    "◁think▷",
+    "◁/think▷",
+    "<reason>",
+    "<Thought>",
+    "</code_interpreter>",
+    "你好",
+]
+
+
+def random_stream(rng, length):
+    return "".join(rng.choice(FRAGMENTS) for _ in range(length))
+
+
+def random_chunks(rng, text):
+    pos = 0
+    while pos < len(text):
+        step = rng.choice([1, 1, 2, 3, 5, 8, 40])
+        yield text[pos : pos + step]
+        pos += step
+
+
+class TestStreamTagScanner:
+    """StreamTagScanner must agree with a full re.search on every chunk"""
+
+    TAG_SETS = [
+        DEFAULT_REASONING_TAGS,
+        DEFAULT_SOLUTION_TAGS,
+        DEFAULT_CODE_INTERPRETER_TAGS,
+        [("<think>", "</think>"), ("<thinking>", "</thinking>")],
+        [("[[", "]]")],
+    ]
+
+    def test_start_tags_fuzz(self):
+        rng = random.Random(7)
+        for tags in self.TAG_SETS:
+            for _ in range(300):
+                scanner = StreamTagScanner()
+                owner = object()
+                text = ""
+                for chunk in random_chunks(rng, random_stream(rng, 30)):
+                    text += chunk
+                    expected = regex_find_start(text, tags)
+                    found = scanner.find_start(owner, text, tags)
+                    assert summarize(found) == summarize(expected), text
+                    if found:
+                        # Continue in a new item with the text after the tag,
+                        # as tag_output_handler does
+                        owner = object()
+                        text = text[found[1].end() :]
+                    elif rng.random() < 0.02:
+                        # Text rewritten in place
+                        text = text[: rng.randint(0, len(text))]
+
+    def test_attributes_across_chunks(self):
+        scanner = StreamTagScanner()
+        owner = object()
+        text = ""
+        for chunk in ["intro <think", " effort=", '"high"', " and more", ">x"]:
+            text += chunk
+            found = scanner.find_start(owner, text, DEFAULT_REASONING_TAGS)
+        assert found is not None
+        assert found[1].group(1) == ' effort="high" and more'
+        assert text[found[1].end() :] == "x"
+
+    def test_newline_closes_pending_opener(self):
+        scanner = StreamTagScanner()
+        owner = object()
+        text = ""
+        for chunk in ["<think a", "\nb", ">", " <think>"]:
+            text += chunk
+            found = scanner.find_start(owner, text, DEFAULT_REASONING_TAGS)
+            assert summarize(found) == summarize(
+                regex_find_start(text, DEFAULT_REASONING_TAGS)
+            )
+        assert found[1].span() == (12, 19)
+
+    def test_first_tag_in_list_order_wins(self):
+        scanner = StreamTagScanner()
+        text = "a <reason> b <think> c"
+        found = scanner.find_start(object(), text, DEFAULT_REASONING_TAGS)
+        assert found[0] == 0
+        assert found[1].group() == "<think>"
+
+    def test_end_tag_fuzz(self):
+        rng = random.Random(11)
+        for end_tag in ["</think>", "◁/think▷", "<|end_of_solution|>", ">"]:
+            for _ in range(300):
+                scanner = StreamTagScanner()
+                owner = object()
+                text = ""
+                for chunk in random_chunks(rng, random_stream(rng, 20) + end_tag):
+                    text += chunk
+                    expected = re.search(re.escape(end_tag), text) is not None
+                    assert scanner.find_end(owner, text, end_tag) == expected
+                    if expected:
+                        owner = object()
+                        text = ""
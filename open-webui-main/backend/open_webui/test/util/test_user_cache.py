@@ -0,0 +1,207 @@
+import types
+import uuid
+
+import pytest
+from fastapi import BackgroundTasks, Response
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.requests import Request
+
+from open_webui.models import users as users_model
+from open_webui.models.users import Users
+from open_webui.utils import auth, user_cache
+from open_webui.utils.user_cache import (
+    AUTH_DB_STATS,
+    USER_CACHE_REDIS_CHANNEL,
+    LastActiveBuffer,
+    UserCache,
+)
+
+
+@pytest.fixture(autouse=True)
+def stats():
+    for key in AUTH_DB_STATS:
+        AUTH_DB_STATS[key] = 0
+    return AUTH_DB_STATS
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = UserCache(ttl=60, size=100)
+    for module in (user_cache, auth, users_model):
+        monkeypatch.setattr(module, "USER_CACHE", cache)
+    return cache
+
+
+@pytest.fixture
+def users():
+    ids = []
+
+    def create(role="user"):
+        id = str(uuid.uuid4())
+        ids.append(id)
+        return Users.insert_new_user(id, "Test", f"{id}@example.com", role=role)
+
+    yield create
+    for id in ids:
+        Users.delete_user_api_key_by_id(id)
+        Users.delete_user_by_id(id)
+
+
+def make_request() -> Request:
+    app = types.SimpleNamespace(state=types.SimpleNamespace(redis=None))
+    return Request({"type": "http", "headers": [], "app": app})
+
+
+async def authenticate(token: str):
+    return await auth.get_current_user(
+        make_request(),
+        Response(),
+        BackgroundTasks(),
+        HTTPAuthorizationCredentials(scheme="Bearer", credentials=token),
+    )
+
+
+@pytest.mark.asyncio
+async def test_jwt_auth_reads_the_user_once(cache, users, stats):
+    user = users()
+    token = auth.create_token({"id": user.id})
+
+    for _ in range(20):
+        assert (await authenticate(token)).role == "user"
+    assert stats["db_reads"] == 1
+    assert stats["cache_hits"] == 19
+    # last_active_at is buffered, not written per request
+    assert stats["db_writes"] == 0
+
+    Users.update_user_role_by_id(user.id, "admin")
+    assert (await authenticate(token)).role == "admin"
+    assert stats["db_reads"] == 2
+
+
+@pytest.mark.asyncio
+async def test_deleted_users_are_rejected(cache, users):
+    user = users()
+    token = auth.create_token({"id": user.id})
+    await authenticate(token)
+
+    Users.delete_user_by_id(user.id)
+    with pytest.raises(auth.HTTPException):
+        await authenticate(token)
+
+
+def test_api_keys_are_dropped_when_changed(cache, users, stats):
+    user = users()
+    Users.update_user_api_key_by_id(user.id, "sk-first")
+    for _ in range(5):
+        found = cache.get_user_by_api_key("sk-first", Users.get_user_by_api_key)
+        assert found.id == user.id
+    assert stats["db_reads"] == 1
+    assert "sk-first" not in str(cache.api_keys)
+
+    Users.update_user_api_key_by_id(user.id, "sk-second")
+    assert cache.get_user_by_api_key("sk-first", Users.get_user_by_api_key) is None
+    found = cache.get_user_by_api_key("sk-second", Users.get_user_by_api_key)
+    assert found.id == user.id
+
+
+def test_callers_get_a_copy(cache, users):
+    user = users()
+    cache.get_user(user.id, Users.get_user_by_id).role = "admin"
+    assert cache.get_user(user.id, Users.get_user_by_id).role == "user"
+
+
+def test_disabled_cache_always_reads(users, stats):
+    cache = UserCache(ttl=0, size=100)
+    user = users()
+    for _ in range(3):
+        cache.get_user(user.id, Users.get_user_by_id)
+    assert stats["db_reads"] == 3
+    assert not cache.users
+
+
+def test_last_active_is_written_in_one_batch(users, stats):
+    created = [users() for _ in range(5)]
+    Users.update_last_active_by_ids({user.id: 1 for user in created})
+
+    buffer = LastActiveBuffer(interval=60)
+    for _ in range(10):
+        for user in created:
+            buffer.mark(user.id)
+    assert buffer.flush(Users.update_last_active_by_ids) == 5
+    assert stats["db_writes"] == 1
+    for user in created:
+        assert Users.get_user_by_id(user.id).last_active_at > 1
+
+    # Nothing pending, nothing written
+    assert buffer.flush(Users.update_last_active_by_ids) == 0
+    assert stats["db_writes"] == 1
+
+
+def test_flush_skips_deleted_users(users):
+    kept, deleted = users(), users()
+    Users.update_last_active_by_ids({kept.id: 1})
+    buffer = LastActiveBuffer(interval=60)
+    buffer.mark(kept.id)
+    buffer.mark(deleted.id)
+    Users.delete_user_by_id(deleted.id)
+
+    assert buffer.flush(Users.update_last_active_by_ids) == 2
+    assert buffer.pending == {}
+    assert Users.get_user_by_id(kept.id).last_active_at > 1
+    assert Users.get_user_by_id(deleted.id) is None
+
+
+def test_failed_flush_keeps_the_timestamps():
+    buffer = LastActiveBuffer(interval=60)
+    buffer.mark("a")
+
+    def fail(pending):
+        raise ConnectionError("database down")
+
+    assert buffer.flush(fail) == 0
+    written = []
+    assert buffer.flush(written.append) == 1
+    assert list(written[0]) == ["a"]
+
+
+class PublishingRedis:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class PubSub:
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def subscribe(self, channel):
+        self.channel = channel
+
+    async def listen(self):
+        for message in self.messages:
+            yield message
+
+
+@pytest.mark.asyncio
+async def test_invalidations_reach_other_instances(monkeypatch, users):
+    monkeypatch.setattr(user_cache, "REDIS_URL", "redis://localhost")
+    redis = PublishingRedis()
+    this, other = UserCache(ttl=60, size=100, redis=redis), UserCache(ttl=60, size=100)
+    monkeypatch.setattr(user_cache, "USER_CACHE", other)
+    user = users()
+    this.get_user(user.id, Users.get_user_by_id)
+    other.get_user(user.id, Users.get_user_by_id)
+
+    this.invalidate(user.id)
+    assert redis.published == [(USER_CACHE_REDIS_CHANNEL, user.id)]
+    assert user.id in other.users
+
+    messages = [{"type": "subscribe", "data": 1}]
+    messages += [{"type": "message", "data": message} for _, message in redis.published]
+    listener = types.SimpleNamespace(pubsub=lambda: PubSub(messages))
+    await user_cache.redis_user_cache_listener(listener)
+    assert user.id not in other.users
+    # Not published again
+    assert len(redis.published) == 1
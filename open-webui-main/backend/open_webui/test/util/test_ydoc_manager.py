@@ -0,0 +1,128 @@
+import asyncio
+
+import pycrdt as Y
+import pytest
+
+from open_webui.socket.utils import YdocManager
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class Editor:
+    """A client document recording the updates of each edit"""
+
+    def __init__(self):
+        self.doc = Y.Doc()
+        self.text = self.doc.get("text", type=Y.Text)
+        self.updates = []
+        self.doc.observe(lambda event: self.updates.append(event.update))
+
+    def type(self, content: str) -> bytes:
+        self.text += content
+        return self.updates[-1]
+
+
+def text_of(state: bytes) -> str:
+    doc = Y.Doc()
+    doc.apply_update(state)
+    return str(doc.get("text", type=Y.Text))
+
+
+@pytest.fixture
+def redis():
+    server = fakeredis.FakeServer()
+    return (
+        fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+        fakeredis.FakeAsyncRedis(server=server),
+    )
+
+
+def make_manager(redis, threshold=500):
+    manager = YdocManager(
+        redis=redis[0], redis_key_prefix="test", binary_redis=redis[1]
+    )
+    manager.COMPACTION_THRESHOLD = threshold
+    return manager
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+async def test_joins_get_only_the_missing_changes(backend, redis):
+    manager = make_manager(redis) if backend == "redis" else YdocManager()
+    assert await manager.get_state("note:1") is None
+
+    editor = Editor()
+    for word in ("hello", " ", "world"):
+        await manager.append_to_updates("note:1", editor.type(word))
+    # Older clients send lists of ints
+    await manager.append_to_updates("note:1", list(editor.type("!")))
+
+    assert await manager.document_exists("note:1")
+    assert text_of(await manager.get_state("note:1")) == "hello world!"
+
+    # A client that saw the first edits
+    client = Y.Doc()
+    client.apply_update(editor.updates[0])
+    diff = await manager.get_state("note:1", client.get_state())
+    assert b"hello" not in diff
+    client.apply_update(diff)
+    assert str(client.get("text", type=Y.Text)) == "hello world!"
+
+    # Up to date: nothing to send
+    assert await manager.get_state("note:1", client.get_state()) == b"\x00\x00"
+
+    await manager.clear_document("note:1")
+    assert not await manager.document_exists("note:1")
+    assert await manager.get_state("note:1") is None
+
+
+@pytest.mark.asyncio
+async def test_updates_are_stored_as_bytes_and_compacted(redis):
+    first, second = make_manager(redis, threshold=10), make_manager(redis, 10)
+    editor = Editor()
+    for idx in range(25):
+        manager = first if idx % 2 else second
+        await manager.append_to_updates("note:1", editor.type(str(idx % 10)))
+
+    expected = "".join(str(idx % 10) for idx in range(25))
+    binary_redis = redis[1]
+    log = await binary_redis.lrange(first._log_key("note_1"), 0, -1)
+    assert len(log) < 10
+    assert log == editor.updates[-len(log) :]
+    assert await binary_redis.hget(first._snapshot_key("note_1"), "state")
+
+    # Both instances catch up with the compactions of the other one
+    for manager in (first, second):
+        assert text_of(await manager.get_state("note:1")) == expected
+
+    await first.append_to_updates("note:1", editor.type("."))
+    assert text_of(await second.get_state("note:1")) == expected + "."
+
+
+@pytest.mark.asyncio
+async def test_cleared_documents_are_not_served_from_cache(redis):
+    first, second = make_manager(redis), make_manager(redis)
+    await first.append_to_updates("note:1", Editor().type("old"))
+    assert text_of(await second.get_state("note:1")) == "old"
+
+    await first.clear_document("note:1")
+    await first.append_to_updates("note:1", Editor().type("new"))
+    assert text_of(await second.get_state("note:1")) == "new"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_appends_and_joins_keep_every_edit(redis):
+    manager = make_manager(redis, threshold=6)
+    editor = Editor()
+    expected = ""
+    for idx in range(20):
+        word = f"w{idx} "
+        expected += word
+        await asyncio.gather(
+            manager.append_to_updates("note:1", editor.type(word)),
+            manager.get_state("note:1"),
+        )
+
+    assert text_of(await manager.get_state("note:1")) == expected
+    # Compactions kept every edit in Redis
+    assert text_of(await make_manager(redis).get_state("note:1")) == expected
@@ -0,0 +1,148 @@
+"""
+Streaming segmentation of audio for transcription.
+
+The input is decoded once by ffmpeg into 16 kHz mono 16-bit PCM and read
+frame by frame. A segment is cut at the first silence once it is half
+the maximum length, or at the maximum length, and written as a WAV file
+as soon as it is complete: only the segment being cut is held in memory.
+"""
+
+import os
+import subprocess
+import tempfile
+import wave
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # bytes, signed 16-bit
+FRAME_SECONDS = 0.1
+FRAME_BYTES = int(SAMPLE_RATE * FRAME_SECONDS) * SAMPLE_WIDTH
+WAV_HEADER_BYTES = 44
+
+# RMS of a silent frame, relative to full scale (about -40 dBFS)
+SILENCE_THRESHOLD = 0.01
+# Consecutive silent frames to cut on
+SILENCE_FRAMES = 3
+
+
+@dataclass
+class AudioChunk:
+    index: int
+    path: str
+    start: float  # seconds
+    end: float
+
+
+def get_max_segment_seconds(max_bytes: int) -> float:
+    """Longest segment whose WAV file fits in `max_bytes`"""
+    return (max_bytes - WAV_HEADER_BYTES) / (SAMPLE_RATE * SAMPLE_WIDTH)
+
+
+def decode_pcm(file_path: str, frame_bytes: int = FRAME_BYTES) -> Iterator[bytes]:
+    """Decode any format ffmpeg reads into PCM frames, as it is decoded"""
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-v",
+                "error",
+                "-i",
+                file_path,
+                "-f",
+                "s16le",
+                "-ac",
+                "1",
+                "-ar",
+                str(SAMPLE_RATE),
+                "-",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+        )
+        decoded = False
+        try:
+            while frame := process.stdout.read(frame_bytes):
+                yield frame
+            decoded = True
+        finally:
+            process.stdout.close()
+            if not decoded:
+                # Stopped early by the consumer
+                process.kill()
+            returncode = process.wait()
+
+        if returncode != 0:
+            stderr.seek(0)
+            raise Exception(
+                f"Failed to decode audio: {stderr.read().decode(errors='replace')}"
+            )
+
+
+def is_silent(frame: bytes, threshold: float = SILENCE_THRESHOLD) -> bool:
+    samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32) / 32768
+    return samples.size == 0 or float(np.sqrt(np.mean(samples**2))) < threshold
+
+
+def segment_pcm(
+    frames: Iterable[bytes],
+    output_dir: str,
+    max_seconds: float,
+    silence_threshold: float = SILENCE_THRESHOLD,
+) -> Iterator[AudioChunk]:
+    """
+    Cut PCM frames into WAV segments of at most `max_seconds`, yielding
+    each one once written.
+    """
+    max_bytes = int(max_seconds * SAMPLE_RATE) * SAMPLE_WIDTH
+    min_bytes = max_bytes // 2
+
+    buffer = bytearray()
+    silent_frames = 0
+    index = 0
+    start = 0.0
+
+    def flush(data: bytes) -> AudioChunk:
+        nonlocal index, start
+        path = os.path.join(output_dir, f"segment_{index}.wav")
+        with wave.open(path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(SAMPLE_WIDTH)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(data)
+        end = start + len(data) / (SAMPLE_RATE * SAMPLE_WIDTH)
+        chunk = AudioChunk(index=index, path=path, start=start, end=end)
+        index += 1
+        start = end
+        return chunk
+
+    for frame in frames:
+        silent_frames = silent_frames + 1 if is_silent(frame, silence_threshold) else 0
+
+        # Cut at the maximum length
+        while len(buffer) + len(frame) > max_bytes:
+            cut = max_bytes - len(buffer)
+            buffer += frame[:cut]
+            frame = frame[cut:]
+            yield flush(bytes(buffer))
+            buffer.clear()
+        buffer += frame
+
+        if len(buffer) >= min_bytes and silent_frames >= SILENCE_FRAMES:
+            yield flush(bytes(buffer))
+            buffer.clear()
+            silent_frames = 0
+
+    # Only silence left is not worth transcribing
+    if buffer and (index == 0 or silent_frames * FRAME_BYTES < len(buffer)):
+        yield flush(bytes(buffer))
+
+
+def stream_audio_segments(
+    file_path: str, output_dir: str, max_seconds: float
+) -> Iterator[AudioChunk]:
+    """Decode `file_path` once, yielding its segments as they are cut"""
+    yield from segment_pcm(decode_pcm(file_path), output_dir, max_seconds)
@@ -25,11 +25,13 @@ from opentelemetry import trace
 from open_webui.utils.access_control import has_permission
 from open_webui.models.users import Users
 from open_webui.models.auths import Auths
+from open_webui.utils.user_cache import AUTH_DB_STATS, LAST_ACTIVE_BUFFER, USER_CACHE
 
 
 from open_webui.constants import ERROR_MESSAGES
 
 from open_webui.env import (
+    DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL,
     ENABLE_PASSWORD_VALIDATION,
     OFFLINE_MODE,
     LICENSE_BLOB,
@@ -328,7 +330,7 @@ async def get_current_user(
                     detail="Invalid token",
                 )
 
-            user = Users.get_user_by_id(data["id"])
+            user = USER_CACHE.get_user(data["id"], Users.get_user_by_id)
             if user is None:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -353,10 +355,7 @@ async def get_current_user(
                     current_span.set_attribute("client.user.role", user.role)
                     current_span.set_attribute("client.auth.type", "jwt")
 
-                # Refresh the user's last active timestamp asynchronously
-                # to prevent blocking the request
-                if background_tasks:
-                    background_tasks.add_task(Users.update_last_active_by_id, user.id)
+                update_user_last_active(user.id, background_tasks)
             return user
         else:
             raise HTTPException(
@@ -380,7 +379,7 @@ async def get_current_user(
 
 def get_current_user_by_api_key(request, api_key: str):
     # Each function call manages its own short-lived session internally
-    user = Users.get_user_by_api_key(api_key)
+    user = USER_CACHE.get_user_by_api_key(api_key, Users.get_user_by_api_key)
 
     if user is None:
         raise HTTPException(
@@ -408,10 +407,28 @@ def get_current_user_by_api_key(request, api_key: str):
         current_span.set_attribute("client.user.role", user.role)
         current_span.set_attribute("client.auth.type", "api_key")
 
-    Users.update_last_active_by_id(user.id)
+    update_user_last_active(user.id)
     return user
 
 
+def update_user_last_active(
+    user_id: str, background_tasks: Optional[BackgroundTasks] = None
+):
+    """
+    Refresh the user's last active timestamp: batched by LAST_ACTIVE_BUFFER,
+    or else written after the response so the request is not blocked.
+    """
+    if DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL > 0:
+        LAST_ACTIVE_BUFFER.mark(user_id)
+        return
+
+    AUTH_DB_STATS["db_writes"] += 1
+    if background_tasks:
+        background_tasks.add_task(Users.update_last_active_by_id, user_id)
+    else:
+        Users.update_last_active_by_id(user_id)
+
+
 def get_verified_user(user=Depends(get_current_user)):
     if user.role not in {"user", "admin"}:
         raise HTTPException(
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from open_webui.env import (
+    REALTIME_CHAT_SAVE_INTERVAL,
+    REALTIME_CHAT_SAVE_MAX_BYTES,
+)
+from open_webui.models.chats import Chats
+
+log = logging.getLogger(__name__)
+
+# Process-wide counters, exported by utils/telemetry/metrics.py.
+# Sizes are characters of rendered message content.
+REALTIME_CHAT_SAVE_STATS = {
+    "requested": 0,
+    "written": 0,
+    "avoided": 0,
+    "bytes_written": 0,
+    "bytes_saved": 0,
+}
+
+
+class RealtimeChatSaver:
+    """
+    Write-behind buffer for ENABLE_REALTIME_CHAT_SAVE.
+
+    Every upsert rewrites the whole chat row, so saving a streaming message
+    on each delta rewrites it thousands of times. save() only keeps the
+    latest state and writes it once `interval` seconds passed since the last
+    write or the content grew by `max_bytes`; a superseded state is never
+    written. flush() must be called when the response completes or is
+    cancelled.
+    """
+
+    def __init__(
+        self,
+        chat_id: str,
+        message_id: str,
+        interval: float = REALTIME_CHAT_SAVE_INTERVAL,
+        max_bytes: int = REALTIME_CHAT_SAVE_MAX_BYTES,
+    ):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.interval = interval
+        self.max_bytes = max_bytes
+
+        self.pending: Optional[dict] = None
+        self.pending_size = 0
+        self.written_size = 0
+        self.last_write = time.monotonic()
+
+    def save(self, message: dict):
+        """Buffer the latest state of the message, writing it when due."""
+        REALTIME_CHAT_SAVE_STATS["requested"] += 1
+        self._replace(message)
+
+        if (
+            time.monotonic() - self.last_write >= self.interval
+            or abs(self.pending_size - self.written_size) >= self.max_bytes
+        ):
+            self.flush()
+
+    def flush(self, message: Optional[dict] = None):
+        """Write the buffered state, or `message` in its place, if any."""
+        if message is not None:
+            REALTIME_CHAT_SAVE_STATS["requested"] += 1
+            self._replace(message)
+        if self.pending is None:
+            return
+
+        message, size = self.pending, self.pending_size
+        self.pending = None
+        self.last_write = time.monotonic()
+
+        Chats.upsert_message_to_chat_by_id_and_message_id(
+            self.chat_id, self.message_id, message
+        )
+        self.written_size = size
+        REALTIME_CHAT_SAVE_STATS["written"] += 1
+        REALTIME_CHAT_SAVE_STATS["bytes_written"] += size
+
+    def _replace(self, message: dict):
+        if self.pending is not None:
+            # The buffered state is superseded before it was written
+            REALTIME_CHAT_SAVE_STATS["avoided"] += 1
+            REALTIME_CHAT_SAVE_STATS["bytes_saved"] += self.pending_size
+            message = {**self.pending, **message}
+        self.pending = message
+        content = message.get("content")
+        self.pending_size = len(content) if isinstance(content, str) else 0
+
+
+# Process-wide counters of ChatEventWriter, exported by utils/telemetry/metrics.py
+CHAT_EVENT_WRITE_STATS = {
+    "events": 0,
+    "written": 0,
+}
+
+
+def apply_chat_event(message: Optional[dict], event: dict) -> Optional[dict]:
+    """
+    Apply an event emitted by get_event_emitter to a message, returning the
+    changed fields or None when the event is not persisted.
+    """
+    event_type = event.get("type")
+    data = event.get("data", {})
+
+    if event_type == "replace":
+        return {"content": data.get("content", "")}
+    if message is None:
+        return None
+
+    if event_type == "status":
+        return {"statusHistory": message.get("statusHistory", []) + [data]}
+    if event_type == "message":
+        return {"content": message.get("content", "") + data.get("content", "")}
+    if event_type == "embeds":
+        return {"embeds": data.get("embeds", []) + message.get("embeds", [])}
+    if event_type == "files":
+        return {"files": data.get("files", []) + message.get("files", [])}
+    if event_type in ["source", "citation"] and data.get("type") is None:
+        return {"sources": message.get("sources", []) + [data]}
+    return None
+
+
+class ChatEventWriter:
+    """
+    Persists message events off the event loop.
+
+    enqueue() only records the event. A background task applies all events
+    queued for a message to a single read of it and writes the result once,
+    in a worker thread, so a burst of status or citation events costs one
+    write and never blocks the loop.
+    """
+
+    def __init__(self):
+        # (chat_id, message_id) -> events, in arrival order
+        self.pending: OrderedDict[tuple[str, str], list[dict]] = OrderedDict()
+        self.writing: Optional[tuple[str, str]] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.changed: Optional[asyncio.Condition] = None
+
+    def enqueue(self, chat_id: str, message_id: str, event: dict):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            if self.loop is not None and self.loop.is_running():
+                # Emitted from a tool running its own loop
+                self.loop.call_soon_threadsafe(
+                    self._enqueue, chat_id, message_id, event
+                )
+                return
+            self.loop = loop
+            self.worker = None
+            self.changed = asyncio.Condition()
+        self._enqueue(chat_id, message_id, event)
+
+    def _enqueue(self, chat_id: str, message_id: str, event: dict):
+        CHAT_EVENT_WRITE_STATS["events"] += 1
+        self.pending.setdefault((chat_id, message_id), []).append(event)
+        if self.worker is None or self.worker.done():
+            self.worker = self.loop.create_task(self._run())
+
+    async def flush(self, chat_id: str, message_id: str):
+        """Wait until the queued events of a message are written."""
+        key = (chat_id, message_id)
+        if self.changed is None or (key not in self.pending and key != self.writing):
+            return
+        if key in self.pending:
+            self.pending.move_to_end(key, last=False)
+        async with self.changed:
+            await self.changed.wait_for(
+                lambda: key not in self.pending and key != self.writing
+            )
+
+    async def close(self):
+        """Write everything queued, used on shutdown."""
+        if self.worker is not None:
+            await self.worker
+
+    async def _run(self):
+        while self.pending:
+            key, events = self.pending.popitem(last=False)
+            self.writing = key
+            try:
+                await asyncio.to_thread(self._write, *key, events)
+            except Exception as e:
+                log.warning(f"Failed to persist events of message {key[1]}: {e}")
+            finally:
+                self.writing = None
+                async with self.changed:
+                    self.changed.notify_all()
+
+    def _write(self, chat_id: str, message_id: str, events: list[dict]):
+        message = Chats.get_message_by_id_and_message_id(chat_id, message_id)
+
+        update = {}
+        for event in events:
+            fields = apply_chat_event(message, event)
+            if fields is not None:
+                message = {**(message or {}), **fields}
+                update.update(fields)
+
+        if update:
+            Chats.upsert_message_to_chat_by_id_and_message_id(
+                chat_id, message_id, update
+            )
+            CHAT_EVENT_WRITE_STATS["written"] += 1
+
+
+CHAT_EVENT_WRITER = ChatEventWriter()
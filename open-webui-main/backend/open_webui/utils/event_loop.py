@@ -0,0 +1,27 @@
+import asyncio
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG_INTERVAL = 0.5  # seconds
+EVENT_LOOP_LAG_WARNING = 1.0  # seconds
+
+# Exported by utils/telemetry/metrics.py. Lag is how much later than
+# scheduled a sleeping task resumed, i.e. how long the loop was blocked.
+EVENT_LOOP_LAG_STATS = {
+    "last": 0.0,
+    "max": 0.0,  # since the last export
+}
+
+
+async def monitor_event_loop_lag(interval: float = EVENT_LOOP_LAG_INTERVAL):
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        lag = max(time.monotonic() - start - interval, 0.0)
+
+        EVENT_LOOP_LAG_STATS["last"] = lag
+        EVENT_LOOP_LAG_STATS["max"] = max(EVENT_LOOP_LAG_STATS["max"], lag)
+        if lag >= EVENT_LOOP_LAG_WARNING:
+            log.warning(f"Event loop was blocked for {lag:.2f}s")
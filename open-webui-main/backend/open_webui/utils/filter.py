@@ -1,11 +1,12 @@
 import inspect
 import logging
+from typing import Optional
 
 from open_webui.utils.plugin import (
     load_function_module_by_id,
     get_function_module_from_cache,
 )
-from open_webui.models.functions import Functions
+from open_webui.models.functions import FUNCTION_VERSIONS, Functions
 
 log = logging.getLogger(__name__)
 
@@ -21,21 +22,24 @@ def get_function_module(request, function_id, load_from_db=True):
 
 
 def get_sorted_filter_ids(request, model: dict, enabled_filter_ids: list = None):
+    # Active filters with their valves, for the priority, in one query
+    active_filters = {
+        function.id: function
+        for function in Functions.get_functions_by_type(
+            "filter", active_only=True, include_valves=True
+        )
+    }
+
     def get_priority(function_id):
-        function = Functions.get_function_by_id(function_id)
-        if function is not None:
-            valves = Functions.get_function_valves_by_id(function_id)
-            return valves.get("priority", 0) if valves else 0
-        return 0
+        valves = active_filters[function_id].valves
+        return valves.get("priority", 0) if valves else 0
 
-    filter_ids = [function.id for function in Functions.get_global_filter_functions()]
+    filter_ids = [
+        function.id for function in active_filters.values() if function.is_global
+    ]
     if "info" in model and "meta" in model["info"]:
         filter_ids.extend(model["info"]["meta"].get("filterIds", []))
         filter_ids = list(set(filter_ids))
-    active_filter_ids = [
-        function.id
-        for function in Functions.get_functions_by_type("filter", active_only=True)
-    ]
 
     def get_active_status(filter_id):
         function_module = get_function_module(request, filter_id)
@@ -45,90 +49,147 @@ def get_sorted_filter_ids(request, model: dict, enabled_filter_ids: list = None)
 
         return True
 
-    active_filter_ids = [
-        filter_id for filter_id in active_filter_ids if get_active_status(filter_id)
+    filter_ids = [
+        filter_id
+        for filter_id in filter_ids
+        if filter_id in active_filters and get_active_status(filter_id)
     ]
-
-    filter_ids = [fid for fid in filter_ids if fid in active_filter_ids]
     filter_ids.sort(key=get_priority)
 
     return filter_ids
 
 
-async def process_filter_functions(
-    request, filter_functions, filter_type, form_data, extra_params
-):
-    skip_files = None
-
-    for function in filter_functions:
-        filter = function
-        filter_id = function.id
-        if not filter:
-            continue
+class CompiledFilter:
+    """One filter of a FilterPipeline, resolved for its filter type"""
 
-        function_module = get_function_module(
-            request, filter_id, load_from_db=(filter_type != "stream")
+    def __init__(self, request, filter_id: str, filter_type: str, load_from_db: bool):
+        self.id = filter_id
+        self.module = get_function_module(request, filter_id, load_from_db)
+        # Read after loading, which may rewrite the function content
+        self.version = FUNCTION_VERSIONS.get(filter_id, 0)
+        self.handler = getattr(self.module, filter_type, None)
+        self.is_coroutine = inspect.iscoroutinefunction(self.handler)
+        self.parameters = (
+            set(inspect.signature(self.handler).parameters) if self.handler else set()
         )
-        # Prepare handler function
-        handler = getattr(function_module, filter_type, None)
-        if not handler:
-            continue
-
-        # Check if the function has a file_handler variable
-        if filter_type == "inlet" and hasattr(function_module, "file_handler"):
-            skip_files = function_module.file_handler
 
-        # Apply valves to the function
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
+        self.valves = None
+        if (
+            self.handler
+            and hasattr(self.module, "valves")
+            and hasattr(self.module, "Valves")
+        ):
             valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
+            self.valves = self.module.Valves(**(valves if valves else {}))
+
+        self.has_user_valves = "__user__" in self.parameters and hasattr(
+            self.module, "UserValves"
+        )
+        # user id -> UserValves
+        self.user_valves = {}
+
+    def get_user_valves(self, user_id: str):
+        if user_id not in self.user_valves:
+            self.user_valves[user_id] = self.module.UserValves(
+                **Functions.get_user_valves_by_id_and_user_id(self.id, user_id)
             )
+        return self.user_valves[user_id]
 
-        try:
-            # Prepare parameters
-            sig = inspect.signature(handler)
-
-            params = {"body": form_data}
-            if filter_type == "stream":
-                params = {"event": form_data}
-
-            params = params | {
-                k: v
-                for k, v in {
-                    **extra_params,
-                    "__id__": filter_id,
-                }.items()
-                if k in sig.parameters
-            }
-
-            # Handle user parameters
-            if "__user__" in sig.parameters:
-                if hasattr(function_module, "UserValves"):
+
+class FilterPipeline:
+    """
+    The filters of one request for one filter type. Modules, valves, user
+    valves and handler signatures are resolved on the first call and reused
+    for the following ones, e.g. every chunk of a stream. A filter is
+    resolved again once its content or valves changed (FUNCTION_VERSIONS).
+    """
+
+    def __init__(self, request, filter_functions: list, filter_type: str):
+        self.request = request
+        self.filter_type = filter_type
+        self.filter_ids = [function.id for function in filter_functions if function]
+        self.filters: Optional[list[CompiledFilter]] = None
+
+    def compile(self, filter_id: str) -> CompiledFilter:
+        return CompiledFilter(
+            self.request,
+            filter_id,
+            self.filter_type,
+            # Streamed chunks use the cached module
+            load_from_db=(self.filter_type != "stream"),
+        )
+
+    async def process(self, form_data, extra_params):
+        if self.filters is None:
+            self.filters = []
+        skip_files = None
+
+        for idx, filter_id in enumerate(self.filter_ids):
+            if idx == len(self.filters):
+                self.filters.append(self.compile(filter_id))
+            elif self.filters[idx].version != FUNCTION_VERSIONS.get(filter_id, 0):
+                self.filters[idx] = self.compile(filter_id)
+            filter = self.filters[idx]
+
+            handler = filter.handler
+            if not handler:
+                continue
+
+            # Check if the function has a file_handler variable
+            if self.filter_type == "inlet" and hasattr(filter.module, "file_handler"):
+                skip_files = filter.module.file_handler
+
+            # Apply valves to the function
+            if filter.valves is not None:
+                filter.module.valves = filter.valves
+
+            try:
+                # Prepare parameters
+                params = {"body": form_data}
+                if self.filter_type == "stream":
+                    params = {"event": form_data}
+
+                params = params | {
+                    k: v
+                    for k, v in {
+                        **extra_params,
+                        "__id__": filter_id,
+                    }.items()
+                    if k in filter.parameters
+                }
+
+                # Handle user parameters
+                if filter.has_user_valves:
                     try:
-                        params["__user__"]["valves"] = function_module.UserValves(
-                            **Functions.get_user_valves_by_id_and_user_id(
-                                filter_id, params["__user__"]["id"]
-                            )
+                        params["__user__"]["valves"] = filter.get_user_valves(
+                            params["__user__"]["id"]
                         )
                     except Exception as e:
                         log.exception(f"Failed to get user values: {e}")
 
-            # Execute handler
-            if inspect.iscoroutinefunction(handler):
-                form_data = await handler(**params)
-            else:
-                form_data = handler(**params)
+                # Execute handler
+                if filter.is_coroutine:
+                    form_data = await handler(**params)
+                else:
+                    form_data = handler(**params)
 
-        except Exception as e:
-            log.debug(f"Error in {filter_type} handler {filter_id}: {e}")
-            raise e
+            except Exception as e:
+                log.debug(f"Error in {self.filter_type} handler {filter_id}: {e}")
+                raise e
 
-    # Handle file cleanup for inlet
-    if skip_files:
-        if "files" in form_data.get("metadata", {}):
-            del form_data["metadata"]["files"]
-        if "files" in form_data:
-            del form_data["files"]
+        # Handle file cleanup for inlet
+        if skip_files:
+            if "files" in form_data.get("metadata", {}):
+                del form_data["metadata"]["files"]
+            if "files" in form_data:
+                del form_data["files"]
 
-    return form_data, {}
+        return form_data, {}
+
+
+async def process_filter_functions(
+    request, filter_functions, filter_type, form_data, extra_params
+):
+    return await FilterPipeline(request, filter_functions, filter_type).process(
+        form_data, extra_params
+    )
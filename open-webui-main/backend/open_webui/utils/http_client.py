@@ -0,0 +1,85 @@
+"""
+Shared aiohttp sessions for upstream model connections.
+
+A new ClientSession per request opens a new connection, with its DNS lookup
+and TLS handshake, for every chat turn. Sessions here live as long as the
+application, one per base URL origin, so connections are kept alive and
+reused between requests. aiohttp speaks HTTP/1.1, concurrent requests to one
+origin use separate pooled connections.
+
+Pooled sessions must not be closed by callers: pass None as the session to
+cleanup_response and stream_wrapper, and the per-request timeout to the
+request call. Cookies are never kept between requests.
+"""
+
+import asyncio
+import logging
+import weakref
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from open_webui.env import (
+    AIOHTTP_CLIENT_POOL_DNS_CACHE_TTL,
+    AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_POOL_SIZE,
+)
+
+log = logging.getLogger(__name__)
+
+
+def get_origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class ClientSessionPool:
+    def __init__(
+        self,
+        size: int = AIOHTTP_CLIENT_POOL_SIZE,
+        keepalive_timeout: float = AIOHTTP_CLIENT_POOL_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = AIOHTTP_CLIENT_POOL_DNS_CACHE_TTL,
+    ):
+        self.size = size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        # Sessions are bound to the loop they were created in, the main loop
+        # in practice. Sessions of other loops go away with their loop.
+        self._sessions: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, aiohttp.ClientSession]
+        ] = weakref.WeakKeyDictionary()
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            ),
+            cookie_jar=aiohttp.DummyCookieJar(),
+            trust_env=True,
+        )
+
+    def get_session(self, url: str) -> aiohttp.ClientSession:
+        """The pooled session for the origin of `url` in the running loop"""
+        sessions = self._sessions.setdefault(asyncio.get_running_loop(), {})
+        origin = get_origin(url)
+        session = sessions.get(origin)
+        if session is None or session.closed:
+            session = sessions[origin] = self._new_session()
+        return session
+
+    async def close(self):
+        sessions = self._sessions.pop(asyncio.get_running_loop(), {})
+        for session in sessions.values():
+            try:
+                await session.close()
+            except Exception as e:
+                log.debug(f"Error closing client session: {e}")
+
+
+CLIENT_SESSION_POOL = ClientSessionPool()
+
+
+def get_client_session(url: str) -> aiohttp.ClientSession:
+    return CLIENT_SESSION_POOL.get_session(url)
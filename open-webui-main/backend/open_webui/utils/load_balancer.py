@@ -0,0 +1,201 @@
+"""
+Load balancing of model requests across backend URLs.
+
+Every request to a node is tracked from the moment it is sent until its
+response, streamed or not, is finished: the requests in flight, an EWMA of
+the time to response headers and consecutive failures. Strategies:
+
+- random: uniform choice, ignoring the stats
+- least_outstanding: fewest requests in flight
+- ewma: lowest EWMA latency weighted by the requests in flight. A node
+  without a response yet is given the mean EWMA of the others, so that
+  its requests in flight still count
+- p2c: the better of two random nodes by that same cost ("power of two
+  choices"), close to ewma without sending every request to one node
+
+A node failing LOAD_BALANCER_FAILURE_THRESHOLD times in a row (connection
+errors and 5xx responses) is ejected for LOAD_BALANCER_EJECTION_COOLDOWN
+seconds. Afterwards it is tried again, and ejected again on the next
+failure until a request succeeds. When every candidate is ejected the
+choice is made among all of them.
+
+Stats are kept per process.
+"""
+
+import logging
+import random
+import time
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Optional
+
+from open_webui.env import (
+    LOAD_BALANCER_EJECTION_COOLDOWN,
+    LOAD_BALANCER_FAILURE_THRESHOLD,
+    LOAD_BALANCER_STRATEGY,
+)
+
+log = logging.getLogger(__name__)
+
+LOAD_BALANCER_STRATEGIES = ("random", "least_outstanding", "ewma", "p2c")
+
+
+@dataclass
+class NodeStats:
+    in_flight: int = 0
+    requests: int = 0
+    errors: int = 0
+    consecutive_failures: int = 0
+    # Seconds to response headers, None until the first response
+    latency_ewma: Optional[float] = None
+    ejected_until: float = 0.0
+    ejections: int = 0
+
+
+class NodeRequest:
+    """One request to a node, see LoadBalancer.start"""
+
+    def __init__(self, balancer: "LoadBalancer", node: str):
+        self.balancer = balancer
+        self.node = node
+        self.started = time.monotonic()
+        self.finished = False
+        self.stats = balancer.get_node(node)
+        self.stats.in_flight += 1
+        self.stats.requests += 1
+
+    def responded(self, status: int = 200):
+        """
+        Response headers were received. Records the latency, and the
+        request as failed if the node answered with a server error.
+        """
+        if status >= 500:
+            self.finish(failed=True)
+            return
+        latency = time.monotonic() - self.started
+        ewma = self.stats.latency_ewma
+        alpha = self.balancer.ewma_alpha
+        self.stats.latency_ewma = (
+            latency if ewma is None else alpha * latency + (1 - alpha) * ewma
+        )
+
+    def finish(self, failed: bool = False):
+        if self.finished:
+            return
+        self.finished = True
+        self.stats.in_flight -= 1
+        if not failed:
+            self.stats.consecutive_failures = 0
+            return
+
+        self.stats.errors += 1
+        self.stats.consecutive_failures += 1
+        if self.stats.consecutive_failures >= self.balancer.failure_threshold:
+            self.stats.ejected_until = time.monotonic() + self.balancer.cooldown
+            self.stats.ejections += 1
+            log.warning(
+                f"Ejected {self.node} for {self.balancer.cooldown}s after"
+                f" {self.stats.consecutive_failures} failures"
+            )
+
+    async def track_stream(self, stream: AsyncIterator) -> AsyncIterator:
+        """Keep the request in flight until `stream` is consumed"""
+        failed = False
+        try:
+            async for chunk in stream:
+                yield chunk
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.finish(failed=failed)
+
+
+class LoadBalancer:
+    def __init__(
+        self,
+        strategy: str = LOAD_BALANCER_STRATEGY,
+        failure_threshold: int = LOAD_BALANCER_FAILURE_THRESHOLD,
+        cooldown: float = LOAD_BALANCER_EJECTION_COOLDOWN,
+        ewma_alpha: float = 0.3,
+        rng: Optional[random.Random] = None,
+    ):
+        if strategy not in LOAD_BALANCER_STRATEGIES:
+            log.warning(f"Unknown load balancer strategy {strategy}, using p2c")
+            strategy = "p2c"
+        self.strategy = strategy
+        self.failure_threshold = max(failure_threshold, 1)
+        self.cooldown = cooldown
+        self.ewma_alpha = ewma_alpha
+        self.rng = rng or random.Random()
+        self.nodes: dict[str, NodeStats] = {}
+
+    def get_node(self, node: str) -> NodeStats:
+        stats = self.nodes.get(node)
+        if stats is None:
+            stats = self.nodes[node] = NodeStats()
+        return stats
+
+    def get_latency_prior(self) -> float:
+        latencies = [
+            stats.latency_ewma
+            for stats in self.nodes.values()
+            if stats.latency_ewma is not None
+        ]
+        return sum(latencies) / len(latencies) if latencies else 1.0
+
+    def cost(self, node: str) -> float:
+        stats = self.get_node(node)
+        latency = stats.latency_ewma
+        if latency is None:
+            latency = self.get_latency_prior()
+        return latency * (stats.in_flight + 1)
+
+    def choose(self, nodes: list[str]) -> str:
+        if len(nodes) == 1:
+            return nodes[0]
+
+        now = time.monotonic()
+        available = [n for n in nodes if self.get_node(n).ejected_until <= now]
+        candidates = available or nodes
+
+        if self.strategy == "random" or len(candidates) == 1:
+            return self.rng.choice(candidates)
+        if self.strategy == "p2c":
+            a, b = self.rng.sample(candidates, 2)
+            return a if self.cost(a) <= self.cost(b) else b
+
+        if self.strategy == "least_outstanding":
+            costs = [self.get_node(node).in_flight for node in candidates]
+        else:
+            costs = [self.cost(node) for node in candidates]
+        best = min(costs)
+        return self.rng.choice(
+            [node for node, cost in zip(candidates, costs) if cost == best]
+        )
+
+    def start(self, node: str) -> NodeRequest:
+        return NodeRequest(self, node)
+
+    def get_stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "strategy": self.strategy,
+            "nodes": {
+                node: {
+                    **{
+                        key: value
+                        for key, value in asdict(stats).items()
+                        if key != "ejected_until"
+                    },
+                    # Seconds until an ejected node is tried again
+                    "ejected_for": max(stats.ejected_until - now, 0.0),
+                }
+                for node, stats in self.nodes.items()
+            },
+        }
+
+
+OLLAMA_LOAD_BALANCER = LoadBalancer()
+# OpenAI connections have one URL per model, so nothing to choose: their
+# stats are tracked for the admin endpoint only
+OPENAI_LOAD_BALANCER = LoadBalancer()
@@ -75,6 +75,7 @@ from open_webui.retrieval.utils import get_sources_from_items
 
 from open_webui.utils.sanitize import sanitize_code
 from open_webui.utils.chat import generate_chat_completion
+from open_webui.utils.chat_save import CHAT_EVENT_WRITER, RealtimeChatSaver
 from open_webui.utils.task import (
     get_task_model_id,
     rag_template,
@@ -102,6 +103,7 @@ from open_webui.utils.tools import (
 )
 from open_webui.utils.plugin import load_function_module_by_id
 from open_webui.utils.filter import (
+    FilterPipeline,
     get_sorted_filter_ids,
     process_filter_functions,
 )
@@ -150,6 +152,7 @@ DEFAULT_REASONING_TAGS = [
 ]
 DEFAULT_SOLUTION_TAGS = [("<|begin_of_solution|>", "<|end_of_solution|>")]
 DEFAULT_CODE_INTERPRETER_TAGS = [("<code_interpreter>", "</code_interpreter>")]
+_TAG_BOUNDARY_RE = re.compile(r"[>\n]")
 
 
 def output_id(prefix: str) -> str:
@@ -337,6 +340,132 @@ def is_opening_code_block(content):
     return len(backtick_segments) > 1 and len(backtick_segments) % 2 == 0
 
 
+def get_tool_outputs(output: list) -> dict:
+    """Collect function_call_output items by call_id for lookup."""
+    tool_outputs = {}
+    for item in output:
+        if item.get("type") == "function_call_output":
+            tool_outputs[item.get("call_id")] = item
+    return tool_outputs
+
+
+def render_output_item(content: str, output: list, idx: int, tool_outputs: dict) -> str:
+    """
+    Append the HTML for output[idx] to the content rendered so far.
+    The result depends only on `content`, the item, whether it is the last
+    item, and (for function calls) its entry in `tool_outputs`.
+    """
+    item = output[idx]
+    item_type = item.get("type", "")
+
+    if item_type == "message":
+        for content_part in item.get("content", []):
+            if "text" in content_part:
+                text = content_part.get("text", "").strip()
+                if text:
+                    content = f"{content}{text}\n"
+
+    elif item_type == "function_call":
+        # Render tool call inline with its result (if available)
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        call_id = item.get("call_id", "")
+        name = item.get("name", "")
+        arguments = item.get("arguments", "")
+
+        result_item = tool_outputs.get(call_id)
+        if result_item:
+            result_text = ""
+            for out in result_item.get("output", []):
+                if "text" in out:
+                    result_text += out.get("text", "")
+            files = result_item.get("files")
+            embeds = result_item.get("embeds", "")
+
+            content += f'<details type="tool_calls" done="true" id="{call_id}" name="{name}" arguments="{html.escape(json.dumps(arguments))}" result="{html.escape(json.dumps(result_text, ensure_ascii=False))}" files="{html.escape(json.dumps(files)) if files else ""}" embeds="{html.escape(json.dumps(embeds))}">\n<summary>Tool Executed</summary>\n</details>\n'
+        else:
+            content += f'<details type="tool_calls" done="false" id="{call_id}" name="{name}" arguments="{html.escape(json.dumps(arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+
+    elif item_type == "function_call_output":
+        # Already handled inline with function_call above
+        pass
+
+    elif item_type == "reasoning":
+        reasoning_content = ""
+        # Check for 'summary' (new structure) or 'content' (legacy/fallback)
+        source_list = item.get("summary", []) or item.get("content", [])
+        for content_part in source_list:
+            if "text" in content_part:
+                reasoning_content += content_part.get("text", "")
+            elif "summary" in content_part:  # Handle potential nested logic if any
+                pass
+
+        reasoning_content = reasoning_content.strip()
+
+        duration = item.get("duration")
+        status = item.get("status", "in_progress")
+
+        # Infer completion: if this reasoning item is NOT the last item,
+        # render as done (a subsequent item means reasoning is complete)
+        is_last_item = idx == len(output) - 1
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        display = html.escape(
+            "\n".join(
+                (f"> {line}" if not line.startswith(">") else line)
+                for line in reasoning_content.splitlines()
+            )
+        )
+
+        if status == "completed" or duration is not None or not is_last_item:
+            content = f'{content}<details type="reasoning" done="true" duration="{duration or 0}">\n<summary>Thought for {duration or 0} seconds</summary>\n{display}\n</details>\n'
+        else:
+            content = f'{content}<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{display}\n</details>\n'
+
+    elif item_type == "open_webui:code_interpreter":
+        content_stripped, original_whitespace = split_content_and_whitespace(content)
+        if is_opening_code_block(content_stripped):
+            content = content_stripped.rstrip("`").rstrip() + original_whitespace
+        else:
+            content = content_stripped + original_whitespace
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        # Render the code_interpreter item as a <details> block
+        # so the frontend Collapsible renders "Analyzing..."/"Analyzed".
+        code = item.get("code", "").strip()
+        lang = item.get("lang", "python")
+        status = item.get("status", "in_progress")
+        duration = item.get("duration")
+        is_last_item = idx == len(output) - 1
+
+        # Build inner content: code block
+        display = ""
+        if code:
+            display = f"```{lang}\n{code}\n```"
+
+        # Build output attribute as HTML-escaped JSON for CodeBlock.svelte
+        ci_output = item.get("output")
+        output_attr = ""
+        if ci_output:
+            if isinstance(ci_output, dict):
+                output_json = json.dumps(ci_output, ensure_ascii=False)
+            else:
+                output_json = json.dumps({"result": str(ci_output)}, ensure_ascii=False)
+            output_attr = f' output="{html.escape(output_json)}"'
+
+        if status == "completed" or duration is not None or not is_last_item:
+            content += f'<details type="code_interpreter" done="true" duration="{duration or 0}"{output_attr}>\n<summary>Analyzed</summary>\n{display}\n</details>\n'
+        else:
+            content += f'<details type="code_interpreter" done="false"{output_attr}>\n<summary>Analyzing…</summary>\n{display}\n</details>\n'
+
+    return content
+
+
 def serialize_output(output: list) -> str:
     """
     Convert OR-aligned output items to HTML for display.
@@ -345,125 +474,274 @@ def serialize_output(output: list) -> str:
     content = ""
 
     # First pass: collect function_call_output items by call_id for lookup
-    tool_outputs = {}
-    for item in output:
-        if item.get("type") == "function_call_output":
-            tool_outputs[item.get("call_id")] = item
+    tool_outputs = get_tool_outputs(output)
 
     # Second pass: render items in order
-    for idx, item in enumerate(output):
-        item_type = item.get("type", "")
-
-        if item_type == "message":
-            for content_part in item.get("content", []):
-                if "text" in content_part:
-                    text = content_part.get("text", "").strip()
-                    if text:
-                        content = f"{content}{text}\n"
-
-        elif item_type == "function_call":
-            # Render tool call inline with its result (if available)
-            if content and not content.endswith("\n"):
-                content += "\n"
-
-            call_id = item.get("call_id", "")
-            name = item.get("name", "")
-            arguments = item.get("arguments", "")
-
-            result_item = tool_outputs.get(call_id)
-            if result_item:
-                result_text = ""
-                for out in result_item.get("output", []):
-                    if "text" in out:
-                        result_text += out.get("text", "")
-                files = result_item.get("files")
-                embeds = result_item.get("embeds", "")
-
-                content += f'<details type="tool_calls" done="true" id="{call_id}" name="{name}" arguments="{html.escape(json.dumps(arguments))}" result="{html.escape(json.dumps(result_text, ensure_ascii=False))}" files="{html.escape(json.dumps(files)) if files else ""}" embeds="{html.escape(json.dumps(embeds))}">\n<summary>Tool Executed</summary>\n</details>\n'
-            else:
-                content += f'<details type="tool_calls" done="false" id="{call_id}" name="{name}" arguments="{html.escape(json.dumps(arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+    for idx in range(len(output)):
+        content = render_output_item(content, output, idx, tool_outputs)
 
-        elif item_type == "function_call_output":
-            # Already handled inline with function_call above
-            pass
+    return content.strip()
 
-        elif item_type == "reasoning":
-            reasoning_content = ""
-            # Check for 'summary' (new structure) or 'content' (legacy/fallback)
-            source_list = item.get("summary", []) or item.get("content", [])
-            for content_part in source_list:
-                if "text" in content_part:
-                    reasoning_content += content_part.get("text", "")
-                elif "summary" in content_part:  # Handle potential nested logic if any
-                    pass
 
-            reasoning_content = reasoning_content.strip()
+def _text_parts_key(parts) -> Optional[tuple]:
+    if parts is None:
+        return None
+    return tuple(part.get("text", "") if "text" in part else None for part in parts)
 
-            duration = item.get("duration")
-            status = item.get("status", "in_progress")
 
-            # Infer completion: if this reasoning item is NOT the last item,
-            # render as done (a subsequent item means reasoning is complete)
-            is_last_item = idx == len(output) - 1
+def _value_key(value):
+    # Containers are keyed by their JSON so in-place mutation is noticed
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, sort_keys=True, default=repr)
 
-            if content and not content.endswith("\n"):
-                content += "\n"
 
-            display = html.escape(
-                "\n".join(
-                    (f"> {line}" if not line.startswith(">") else line)
-                    for line in reasoning_content.splitlines()
-                )
+def output_item_render_key(output: list, idx: int, tool_outputs: dict) -> tuple:
+    """
+    Everything render_output_item() reads for output[idx], apart from the
+    content before it. Equal keys mean equal HTML for that item.
+    """
+    item = output[idx]
+    item_type = item.get("type", "")
+    is_last_item = idx == len(output) - 1
+
+    if item_type == "message":
+        return (item_type, _text_parts_key(item.get("content", [])))
+
+    elif item_type == "function_call":
+        result_key = None
+        result_item = tool_outputs.get(item.get("call_id", ""))
+        if result_item:
+            result_key = (
+                _text_parts_key(result_item.get("output", [])),
+                _value_key(result_item.get("files")),
+                _value_key(result_item.get("embeds", "")),
             )
+        return (
+            item_type,
+            item.get("call_id", ""),
+            item.get("name", ""),
+            _value_key(item.get("arguments", "")),
+            result_key,
+        )
 
-            if status == "completed" or duration is not None or not is_last_item:
-                content = f'{content}<details type="reasoning" done="true" duration="{duration or 0}">\n<summary>Thought for {duration or 0} seconds</summary>\n{display}\n</details>\n'
-            else:
-                content = f'{content}<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{display}\n</details>\n'
+    elif item_type == "reasoning":
+        return (
+            item_type,
+            _text_parts_key(item.get("summary", [])),
+            _text_parts_key(item.get("content", [])),
+            item.get("duration"),
+            item.get("status", "in_progress"),
+            is_last_item,
+        )
+
+    elif item_type == "open_webui:code_interpreter":
+        return (
+            item_type,
+            item.get("code", ""),
+            item.get("lang", "python"),
+            item.get("status", "in_progress"),
+            item.get("duration"),
+            _value_key(item.get("output")),
+            is_last_item,
+        )
+
+    return (item_type,)
+
+
+def is_output_item_final(item: dict, tool_outputs: dict) -> bool:
+    """Whether an item's render key can no longer change, while it is not last"""
+    if item.get("status") != "completed":
+        return False
+    if item.get("type") == "function_call":
+        # Its key includes the result, which arrives after it is completed
+        result_item = tool_outputs.get(item.get("call_id", ""))
+        return bool(result_item) and result_item.get("status") == "completed"
+    return True
+
+
+class OutputSerializer:
+    """
+    Incremental serialize_output() for one streamed response.
+
+    Remembers each item's render key and the content rendered up to the last
+    few items. A call re-renders only from the first item whose key changed,
+    which while streaming is the in-progress tail, so escaping finished tool
+    calls and reasoning blocks is not redone on every delta. The keys of
+    completed items are kept too, so only the open tail is keyed again.
+    Returns exactly what serialize_output(output) would.
+    """
 
-        elif item_type == "open_webui:code_interpreter":
-            content_stripped, original_whitespace = split_content_and_whitespace(
-                content
+    # Rendered prefixes kept; older ones are dropped to bound memory and a
+    # change that far back re-renders from the start.
+    CHECKPOINTS = 4
+
+    def __init__(self):
+        self.keys: list[tuple] = []
+        self.rendered: list[Optional[str]] = []
+        # id(item) -> (item, key) of completed items. Updated items are
+        # copies, so a completed item is not changed in place.
+        self.final_keys: dict[int, tuple[dict, tuple]] = {}
+
+    def get_key(self, output: list, idx: int, tool_outputs: dict) -> tuple:
+        item = output[idx]
+        # The last item is keyed again: its key depends on being last
+        is_last_item = idx == len(output) - 1
+        if not is_last_item:
+            cached = self.final_keys.get(id(item))
+            if cached is not None and cached[0] is item:
+                return cached[1]
+
+        key = output_item_render_key(output, idx, tool_outputs)
+        if not is_last_item and is_output_item_final(item, tool_outputs):
+            self.final_keys[id(item)] = (item, key)
+        return key
+
+    def __call__(self, output: list) -> str:
+        tool_outputs = get_tool_outputs(output)
+        keys = [self.get_key(output, idx, tool_outputs) for idx in range(len(output))]
+
+        start = 0
+        for cached, key in zip(self.keys, keys):
+            if cached != key:
+                break
+            start += 1
+        while start and self.rendered[start - 1] is None:
+            start -= 1
+
+        del self.rendered[start:]
+        content = self.rendered[-1] if self.rendered else ""
+        for idx in range(start, len(output)):
+            content = render_output_item(content, output, idx, tool_outputs)
+            self.rendered.append(content)
+
+        for idx in range(len(self.rendered) - self.CHECKPOINTS - 1, -1, -1):
+            if self.rendered[idx] is None:
+                break
+            self.rendered[idx] = None
+
+        self.keys = keys
+        return content.strip()
+
+
+def get_start_tag_pattern(start_tag: str) -> str:
+    """Regex for a start tag; "<tag>" also matches "<tag attr=...>"."""
+    if start_tag.startswith("<") and start_tag.endswith(">"):
+        return rf"<{re.escape(start_tag[1:-1])}(\s.*?)?>"
+    return re.escape(start_tag)
+
+
+class StreamTagScanner:
+    """
+    Incremental start/end tag detection for one streamed response.
+
+    Remembers how far the text of the item being streamed into was scanned
+    and searches only the appended text plus a carry-over window long enough
+    for a tag split across chunks, with one alternation over all start tags.
+    A "<tag ..." whose attributes are still streaming is kept as a pending
+    opener until its ">" (a match) or a newline (no match) arrives.
+
+    Results are the same as searching the whole text on every chunk: the
+    first tag in list order that matches, at its leftmost match.
+    """
+
+    # Characters checked to notice that a scanned text was rewritten
+    TAIL = 64
+
+    def __init__(self):
+        self.patterns: dict[tuple, tuple] = {}
+        self.state: dict[tuple, dict] = {}
+
+    def _compile(self, tags: tuple) -> tuple:
+        compiled = self.patterns.get(tags)
+        if compiled is None:
+            patterns = [get_start_tag_pattern(start_tag) for start_tag, _ in tags]
+            openers = [
+                re.escape(start_tag[:-1])
+                for start_tag, _ in tags
+                if start_tag.startswith("<") and start_tag.endswith(">")
+            ]
+            compiled = (
+                re.compile("|".join(f"(?:{pattern})" for pattern in patterns)),
+                [re.compile(pattern) for pattern in patterns],
+                re.compile(rf"(?:{'|'.join(openers)})\s") if openers else None,
+                max(len(start_tag) for start_tag, _ in tags) - 1,
             )
-            if is_opening_code_block(content_stripped):
-                content = content_stripped.rstrip("`").rstrip() + original_whitespace
-            else:
-                content = content_stripped + original_whitespace
-
-            if content and not content.endswith("\n"):
-                content += "\n"
-
-            # Render the code_interpreter item as a <details> block
-            # so the frontend Collapsible renders "Analyzing..."/"Analyzed".
-            code = item.get("code", "").strip()
-            lang = item.get("lang", "python")
-            status = item.get("status", "in_progress")
-            duration = item.get("duration")
-            is_last_item = idx == len(output) - 1
-
-            # Build inner content: code block
-            display = ""
-            if code:
-                display = f"```{lang}\n{code}\n```"
-
-            # Build output attribute as HTML-escaped JSON for CodeBlock.svelte
-            ci_output = item.get("output")
-            output_attr = ""
-            if ci_output:
-                if isinstance(ci_output, dict):
-                    output_json = json.dumps(ci_output, ensure_ascii=False)
-                else:
-                    output_json = json.dumps(
-                        {"result": str(ci_output)}, ensure_ascii=False
-                    )
-                output_attr = f' output="{html.escape(output_json)}"'
+            self.patterns[tags] = compiled
+        return compiled
 
-            if status == "completed" or duration is not None or not is_last_item:
-                content += f'<details type="code_interpreter" done="true" duration="{duration or 0}"{output_attr}>\n<summary>Analyzed</summary>\n{display}\n</details>\n'
-            else:
-                content += f'<details type="code_interpreter" done="false"{output_attr}>\n<summary>Analyzing…</summary>\n{display}\n</details>\n'
+    def _state(self, key: tuple, owner: Any, text: str) -> dict:
+        state = self.state.get(key)
+        if (
+            state is None
+            or state["owner"] is not owner
+            or len(text) < state["length"]
+            or text[state["length"] - len(state["tail"]) : state["length"]]
+            != state["tail"]
+        ):
+            state = {"owner": owner, "length": 0, "tail": "", "pending": None}
+            self.state[key] = state
+        return state
+
+    def _save(self, state: dict, text: str, pending: Optional[tuple] = None):
+        state["length"] = len(text)
+        state["tail"] = text[-self.TAIL :]
+        state["pending"] = pending
+
+    @staticmethod
+    def _pending_opener(opener, text: str, pos: int) -> Optional[tuple]:
+        # An opener is still open if no ">" or newline follows its whitespace
+        last = max(text.rfind(">", pos), text.rfind("\n", pos))
+        for match in opener.finditer(text, pos):
+            if match.end() > last:
+                return match.start(), match.end()
+        return None
 
-    return content.strip()
+    def find_start(self, owner: Any, text: str, tags: list) -> Optional[tuple]:
+        """
+        Return (index into tags, match) for the first tag in `tags` that
+        occurs in `text`, or None. `owner` is the item the text belongs to.
+        """
+        tags = tuple(tags)
+        if not tags:
+            return None
+        combined, patterns, opener, carry = self._compile(tags)
+        key = ("start", tags)
+        state = self._state(key, owner, text)
+
+        pos = max(0, state["length"] - carry)
+        pending = state["pending"]
+        found = combined.search(text, pos) is not None
+        if pending is not None:
+            boundary = _TAG_BOUNDARY_RE.search(text, max(state["length"], pending[1]))
+            if boundary is not None:
+                if boundary.group() == ">":
+                    found = True
+                else:
+                    pending = None
+
+        if found:
+            begin = min(pos, pending[0]) if pending is not None else pos
+            for idx, pattern in enumerate(patterns):
+                match = pattern.search(text, begin)
+                if match:
+                    del self.state[key]
+                    return idx, match
+
+        if pending is None and opener is not None:
+            pending = self._pending_opener(opener, text, pos)
+        self._save(state, text, pending)
+        return None
+
+    def find_end(self, owner: Any, text: str, end_tag: str) -> bool:
+        """Return whether `end_tag` occurs in `text`, the text of `owner`."""
+        key = ("end", end_tag)
+        state = self._state(key, owner, text)
+        if text.find(end_tag, max(0, state["length"] - len(end_tag) + 1)) != -1:
+            del self.state[key]
+            return True
+        self._save(state, text)
+        return False
 
 
 def deep_merge(target, source):
@@ -2992,6 +3270,10 @@ async def non_streaming_chat_response_handler(response, ctx):
                         }
                     )
 
+                    await CHAT_EVENT_WRITER.flush(
+                        metadata["chat_id"], metadata["message_id"]
+                    )
+
                     # Save message in the database
                     Chats.upsert_message_to_chat_by_id_and_message_id(
                         metadata["chat_id"],
@@ -3060,12 +3342,11 @@ async def streaming_chat_response_handler(response, ctx):
         "__model__": model,
     }
 
-    filter_functions = [
-        Functions.get_function_by_id(filter_id)
-        for filter_id in get_sorted_filter_ids(
-            request, model, metadata.get("filter_ids", [])
-        )
-    ]
+    filter_functions = Functions.get_functions_by_ids(
+        get_sorted_filter_ids(request, model, metadata.get("filter_ids", []))
+    )
+    # Resolved on the first chunk, then applied to every chunk
+    stream_filters = FilterPipeline(request, filter_functions, "stream")
 
     # Standard streaming response handler
     if event_emitter and event_caller:
@@ -3123,101 +3404,91 @@ async def streaming_chat_response_handler(response, ctx):
                 if last_type == "message":
                     # Use the output item's own text for tag detection
                     item_text = get_last_text(output)
-                    for start_tag, end_tag in tags:
-
-                        start_tag_pattern = rf"{re.escape(start_tag)}"
-                        if start_tag.startswith("<") and start_tag.endswith(">"):
-                            start_tag_pattern = (
-                                rf"<{re.escape(start_tag[1:-1])}(\s.*?)?>"
-                            )
+                    found = tag_scanner.find_start(output[-1], item_text, tags)
+                    if found:
+                        start_tag, end_tag = tags[found[0]]
+                        match = found[1]
+                        try:
+                            attr_content = match.group(1) if match.group(1) else ""
+                        except:
+                            attr_content = ""
 
-                        match = re.search(start_tag_pattern, item_text)
-                        if match:
-                            try:
-                                attr_content = match.group(1) if match.group(1) else ""
-                            except:
-                                attr_content = ""
+                        attributes = extract_attributes(attr_content)
 
-                            attributes = extract_attributes(attr_content)
+                        before_tag = item_text[: match.start()]
+                        after_tag = item_text[match.end() :]
 
-                            before_tag = item_text[: match.start()]
-                            after_tag = item_text[match.end() :]
+                        # Keep only text before the tag in the message
+                        set_last_text(output, before_tag)
 
-                            # Keep only text before the tag in the message
-                            set_last_text(output, before_tag)
+                        if not before_tag.strip():
+                            # Remove empty message item
+                            if output and output[-1].get("type") == "message":
+                                output.pop()
 
-                            if not before_tag.strip():
-                                # Remove empty message item
-                                if output and output[-1].get("type") == "message":
-                                    output.pop()
+                        # Append the new output item
+                        if output_item_type == "reasoning":
+                            output.append(
+                                {
+                                    "type": "reasoning",
+                                    "id": output_id("r"),
+                                    "status": "in_progress",
+                                    "start_tag": start_tag,
+                                    "end_tag": end_tag,
+                                    "attributes": attributes,
+                                    "content": [],
+                                    "summary": None,
+                                    "started_at": time.time(),
+                                }
+                            )
+                        elif output_item_type == "open_webui:code_interpreter":
+                            output.append(
+                                {
+                                    "type": "open_webui:code_interpreter",
+                                    "id": output_id("ci"),
+                                    "status": "in_progress",
+                                    "start_tag": start_tag,
+                                    "end_tag": end_tag,
+                                    "attributes": attributes,
+                                    "lang": attributes.get("lang", "python"),
+                                    "code": "",
+                                    "output": None,
+                                    "started_at": time.time(),
+                                }
+                            )
+                        else:
+                            # solution or other text-producing tag
+                            output.append(
+                                {
+                                    "type": "message",
+                                    "id": output_id("msg"),
+                                    "status": "in_progress",
+                                    "role": "assistant",
+                                    "content": [{"type": "output_text", "text": ""}],
+                                    "_tag_type": content_type,
+                                    "start_tag": start_tag,
+                                    "end_tag": end_tag,
+                                    "attributes": attributes,
+                                    "started_at": time.time(),
+                                }
+                            )
 
-                            # Append the new output item
+                        if after_tag:
+                            # Set the after_tag content on the new item
                             if output_item_type == "reasoning":
-                                output.append(
-                                    {
-                                        "type": "reasoning",
-                                        "id": output_id("r"),
-                                        "status": "in_progress",
-                                        "start_tag": start_tag,
-                                        "end_tag": end_tag,
-                                        "attributes": attributes,
-                                        "content": [],
-                                        "summary": None,
-                                        "started_at": time.time(),
-                                    }
-                                )
+                                output[-1]["content"] = [
+                                    {"type": "output_text", "text": after_tag}
+                                ]
                             elif output_item_type == "open_webui:code_interpreter":
-                                output.append(
-                                    {
-                                        "type": "open_webui:code_interpreter",
-                                        "id": output_id("ci"),
-                                        "status": "in_progress",
-                                        "start_tag": start_tag,
-                                        "end_tag": end_tag,
-                                        "attributes": attributes,
-                                        "lang": attributes.get("lang", "python"),
-                                        "code": "",
-                                        "output": None,
-                                        "started_at": time.time(),
-                                    }
-                                )
+                                output[-1]["code"] = after_tag
                             else:
-                                # solution or other text-producing tag
-                                output.append(
-                                    {
-                                        "type": "message",
-                                        "id": output_id("msg"),
-                                        "status": "in_progress",
-                                        "role": "assistant",
-                                        "content": [
-                                            {"type": "output_text", "text": ""}
-                                        ],
-                                        "_tag_type": content_type,
-                                        "start_tag": start_tag,
-                                        "end_tag": end_tag,
-                                        "attributes": attributes,
-                                        "started_at": time.time(),
-                                    }
-                                )
-
-                            if after_tag:
-                                # Set the after_tag content on the new item
-                                if output_item_type == "reasoning":
-                                    output[-1]["content"] = [
-                                        {"type": "output_text", "text": after_tag}
-                                    ]
-                                elif output_item_type == "open_webui:code_interpreter":
-                                    output[-1]["code"] = after_tag
-                                else:
-                                    set_last_text(output, after_tag)
+                                set_last_text(output, after_tag)
 
-                                _, recursive_end = tag_output_handler(
-                                    content_type, tags, output
-                                )
-                                if recursive_end:
-                                    end_flag = True
-
-                            break
+                            _, recursive_end = tag_output_handler(
+                                content_type, tags, output
+                            )
+                            if recursive_end:
+                                end_flag = True
 
                 elif (
                     (last_type == "reasoning" and content_type == "reasoning")
@@ -3247,17 +3518,12 @@ async def streaming_chat_response_handler(response, ctx):
                     else:
                         block_content = get_last_text(output)
 
-                    if re.search(end_tag_pattern, block_content):
+                    if tag_scanner.find_end(item, block_content, end_tag):
                         end_flag = True
 
                         # Strip start and end tags from content
-                        start_tag_pattern = rf"{re.escape(start_tag)}"
-                        if start_tag.startswith("<") and start_tag.endswith(">"):
-                            start_tag_pattern = (
-                                rf"<{re.escape(start_tag[1:-1])}(\s.*?)?>"
-                            )
                         block_content = re.sub(
-                            start_tag_pattern, "", block_content
+                            get_start_tag_pattern(start_tag), "", block_content
                         ).strip()
 
                         end_tag_regex = re.compile(end_tag_pattern, re.DOTALL)
@@ -3366,6 +3632,15 @@ async def streaming_chat_response_handler(response, ctx):
                 else:
                     output = []
 
+            # Re-renders only the output items that changed since the last delta
+            render_output = OutputSerializer()
+            # Scans only newly streamed text for reasoning/solution/code tags
+            tag_scanner = StreamTagScanner()
+            # Coalesces ENABLE_REALTIME_CHAT_SAVE writes of this message
+            realtime_saver = RealtimeChatSaver(
+                metadata["chat_id"], metadata["message_id"]
+            )
+
             usage = None
 
             reasoning_tags_param = metadata.get("params", {}).get("reasoning_tags")
@@ -3457,12 +3732,8 @@ async def streaming_chat_response_handler(response, ctx):
                         try:
                             data = json.loads(data)
 
-                            data, _ = await process_filter_functions(
-                                request=request,
-                                filter_functions=filter_functions,
-                                filter_type="stream",
-                                form_data=data,
-                                extra_params={"__body__": form_data, **extra_params},
+                            data, _ = await stream_filters.process(
+                                data, {"__body__": form_data, **extra_params}
                             )
 
                             if data:
@@ -3494,7 +3765,7 @@ async def streaming_chat_response_handler(response, ctx):
 
                                     processed_data = {
                                         "output": output,
-                                        "content": serialize_output(output),
+                                        "content": render_output(output),
                                     }
 
                                     # print(data)
@@ -3666,7 +3937,7 @@ async def streaming_chat_response_handler(response, ctx):
                                                 {
                                                     "type": "chat:completion",
                                                     "data": {
-                                                        "content": serialize_output(
+                                                        "content": render_output(
                                                             pending_output
                                                         ),
                                                     },
@@ -3737,7 +4008,7 @@ async def streaming_chat_response_handler(response, ctx):
                                                 }
                                             ]
 
-                                        data = {"content": serialize_output(output)}
+                                        data = {"content": render_output(output)}
 
                                     if value:
                                         if (
@@ -3921,17 +4192,15 @@ async def streaming_chat_response_handler(response, ctx):
 
                                         if ENABLE_REALTIME_CHAT_SAVE:
                                             # Save message in the database
-                                            Chats.upsert_message_to_chat_by_id_and_message_id(
-                                                metadata["chat_id"],
-                                                metadata["message_id"],
+                                            realtime_saver.save(
                                                 {
-                                                    "content": serialize_output(output),
+                                                    "content": render_output(output),
                                                     "output": output,
-                                                },
+                                                }
                                             )
                                         else:
                                             data = {
-                                                "content": serialize_output(output),
+                                                "content": render_output(output),
                                             }
 
                                 if delta:
@@ -4029,7 +4298,7 @@ async def streaming_chat_response_handler(response, ctx):
                         {
                             "type": "chat:completion",
                             "data": {
-                                "content": serialize_output(output),
+                                "content": render_output(output),
                                 "output": output,
                             },
                         }
@@ -4257,7 +4526,7 @@ async def streaming_chat_response_handler(response, ctx):
                         {
                             "type": "chat:completion",
                             "data": {
-                                "content": serialize_output(output),
+                                "content": render_output(output),
                                 "output": output,
                             },
                         }
@@ -4303,7 +4572,7 @@ async def streaming_chat_response_handler(response, ctx):
                             {
                                 "type": "chat:completion",
                                 "data": {
-                                    "content": serialize_output(output),
+                                    "content": render_output(output),
                                     "output": output,
                                 },
                             }
@@ -4441,7 +4710,7 @@ async def streaming_chat_response_handler(response, ctx):
                             {
                                 "type": "chat:completion",
                                 "data": {
-                                    "content": serialize_output(output),
+                                    "content": render_output(output),
                                     "output": output,
                                 },
                             }
@@ -4478,10 +4747,15 @@ async def streaming_chat_response_handler(response, ctx):
                     if item.get("status") == "in_progress":
                         item["status"] = "completed"
 
+                # Events emitted during the response are written before it
+                await CHAT_EVENT_WRITER.flush(
+                    metadata["chat_id"], metadata["message_id"]
+                )
+
                 title = Chats.get_chat_title_by_id(metadata["chat_id"])
                 data = {
                     "done": True,
-                    "content": serialize_output(output),
+                    "content": render_output(output),
                     "output": output,
                     "title": title,
                 }
@@ -4492,16 +4766,18 @@ async def streaming_chat_response_handler(response, ctx):
                         metadata["chat_id"],
                         metadata["message_id"],
                         {
-                            "content": serialize_output(output),
+                            "content": render_output(output),
                             "output": output,
                             **({"usage": usage} if usage else {}),
                         },
                     )
-                elif usage:
-                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                        metadata["chat_id"],
-                        metadata["message_id"],
-                        {"usage": usage},
+                else:
+                    realtime_saver.flush(
+                        {
+                            "content": render_output(output),
+                            "output": output,
+                            **({"usage": usage} if usage else {}),
+                        }
                     )
 
                 # Send a webhook notification if the user is not active
@@ -4531,6 +4807,9 @@ async def streaming_chat_response_handler(response, ctx):
             except asyncio.CancelledError:
                 log.warning("Task was cancelled!")
                 await event_emitter({"type": "chat:tasks:cancel"})
+                await CHAT_EVENT_WRITER.flush(
+                    metadata["chat_id"], metadata["message_id"]
+                )
 
                 if not ENABLE_REALTIME_CHAT_SAVE:
                     # Save message in the database
@@ -4538,10 +4817,12 @@ async def streaming_chat_response_handler(response, ctx):
                         metadata["chat_id"],
                         metadata["message_id"],
                         {
-                            "content": serialize_output(output),
+                            "content": render_output(output),
                             "output": output,
                         },
                     )
+                else:
+                    realtime_saver.flush()
 
             if response.background is not None:
                 await response.background()
@@ -4555,25 +4836,13 @@ async def streaming_chat_response_handler(response, ctx):
                 return f"data: {item}\n\n"
 
             for event in events:
-                event, _ = await process_filter_functions(
-                    request=request,
-                    filter_functions=filter_functions,
-                    filter_type="stream",
-                    form_data=event,
-                    extra_params=extra_params,
-                )
+                event, _ = await stream_filters.process(event, extra_params)
 
                 if event:
                     yield wrap_item(json.dumps(event))
 
             async for data in original_generator:
-                data, _ = await process_filter_functions(
-                    request=request,
-                    filter_functions=filter_functions,
-                    filter_type="stream",
-                    form_data=data,
-                    extra_params=extra_params,
-                )
+                data, _ = await stream_filters.process(data, extra_params)
 
                 if data:
                     yield data
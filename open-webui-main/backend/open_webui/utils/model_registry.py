@@ -0,0 +1,162 @@
+"""
+Versioned cache of the models built by utils/models.get_all_models.
+
+get_all_models merges the base models with arena models, custom models,
+functions and access grants. The merged models are kept until something
+they are built from changes:
+
+- ModelsTable, FunctionsTable and AccessGrantsTable (for models) call
+  MODEL_REGISTRY.invalidate() when they write. With REDIS_URL this also
+  bumps {prefix}:models:version, which every instance checks at most every
+  CONFIG_REDIS_REFRESH_INTERVAL seconds.
+- The config values get_all_models reads are part of the cache key.
+- Base models are refetched in the background every
+  MODELS_REGISTRY_REFRESH_INTERVAL seconds unless ENABLE_BASE_MODELS_CACHE
+  keeps them until an explicit refresh.
+
+Each build that changes the models gets a new `build` number. Per-user
+filtered model lists are memoized by build, user, role and groups.
+MODELS_REGISTRY_REFRESH_INTERVAL=0 disables the cache: models are built
+on every call, as before.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from open_webui.env import (
+    CONFIG_REDIS_REFRESH_INTERVAL,
+    MODELS_FILTER_CACHE_SIZE,
+    MODELS_REGISTRY_REFRESH_INTERVAL,
+    REDIS_KEY_PREFIX,
+    REDIS_URL,
+)
+from open_webui.utils.redis import get_redis_client
+
+log = logging.getLogger(__name__)
+
+# Exported by utils/telemetry/metrics.py
+MODEL_REGISTRY_STATS = {
+    "hits": 0,
+    "builds": 0,
+    "filter_hits": 0,
+    "filter_misses": 0,
+}
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        refresh_interval: float = MODELS_REGISTRY_REFRESH_INTERVAL,
+        filter_cache_size: int = MODELS_FILTER_CACHE_SIZE,
+        redis: Any = None,
+        redis_key_prefix: str = REDIS_KEY_PREFIX,
+    ):
+        self.refresh_interval = refresh_interval
+        self.filter_cache_size = filter_cache_size
+        # Sync client sharing the version, created on first use
+        self.redis = redis
+        self.redis_version_key = f"{redis_key_prefix}:models:version"
+        # Bumped on every invalidation, local or seen in Redis
+        self.version = 0
+        self.redis_version: Optional[str] = None
+        self.checked_at = 0.0
+        # Models of the last build, and the version and key it was built for
+        self.models: Optional[list[dict]] = None
+        self.models_dict: dict = {}
+        self.built_for: Optional[tuple] = None
+        self.build = 0
+        # (build, user id, role, group ids) -> filtered models
+        self.filtered: OrderedDict[tuple, list[dict]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.refresh_interval > 0
+
+    def _get_redis(self):
+        if self.redis is None and REDIS_URL:
+            self.redis = get_redis_client()
+        return self.redis
+
+    def invalidate(self, publish: bool = True):
+        """Rebuild the models on the next call, on every instance if `publish`"""
+        with self.lock:
+            self.version += 1
+        if not (publish and self.enabled):
+            return
+        try:
+            redis = self._get_redis()
+            if redis is not None:
+                self.redis_version = str(redis.incr(self.redis_version_key))
+        except Exception as e:
+            log.warning(f"Failed to publish model registry version: {e}")
+
+    def check(self):
+        """Invalidate if another instance did, at most once per interval"""
+        now = time.monotonic()
+        if now - self.checked_at < CONFIG_REDIS_REFRESH_INTERVAL:
+            return
+        self.checked_at = now
+        try:
+            redis = self._get_redis()
+            if redis is None:
+                return
+            version = redis.get(self.redis_version_key)
+            version = version.decode() if isinstance(version, bytes) else version
+        except Exception as e:
+            log.warning(f"Failed to check model registry version: {e}")
+            return
+        if version != self.redis_version:
+            self.redis_version = version
+            self.invalidate(publish=False)
+
+    def get_models(self, key: Any) -> Optional[list[dict]]:
+        """The models last built for `key`, if nothing changed since"""
+        if not self.enabled:
+            return None
+        self.check()
+        if self.models is None or self.built_for != (self.version, key):
+            return None
+        MODEL_REGISTRY_STATS["hits"] += 1
+        return self.models
+
+    def set_models(self, version: int, key: Any, models: list[dict], models_dict: dict):
+        """
+        Keep `models`, built for `key` from the state at `version`. A newer
+        version means something changed during the build: the next call
+        builds again.
+        """
+        MODEL_REGISTRY_STATS["builds"] += 1
+        with self.lock:
+            if models_dict != self.models_dict:
+                self.build += 1
+                self.filtered.clear()
+            self.models = models
+            self.models_dict = models_dict
+            self.built_for = (version, key)
+
+    def get_filtered(self, key: tuple) -> Optional[list[dict]]:
+        if not self.enabled:
+            return None
+        with self.lock:
+            models = self.filtered.get((self.build, *key))
+            if models is not None:
+                self.filtered.move_to_end((self.build, *key))
+        MODEL_REGISTRY_STATS["filter_misses" if models is None else "filter_hits"] += 1
+        return models
+
+    def set_filtered(self, build: int, key: tuple, models: list[dict]):
+        if not self.enabled:
+            return
+        with self.lock:
+            if build != self.build:
+                return
+            self.filtered[(build, *key)] = models
+            while len(self.filtered) > self.filter_cache_size:
+                self.filtered.popitem(last=False)
+
+
+MODEL_REGISTRY = ModelRegistry()
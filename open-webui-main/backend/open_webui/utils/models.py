@@ -1,4 +1,5 @@
 import copy
+import json
 import time
 import logging
 import asyncio
@@ -23,6 +24,7 @@ from open_webui.utils.plugin import (
     get_function_module_from_cache,
 )
 from open_webui.utils.access_control import has_access
+from open_webui.utils.model_registry import MODEL_REGISTRY
 
 
 from open_webui.config import (
@@ -79,7 +81,39 @@ async def get_all_base_models(request: Request, user: UserModel = None):
     return function_models + openai_models + ollama_models
 
 
+def get_models_key(request: Request) -> str:
+    """The config get_all_models builds the models from, see ModelRegistry"""
+    config = request.app.state.config
+    return json.dumps(
+        [
+            getattr(config, key, None)
+            for key in (
+                "ENABLE_OPENAI_API",
+                "OPENAI_API_BASE_URLS",
+                "OPENAI_API_KEYS",
+                "OPENAI_API_CONFIGS",
+                "ENABLE_OLLAMA_API",
+                "OLLAMA_BASE_URLS",
+                "OLLAMA_API_CONFIGS",
+                "ENABLE_EVALUATION_ARENA_MODELS",
+                "EVALUATION_ARENA_MODELS",
+                "DEFAULT_MODEL_METADATA",
+            )
+        ],
+        sort_keys=True,
+        default=str,
+    )
+
+
 async def get_all_models(request, refresh: bool = False, user: UserModel = None):
+    models_key = get_models_key(request)
+    if not refresh and request.app.state.MODELS:
+        models = MODEL_REGISTRY.get_models(models_key)
+        if models is not None:
+            return models
+    # Anything invalidating the registry from here on is built next time
+    version = MODEL_REGISTRY.version
+
     if (
         request.app.state.MODELS
         and request.app.state.BASE_MODELS
@@ -95,6 +129,7 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
 
     # If there are no models, return an empty list
     if len(models) == 0:
+        MODEL_REGISTRY.set_models(version, models_key, [], {})
         return []
 
     # Add arena models
@@ -377,14 +412,58 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
     log.debug(f"get_all_models() returned {len(models)} models")
 
     models_dict = {model["id"]: model for model in models}
+    # Keep the time unchanged models were first listed at, so they compare
+    # equal to the last build
+    for model_id, model in models_dict.items():
+        previous = MODEL_REGISTRY.models_dict.get(model_id)
+        if (
+            previous is not None
+            and model.get("created") != previous.get("created")
+            and {**model, "created": previous.get("created")} == previous
+        ):
+            model["created"] = previous.get("created")
+
     if isinstance(request.app.state.MODELS, RedisDict):
+        # Only the models that changed since the last build are written
         request.app.state.MODELS.set(models_dict)
     else:
         request.app.state.MODELS = models_dict
 
+    MODEL_REGISTRY.set_models(version, models_key, models, models_dict)
     return models
 
 
+async def periodic_models_refresh(app):
+    """
+    Refetch the base models every MODELS_REGISTRY_REFRESH_INTERVAL seconds,
+    so requests are served from the model registry
+    """
+    request = Request(
+        {
+            "type": "http",
+            "asgi.version": "3.0",
+            "asgi.spec_version": "2.0",
+            "method": "GET",
+            "path": "/internal",
+            "query_string": b"",
+            "headers": [],
+            "client": ("127.0.0.1", 12345),
+            "server": ("127.0.0.1", 80),
+            "scheme": "http",
+            "app": app,
+        }
+    )
+    while True:
+        await asyncio.sleep(MODEL_REGISTRY.refresh_interval)
+        # Only once models were requested, and not when kept until refreshed
+        if not app.state.MODELS or app.state.config.ENABLE_BASE_MODELS_CACHE:
+            continue
+        try:
+            await get_all_models(request, refresh=True)
+        except Exception as e:
+            log.warning(f"Failed to refresh models: {e}")
+
+
 def check_model_access(user, model, db=None):
     if model.get("arena"):
         meta = model.get("info", {}).get("meta", {})
@@ -413,7 +492,7 @@ def check_model_access(user, model, db=None):
             raise Exception("Model not found")
 
 
-def get_filtered_models(models, user, db=None):
+def get_filtered_models(models, user, db=None, user_group_ids=None):
     # Filter out models that the user does not have access to
     if (
         user.role == "user"
@@ -427,9 +506,10 @@ def get_filtered_models(models, user, db=None):
             if info:
                 model_infos[model["id"]] = info
 
-        user_group_ids = {
-            group.id for group in Groups.get_groups_by_member_id(user.id, db=db)
-        }
+        if user_group_ids is None:
+            user_group_ids = {
+                group.id for group in Groups.get_groups_by_member_id(user.id, db=db)
+            }
 
         # Batch-fetch accessible resource IDs in a single query instead of N has_access calls
         accessible_model_ids = AccessGrants.get_accessible_resource_ids(
@@ -389,6 +389,8 @@ def get_function_module_from_cache(request, function_id, load_from_db=True):
         ):
             return request.app.state.FUNCTIONS[function_id], None, None
 
+        # Content unknown: the next load from the database replaces the module
+        content = None
         function_module, function_type, frontmatter = load_function_module_by_id(
             function_id
         )
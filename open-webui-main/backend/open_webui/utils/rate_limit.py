@@ -1,139 +1,219 @@
+import hashlib
+import logging
+import math
 import time
-from typing import Optional, Dict
-from open_webui.env import REDIS_KEY_PREFIX
+from collections import OrderedDict
+from typing import Any, Optional
+
+from redis.exceptions import NoScriptError
+
+from open_webui.env import (
+    CHAT_RATE_LIMIT_PER_API_KEY,
+    CHAT_RATE_LIMIT_PER_MODEL,
+    CHAT_RATE_LIMIT_PER_USER,
+    CHAT_RATE_LIMIT_WINDOW,
+    RATE_LIMIT_MEMORY_SIZE,
+    REDIS_KEY_PREFIX,
+    REDIS_URL,
+)
+from open_webui.utils.redis import get_redis_client
+
+log = logging.getLogger(__name__)
+
+# Exported by utils/telemetry/metrics.py
+RATE_LIMIT_STATS = {
+    "checks": 0,
+    "limited": 0,
+    "fallbacks": 0,
+}
+
+# Generic cell rate algorithm: one key per limited key holding its
+# theoretical arrival time (TAT) in milliseconds, checked and updated in
+# one round trip. Time is taken from the Redis server so that every
+# instance agrees on it.
+#
+# KEYS[1]: limited key
+# ARGV[1]: emission interval (window / limit) in milliseconds
+# ARGV[2]: limit
+# ARGV[3]: cost, 0 to only read the count
+#
+# Returns {limited, count}
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+
+local new_tat = tat + interval * cost
+if new_tat - interval * limit > now then
+    return {1, math.ceil((tat - now) / interval)}
+end
+
+if cost > 0 then
+    redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+end
+return {0, math.ceil((new_tat - now) / interval)}
+"""
+GCRA_SCRIPT_SHA = hashlib.sha1(GCRA_SCRIPT.encode()).hexdigest()
 
 
 class RateLimiter:
     """
-    General-purpose rate limiter using Redis with a rolling window strategy.
-    Falls back to in-memory storage if Redis is not available.
+    Rate limiter allowing `limit` events per `window` seconds for each key,
+    using the generic cell rate algorithm (GCRA) in a Redis script. Falls
+    back to a bounded in-memory store if Redis is not available.
     """
 
-    # In-memory fallback storage
-    _memory_store: Dict[str, Dict[int, int]] = {}
-
     def __init__(
         self,
-        redis_client,
+        name: str,
         limit: int,
-        window: int,
-        bucket_size: int = 60,
+        window: float,
+        redis_client: Any = None,
         enabled: bool = True,
+        memory_size: int = RATE_LIMIT_MEMORY_SIZE,
     ):
         """
-        :param redis_client: Redis client instance or None
+        :param name: Namespace of the keys, e.g. "signin"
         :param limit: Max allowed events in the window
         :param window: Time window in seconds
-        :param bucket_size: Bucket resolution
+        :param redis_client: Async Redis client, created on first use with
+            REDIS_URL if None
         :param enabled: Turn on/off rate limiting globally
+        :param memory_size: Keys kept by the in-memory fallback
         """
-        self.r = redis_client
+        self.name = name
         self.limit = limit
         self.window = window
-        self.bucket_size = bucket_size
-        self.num_buckets = window // bucket_size
-        self.enabled = enabled
-
-    def _bucket_key(self, key: str, bucket_index: int) -> str:
-        return f"{REDIS_KEY_PREFIX}:ratelimit:{key.lower()}:{bucket_index}"
-
-    def _current_bucket(self) -> int:
-        return int(time.time()) // self.bucket_size
-
-    def _redis_available(self) -> bool:
-        return self.r is not None
+        self.enabled = enabled and limit > 0
+        # Milliseconds between two events at the sustained rate
+        self.interval = window * 1000 / limit if limit > 0 else 0
+        self.r = redis_client
 
-    def is_limited(self, key: str) -> bool:
+        # In-memory fallback: key -> TAT in milliseconds, least recently
+        # used first. Keys whose TAT has passed are at their full limit
+        # and are dropped first.
+        self.memory_size = memory_size
+        self._memory_store: OrderedDict[str, float] = OrderedDict()
+
+    def _key(self, key: str) -> str:
+        return f"{REDIS_KEY_PREFIX}:ratelimit:{self.name}:{key.lower()}"
+
+    def _get_redis(self):
+        if self.r is None and REDIS_URL:
+            self.r = get_redis_client(async_mode=True)
+        return self.r
+
+    async def _check(self, key: str, cost: int) -> tuple[bool, int]:
+        redis = self._get_redis()
+        if redis is not None:
+            # EVALSHA/EVAL rather than register_script, which the Sentinel
+            # proxy wraps into a coroutine
+            args = (1, self._key(key), self.interval, self.limit, cost)
+            try:
+                try:
+                    limited, count = await redis.evalsha(GCRA_SCRIPT_SHA, *args)
+                except NoScriptError:
+                    limited, count = await redis.eval(GCRA_SCRIPT, *args)
+                return bool(int(limited)), int(count)
+            except Exception as e:
+                RATE_LIMIT_STATS["fallbacks"] += 1
+                log.debug(f"Rate limiter {self.name} falling back to memory: {e}")
+        return self._check_memory(key, cost)
+
+    def _check_memory(self, key: str, cost: int) -> tuple[bool, int]:
+        now = time.time() * 1000
+        store = self._memory_store
+        tat = max(store.get(key, now), now)
+
+        new_tat = tat + self.interval * cost
+        if new_tat - self.interval * self.limit > now:
+            return True, math.ceil((tat - now) / self.interval)
+
+        if cost > 0:
+            store[key] = new_tat
+            store.move_to_end(key)
+            # Drop the expired keys, then the least recently used ones
+            while store:
+                oldest, oldest_tat = next(iter(store.items()))
+                if oldest_tat > now and len(store) <= self.memory_size:
+                    break
+                del store[oldest]
+        return False, math.ceil((new_tat - now) / self.interval)
+
+    async def is_limited(self, key: str, cost: int = 1) -> bool:
         """
-        Main rate-limit check.
+        Main rate-limit check, counting `cost` events unless limited.
         Gracefully handles missing or failing Redis.
         """
         if not self.enabled:
             return False
 
-        if self._redis_available():
-            try:
-                return self._is_limited_redis(key)
-            except Exception:
-                return self._is_limited_memory(key)
-        else:
-            return self._is_limited_memory(key)
+        RATE_LIMIT_STATS["checks"] += 1
+        limited, _ = await self._check(key, cost)
+        if limited:
+            RATE_LIMIT_STATS["limited"] += 1
+        return limited
 
-    def get_count(self, key: str) -> int:
+    async def get_count(self, key: str) -> int:
         if not self.enabled:
             return 0
 
-        if self._redis_available():
-            try:
-                return self._get_count_redis(key)
-            except Exception:
-                return self._get_count_memory(key)
-        else:
-            return self._get_count_memory(key)
-
-    def remaining(self, key: str) -> int:
-        used = self.get_count(key)
-        return max(0, self.limit - used)
-
-    def _is_limited_redis(self, key: str) -> bool:
-        now_bucket = self._current_bucket()
-        bucket_key = self._bucket_key(key, now_bucket)
-
-        attempts = self.r.incr(bucket_key)
-        if attempts == 1:
-            self.r.expire(bucket_key, self.window + self.bucket_size)
+        _, count = await self._check(key, 0)
+        return count
 
-        # Collect buckets
-        buckets = [
-            self._bucket_key(key, now_bucket - i) for i in range(self.num_buckets + 1)
-        ]
-
-        counts = self.r.mget(buckets)
-        total = sum(int(c) for c in counts if c)
-
-        return total > self.limit
-
-    def _get_count_redis(self, key: str) -> int:
-        now_bucket = self._current_bucket()
-        buckets = [
-            self._bucket_key(key, now_bucket - i) for i in range(self.num_buckets + 1)
-        ]
-        counts = self.r.mget(buckets)
-        return sum(int(c) for c in counts if c)
-
-    def _is_limited_memory(self, key: str) -> bool:
-        now_bucket = self._current_bucket()
-
-        # Init storage
-        if key not in self._memory_store:
-            self._memory_store[key] = {}
-
-        store = self._memory_store[key]
-
-        # Increment bucket
-        store[now_bucket] = store.get(now_bucket, 0) + 1
+    async def remaining(self, key: str) -> int:
+        used = await self.get_count(key)
+        return max(0, self.limit - used)
 
-        # Drop expired buckets
-        min_bucket = now_bucket - self.num_buckets
-        expired = [b for b in store if b < min_bucket]
-        for b in expired:
-            del store[b]
 
-        # Count totals
-        total = sum(store.values())
-        return total > self.limit
+def get_request_api_key(request) -> Optional[str]:
+    """The API key a request authenticated with, if any"""
+    token = None
+    authorization = request.headers.get("Authorization")
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[len("bearer ") :].strip()
+    elif getattr(request.state, "token", None):
+        token = request.state.token.credentials
+    if token and token.startswith("sk-"):
+        return token
+    return None
 
-    def _get_count_memory(self, key: str) -> int:
-        now_bucket = self._current_bucket()
-        if key not in self._memory_store:
-            return 0
 
-        store = self._memory_store[key]
-        min_bucket = now_bucket - self.num_buckets
+chat_user_rate_limiter = RateLimiter(
+    "chat:user", CHAT_RATE_LIMIT_PER_USER, CHAT_RATE_LIMIT_WINDOW
+)
+chat_model_rate_limiter = RateLimiter(
+    "chat:model", CHAT_RATE_LIMIT_PER_MODEL, CHAT_RATE_LIMIT_WINDOW
+)
+chat_api_key_rate_limiter = RateLimiter(
+    "chat:api_key", CHAT_RATE_LIMIT_PER_API_KEY, CHAT_RATE_LIMIT_WINDOW
+)
 
-        # Remove expired
-        expired = [b for b in store if b < min_bucket]
-        for b in expired:
-            del store[b]
 
-        return sum(store.values())
+async def is_chat_completion_limited(request, user, model_id: str) -> bool:
+    """
+    Check the chat completion limits per user, per model and per API key,
+    stopping at the first exceeded one.
+    """
+    checks = [(chat_user_rate_limiter, user.id)]
+    if model_id:
+        checks.append((chat_model_rate_limiter, model_id))
+    api_key = get_request_api_key(request)
+    if api_key:
+        # Not stored in Redis as is
+        checks.append(
+            (chat_api_key_rate_limiter, hashlib.sha256(api_key.encode()).hexdigest())
+        )
+
+    for limiter, key in checks:
+        if await limiter.is_limited(key):
+            return True
+    return False
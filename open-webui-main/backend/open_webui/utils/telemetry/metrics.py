@@ -8,6 +8,12 @@ Metrics collected:
 
 * http.server.requests (counter)
 * http.server.duration (histogram, milliseconds)
+* webui.chat.realtime_save.* (counters, coalesced realtime chat saves)
+* webui.chat.event_writes.* (counters, persisted socket events)
+* webui.event_loop.lag (gauge, seconds, worst lag since the last export)
+* webui.auth.* (counters, user cache and auth path database queries)
+* webui.models.registry.* (counters, model list builds and cache hits)
+* webui.ratelimit.* (counters, rate limit checks and rejections)
 
 Attributes used: http.method, http.route, http.status_code
 
@@ -46,6 +52,16 @@ from open_webui.env import (
     OTEL_METRICS_EXPORTER_OTLP_INSECURE,
 )
 from open_webui.models.users import Users
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE_STATS
+from open_webui.retrieval.ingest import CHUNK_EMBEDDING_STATS
+from open_webui.utils.chat_save import (
+    CHAT_EVENT_WRITE_STATS,
+    REALTIME_CHAT_SAVE_STATS,
+)
+from open_webui.utils.event_loop import EVENT_LOOP_LAG_STATS
+from open_webui.utils.model_registry import MODEL_REGISTRY_STATS
+from open_webui.utils.rate_limit import RATE_LIMIT_STATS
+from open_webui.utils.user_cache import AUTH_DB_STATS
 
 _EXPORT_INTERVAL_MILLIS = 10_000  # 10 seconds
 
@@ -101,6 +117,15 @@ def _build_meter_provider(resource: Resource) -> MeterProvider:
         View(
             instrument_name="webui.users.active.today",
         ),
+        View(
+            instrument_name="webui.chat.realtime_save.*",
+        ),
+        View(
+            instrument_name="webui.chat.event_writes.*",
+        ),
+        View(
+            instrument_name="webui.event_loop.lag",
+        ),
     ]
 
     provider = MeterProvider(
@@ -176,6 +201,190 @@ def setup_metrics(app: FastAPI, resource: Resource) -> None:
         callbacks=[observe_users_active_today],
     )
 
+    def realtime_save_callback(key: str):
+        def observe(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=REALTIME_CHAT_SAVE_STATS[key])]
+
+        return observe
+
+    for name, key, description, unit in [
+        ("writes", "written", "Realtime chat saves written", "1"),
+        (
+            "writes_avoided",
+            "avoided",
+            "Realtime chat saves coalesced into a later write",
+            "1",
+        ),
+        (
+            "bytes_saved",
+            "bytes_saved",
+            "Message content not rewritten thanks to coalescing",
+            "By",
+        ),
+    ]:
+        meter.create_observable_counter(
+            name=f"webui.chat.realtime_save.{name}",
+            description=description,
+            unit=unit,
+            callbacks=[realtime_save_callback(key)],
+        )
+
+    def chat_event_write_callback(key: str):
+        def observe(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=CHAT_EVENT_WRITE_STATS[key])]
+
+        return observe
+
+    meter.create_observable_counter(
+        name="webui.chat.event_writes.events",
+        description="Socket events queued for persistence",
+        unit="1",
+        callbacks=[chat_event_write_callback("events")],
+    )
+    meter.create_observable_counter(
+        name="webui.chat.event_writes.writes",
+        description="Message writes persisting queued socket events",
+        unit="1",
+        callbacks=[chat_event_write_callback("written")],
+    )
+
+    def observe_event_loop_lag(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        lag = EVENT_LOOP_LAG_STATS["max"]
+        EVENT_LOOP_LAG_STATS["max"] = EVENT_LOOP_LAG_STATS["last"]
+        return [metrics.Observation(value=lag)]
+
+    meter.create_observable_gauge(
+        name="webui.event_loop.lag",
+        description="Worst event loop lag since the last export",
+        unit="s",
+        callbacks=[observe_event_loop_lag],
+    )
+
+    def embedding_cache_callback(key: str):
+        def observe(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=EMBEDDING_CACHE_STATS[key])]
+
+        return observe
+
+    for name, key, description in [
+        ("hits", "hits", "Embeddings found in the in-process cache"),
+        ("redis_hits", "redis_hits", "Embeddings found in the Redis cache"),
+        ("misses", "misses", "Embeddings computed by the model or API"),
+    ]:
+        meter.create_observable_counter(
+            name=f"webui.retrieval.embedding_cache.{name}",
+            description=description,
+            unit="1",
+            callbacks=[embedding_cache_callback(key)],
+        )
+
+    def observe_embedding_cache_hit_rate(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        hits = EMBEDDING_CACHE_STATS["hits"] + EMBEDDING_CACHE_STATS["redis_hits"]
+        total = hits + EMBEDDING_CACHE_STATS["misses"]
+        return [metrics.Observation(value=hits / total if total else 0.0)]
+
+    meter.create_observable_gauge(
+        name="webui.retrieval.embedding_cache.hit_rate",
+        description="Share of embeddings served from the cache since startup",
+        unit="1",
+        callbacks=[observe_embedding_cache_hit_rate],
+    )
+
+    def chunk_embedding_callback(key: str):
+        def observe(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=CHUNK_EMBEDDING_STATS[key])]
+
+        return observe
+
+    for name, key, description in [
+        ("reused", "reused", "Ingested chunks embedded with a stored vector"),
+        ("computed", "computed", "Ingested chunks sent to the embedding engine"),
+    ]:
+        meter.create_observable_counter(
+            name=f"webui.retrieval.chunk_embeddings.{name}",
+            description=description,
+            unit="1",
+            callbacks=[chunk_embedding_callback(key)],
+        )
+
+    def auth_callback(key: str):
+        def observe(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=AUTH_DB_STATS[key])]
+
+        return observe
+
+    for name, key, description in [
+        ("user_cache.hits", "cache_hits", "Authenticated users served from memory"),
+        ("user_cache.misses", "cache_misses", "Authenticated users not in memory"),
+        ("db.reads", "db_reads", "User lookups by id or API key on the auth path"),
+        ("db.writes", "db_writes", "last_active_at writes on the auth path"),
+    ]:
+        meter.create_observable_counter(
+            name=f"webui.auth.{name}",
+            description=description,
+            unit="1",
+            callbacks=[auth_callback(key)],
+        )
+
+    def model_registry_callback(key: str):
+        def observe(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=MODEL_REGISTRY_STATS[key])]
+
+        return observe
+
+    for name, key, description in [
+        ("hits", "hits", "Model lists served from the model registry"),
+        ("builds", "builds", "Model lists built from base and custom models"),
+        ("filtered.hits", "filter_hits", "Per-user model lists served memoized"),
+        ("filtered.misses", "filter_misses", "Per-user model lists filtered"),
+    ]:
+        meter.create_observable_counter(
+            name=f"webui.models.registry.{name}",
+            description=description,
+            unit="1",
+            callbacks=[model_registry_callback(key)],
+        )
+
+    def rate_limit_callback(key: str):
+        def observe(
+            options: metrics.CallbackOptions,
+        ) -> Sequence[metrics.Observation]:
+            return [metrics.Observation(value=RATE_LIMIT_STATS[key])]
+
+        return observe
+
+    for name, key, description in [
+        ("checks", "checks", "Rate limit checks"),
+        ("limited", "limited", "Requests rejected by a rate limit"),
+        (
+            "fallbacks",
+            "fallbacks",
+            "Rate limit checks done in memory after a Redis error",
+        ),
+    ]:
+        meter.create_observable_counter(
+            name=f"webui.ratelimit.{name}",
+            description=description,
+            unit="1",
+            callbacks=[rate_limit_callback(key)],
+        )
+
     # FastAPI middleware
     @app.middleware("http")
     async def _metrics_middleware(request: Request, call_next):
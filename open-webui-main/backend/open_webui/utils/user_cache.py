@@ -0,0 +1,210 @@
+"""
+Users and API keys recently authenticated, and their last activity.
+
+get_current_user reads the user on every request. Users are kept in
+process for AUTH_USER_CACHE_TTL seconds, by id and by API key, and dropped
+whenever UsersTable changes them. With REDIS_URL those changes are also
+published, so other instances drop the user at once instead of serving it
+until the TTL runs out. Callers get a copy of the cached user.
+
+last_active_at is not written per request either: LastActiveBuffer keeps
+the latest activity per user and writes them all in one statement every
+DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL seconds.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from open_webui.env import (
+    AUTH_USER_CACHE_SIZE,
+    AUTH_USER_CACHE_TTL,
+    DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL,
+    ENABLE_AUTH_USER_CACHE_REDIS,
+    REDIS_KEY_PREFIX,
+    REDIS_URL,
+)
+from open_webui.utils.redis import get_redis_client
+
+log = logging.getLogger(__name__)
+
+USER_CACHE_REDIS_CHANNEL = f"{REDIS_KEY_PREFIX}:users:invalidate"
+
+# Auth path database queries, exported by utils/telemetry/metrics.py
+AUTH_DB_STATS = {
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "db_reads": 0,  # user lookups by id or API key
+    "db_writes": 0,  # last_active_at statements
+    "invalidations": 0,
+}
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+class UserCache:
+    def __init__(self, ttl: float, size: int, redis: Any = None):
+        self.ttl = ttl
+        self.size = size
+        # Sync client publishing invalidations, created on first use
+        self.redis = redis
+        # user id -> (expires at, user)
+        self.users: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        # sha256 of the API key -> (expires at, user id)
+        self.api_keys: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        # Auth runs on the event loop and in the thread pool
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.size > 0
+
+    def _get(self, entries: OrderedDict, key: str) -> Optional[Any]:
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return entry[1]
+
+    def _set(self, entries: OrderedDict, key: str, value: Any):
+        entries[key] = (time.monotonic() + self.ttl, value)
+        entries.move_to_end(key)
+        while len(entries) > self.size:
+            entries.popitem(last=False)
+
+    def get_user(self, id: str, load: Callable[[str], Optional[Any]]) -> Optional[Any]:
+        """The user `id`, from the cache or else from `load(id)`"""
+        if not self.enabled:
+            AUTH_DB_STATS["db_reads"] += 1
+            return load(id)
+
+        with self.lock:
+            user = self._get(self.users, id)
+        if user is not None:
+            AUTH_DB_STATS["cache_hits"] += 1
+            return user.model_copy(deep=True)
+
+        AUTH_DB_STATS["cache_misses"] += 1
+        AUTH_DB_STATS["db_reads"] += 1
+        user = load(id)
+        if user is not None:
+            with self.lock:
+                self._set(self.users, user.id, user)
+            user = user.model_copy(deep=True)
+        return user
+
+    def get_user_by_api_key(
+        self, api_key: str, load: Callable[[str], Optional[Any]]
+    ) -> Optional[Any]:
+        """The user owning `api_key`, from the cache or else from `load(api_key)`"""
+        if not self.enabled:
+            AUTH_DB_STATS["db_reads"] += 1
+            return load(api_key)
+
+        key_hash = hash_api_key(api_key)
+        with self.lock:
+            user_id = self._get(self.api_keys, key_hash)
+            user = self._get(self.users, user_id) if user_id else None
+        if user is not None:
+            AUTH_DB_STATS["cache_hits"] += 1
+            return user.model_copy(deep=True)
+
+        AUTH_DB_STATS["cache_misses"] += 1
+        AUTH_DB_STATS["db_reads"] += 1
+        user = load(api_key)
+        if user is not None:
+            with self.lock:
+                self._set(self.users, user.id, user)
+                self._set(self.api_keys, key_hash, user.id)
+            user = user.model_copy(deep=True)
+        return user
+
+    def invalidate(self, id: str, publish: bool = True):
+        """Drop the user `id` and their API keys, on every instance if `publish`"""
+        AUTH_DB_STATS["invalidations"] += 1
+        with self.lock:
+            self.users.pop(id, None)
+            for key_hash in [k for k, (_, v) in self.api_keys.items() if v == id]:
+                del self.api_keys[key_hash]
+
+        if publish and self.enabled and ENABLE_AUTH_USER_CACHE_REDIS and REDIS_URL:
+            try:
+                if self.redis is None:
+                    self.redis = get_redis_client()
+                if self.redis is not None:
+                    self.redis.publish(USER_CACHE_REDIS_CHANNEL, id)
+            except Exception as e:
+                log.warning(f"Failed to publish user cache invalidation: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.users.clear()
+            self.api_keys.clear()
+
+
+async def redis_user_cache_listener(redis):
+    """Drop users changed on other instances, see UserCache.invalidate"""
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(USER_CACHE_REDIS_CHANNEL)
+
+    async for message in pubsub.listen():
+        if message["type"] != "message":
+            continue
+        try:
+            data = message["data"]
+            USER_CACHE.invalidate(
+                data.decode() if isinstance(data, bytes) else data, publish=False
+            )
+        except Exception as e:
+            log.exception(f"Error handling user cache invalidation: {e}")
+
+
+class LastActiveBuffer:
+    def __init__(self, interval: float):
+        self.interval = interval
+        # user id -> last active timestamp
+        self.pending: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def mark(self, id: str):
+        with self.lock:
+            self.pending[id] = int(time.time())
+
+    def flush(self, write: Callable[[dict[str, int]], Any]) -> int:
+        """Write the pending timestamps with `write`, returns how many"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return 0
+        AUTH_DB_STATS["db_writes"] += 1
+        try:
+            write(pending)
+        except Exception as e:
+            log.warning(f"Failed to write last active timestamps: {e}")
+            # Keep them for the next flush, unless newer ones came in
+            with self.lock:
+                self.pending = {**pending, **self.pending}
+            return 0
+        return len(pending)
+
+    async def run(self, write: Callable[[dict[str, int]], Any]):
+        """Flush every `interval` seconds until cancelled, then once more"""
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                await asyncio.to_thread(self.flush, write)
+        finally:
+            self.flush(write)
+
+
+USER_CACHE = UserCache(ttl=AUTH_USER_CACHE_TTL, size=AUTH_USER_CACHE_SIZE)
+LAST_ACTIVE_BUFFER = LastActiveBuffer(DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL)
@@ -90,7 +90,9 @@ export class SocketIOCollaborationProvider {
 			document_id: this.documentId,
 			user_id: this.user?.id,
 			user_name: this.user?.name,
-			user_color: userColor
+			user_color: userColor,
+			// Only the changes this document misses are sent back
+			state_vector: Y.encodeStateVector(this.doc)
 		});
 
 		// Set user awareness info
@@ -123,7 +125,7 @@ export class SocketIOCollaborationProvider {
 					if (data.state) {
 						const state = new Uint8Array(data.state);
 
-						if (state.length === 2 && state[0] === 0 && state[1] === 0) {
+						if (!data.diff && state.length === 2 && state[0] === 0 && state[1] === 0) {
 							// Empty state, check if we have content to initialize
 							// check if editor empty as well
 							// const editor = await getEditorInstance();
@@ -170,7 +172,8 @@ export class SocketIOCollaborationProvider {
 
 					this.synced = false;
 					this.socket.emit('ydoc:document:state', {
-						document_id: this.documentId
+						document_id: this.documentId,
+						state_vector: Y.encodeStateVector(this.doc)
 					});
 				}
 			}
@@ -200,7 +203,7 @@ export class SocketIOCollaborationProvider {
 					document_id: this.documentId,
 					user_id: this.user?.id,
 					socket_id: this.socket.id,
-					update: Array.from(update),
+					update,
 					data: {
 						content: this.editorContentGetter?.() ?? {
 							md: '',
@@ -225,7 +228,7 @@ export class SocketIOCollaborationProvider {
 					this.socket.emit('ydoc:awareness:update', {
 						document_id: this.documentId,
 						user_id: this.socket.id,
-						update: Array.from(awarenessUpdate)
+						update: awarenessUpdate
 					});
 				}
 			}